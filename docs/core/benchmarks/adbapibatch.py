@@ -0,0 +1,66 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for L{twisted.enterprise.adbapi.WriteBatcher}.
+
+A number of single-row INSERTs are made at once into an SQLite database in
+a temporary directory, either each with L{ConnectionPool.runOperation} or
+through a L{WriteBatcher}, and the number of rows inserted per second and
+the number of transactions committed are reported.
+"""
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+from twisted.enterprise.adbapi import ConnectionPool, WriteBatcher
+from twisted.internet import defer, reactor, task
+
+INSERT = "insert into simple(x) values(?)"
+
+
+
+@defer.inlineCallbacks
+def benchmark(directory, batched, rows):
+    """
+    Insert C{rows} rows, and return the rate and the number of transactions.
+    """
+    database = os.path.join(directory, "batched" if batched else "single")
+    pool = ConnectionPool("sqlite3", database, check_same_thread=False,
+                          cp_min=1, cp_max=1)
+    pool.start()
+    yield pool.runOperation("create table simple (x integer)")
+    before = pool.statistics()["inUse"]["count"]
+    if batched:
+        runOperation = WriteBatcher(pool).runOperation
+    else:
+        runOperation = pool.runOperation
+    started = time.time()
+    yield defer.gatherResults(
+        [runOperation(INSERT, (i,)) for i in range(rows)])
+    elapsed = time.time() - started
+    transactions = pool.statistics()["inUse"]["count"] - before
+    pool.close()
+    defer.returnValue((rows / elapsed, transactions))
+
+
+
+@defer.inlineCallbacks
+def main(reactor):
+    directory = tempfile.mkdtemp()
+    try:
+        for batched in (False, True):
+            rate, transactions = yield benchmark(directory, batched, 20000)
+            print("%-8s %10.1f rows/s  %6d transactions" % (
+                "batched" if batched else "single", rate, transactions))
+    finally:
+        shutil.rmtree(directory)
+
+
+
+if __name__ == '__main__':
+    task.react(main, [])
@@ -0,0 +1,112 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for L{twisted.internet.threads.deferToThreadPool} round trips.
+
+A number of calls are kept running in a thread pool at once, each of which is
+replaced by a new one as soon as its result arrives in the reactor thread,
+until a total number have completed.  This is run with a pipe and an
+C{eventfd} waker, and with and without coalescing the wake-ups made by
+C{callFromThread}, and the number of round trips per second is reported along
+with the number of times the waker was woken up per round trip.
+"""
+
+from __future__ import print_function
+
+import os
+import time
+
+from twisted.internet import posixbase
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+try:
+    from twisted.internet.epollreactor import EPollReactor as Reactor
+except ImportError:
+    from twisted.internet.pollreactor import PollReactor as Reactor
+
+
+
+class UncoalescedReactor(Reactor):
+    """
+    A reactor which wakes itself up for every call from a thread.
+    """
+    def callFromThread(self, f, *args, **kw):
+        self.threadCallQueue.append((f, args, kw))
+        self.wakeUp()
+
+
+
+def work():
+    """
+    Do nothing, in a thread.
+    """
+
+
+
+def benchmark(reactorClass, wakerFactory, concurrency, total):
+    """
+    Complete C{total} calls to L{work} in a thread pool, C{concurrency} at a
+    time, on a new instance of C{reactorClass} using C{wakerFactory}.
+
+    @return: A C{tuple} of the number of round trips per second and the
+        number of wake-ups per round trip.
+    """
+    reactor = reactorClass.__new__(reactorClass)
+    reactor._wakerFactory = wakerFactory
+    reactor.__init__()
+    wakeUp = reactor.waker.wakeUp
+    wakeUps = [0]
+    def countingWakeUp():
+        wakeUps[0] += 1
+        wakeUp()
+    reactor.waker.wakeUp = countingWakeUp
+
+    pool = ThreadPool(concurrency, concurrency)
+    pool.start()
+    state = {"started": 0, "finished": 0}
+
+    def start():
+        state["started"] += 1
+        deferToThreadPool(reactor, pool, work).addCallback(finished)
+
+    def finished(ignored):
+        state["finished"] += 1
+        if state["finished"] == total:
+            state["elapsed"] = time.time() - state["began"]
+            reactor.stop()
+        elif state["started"] < total:
+            start()
+
+    def begin():
+        state["began"] = time.time()
+        for i in range(concurrency):
+            start()
+
+    reactor.callWhenRunning(begin)
+    reactor.run(installSignalHandlers=False)
+    pool.stop()
+    return total / state["elapsed"], float(wakeUps[0]) / total
+
+
+
+def main():
+    wakers = [("pipe", posixbase._UnixWaker)]
+    if getattr(os, "eventfd", None) is not None:
+        wakers.append(("eventfd", posixbase._EventFDWaker))
+    for concurrency in (1, 16):
+        for wakerName, wakerFactory in wakers:
+            for reactorClass, coalesced in ((UncoalescedReactor, False),
+                                            (Reactor, True)):
+                rate, wakeUps = benchmark(
+                    reactorClass, wakerFactory, concurrency, 20000)
+                print("concurrency: %2d  %-8s %-12s %8.1f round trips/s  "
+                      "wake-ups per round trip: %.2f" % (
+                          concurrency, wakerName,
+                          "coalesced" if coalesced else "uncoalesced",
+                          rate, wakeUps))
+
+
+
+if __name__ == '__main__':
+    main()
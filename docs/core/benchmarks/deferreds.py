@@ -4,12 +4,18 @@
 """
 See how fast deferreds are.
 
-This is mainly useful to compare cdefer.Deferred to defer.Deferred
+Each benchmark is run a number of times and the time taken by one run is
+reported in microseconds, the best of three attempts, so that changes to
+L{twisted.internet.defer} which make common operations slower are visible.
 """
 
+from __future__ import print_function
+
+import gc
+import sys
+import time
 
 from twisted.internet import defer
-from timer import timeit
 
 benchmarkFuncs = []
 
@@ -36,6 +42,32 @@ def benchmarkNFunc(iter, ns):
         return func
     return decorator
 
+def timeit(func, iter, *args):
+    """
+    Call C{func} C{iter} times with C{args} and return the time taken, the
+    best of three attempts.
+    """
+    r = range(iter)
+    best = None
+    gc.disable()
+    try:
+        for attempt in range(3):
+            t = time.time()
+            for i in r:
+                func(*args)
+            elapsed = time.time() - t
+            if best is None or elapsed < best:
+                best = elapsed
+        return best
+    finally:
+        gc.enable()
+
+def f(result):
+    """
+    A trivial callback.
+    """
+    return result
+
 def instantiate():
     """
     Only create a deferred
@@ -43,6 +75,13 @@ def instantiate():
     d = defer.Deferred()
 instantiate = benchmarkFunc(100000)(instantiate)
 
+def succeed():
+    """
+    Create a deferred which already has a result with L{defer.succeed}.
+    """
+    d = defer.succeed(1)
+succeed = benchmarkFunc(100000)(succeed)
+
 def instantiateShootCallback():
     """
     Create a deferred and give it a normal result
@@ -62,7 +101,24 @@ def instantiateShootErrback():
     except:
         d.errback()
     d.addErrback(lambda x: None)
-instantiateShootErrback = benchmarkFunc(200)(instantiateShootErrback)
+instantiateShootErrback = benchmarkFunc(10000)(instantiateShootErrback)
+
+def addCallbackCallback():
+    """
+    Create a deferred, add one callback to it and give it a result: the usual
+    life of a deferred.
+    """
+    d = defer.Deferred()
+    d.addCallback(f)
+    d.callback(1)
+addCallbackCallback = benchmarkFunc(100000)(addCallbackCallback)
+
+def succeedAddCallback():
+    """
+    Add one callback to a deferred which already has a result.
+    """
+    defer.succeed(1).addCallback(f)
+succeedAddCallback = benchmarkFunc(100000)(succeedAddCallback)
 
 ns = [10, 1000, 10000]
 
@@ -72,9 +128,7 @@ def instantiateAddCallbacksNoResult(n):
     number of times.
     """
     d = defer.Deferred()
-    def f(result):
-        return result
-    for i in xrange(n):
+    for i in range(n):
         d.addCallback(f)
         d.addErrback(f)
         d.addBoth(f)
@@ -87,9 +141,7 @@ def instantiateAddCallbacksBeforeResult(n):
     number of times, and then shoots a result through all of the callbacks.
     """
     d = defer.Deferred()
-    def f(result):
-        return result
-    for i in xrange(n):
+    for i in range(n):
         d.addCallback(f)
         d.addErrback(f)
         d.addBoth(f)
@@ -104,10 +156,8 @@ def instantiateAddCallbacksAfterResult(n):
     callbacks as they are added.
     """
     d = defer.Deferred()
-    def f(result):
-        return result
     d.callback(1)
-    for i in xrange(n):
+    for i in range(n):
         d.addCallback(f)
         d.addErrback(f)
         d.addBoth(f)
@@ -121,11 +171,9 @@ def pauseUnpause(n):
     callbacks.
     """
     d = defer.Deferred()
-    def f(result):
-        return result
     d.callback(1)
     d.pause()
-    for i in xrange(n):
+    for i in range(n):
         d.addCallback(f)
         d.addErrback(f)
         d.addBoth(f)
@@ -133,13 +181,43 @@ def pauseUnpause(n):
     d.unpause()
 pauseUnpause = benchmarkNFunc(20, ns)(pauseUnpause)
 
-def benchmark():
+def chainDepth(n):
+    """
+    Create a chain of the given number of deferreds, each waiting on the
+    result of the next one, and give the last one a result.
+    """
+    first = last = defer.Deferred()
+    for i in range(n):
+        next = defer.Deferred()
+        last.addCallback(lambda ignored, next=next: next)
+        last.callback(None)
+        last = next
+    last.callback(1)
+chainDepth = benchmarkNFunc(20, ns)(chainDepth)
+
+def chainFired(n):
+    """
+    Create a deferred whose callbacks return the given number of deferreds
+    which already have results.
+    """
+    d = defer.Deferred()
+    for i in range(n):
+        d.addCallback(defer.succeed)
+    d.callback(1)
+chainFired = benchmarkNFunc(20, ns)(chainFired)
+
+def benchmark(names):
     """
-    Run all of the benchmarks registered in the benchmarkFuncs list
+    Run the benchmarks registered in the benchmarkFuncs list whose names are
+    in C{names}, or all of them if it is empty.
     """
-    print defer.Deferred.__module__
+    print(defer.Deferred.__module__)
     for func, args, iter in benchmarkFuncs:
-        print func.__name__, args, timeit(func, iter, *args)
+        if names and func.__name__ not in names:
+            continue
+        print("%-36s %-8s %10.3f usec" % (
+            func.__name__, args and args[0] or "",
+            timeit(func, iter, *args) / iter * 1e6))
 
 if __name__ == '__main__':
-    benchmark()
+    benchmark(sys.argv[1:])
@@ -0,0 +1,129 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for L{twisted.internet.epollreactor.EPollReactor} in level- and
+edge-triggered modes.
+
+A client and server connected over loopback TCP bounce a message back and
+forth a number of times.  Every write starts and stops the connection writing,
+which in level-triggered mode costs two C{epoll_ctl} calls.  The number of
+calls made to the C{epoll} object is counted by wrapping it, and reported
+along with the number of round trips per second.
+"""
+
+from __future__ import print_function
+
+import time
+
+from twisted.internet.epollreactor import EPollReactor
+from twisted.internet.protocol import Protocol, ServerFactory, ClientFactory
+
+
+
+class CountingPoller(object):
+    """
+    Wrap an C{epoll} object, counting the calls made to each of its methods.
+
+    @ivar calls: A C{dict} mapping method names to the number of times they
+        have been called.
+    """
+    def __init__(self, poller):
+        self._poller = poller
+        self.calls = dict.fromkeys(
+            ["register", "modify", "unregister", "poll"], 0)
+
+
+    def __getattr__(self, name):
+        method = getattr(self._poller, name)
+        if name not in self.calls:
+            return method
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return method(*args, **kwargs)
+        return counted
+
+
+
+class Echo(Protocol):
+    """
+    Send back everything received.
+    """
+    def dataReceived(self, data):
+        self.transport.write(data)
+
+
+
+class PingPong(Protocol):
+    """
+    Send a message, and send it again each time it comes back, until it has
+    done so C{rounds} times.
+    """
+    def __init__(self, message, rounds, reactor):
+        self.message = message
+        self.rounds = rounds
+        self.reactor = reactor
+        self.received = 0
+
+
+    def connectionMade(self):
+        self.started = time.time()
+        self.transport.write(self.message)
+
+
+    def dataReceived(self, data):
+        self.received += len(data)
+        if self.received < len(self.message):
+            return
+        self.received -= len(self.message)
+        self.rounds -= 1
+        if self.rounds:
+            self.transport.write(self.message)
+        else:
+            self.elapsed = time.time() - self.started
+            self.reactor.stop()
+
+
+
+def benchmark(edgeTriggered, size, rounds):
+    """
+    Bounce a message of C{size} bytes between two connections C{rounds}
+    times, on a reactor created with the given C{edgeTriggered} argument.
+
+    @return: A C{tuple} of the number of round trips per second and the
+        calls made to the C{epoll} object, as counted by L{CountingPoller}.
+    """
+    reactor = EPollReactor(edgeTriggered)
+    poller = reactor._poller = CountingPoller(reactor._poller)
+
+    serverFactory = ServerFactory()
+    serverFactory.protocol = Echo
+    port = reactor.listenTCP(0, serverFactory, interface="127.0.0.1")
+
+    client = PingPong(b"x" * size, rounds, reactor)
+    clientFactory = ClientFactory()
+    clientFactory.buildProtocol = lambda addr: client
+    reactor.connectTCP("127.0.0.1", port.getHost().port, clientFactory)
+    reactor.run(installSignalHandlers=False)
+    return rounds / client.elapsed, poller.calls
+
+
+
+def main():
+    rounds = 20000
+    for size in (64, 16384):
+        for edgeTriggered in (False, True):
+            rate, calls = benchmark(edgeTriggered, size, rounds)
+            print("size: %5d  %-15s %8.1f round trips/s  epoll_ctl per "
+                  "round trip: %.2f  epoll_wait per round trip: %.2f" % (
+                      size,
+                      "edge-triggered" if edgeTriggered else "level-triggered",
+                      rate,
+                      float(calls["register"] + calls["modify"] +
+                            calls["unregister"]) / rounds,
+                      float(calls["poll"]) / rounds))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmarks for L{twisted.internet.defer.inlineCallbacks}.
+
+Each generator yields a number of times, either values which are not
+L{Deferred}s, L{Deferred}s which already have results, or L{Deferred}s which
+are given their results after being yielded.  The time taken per yield is
+reported, in microseconds, the best of three attempts.
+"""
+
+from __future__ import print_function
+
+import gc
+import time
+
+from twisted.internet.defer import Deferred, inlineCallbacks, succeed
+
+
+
+@inlineCallbacks
+def yieldValues(n):
+    """
+    Yield C{n} values which are not L{Deferred}s.
+    """
+    for i in range(n):
+        yield i
+
+
+
+@inlineCallbacks
+def yieldFired(n):
+    """
+    Yield C{n} L{Deferred}s which already have results.
+    """
+    for i in range(n):
+        yield succeed(i)
+
+
+
+@inlineCallbacks
+def yieldUnfired(deferreds):
+    """
+    Yield each of C{deferreds}, which do not have results yet.
+    """
+    for d in deferreds:
+        yield d
+
+
+
+def runUnfired(n):
+    """
+    Run L{yieldUnfired} with C{n} L{Deferred}s, giving each a result once it
+    has been yielded.
+    """
+    deferreds = [Deferred() for i in range(n)]
+    yieldUnfired(deferreds)
+    for d in deferreds:
+        d.callback(None)
+
+
+
+def timeit(func, n):
+    """
+    Return the time C{func(n)} takes per yield, the best of three attempts.
+    """
+    best = None
+    gc.disable()
+    try:
+        for attempt in range(3):
+            started = time.time()
+            func(n)
+            elapsed = time.time() - started
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        gc.enable()
+    return best / n
+
+
+
+def main():
+    n = 100000
+    for func in (yieldValues, yieldFired, runUnfired):
+        print("%-12s %8.3f usec per yield" % (
+            func.__name__, timeit(func, n) * 1e6))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for the cost of L{twisted.internet.base.ReactorBase}
+instrumentation.
+
+A client and server connected over loopback TCP exchange messages with and
+without instrumentation, and the number of round trips per second is
+reported for two workloads:
+
+    - C{ping-pong}: a single byte is bounced back and forth while a timed
+      call reschedules itself, so that every iteration of the reactor has a
+      read or write and a timed call which do almost nothing.  This is the
+      worst case for instrumentation.
+
+    - C{json}: the client sends a line of JSON describing a hundred records,
+      and the server, which has an idle timeout like most servers, answers
+      with a line of JSON summarizing them.
+"""
+
+from __future__ import print_function
+
+import json
+import time
+
+from twisted.internet.protocol import Protocol, ServerFactory, ClientFactory
+from twisted.protocols import basic, policies
+from twisted.internet.selectreactor import SelectReactor
+try:
+    from twisted.internet.epollreactor import EPollReactor
+except ImportError:
+    EPollReactor = None
+
+
+
+class Echo(Protocol):
+    """
+    Send back everything received.
+    """
+    def dataReceived(self, data):
+        self.transport.write(data)
+
+
+
+class PingPong(Protocol):
+    """
+    Send a message, and send it again each time it comes back, until it has
+    done so C{rounds} times.
+    """
+    def __init__(self, rounds, reactor):
+        self.rounds = rounds
+        self.reactor = reactor
+
+
+    def connectionMade(self):
+        self.started = time.time()
+        self.transport.write(b"x")
+
+
+    def dataReceived(self, data):
+        self.rounds -= 1
+        if self.rounds:
+            self.transport.write(b"x")
+        else:
+            self.elapsed = time.time() - self.started
+            self.reactor.stop()
+
+
+
+class Summarize(basic.LineReceiver, policies.TimeoutMixin):
+    """
+    Answer each line, a JSON list of records, with a line of JSON giving
+    their number, their total score and the ten with the highest scores, and
+    disconnect after a minute without a request.
+    """
+    def __init__(self, reactor):
+        self.timeoutClock = reactor
+
+
+    def connectionMade(self):
+        self.setTimeout(60)
+
+
+    def lineReceived(self, line):
+        self.resetTimeout()
+        records = json.loads(line.decode("utf-8"))
+        records.sort(key=lambda record: record["score"])
+        summary = {
+            "count": len(records),
+            "total": sum(record["score"] for record in records),
+            "top": records[-10:],
+            }
+        self.sendLine(json.dumps(summary).encode("utf-8"))
+
+
+
+class Request(basic.LineReceiver):
+    """
+    Send a request to L{Summarize}, and send it again each time the answer
+    comes back, until it has done so C{rounds} times.
+    """
+    request = json.dumps([
+        {"id": i, "name": "record %d" % (i,), "score": i * 7919 % 1000}
+        for i in range(100)]).encode("utf-8")
+
+    def __init__(self, rounds, reactor):
+        self.rounds = rounds
+        self.reactor = reactor
+
+
+    def connectionMade(self):
+        self.started = time.time()
+        self.sendLine(self.request)
+
+
+    def lineReceived(self, line):
+        json.loads(line.decode("utf-8"))
+        self.rounds -= 1
+        if self.rounds:
+            self.sendLine(self.request)
+        else:
+            self.elapsed = time.time() - self.started
+            self.reactor.stop()
+
+
+
+def tick(reactor):
+    """
+    Reschedule this function to run on every iteration of the reactor.
+    """
+    reactor.callLater(0, tick, reactor)
+
+
+
+def benchmark(reactorClass, instrumented, workload, rounds):
+    """
+    Exchange messages between two connections C{rounds} times on a new
+    instance of C{reactorClass}.
+
+    @param workload: C{"ping-pong"} or C{"json"}.
+
+    @return: The number of round trips per second.
+    """
+    reactor = reactorClass()
+    if instrumented:
+        reactor.startInstrumentation()
+
+    serverFactory = ServerFactory()
+    if workload == "ping-pong":
+        serverFactory.protocol = Echo
+        client = PingPong(rounds, reactor)
+        tick(reactor)
+    else:
+        serverFactory.buildProtocol = lambda addr: Summarize(reactor)
+        client = Request(rounds, reactor)
+    port = reactor.listenTCP(0, serverFactory, interface="127.0.0.1")
+
+    clientFactory = ClientFactory()
+    clientFactory.buildProtocol = lambda addr: client
+    reactor.connectTCP("127.0.0.1", port.getHost().port, clientFactory)
+    reactor.run(installSignalHandlers=False)
+    return rounds / client.elapsed
+
+
+
+def main():
+    reactorClasses = [SelectReactor]
+    if EPollReactor is not None:
+        reactorClasses.append(EPollReactor)
+    for workload, rounds in (("ping-pong", 20000), ("json", 5000)):
+        for reactorClass in reactorClasses:
+            for instrumented in (False, True):
+                rate = benchmark(reactorClass, instrumented, workload, rounds)
+                print("%-9s %-14s %-15s %8.1f round trips/s" % (
+                    workload, reactorClass.__name__,
+                    "instrumented" if instrumented else "uninstrumented",
+                    rate))
+
+
+
+if __name__ == '__main__':
+    main()
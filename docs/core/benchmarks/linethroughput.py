@@ -0,0 +1,94 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Throughput benchmark for L{twisted.protocols.basic.LineReceiver} and
+L{twisted.protocols.basic.LineOnlyReceiver}.
+
+About a megabyte of lines of each length from 10 bytes to 10 kilobytes is
+delivered to each receiver, either in one burst or in chunks of a few
+sizes, and the number of megabytes and lines handled per second is
+reported.
+"""
+
+from __future__ import division, print_function
+
+import time
+
+from twisted.protocols import basic
+from twisted.test.proto_helpers import StringTransport
+
+TOTAL = 2 ** 20
+
+
+
+class CollectingLineReceiver(basic.LineReceiver):
+    """
+    A L{basic.LineReceiver} which keeps the lines it receives.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.lineReceived = self.lines.append
+
+
+
+class CollectingLineOnlyReceiver(basic.LineOnlyReceiver):
+    """
+    A L{basic.LineOnlyReceiver} which keeps the lines it receives.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.lineReceived = self.lines.append
+
+
+
+def benchmark(receiverClass, lineLength, chunkSize):
+    """
+    Deliver about L{TOTAL} bytes of lines of C{lineLength} bytes to a new
+    C{receiverClass} in chunks of C{chunkSize} bytes, or all at once if it
+    is C{None}.
+
+    @return: The number of megabytes and of lines delivered per second.
+    """
+    line = b'x' * lineLength
+    count = max(1, TOTAL // (lineLength + 2))
+    data = (line + b'\r\n') * count
+    if chunkSize is None:
+        chunks = [data]
+    else:
+        chunks = [data[i:i + chunkSize]
+                  for i in range(0, len(data), chunkSize)]
+    receiver = receiverClass()
+    receiver.MAX_LENGTH = lineLength
+    receiver.makeConnection(StringTransport())
+
+    started = time.time()
+    for chunk in chunks:
+        receiver.dataReceived(chunk)
+    elapsed = time.time() - started
+
+    assert receiver.lines == [line] * count
+    return len(data) / elapsed / 2 ** 20, count / elapsed
+
+
+
+def main():
+    print("%-18s %7s %7s %10s %12s" % (
+        "receiver", "line", "chunk", "MB/s", "lines/s"))
+    for receiverClass in (CollectingLineReceiver,
+                          CollectingLineOnlyReceiver):
+        name = receiverClass.__bases__[0].__name__
+        for lineLength in (10, 100, 1000, 10000):
+            for chunkSize in (None, 65536, 4096, 100):
+                megabytes, lines = benchmark(
+                    receiverClass, lineLength, chunkSize)
+                print("%-18s %7d %7s %10.1f %12.0f" % (
+                    name, lineLength, chunkSize or "burst", megabytes,
+                    lines))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measure the cost per request of a line-based echo server with
+L{twisted.test.loadsim}.
+
+A few thousand clients arrive at random over a simulated minute, each sending
+a number of lines with a pause between them, over connections with a random
+latency.  The simulated throughput and response times are the same on every
+run; the server time per request is measured.
+"""
+
+from __future__ import division, print_function
+
+from twisted.internet.protocol import ServerFactory
+from twisted.protocols.basic import LineReceiver
+from twisted.test.loadsim import ScriptedClient, Simulation, lineResponseLength
+
+
+
+class Echo(LineReceiver):
+    """
+    Send back every line received.
+    """
+    def lineReceived(self, line):
+        self.sendLine(line)
+
+
+
+def main():
+    factory = ServerFactory()
+    factory.protocol = Echo
+    sim = Simulation(factory, seed=1,
+                     latency=lambda random: 0.005 + random.expovariate(200))
+    request = b"x" * 100 + b"\r\n"
+    sim.arrive(5000, 80, lambda: ScriptedClient(
+        [request] * 10, lineResponseLength,
+        lambda random: random.expovariate(2)))
+    sim.run()
+    print(sim.report())
+
+
+
+if __name__ == '__main__':
+    main()
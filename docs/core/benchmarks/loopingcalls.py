@@ -0,0 +1,77 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for many L{twisted.internet.task.LoopingCall}s with the same
+interval, such as per-connection heartbeats.
+
+A number of looping calls are run for a few seconds, each with its own
+reactor timer and then all in one L{twisted.internet.task.LoopingCallGroup},
+and the processor time taken per call is reported along with the number of
+timers the reactor had pending.
+"""
+
+from __future__ import print_function
+
+import time
+
+from twisted.internet import task
+try:
+    processTime = time.process_time
+except AttributeError:
+    # Python 2.
+    processTime = time.clock
+try:
+    from twisted.internet.epollreactor import EPollReactor as Reactor
+except ImportError:
+    from twisted.internet.pollreactor import PollReactor as Reactor
+
+
+
+def heartbeat():
+    """
+    Do nothing, periodically.
+    """
+
+
+
+def benchmark(grouped, count, interval, duration):
+    """
+    Run C{count} looping calls every C{interval} seconds for C{duration}
+    seconds on a new reactor.
+
+    @return: A C{tuple} of the processor time taken per call, in seconds,
+        and the number of timers the reactor had pending.
+    """
+    reactor = Reactor()
+    group = task.LoopingCallGroup(jitter=1.0, clock=reactor)
+    calls = []
+    for i in range(count):
+        if grouped:
+            call = group.loopingCall(heartbeat)
+        else:
+            call = task.LoopingCall(heartbeat)
+            call.clock = reactor
+        call.start(interval, now=False)
+        calls.append(call)
+    timers = len(reactor.getDelayedCalls())
+    reactor.callLater(duration, reactor.stop)
+    started = processTime()
+    reactor.run(installSignalHandlers=False)
+    elapsed = processTime() - started
+    for call in calls:
+        call.stop()
+    return elapsed / (count * duration / interval), timers
+
+
+
+def main():
+    for grouped in (False, True):
+        perCall, timers = benchmark(grouped, 20000, 1.0, 5)
+        print("%-10s %8.3f usec per call  %6d timers" % (
+            "grouped" if grouped else "ungrouped", perCall * 1e6, timers))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for reading from a L{twisted.internet.tcp} connection, comparing
+L{Connection.doRead} delivering a new C{bytes} object to
+L{IProtocol.dataReceived} with reading into a reused buffer for
+L{twisted.internet.interfaces.IBufferReceiver.bufferReceived}.
+
+The other end of the connection is a local socket which is written to by
+hand before each read.  Where L{tracemalloc} can measure it (Python 3.9
+and later), the peak memory allocated during a read is reported as well.
+"""
+
+from __future__ import print_function
+
+import socket
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from zope.interface import implementer
+
+from twisted.internet.tcp import Connection
+from twisted.internet.protocol import Protocol
+from twisted.internet.interfaces import IBufferReceiver
+
+
+
+class NullReactor(object):
+    """
+    Just enough of a reactor for a L{Connection} which is read by hand.
+    """
+    def addReader(self, reader):
+        pass
+
+
+    def removeReader(self, reader):
+        pass
+
+
+
+class DataCounter(Protocol):
+    """
+    Count the bytes given to C{dataReceived}.
+    """
+    count = 0
+
+    def dataReceived(self, data):
+        self.count += len(data)
+
+
+
+@implementer(IBufferReceiver)
+class BufferCounter(DataCounter):
+    """
+    Count the bytes given to C{bufferReceived}.
+    """
+    def bufferReceived(self, data):
+        self.count += len(data)
+
+
+
+def connect(protocolClass, size):
+    """
+    Make a L{Connection} to a local socket which can buffer at least C{size}
+    bytes, delivering what it reads to an instance of C{protocolClass}.
+
+    @return: The L{Connection} and the socket at the other end.
+    """
+    client, server = socket.socketpair()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size * 2)
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size * 2)
+    conn = Connection(client, protocolClass(), NullReactor())
+    conn.connected = True
+    return conn, server
+
+
+
+def readAll(conn, server, data):
+    """
+    Send C{data} from C{server} and read it all from C{conn}.
+    """
+    server.sendall(data)
+    expected = conn.protocol.count + len(data)
+    while conn.protocol.count < expected:
+        conn.doRead()
+
+
+
+def benchmark(protocolClass, size, rounds):
+    """
+    Read C{size} bytes from a connection C{rounds} times, delivering them to
+    an instance of C{protocolClass}, and return the number of rounds per
+    second.
+    """
+    conn, server = connect(protocolClass, size)
+    data = b"x" * size
+    elapsed = 0
+    for i in range(rounds):
+        before = time.time()
+        readAll(conn, server, data)
+        elapsed += time.time() - before
+    conn.socket.close()
+    server.close()
+    return rounds / elapsed
+
+
+
+def peakAllocation(protocolClass, size):
+    """
+    Read C{size} bytes from a connection, delivering them to an instance of
+    C{protocolClass}, and return the peak number of bytes allocated while
+    reading, or C{None} if that can't be measured.
+    """
+    if getattr(tracemalloc, "reset_peak", None) is None:
+        return None
+    conn, server = connect(protocolClass, size)
+    data = b"x" * size
+    # Allocate the reused buffer, if there is one, before measuring.
+    readAll(conn, server, data)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    readAll(conn, server, data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    conn.socket.close()
+    server.close()
+    return peak
+
+
+
+def main():
+    for size in (100, 4096, 65536):
+        for protocolClass in (DataCounter, BufferCounter):
+            rate = benchmark(protocolClass, size, 20000)
+            peak = peakAllocation(protocolClass, size)
+            if peak is None:
+                peak = "unknown"
+            print("size: %6d  %-14s %10.1f rounds/s  peak allocation: %s" % (
+                size, protocolClass.__name__, rate, peak))
+
+
+
+if __name__ == '__main__':
+    main()
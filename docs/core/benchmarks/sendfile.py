@@ -0,0 +1,126 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for sending a file over a L{twisted.internet.tcp} connection, by
+reading it and writing the bytes to the connection as
+L{twisted.web.static.NoRangeStaticProducer} used to, and with
+L{twisted.internet.interfaces.ISendfileTransport.sendFile}.
+
+The connection is flushed by hand to a local socket which is drained with
+C{recv_into}, so the CPU time reported includes the cost of receiving the
+bytes as well as sending them.  C{sendFile} is only available on Python 3,
+where L{os.sendfile} exists.
+"""
+
+from __future__ import print_function
+
+import os
+import socket
+import tempfile
+import time
+
+from twisted.internet import tcp
+from twisted.internet.tcp import Connection
+from twisted.internet.protocol import Protocol
+
+
+
+class NullReactor(object):
+    """
+    Just enough of a reactor for a L{Connection} which is flushed by hand.
+    """
+    def addWriter(self, writer):
+        pass
+
+
+    def removeWriter(self, writer):
+        pass
+
+
+    def removeReader(self, reader):
+        pass
+
+
+
+def drain(skt, buf):
+    """
+    Read everything currently available from C{skt} into C{buf}.
+    """
+    try:
+        while skt.recv_into(buf):
+            pass
+    except socket.error:
+        pass
+
+
+
+def flush(conn, server, buf):
+    """
+    Write everything buffered by C{conn}.
+    """
+    while conn._tempDataLen or conn.offset < len(conn.dataBuffer):
+        conn.doWrite()
+        drain(server, buf)
+
+
+
+def readAndWrite(conn, fileObj, size, server, buf):
+    fileObj.seek(0)
+    while True:
+        data = fileObj.read(conn.bufferSize)
+        if not data:
+            break
+        conn.write(data)
+        flush(conn, server, buf)
+
+
+
+def sendFile(conn, fileObj, size, server, buf):
+    conn.sendFile(fileObj, 0, size)
+    flush(conn, server, buf)
+
+
+
+def benchmark(method, fileObj, size, rounds):
+    """
+    Send C{fileObj} C{rounds} times using C{method} and return the CPU
+    seconds used per gigabyte sent and the throughput in megabytes per second.
+    """
+    client, server = socket.socketpair()
+    server.setblocking(False)
+    conn = Connection(client, Protocol(), NullReactor())
+    conn.connected = True
+    buf = bytearray(1024 * 1024)
+    beforeCPU = sum(os.times()[:2])
+    before = time.time()
+    for i in range(rounds):
+        method(conn, fileObj, size, server, buf)
+    elapsed = time.time() - before
+    cpu = sum(os.times()[:2]) - beforeCPU
+    client.close()
+    server.close()
+    gigabytes = size * rounds / 1024 / 1024 / 1024
+    return cpu / gigabytes, gigabytes * 1024 / elapsed
+
+
+
+def main():
+    for size in (64 * 1024, 1024 * 1024, 16 * 1024 * 1024):
+        with tempfile.TemporaryFile() as fileObj:
+            fileObj.write(b"x" * size)
+            fileObj.flush()
+            rounds = max(10, 2 * 1024 * 1024 * 1024 // size)
+            for method in (readAndWrite, sendFile):
+                if method is sendFile and tcp._sendfile is None:
+                    print("size: %8d  %-12s unavailable" % (
+                        size, method.__name__))
+                    continue
+                cpu, throughput = benchmark(method, fileObj, size, rounds)
+                print("size: %8d  %-12s %6.2f CPU s/GB  %8.1f MB/s" % (
+                    size, method.__name__, cpu, throughput))
+
+
+
+if __name__ == '__main__':
+    main()
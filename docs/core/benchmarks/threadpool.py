@@ -0,0 +1,127 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmarks for L{twisted.python.threadpool.ThreadPool} with many tiny calls.
+
+The first measures the pool alone: a number of calls which do nothing are
+queued at once, and the time until the last has finished is reported per
+call.  The second keeps a number of calls running with
+L{twisted.internet.threads.deferToThreadPool}, each replaced as soon as its
+result arrives in the reactor thread, with and without C{batchResults}, and
+reports the round trips per second and the number of C{callFromThread}s per
+round trip.
+"""
+
+from __future__ import division, print_function
+
+import threading
+import time
+
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+try:
+    from twisted.internet.epollreactor import EPollReactor as Reactor
+except ImportError:
+    from twisted.internet.pollreactor import PollReactor as Reactor
+
+
+
+def work():
+    """
+    Do nothing, in a thread.
+    """
+
+
+
+def poolAlone(threads, total):
+    """
+    Run C{total} calls to L{work} in a pool of C{threads} threads.
+
+    @return: The time taken per call, in seconds.
+    """
+    pool = ThreadPool(threads, threads)
+    pool.start()
+    done = threading.Event()
+    remaining = [total]
+    lock = threading.Lock()
+
+    def onResult(success, result):
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+    started = time.time()
+    for i in range(total):
+        pool.callInThreadWithCallback(onResult, work)
+    done.wait()
+    elapsed = time.time() - started
+    pool.stop()
+    return elapsed / total
+
+
+
+def roundTrips(batched, concurrency, total):
+    """
+    Complete C{total} calls to L{work} with L{deferToThreadPool},
+    C{concurrency} at a time.
+
+    @return: A C{tuple} of the number of round trips per second and the
+        number of calls to C{callFromThread} per round trip.
+    """
+    reactor = Reactor()
+    callFromThread = reactor.callFromThread
+    calls = [0]
+    def countingCallFromThread(f, *args, **kw):
+        calls[0] += 1
+        callFromThread(f, *args, **kw)
+    reactor.callFromThread = countingCallFromThread
+
+    pool = ThreadPool(concurrency, concurrency)
+    pool.batchResults = batched
+    pool.start()
+    state = {"started": 0, "finished": 0}
+
+    def start():
+        state["started"] += 1
+        deferToThreadPool(reactor, pool, work).addCallback(finished)
+
+    def finished(ignored):
+        state["finished"] += 1
+        if state["finished"] == total:
+            state["elapsed"] = time.time() - state["began"]
+            reactor.stop()
+        elif state["started"] < total:
+            start()
+
+    def begin():
+        state["began"] = time.time()
+        for i in range(concurrency):
+            start()
+
+    reactor.callWhenRunning(begin)
+    reactor.run(installSignalHandlers=False)
+    pool.stop()
+    return total / state["elapsed"], calls[0] / total
+
+
+
+def main():
+    for threads in (1, 8):
+        best = min(poolAlone(threads, 100000) for i in range(3))
+        print("pool alone, %d threads: %8.3f usec per call" % (
+            threads, best * 1e6))
+    for concurrency in (1, 16):
+        for batched in (False, True):
+            rate, calls = max(
+                roundTrips(batched, concurrency, 20000) for i in range(3))
+            print("deferToThreadPool, concurrency %2d, %-9s %8.1f round "
+                  "trips/s  callFromThread per round trip: %.2f" % (
+                      concurrency, "batched" if batched else "unbatched",
+                      rate, calls))
+
+
+
+if __name__ == '__main__':
+    main()
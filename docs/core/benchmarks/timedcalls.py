@@ -0,0 +1,171 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmarks for the timed call queue of L{twisted.internet.base.ReactorBase}.
+
+The indexed heap used by the reactor is compared against the previous
+implementation, which used L{heapq} with a linear search to reschedule calls
+and left cancelled calls in the heap until a compaction pass removed them.
+
+Each scenario keeps a large number of live timers, like a server with many
+connections each holding a L{twisted.protocols.policies.TimeoutMixin} timeout,
+and then repeatedly resets or cancels and replaces them.
+"""
+
+from __future__ import print_function
+
+import random
+import time
+from heapq import heappush, heappop, heapify
+
+from twisted.internet.base import ReactorBase
+
+
+
+class BenchmarkReactor(ReactorBase):
+    """
+    A reactor with a manually advanced clock which is never run.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        ReactorBase.__init__(self)
+
+
+    def seconds(self):
+        return self.now
+
+
+    def installWaker(self):
+        pass
+
+
+
+class LegacyHeapReactor(BenchmarkReactor):
+    """
+    A reactor using the timed call queue implementation which predates the
+    indexed heap.
+    """
+
+    def __init__(self):
+        self._cancellations = 0
+        BenchmarkReactor.__init__(self)
+
+
+    def _moveCallLaterSooner(self, tple):
+        heap = self._pendingTimedCalls
+        try:
+            pos = heap.index(tple)
+            elt = heap[pos]
+            while pos != 0:
+                parent = (pos - 1) // 2
+                if heap[parent] <= elt:
+                    break
+                heap[pos] = heap[parent]
+                pos = parent
+            heap[pos] = elt
+        except ValueError:
+            pass
+
+
+    def _cancelCallLater(self, tple):
+        self._cancellations += 1
+
+
+    def _insertNewDelayedCalls(self):
+        for call in self._newTimedCalls:
+            if call.cancelled:
+                self._cancellations -= 1
+            else:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+        self._newTimedCalls = []
+
+
+    def runUntilCurrent(self):
+        self._insertNewDelayedCalls()
+        now = self.seconds()
+        while self._pendingTimedCalls and (
+                self._pendingTimedCalls[0].time <= now):
+            call = heappop(self._pendingTimedCalls)
+            if call.cancelled:
+                self._cancellations -= 1
+                continue
+            if call.delayed_time > 0:
+                call.activate_delay()
+                heappush(self._pendingTimedCalls, call)
+                continue
+            call.called = 1
+            call.func(*call.args, **call.kw)
+        if (self._cancellations > 50 and
+                self._cancellations > len(self._pendingTimedCalls) >> 1):
+            self._cancellations = 0
+            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
+                                       if not x.cancelled]
+            heapify(self._pendingTimedCalls)
+
+
+
+def noop():
+    pass
+
+
+
+def populate(reactor, timers):
+    """
+    Schedule C{timers} calls at random times in the next hour.
+    """
+    rng = random.Random(timers)
+    calls = [reactor.callLater(rng.uniform(60, 3600), noop)
+             for i in range(timers)]
+    reactor.runUntilCurrent()
+    return calls, rng
+
+
+
+def resetSooner(reactor, timers, operations):
+    """
+    Repeatedly move a random timer to an earlier time.
+    """
+    calls, rng = populate(reactor, timers)
+    before = time.time()
+    for i in range(operations):
+        call = calls[rng.randrange(timers)]
+        call.reset((call.getTime() - reactor.now) * 0.9)
+    return time.time() - before
+
+
+
+def cancelAndReplace(reactor, timers, operations):
+    """
+    Repeatedly cancel a random timer and schedule a new one in its place,
+    running the reactor's timed call processing after each batch of changes.
+    """
+    calls, rng = populate(reactor, timers)
+    before = time.time()
+    for i in range(operations):
+        index = rng.randrange(timers)
+        calls[index].cancel()
+        calls[index] = reactor.callLater(rng.uniform(60, 3600), noop)
+        if not i % 100:
+            reactor.runUntilCurrent()
+    reactor.runUntilCurrent()
+    return time.time() - before
+
+
+
+def main():
+    for scenario in resetSooner, cancelAndReplace:
+        for timers in 1000, 10000, 100000:
+            operations = 200
+            for reactorType in LegacyHeapReactor, BenchmarkReactor:
+                elapsed = scenario(reactorType(), timers, operations)
+                print("%-16s %-18s timers: %6d  %8.2f usec/op" % (
+                    scenario.__name__, reactorType.__name__, timers,
+                    elapsed / operations * 1e6))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Benchmark for writing many small chunks to a L{twisted.internet.tcp}
+connection, with and without scatter/gather (C{sendmsg}) writes.
+
+Each round writes a response made of many small fragments, much like the
+headers and body chunks of an HTTP response, and then flushes the
+connection's buffer to a local socket.  Scatter/gather writes are only
+available on Python 3, where sockets have a C{sendmsg} method.  They are
+only used when the buffered chunks are at least
+C{twisted.internet.abstract._VECTOR_MIN_CHUNK} bytes long on average; for
+smaller chunks joining them is cheaper.  The "sendmsg" column forces them
+on regardless.
+"""
+
+from __future__ import print_function
+
+import socket
+import time
+
+from twisted.internet import abstract
+from twisted.internet.tcp import Connection
+from twisted.internet.protocol import Protocol
+
+
+
+class NullReactor(object):
+    """
+    Just enough of a reactor for a L{Connection} which is flushed by hand.
+    """
+    def addWriter(self, writer):
+        pass
+
+
+    def removeWriter(self, writer):
+        pass
+
+
+    def removeReader(self, reader):
+        pass
+
+
+
+def drain(skt):
+    """
+    Read everything currently available from C{skt}.
+    """
+    try:
+        while skt.recv(1024 * 1024):
+            pass
+    except socket.error:
+        pass
+
+
+
+def benchmark(vectorWrites, fragments, fragmentSize, rounds):
+    """
+    Write C{rounds} responses of C{fragments} chunks of C{fragmentSize} bytes
+    each and return the throughput in megabytes per second.
+    """
+    client, server = socket.socketpair()
+    server.setblocking(False)
+    conn = Connection(client, Protocol(), NullReactor())
+    conn.connected = True
+    if vectorWrites and not conn._vectorWrites:
+        return None
+    conn._vectorWrites = vectorWrites
+    abstract._VECTOR_MIN_CHUNK = 0
+
+    chunk = b"x" * fragmentSize
+    response = [chunk] * fragments
+    before = time.time()
+    for i in range(rounds):
+        conn.writeSequence(response)
+        while conn._tempDataLen or conn.offset < len(conn.dataBuffer):
+            conn.doWrite()
+            drain(server)
+    elapsed = time.time() - before
+    client.close()
+    server.close()
+    return fragments * fragmentSize * rounds / elapsed / 1024 / 1024
+
+
+
+def main():
+    for fragmentSize in (16, 256, 4096, 16384, 65536):
+        for fragments in (10, 100, 300):
+            rounds = max(10, 20000000 // (fragments * fragmentSize))
+            results = []
+            for vectorWrites in (False, True):
+                throughput = benchmark(
+                    vectorWrites, fragments, fragmentSize, rounds)
+                if throughput is None:
+                    results.append("unavailable")
+                else:
+                    results.append("%8.1f MB/s" % (throughput,))
+            print("fragments: %4d  size: %4d  join: %s  sendmsg: %s" % (
+                fragments, fragmentSize, results[0], results[1]))
+
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,15 @@ An asynchronous mapping to U{DB-API 2.0<http://www.python.org/topics/database/Da
 """
 
 import sys
+import threading
+from collections import OrderedDict
 
-from twisted.internet import threads
-from twisted.python import reflect, log
+from zope.interface import implementer
+
+from twisted.internet import defer, task, threads
+from twisted.internet._instrumentation import LatencyHistogram, _now
+from twisted.internet.interfaces import IPushProducer
+from twisted.python import failure, reflect, log
 
 
 class ConnectionLost(Exception):
@@ -122,6 +128,195 @@ class Transaction:
         return getattr(self._cursor, name)
 
 
+class _PoolStatistics(object):
+    """
+    Measurements of how a L{ConnectionPool} is used, which any thread may
+    record.
+
+    @ivar waitTime: How long each call waited for a thread and connection.
+    @type waitTime: L{LatencyHistogram}
+    @ivar inUse: How long each call held its connection.
+    @type inUse: L{LatencyHistogram}
+    @ivar queries: A C{dict} mapping SQL statements run by
+        L{ConnectionPool.runQuery}, L{ConnectionPool.runOperation} and
+        L{ConnectionPool.runQueryStream} to L{LatencyHistogram}s of how long
+        they took.
+    @ivar maxQueries: The largest number of statements to keep in
+        C{queries}; others aren't timed.
+    @ivar pings: The number of idle connections checked with C{good_sql}.
+    @ivar pingFailures: The number of those checks which failed.
+    @ivar recycled: The number of connections replaced because they were
+        older than C{max_lifetime}.
+    @ivar _lock: A L{threading.Lock} held while recording.
+    """
+
+    def __init__(self, maxQueries=100):
+        self.waitTime = LatencyHistogram()
+        self.inUse = LatencyHistogram()
+        self.queries = {}
+        self.maxQueries = maxQueries
+        self.pings = 0
+        self.pingFailures = 0
+        self.recycled = 0
+        self._lock = threading.Lock()
+
+
+    def recordCall(self, queued, started, finished):
+        """
+        Record a call which was made at C{queued}, started running at
+        C{started} and finished at C{finished}.
+        """
+        with self._lock:
+            self.waitTime.record(started - queued)
+            self.inUse.record(finished - started)
+
+
+    def recordQuery(self, sql, duration):
+        """
+        Record how long a statement took.
+        """
+        with self._lock:
+            histogram = self.queries.get(sql)
+            if histogram is None:
+                if len(self.queries) >= self.maxQueries:
+                    return
+                histogram = self.queries[sql] = LatencyHistogram()
+            histogram.record(duration)
+
+
+    def count(self, name):
+        """
+        Add one to the counter called C{name}.
+        """
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+    def summary(self):
+        """
+        Summarize the measurements.
+
+        @return: A C{dict} of C{"waitTime"}, C{"inUse"} and C{"queries"},
+            mapping to L{LatencyHistogram.summary} results or a C{dict} of
+            them, and the counters.
+        """
+        with self._lock:
+            return {
+                "waitTime": self.waitTime.summary(),
+                "inUse": self.inUse.summary(),
+                "queries": dict((sql, histogram.summary())
+                                for sql, histogram in self.queries.items()),
+                "pings": self.pings,
+                "pingFailures": self.pingFailures,
+                "recycled": self.recycled,
+                }
+
+
+
+@implementer(IPushProducer)
+class _QueryProducer(object):
+    """
+    A producer of the rows of a query, fetched in a pool thread and written
+    to a consumer in the reactor thread; see
+    L{ConnectionPool.runQueryStream}.
+
+    The pool thread fetches the next batch of rows while the last one is
+    being written, and waits before sending it on while the consumer has
+    paused it or hasn't been given the last batch yet, so that at most two
+    batches are held in memory at once.
+
+    @ivar _consumer: The L{IConsumer} to write batches to.
+    @ivar _transform: A callable to apply to each batch before writing it,
+        or C{None}.
+    @ivar _condition: A L{threading.Condition} held while changing
+        C{_paused}, C{_stopped} and C{_unwritten}, and notified when any of
+        them change.
+    @ivar _paused: Whether the consumer has paused this producer.
+    @ivar _stopped: Whether the consumer has stopped this producer.
+    @ivar _unwritten: Whether a batch has been sent to the reactor thread but
+        not yet written.
+    @ivar deferred: The L{defer.Deferred} returned by
+        L{ConnectionPool.runQueryStream}, or C{None} once it has fired.
+    """
+
+    def __init__(self, consumer, transform):
+        self._consumer = consumer
+        self._transform = transform
+        self._condition = threading.Condition()
+        self._paused = False
+        self._stopped = False
+        self._unwritten = False
+        self.deferred = defer.Deferred()
+
+
+    def pauseProducing(self):
+        with self._condition:
+            self._paused = True
+
+
+    def resumeProducing(self):
+        with self._condition:
+            self._paused = False
+            self._condition.notify()
+
+
+    def stopProducing(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self.deferred is not None:
+            d, self.deferred = self.deferred, None
+            d.errback(Exception("Consumer asked us to stop producing"))
+
+
+    def _send(self, reactor, rows):
+        """
+        Send a batch of rows to be written, from the pool thread, once the
+        consumer wants it.
+
+        @return: C{False} if the consumer has stopped this producer, C{True}
+            otherwise.
+        """
+        with self._condition:
+            while (self._paused or self._unwritten) and not self._stopped:
+                self._condition.wait()
+            if self._stopped:
+                return False
+            self._unwritten = True
+        reactor.callFromThread(self._write, rows)
+        return True
+
+
+    def _write(self, rows):
+        """
+        Write a batch of rows to the consumer, in the reactor thread.
+        """
+        try:
+            if not self._stopped:
+                if self._transform is not None:
+                    rows = self._transform(rows)
+                self._consumer.write(rows)
+        finally:
+            with self._condition:
+                self._unwritten = False
+                self._condition.notify()
+
+
+    def _finished(self, result):
+        """
+        Stop producing for the consumer, and fire C{deferred} with the number
+        of rows written or the failure of the query.
+        """
+        self._consumer.unregisterProducer()
+        if self.deferred is not None:
+            d, self.deferred = self.deferred, None
+            if isinstance(result, failure.Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+
+
+
 class ConnectionPool:
     """
     Represent a pool of connections to a DB-API 2.0 compliant database.
@@ -138,11 +333,31 @@ class ConnectionPool:
         reactor stops.
 
     @ivar _reactor: The reactor which will be used to schedule startup and
-        shutdown events.
+        shutdown events, and maintenance.
     @type _reactor: L{IReactorCore} provider
+
+    @ivar _statistics: The L{_PoolStatistics} reported by L{statistics}.
+
+    @ivar _connectionTimes: A C{dict} mapping the thread ids in
+        C{connections} to C{[created, lastUsed]} lists of when the thread's
+        connection was made and last used.
+
+    @ivar _maintenance: The L{task.LoopingCall} which calls L{_maintain}, or
+        C{None}.
+
+    @ivar _checksDue: The C{set} of thread ids in C{connections} whose
+        connections L{_maintain} has found due for L{_checkConnection} and
+        which haven't been checked since.
+
+    @ivar _cursorCaches: A C{dict} mapping the thread ids in C{connections}
+        to C{(connection, cursors)} tuples, where C{cursors} is an
+        L{OrderedDict} mapping SQL statements to C{(statement, cursor)}
+        tuples of the statement object first run with the cursor, least
+        recently used first.
     """
 
-    CP_ARGS = "min max name noisy openfun reconnect good_sql".split()
+    CP_ARGS = ("min max name noisy openfun reconnect good_sql "
+               "ping_interval max_lifetime idle_timeout cursor_cache").split()
 
     noisy = False # if true, generate informational log messages
     min = 3 # minimum number of connections in pool
@@ -151,6 +366,10 @@ class ConnectionPool:
     openfun = None # A function to call on new connections
     reconnect = False # reconnect when connections fail
     good_sql = 'select 1' # a query which should always succeed
+    ping_interval = None # seconds before an idle connection is checked
+    max_lifetime = None # seconds before a connection is replaced
+    idle_timeout = None # seconds before idle threads beyond min exit
+    cursor_cache = 0 # cursors kept for reuse by each connection
 
     running = False # true when the pool is operating
     connectionFactory = Connection
@@ -159,6 +378,8 @@ class ConnectionPool:
     # Initialize this to None so it's available in close() even if start()
     # never runs.
     shutdownID = None
+    _maintenance = None
+    _statistics = None
 
     def __init__(self, dbapiName, *connargs, **connkw):
         """Create a new ConnectionPool.
@@ -194,6 +415,26 @@ class ConnectionPool:
         @param cp_reactor: use this reactor instead of the global reactor
             (added in Twisted 10.2).
         @type cp_reactor: L{IReactorCore} provider
+
+        @param cp_ping_interval: check each connection which has been idle
+            for this many seconds by running C{cp_good_sql} with it, from a
+            timer rather than before the next query, and replace it if that
+            fails (default C{None}, never check).
+
+        @param cp_max_lifetime: replace connections which are older than
+            this many seconds, when idle if C{cp_ping_interval} is set or
+            else when next used (default C{None}, keep them forever).
+
+        @param cp_idle_timeout: let the threads beyond C{cp_min} which have
+            had nothing to do for this many seconds exit, and close their
+            connections, so the pool shrinks again after it has grown to
+            keep up with a queue of calls (default C{None}, keep them).
+
+        @param cp_cursor_cache: keep a cursor for each of this many of the
+            statements run most recently by L{runQuery} and L{runOperation}
+            with each connection, and run the statement again with the same
+            cursor and the same statement object, which DB-API modules may
+            use to skip preparing it again (default 0, keep none).
         """
 
         self.dbapiName = dbapiName
@@ -223,13 +464,18 @@ class ConnectionPool:
         self.max = max(self.min, self.max)
 
         self.connections = {}  # all connections, hashed on thread id
+        self._connectionTimes = {}
+        self._cursorCaches = {}
+        self._checksDue = set()
+        self._statistics = _PoolStatistics()
 
         # these are optional so import them here
         from twisted.python import threadpool
         import thread
 
         self.threadID = thread.get_ident
-        self.threadpool = threadpool.ThreadPool(self.min, self.max)
+        self.threadpool = threadpool.ThreadPool(
+            self.min, self.max, keepalive=self.idle_timeout)
         self.startID = self._reactor.callWhenRunning(self._start)
 
 
@@ -250,6 +496,38 @@ class ConnectionPool:
             self.shutdownID = self._reactor.addSystemEventTrigger(
                 'during', 'shutdown', self.finalClose)
             self.running = True
+            intervals = [interval for interval in (
+                self.ping_interval, self.max_lifetime, self.idle_timeout)
+                         if interval is not None]
+            if intervals:
+                self._maintenance = task.LoopingCall(self._maintain)
+                self._maintenance.clock = self._reactor
+                self._maintenance.start(min(intervals), now=False)
+
+
+    def statistics(self):
+        """
+        Report on how the pool is being used.
+
+        @return: A C{dict} with these keys:
+            - C{"connections"}: the number of open connections.
+            - C{"threads"}: the L{threadpool.ThreadPool.statistics} of the
+              pool's threads, including the number of calls queued.
+            - C{"waitTime"}: a L{LatencyHistogram.summary} of how long calls
+              waited for a connection.
+            - C{"inUse"}: a L{LatencyHistogram.summary} of how long calls
+              held their connections.
+            - C{"queries"}: a C{dict} mapping the SQL statements run by
+              L{runQuery}, L{runOperation} and L{runQueryStream} to
+              L{LatencyHistogram.summary} results of how long they took.
+            - C{"pings"}, C{"pingFailures"} and C{"recycled"}: the number of
+              idle connections checked, of those which failed the check, and
+              of connections replaced for being older than C{max_lifetime}.
+        """
+        result = self._statistics.summary()
+        result["connections"] = len(self.connections)
+        result["threads"] = self.threadpool.statistics()
+        return result
 
 
     def runWithConnection(self, func, *args, **kw):
@@ -275,10 +553,24 @@ class ConnectionPool:
         """
         from twisted.internet import reactor
         return threads.deferToThreadPool(reactor, self.threadpool,
+                                         self._timed, _now(),
                                          self._runWithConnection,
                                          func, *args, **kw)
 
 
+    def _timed(self, queued, f, *args, **kw):
+        """
+        Call C{f} in a pool thread, recording how long the call waited for
+        the thread and how long it took.
+        """
+        started = _now()
+        try:
+            return f(*args, **kw)
+        finally:
+            if self._statistics is not None:
+                self._statistics.recordCall(queued, started, _now())
+
+
     def _runWithConnection(self, func, *args, **kw):
         conn = self.connectionFactory(self)
         try:
@@ -325,6 +617,7 @@ class ConnectionPool:
         """
         from twisted.internet import reactor
         return threads.deferToThreadPool(reactor, self.threadpool,
+                                         self._timed, _now(),
                                          self._runInteraction,
                                          interaction, *args, **kw)
 
@@ -349,6 +642,49 @@ class ConnectionPool:
         return self.runInteraction(self._runQuery, *args, **kw)
 
 
+    def runQueryStream(self, consumer, sql, args=None, batchSize=100,
+                       transform=None):
+        """
+        Execute an SQL query and write its rows to a consumer in batches, as
+        they are fetched, rather than all at once.
+
+        The rows are fetched with the DB-API cursor's C{fetchmany} method, a
+        batch at a time, by a thread from the pool, which is registered with
+        C{consumer} as a streaming producer: pausing it stops the thread
+        fetching rows until it is resumed, and stopping it abandons the
+        query.  The thread's connection is in use until every row has been
+        fetched.
+
+        @param consumer: The L{IConsumer} to write the rows to.  Each call to
+            its C{write} method is passed a C{list} of rows, or the result of
+            C{transform} if it is given.
+
+        @param sql: The SQL statement to pass to the cursor's C{execute}
+            method.
+
+        @param args: The parameters to pass to the cursor's C{execute} method
+            along with C{sql}, or C{None} if there are none.
+
+        @param batchSize: The number of rows to fetch at a time.
+        @type batchSize: C{int}
+
+        @param transform: A callable which takes a C{list} of rows and returns
+            what to write to C{consumer}, for example the rows formatted as
+            bytes, or C{None} to write the rows themselves.
+
+        @return: A L{defer.Deferred} which fires with the number of rows
+            written once every row has been, or fails if the query does or if
+            the consumer stops the producer.
+        """
+        from twisted.internet import reactor
+        producer = _QueryProducer(consumer, transform)
+        consumer.registerProducer(producer, True)
+        d = self.runInteraction(
+            self._runQueryStream, reactor, producer, sql, args, batchSize)
+        d.addBoth(producer._finished)
+        return producer.deferred
+
+
     def runOperation(self, *args, **kw):
         """Execute an SQL query and return None.
 
@@ -384,11 +720,17 @@ class ConnectionPool:
         """This should only be called by the shutdown trigger."""
 
         self.shutdownID = None
+        if self._maintenance is not None:
+            self._maintenance.stop()
+            self._maintenance = None
         self.threadpool.stop()
         self.running = False
         for conn in self.connections.values():
             self._close(conn)
         self.connections.clear()
+        self._connectionTimes.clear()
+        self._cursorCaches.clear()
+        self._checksDue.clear()
 
     def connect(self):
         """Return a database connection when one becomes available.
@@ -402,7 +744,19 @@ class ConnectionPool:
         """
 
         tid = self.threadID()
+        if tid in self._checksDue:
+            # The check sent for this thread's connection was run by another
+            # thread, so do it before the connection is used.
+            self._checkConnection()
         conn = self.connections.get(tid)
+        now = _now()
+        times = self._connectionTimes.get(tid)
+        if (conn is not None and times is not None and
+                self.max_lifetime is not None and
+                now - times[0] >= self.max_lifetime):
+            self._statistics.count("recycled")
+            self.disconnect(conn)
+            conn = None
         if conn is None:
             if self.noisy:
                 log.msg('adbapi connecting: %s %s%s' % (self.dbapiName,
@@ -412,6 +766,9 @@ class ConnectionPool:
             if self.openfun != None:
                 self.openfun(conn)
             self.connections[tid] = conn
+            self._connectionTimes[tid] = [now, now]
+        elif times is not None:
+            times[1] = now
         return conn
 
     def disconnect(self, conn):
@@ -427,6 +784,104 @@ class ConnectionPool:
         if conn is not None:
             self._close(conn)
             del self.connections[tid]
+            self._connectionTimes.pop(tid, None)
+            self._cursorCaches.pop(tid, None)
+            self._checksDue.discard(tid)
+
+
+    def _maintain(self):
+        """
+        Close the connections of threads which have exited, and check the
+        connections of idle threads which are due for L{_checkConnection}.
+
+        This is called by a timer in the reactor thread.  A thread pool
+        can't send a call to a particular thread, so for each idle thread
+        whose connection is due, the thread's id is added to C{_checksDue}
+        and a call to L{_checkConnection} is sent to whichever idle thread
+        takes it first.  That is usually the one which has waited longest,
+        but if it is another, that thread checks its own connection if it
+        is due too, and the connection found due is checked by L{connect}
+        before it is next used instead.  No more than one call is sent for
+        each connection found due, so idle threads still time out.
+        """
+        alive = set(thread.ident for thread in threading.enumerate())
+        for tid in list(self.connections):
+            if tid not in alive:
+                conn = self.connections.pop(tid, None)
+                self._connectionTimes.pop(tid, None)
+                self._cursorCaches.pop(tid, None)
+                self._checksDue.discard(tid)
+                if conn is not None:
+                    self._close(conn)
+        now = _now()
+        for thread in list(self.threadpool.waiters):
+            tid = thread.ident
+            if tid not in self._checksDue and self._checkDue(
+                    self._connectionTimes.get(tid), now):
+                self._checksDue.add(tid)
+                self.threadpool.callInThread(self._checkConnection)
+
+
+    def _checkDue(self, times, now):
+        """
+        Decide whether a connection should be checked.
+
+        @param times: The connection's C{[created, lastUsed]} times, or
+            C{None} if there is no connection.
+
+        @return: C{"recycle"} if the connection is older than
+            C{max_lifetime}, C{"ping"} if it has been idle for
+            C{ping_interval}, or C{None} if neither.
+        """
+        if times is None:
+            return None
+        created, lastUsed = times
+        maxLifetime = self.max_lifetime
+        if maxLifetime is not None and now - created >= maxLifetime:
+            return "recycle"
+        if self.ping_interval is not None and (
+                now - lastUsed >= self.ping_interval):
+            return "ping"
+        return None
+
+
+    def _checkConnection(self):
+        """
+        Replace this thread's connection if it is older than
+        C{max_lifetime}, or if it has been idle for C{ping_interval} and
+        running C{good_sql} with it fails.
+
+        This is called in a pool thread which isn't running anything else,
+        or by L{connect} before the connection is used.
+        """
+        tid = self.threadID()
+        self._checksDue.discard(tid)
+        conn = self.connections.get(tid)
+        times = self._connectionTimes.get(tid)
+        now = _now()
+        due = self._checkDue(times, now)
+        if conn is None or due is None:
+            return
+        if due == "recycle":
+            self._statistics.count("recycled")
+        else:
+            self._statistics.count("pings")
+            try:
+                curs = conn.cursor()
+                curs.execute(self.good_sql)
+                curs.close()
+                conn.rollback()
+            except:
+                self._statistics.count("pingFailures")
+                log.err(None, "Connection check failed")
+            else:
+                times[1] = now
+                return
+        self.disconnect(conn)
+        try:
+            self.connect()
+        except:
+            log.err(None, "Reconnection failed")
 
 
     def _close(self, conn):
@@ -455,12 +910,78 @@ class ConnectionPool:
             raise excType, excValue, excTraceback
 
 
+    def _timeQuery(self, args, started):
+        """
+        Record how long the statement which is the first of C{args} took,
+        since C{started}.
+        """
+        if args and self._statistics is not None:
+            self._statistics.recordQuery(args[0], _now() - started)
+
+
+    def _cachedCursor(self, trans, args):
+        """
+        Find the cursor to run a statement with, and the arguments to pass
+        to its C{execute} method.
+
+        @param args: The positional arguments to pass to C{execute}, the
+            first of which is the statement.
+
+        @return: C{trans} and C{args} if C{cursor_cache} is not set, or else
+            the cursor kept for the statement by this thread's connection
+            and C{args} with the statement replaced by the object first run
+            with that cursor.
+        """
+        if not self.cursor_cache or not args:
+            return trans, args
+        tid = self.threadID()
+        conn = self.connections.get(tid)
+        cache = self._cursorCaches.get(tid)
+        if cache is None or cache[0] is not conn:
+            cache = self._cursorCaches[tid] = (conn, OrderedDict())
+        cursors = cache[1]
+        sql = args[0]
+        try:
+            sql, cursor = cursors.pop(sql)
+        except KeyError:
+            cursor = conn.cursor()
+            while len(cursors) >= self.cursor_cache:
+                evicted = cursors.popitem(last=False)[1][1]
+                evicted.close()
+        cursors[sql] = (sql, cursor)
+        return cursor, (sql,) + tuple(args[1:])
+
+
     def _runQuery(self, trans, *args, **kw):
-        trans.execute(*args, **kw)
-        return trans.fetchall()
+        started = _now()
+        cursor, args = self._cachedCursor(trans, args)
+        cursor.execute(*args, **kw)
+        result = cursor.fetchall()
+        self._timeQuery(args, started)
+        return result
+
+    def _runQueryStream(self, trans, reactor, producer, sql, args,
+                        batchSize):
+        started = _now()
+        if args is None:
+            trans.execute(sql)
+        else:
+            trans.execute(sql, args)
+        count = 0
+        try:
+            while True:
+                rows = trans.fetchmany(batchSize)
+                if not rows or not producer._send(reactor, rows):
+                    return count
+                count += len(rows)
+        finally:
+            self._timeQuery((sql,), started)
 
     def _runOperation(self, trans, *args, **kw):
-        trans.execute(*args, **kw)
+        started = _now()
+        cursor, args = self._cachedCursor(trans, args)
+        cursor.execute(*args, **kw)
+        self._timeQuery(args, started)
 
     def __getstate__(self):
         return {'dbapiName': self.dbapiName,
@@ -469,6 +990,10 @@ class ConnectionPool:
                 'noisy': self.noisy,
                 'reconnect': self.reconnect,
                 'good_sql': self.good_sql,
+                'ping_interval': self.ping_interval,
+                'max_lifetime': self.max_lifetime,
+                'idle_timeout': self.idle_timeout,
+                'cursor_cache': self.cursor_cache,
                 'connargs': self.connargs,
                 'connkw': self.connkw}
 
@@ -477,4 +1002,275 @@ class ConnectionPool:
         self.__init__(self.dbapiName, *self.connargs, **self.connkw)
 
 
-__all__ = ['Transaction', 'ConnectionPool']
+
+class WriteBatcher(object):
+    """
+    Group operations which use the same SQL statement and run each group
+    with the DB-API cursor's C{executemany} method in a single
+    L{ConnectionPool.runInteraction}, so that many small writes cost one
+    thread hop and one commit rather than one each.
+
+    An operation waits at most C{delay} seconds for others to join it, and
+    a group is run as soon as it has C{maxRows} operations.  Each group is
+    a single transaction: if it fails, every operation in it fails.
+
+    Operations using the same statement are run in the order they were
+    made: a group is not started until the one before it for the same
+    statement has finished, whether or not that succeeded.  Groups for
+    different statements are run independently, on as many of the pool's
+    connections as are free, so operations which depend on each other
+    should use the same statement or the pool directly.
+
+    @ivar pool: The L{ConnectionPool} to run operations with.
+    @ivar maxRows: The largest number of operations to run together.
+    @type maxRows: C{int}
+    @ivar delay: The longest an operation waits for others to join it, in
+        seconds.
+    @type delay: C{float}
+
+    @ivar _clock: The L{IReactorTime} provider used to wait.
+    @ivar _pending: A C{dict} mapping statements to C{[params, deferreds,
+        delayedCall]} lists of the operations waiting to be run.
+    @ivar _running: The L{defer.Deferred}s of the groups being run or
+        waiting for the group before them to finish.
+    @ivar _last: A C{dict} mapping statements to the L{defer.Deferred} of
+        the most recent group using each which hasn't finished yet.
+    """
+
+    def __init__(self, pool, maxRows=1000, delay=0.01, clock=None):
+        if clock is None:
+            from twisted.internet import reactor as clock
+        self.pool = pool
+        self.maxRows = maxRows
+        self.delay = delay
+        self._clock = clock
+        self._pending = {}
+        self._running = []
+        self._last = {}
+
+
+    def runOperation(self, sql, params=()):
+        """
+        Execute an SQL statement along with other operations using it.
+
+        @param sql: The SQL statement.
+        @param params: The parameters of this operation, which will be one of
+            the sequence of parameters passed to C{executemany}.
+
+        @return: A L{defer.Deferred} which fires with C{None} once the
+            operation's group has been committed, or with the failure which
+            rolled the group back.
+        """
+        batch = self._pending.get(sql)
+        if batch is None:
+            batch = self._pending[sql] = [
+                [], [], self._clock.callLater(self.delay, self._run, sql)]
+        d = defer.Deferred()
+        batch[0].append(params)
+        batch[1].append(d)
+        if len(batch[0]) >= self.maxRows:
+            self._run(sql)
+        return d
+
+
+    def flush(self):
+        """
+        Run every waiting group now.
+
+        @return: A L{defer.Deferred} which fires with C{None} once every group
+            which has been started has finished.
+        """
+        for sql in list(self._pending):
+            self._run(sql)
+        return defer.DeferredList(list(self._running)).addCallback(
+            lambda ignored: None)
+
+
+    def _run(self, sql):
+        """
+        Run the group of operations waiting to use C{sql}, once the group
+        before it for C{sql}, if any, has finished.
+        """
+        params, deferreds, delayedCall = self._pending.pop(sql)
+        if delayedCall.active():
+            delayedCall.cancel()
+        d = defer.Deferred()
+        self._running.append(d)
+        previous = self._last.get(sql)
+        self._last[sql] = d
+        def start(ignored):
+            self.pool.runInteraction(
+                self._executeMany, sql, params).chainDeferred(d)
+        def finished(result):
+            self._running.remove(d)
+            if self._last.get(sql) is d:
+                del self._last[sql]
+            for waiting in deferreds:
+                if isinstance(result, failure.Failure):
+                    waiting.errback(result)
+                else:
+                    waiting.callback(None)
+        # finished returns None, so the next group starts even if this one
+        # failed.
+        d.addBoth(finished)
+        if previous is None:
+            start(None)
+        else:
+            previous.addCallback(start)
+
+
+    def _executeMany(self, trans, sql, params):
+        trans.executemany(sql, params)
+
+
+
+
+class RoutingConnectionPool(object):
+    """
+    Send reads to read replicas of a database and everything else to its
+    primary.
+
+    L{runQuery} and L{runQueryStream} are run by one of the C{replicas},
+    chosen according to C{policy}, or by C{primary} if there are none.
+    L{runOperation}, L{runInteraction} and L{runWithConnection} are always
+    run by C{primary}, since they may write.  Replicas may lag behind the
+    primary, so a query which must see a write just made should be run
+    with C{primary} directly.
+
+    @ivar primary: The L{ConnectionPool} for the primary.
+    @ivar replicas: The L{ConnectionPool}s for the replicas.
+    @type replicas: C{list}
+    @ivar policy: C{"round-robin"} to use each replica in turn, or
+        C{"least-loaded"} to use the one with the fewest queries running,
+        in turn among those with as few.
+
+    @ivar _outstanding: The number of queries running on each replica, in
+        the same order as C{replicas}.
+    @ivar _next: The index in C{replicas} of the replica to try first next.
+    """
+
+    policies = ("round-robin", "least-loaded")
+
+    def __init__(self, primary, replicas=(), policy="round-robin"):
+        if policy not in self.policies:
+            raise ValueError("Unknown routing policy %r" % (policy,))
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.policy = policy
+        self._outstanding = [0] * len(self.replicas)
+        self._next = 0
+
+
+    def _choose(self):
+        """
+        Choose the replica to run the next read.
+
+        @return: The index in C{replicas} of the replica.
+        """
+        count = len(self.replicas)
+        start = self._next
+        chosen = start
+        if self.policy == "least-loaded":
+            for offset in range(count):
+                index = (start + offset) % count
+                if self._outstanding[index] < self._outstanding[chosen]:
+                    chosen = index
+        self._next = (chosen + 1) % count
+        return chosen
+
+
+    def _read(self, method, *args, **kw):
+        """
+        Call the method named C{method} of the replica chosen by
+        L{_choose}, or of C{primary} if there are no replicas.
+        """
+        if not self.replicas:
+            return getattr(self.primary, method)(*args, **kw)
+        index = self._choose()
+        d = getattr(self.replicas[index], method)(*args, **kw)
+        self._outstanding[index] += 1
+        def finished(result):
+            self._outstanding[index] -= 1
+            return result
+        return d.addBoth(finished)
+
+
+    def runQuery(self, *args, **kw):
+        """
+        Execute an SQL query on a replica and return the result.
+
+        @see: L{ConnectionPool.runQuery}
+        """
+        return self._read("runQuery", *args, **kw)
+
+
+    def runQueryStream(self, *args, **kw):
+        """
+        Execute an SQL query on a replica and write its rows to a consumer
+        in batches.
+
+        @see: L{ConnectionPool.runQueryStream}
+        """
+        return self._read("runQueryStream", *args, **kw)
+
+
+    def runOperation(self, *args, **kw):
+        """
+        Execute an SQL statement on the primary.
+
+        @see: L{ConnectionPool.runOperation}
+        """
+        return self.primary.runOperation(*args, **kw)
+
+
+    def runInteraction(self, *args, **kw):
+        """
+        Run an interaction with a transaction on the primary.
+
+        @see: L{ConnectionPool.runInteraction}
+        """
+        return self.primary.runInteraction(*args, **kw)
+
+
+    def runWithConnection(self, *args, **kw):
+        """
+        Run a function with a connection to the primary.
+
+        @see: L{ConnectionPool.runWithConnection}
+        """
+        return self.primary.runWithConnection(*args, **kw)
+
+
+    def start(self):
+        """
+        Start the primary's pool and every replica's.
+        """
+        for pool in [self.primary] + self.replicas:
+            pool.start()
+
+
+    def close(self):
+        """
+        Close the primary's pool and every replica's.
+        """
+        for pool in [self.primary] + self.replicas:
+            pool.close()
+
+
+    def statistics(self):
+        """
+        Report on how the pools are being used.
+
+        @return: A C{dict} with the L{ConnectionPool.statistics} of the
+            primary under C{"primary"}, a C{list} of those of the replicas
+            under C{"replicas"}, and a C{list} of the number of queries
+            running on each replica under C{"outstanding"}.
+        """
+        return {"primary": self.primary.statistics(),
+                "replicas": [pool.statistics() for pool in self.replicas],
+                "outstanding": list(self._outstanding)}
+
+
+
+__all__ = ['Transaction', 'ConnectionPool', 'WriteBatcher',
+           'RoutingConnectionPool']
@@ -0,0 +1,539 @@
+# -*- test-case-name: twisted.internet.test.test_base -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Measurements of where a reactor spends its time.
+
+See L{twisted.internet.base.ReactorBase.startInstrumentation}.
+"""
+
+from __future__ import division, absolute_import
+
+import time
+from bisect import bisect_right
+from collections import deque
+
+from twisted.python import log, reflect
+
+try:
+    _now = time.perf_counter
+except AttributeError:
+    # Python 2.
+    _now = time.time
+
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of durations, with buckets whose upper bounds double from
+    ten microseconds to about ten seconds.
+
+    @ivar bounds: The upper bounds, in seconds, of every bucket but the last,
+        which counts everything larger.
+    @type bounds: C{list} of C{float}
+
+    @ivar buckets: The number of durations recorded in each bucket.
+    @type buckets: C{list} of C{int}
+
+    @ivar count: The number of durations recorded.
+    @type count: C{int}
+
+    @ivar total: The sum of the durations recorded.
+    @type total: C{float}
+
+    @ivar maximum: The largest duration recorded.
+    @type maximum: C{float}
+    """
+    bounds = [0.00001 * 2 ** i for i in range(21)]
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+
+    def record(self, duration):
+        """
+        Record a duration.
+
+        @param duration: The duration, in seconds.
+        @type duration: C{float}
+        """
+        self.recordMany([duration])
+
+
+    def recordMany(self, durations):
+        """
+        Record several durations.
+
+        This is cheaper than calling L{record} for each of them.
+
+        @param durations: The durations, in seconds.
+        @type durations: iterable of C{float}
+        """
+        bounds = self.bounds
+        buckets = self.buckets
+        count = 0
+        total = 0.0
+        maximum = self.maximum
+        for duration in durations:
+            buckets[bisect_right(bounds, duration)] += 1
+            count += 1
+            total += duration
+            if duration > maximum:
+                maximum = duration
+        self.count += count
+        self.total += total
+        self.maximum = maximum
+
+
+    def percentile(self, percent):
+        """
+        Estimate a percentile of the durations recorded.
+
+        @param percent: The percentile, between 0 and 100.
+        @type percent: C{float}
+
+        @return: The upper bound of the bucket the percentile falls in, or
+            the largest duration recorded if that is smaller; C{0.0} if
+            nothing has been recorded.
+        @rtype: C{float}
+        """
+        if not self.count:
+            return 0.0
+        wanted = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+    def summary(self):
+        """
+        Summarize the durations recorded.
+
+        @return: A C{dict} with C{"count"}, C{"total"}, C{"mean"}, C{"p50"},
+            C{"p99"} and C{"max"} keys; all but the count are in seconds.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.count and self.total / self.count,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.maximum,
+            }
+
+
+
+class SlowCall(object):
+    """
+    A record of one callback which ran for longer than the threshold.
+
+    @ivar kind: What sort of callback it was: C{"doRead"}, C{"doWrite"},
+        C{"DelayedCall"} or C{"callFromThread"}, or C{"dispatch"} for a read
+        or write on a reactor whose events can't be told apart.  It is
+        C{"iteration"} if the reactor was kept busy by an iteration which
+        wasn't being measured, so the callback responsible isn't known.
+    @type kind: C{str}
+
+    @ivar name: The fully qualified name of the callback, or of the
+        reactor's class if the callback isn't known.
+    @type name: C{str}
+
+    @ivar duration: How long it ran for, in seconds.
+    @type duration: C{float}
+    """
+
+    def __init__(self, kind, name, duration):
+        self.kind = kind
+        self.name = name
+        self.duration = duration
+
+
+    def __repr__(self):
+        return "<SlowCall %s %s %.6fs>" % (self.kind, self.name, self.duration)
+
+
+
+def _callableName(f):
+    """
+    Return the fully qualified name of a callable, or a representation of it
+    if it has no name.
+    """
+    try:
+        return reflect.fullyQualifiedName(f)
+    except AttributeError:
+        return reflect.safe_repr(f)
+
+
+
+class ReactorInstrumentation(object):
+    """
+    Record how long each iteration of a reactor's loop takes, split into
+    waiting for events, dispatching them to C{doRead} and C{doWrite}, and
+    running timed and thread calls, and report any single callback which
+    takes longer than a threshold.
+
+    Only one iteration every C{sampleInterval} seconds is measured: once
+    C{nextSample} has passed, L{sample} puts timing wrappers in place for the
+    next iteration, and they are taken away again afterwards, so the
+    iterations in between run just as they would without instrumentation.
+    However busy the reactor is, this costs at most one measured iteration
+    per C{sampleInterval}, which is cheap enough to leave enabled.
+    C{nextSample} is not a timed call, so that the reactor's own timed calls
+    don't pay for sharing their heap with it, but the reactor does not sleep
+    past it.  A callback which takes longer than the threshold in an
+    iteration which isn't measured holds up the next sample, so it is still
+    reported, but as a slow C{"iteration"} named after the reactor.  The
+    histograms are only worked out when they are asked for, from the most
+    recent measurements.
+
+    @ivar threshold: Callbacks which take longer than this many seconds are
+        logged and kept in C{slowCalls}.
+    @type threshold: C{float}
+
+    @ivar sampleInterval: The number of seconds between measured iterations,
+        or C{0} to measure every iteration.
+    @type sampleInterval: C{float}
+
+    @ivar measuring: Whether the current iteration is being measured.
+    @type measuring: C{bool}
+
+    @ivar nextSample: The time, in the reactor's L{seconds
+        <twisted.internet.interfaces.IReactorTime.seconds>}, after which
+        L{sample} is to be called, or C{None} if it isn't.
+    @type nextSample: C{float}
+
+    @ivar slowCalls: The most recent L{SlowCall}s.
+    @type slowCalls: L{collections.deque}
+
+    @ivar iterations: The number of iterations of the loop measured.
+    @type iterations: C{int}
+
+    @ivar _recent: A L{collections.deque} of C{(elapsed, dispatched, timed)}
+        tuples for the most recently measured iterations: the time
+        C{doIteration} took, the part of that spent calling C{doRead} and
+        C{doWrite}, and the time C{runUntilCurrent} took after it.
+
+    @ivar _now: A no-argument callable returning the current time in
+        seconds, used to measure durations.
+
+    @ivar _reactor: The reactor being instrumented, or C{None}.
+
+    @ivar _wrappers: A C{dict} mapping the names of the reactor's methods to
+        the wrappers which time them while an iteration is measured.
+
+    @ivar _dispatched: The time spent calling C{doRead} and C{doWrite} so far
+        in the measured iteration.
+
+    @ivar _polled: C{(elapsed, dispatched)} for the measured iteration's
+        C{doIteration} once it has returned, or C{None}.
+    """
+
+    def __init__(self, threshold=0.1, keepSlow=100, keepIterations=10000,
+                 now=_now, sampleInterval=0.001):
+        """
+        @param threshold: See C{threshold}.
+
+        @param keepSlow: The number of L{SlowCall}s to keep in C{slowCalls}.
+        @type keepSlow: C{int}
+
+        @param keepIterations: The number of iterations the histograms are
+            worked out from.
+        @type keepIterations: C{int}
+
+        @param now: See C{_now}.
+
+        @param sampleInterval: See C{sampleInterval}.
+        """
+        self.threshold = threshold
+        self.sampleInterval = sampleInterval
+        self.measuring = False
+        self.nextSample = None
+        self.slowCalls = deque(maxlen=keepSlow)
+        self.iterations = 0
+        self._recent = deque(maxlen=keepIterations)
+        self._now = now
+        self._reactor = None
+        self._wrappers = {}
+        self._dispatched = 0.0
+        self._polled = None
+
+
+    def install(self, reactor):
+        """
+        Start instrumenting a reactor.
+
+        While an iteration is measured, the reactor's C{doIteration},
+        C{runUntilCurrent} and, if it has one, C{_doReadOrWrite} are
+        shadowed by instance attributes which time them, so that the reactor
+        pays nothing for instrumentation the rest of the time.  A measured
+        iteration is a C{doIteration} and the C{runUntilCurrent} after it.
+
+        @param reactor: The reactor, a L{twisted.internet.base.ReactorBase}.
+        """
+        self._reactor = reactor
+        self._wrappers = {
+            "doIteration": self._timeIteration(reactor.doIteration),
+            "runUntilCurrent": self._timeTimedCalls(reactor.runUntilCurrent),
+            }
+        if getattr(reactor, "_doReadOrWrite", None) is not None:
+            self._wrappers["_doReadOrWrite"] = self._timeDispatch(
+                reactor._doReadOrWrite)
+        if self.sampleInterval:
+            self.nextSample = reactor.seconds()
+        else:
+            self._startMeasuring()
+
+
+    def uninstall(self):
+        """
+        Stop instrumenting the reactor passed to L{install}.
+        """
+        self.nextSample = None
+        self._stopMeasuring()
+        self._reactor = None
+
+
+    def _startMeasuring(self):
+        """
+        Put the timing wrappers in place.
+        """
+        self.measuring = True
+        self._polled = None
+        for name, wrapper in self._wrappers.items():
+            setattr(self._reactor, name, wrapper)
+
+
+    def _stopMeasuring(self):
+        """
+        Take the timing wrappers away again.
+        """
+        self.measuring = False
+        for name in self._wrappers:
+            # Not reactor.__dict__.pop: on CPython 3.11 and later, asking for
+            # an instance's __dict__ makes all of its attributes slower to
+            # look up from then on.
+            try:
+                delattr(self._reactor, name)
+            except AttributeError:
+                pass
+
+
+    def sample(self, now):
+        """
+        Measure the next iteration, first reporting how late this sample is if
+        the reactor has been kept busy for longer than C{threshold} since
+        C{nextSample}.
+
+        @param now: The reactor's current time, no earlier than
+            C{nextSample}.
+        @type now: C{float}
+        """
+        late = now - self.nextSample
+        self.nextSample = None
+        if late > self.threshold:
+            self._slow("iteration", self._reactor.__class__, late)
+        self._startMeasuring()
+
+
+    def _measured(self, timed):
+        """
+        Record the measurements of an iteration, and arrange for the next one
+        to be measured after C{sampleInterval} seconds.
+
+        @param timed: The time the iteration's C{runUntilCurrent} took.
+        """
+        elapsed, dispatched = self._polled
+        self._polled = None
+        self._recent.append((elapsed, dispatched, timed))
+        self.iterations += 1
+        if self.sampleInterval and self._reactor is not None:
+            self._stopMeasuring()
+            self.nextSample = self._reactor.seconds() + self.sampleInterval
+
+
+    def _histogram(self, durations):
+        """
+        Make a L{LatencyHistogram} of some durations.
+        """
+        histogram = LatencyHistogram()
+        histogram.recordMany(durations)
+        return histogram
+
+
+    @property
+    def iteration(self):
+        """
+        The time taken by each recent iteration.
+
+        @rtype: L{LatencyHistogram}
+        """
+        return self._histogram([e + t for (e, d, t) in self._recent])
+
+
+    @property
+    def poll(self):
+        """
+        The time spent in each recent iteration waiting for events.
+
+        @rtype: L{LatencyHistogram}
+        """
+        return self._histogram([max(e - d, 0.0) for (e, d, t) in self._recent])
+
+
+    @property
+    def dispatch(self):
+        """
+        The time spent in each recent iteration calling C{doRead} and
+        C{doWrite}.
+
+        @rtype: L{LatencyHistogram}
+        """
+        return self._histogram([d for (e, d, t) in self._recent])
+
+
+    @property
+    def timedCalls(self):
+        """
+        The time spent in each recent iteration calling timed calls and calls
+        from threads.
+
+        @rtype: L{LatencyHistogram}
+        """
+        return self._histogram([t for (e, d, t) in self._recent])
+
+
+    def _timeTimedCalls(self, runUntilCurrent):
+        now = self._now
+        def timedRunUntilCurrent():
+            before = now()
+            try:
+                runUntilCurrent()
+            finally:
+                if self._polled is not None:
+                    self._measured(now() - before)
+        return timedRunUntilCurrent
+
+
+    def _timeIteration(self, doIteration):
+        now = self._now
+        def timedDoIteration(delay):
+            self._dispatched = 0.0
+            before = now()
+            try:
+                doIteration(delay)
+            finally:
+                self._polled = (now() - before, self._dispatched)
+        return timedDoIteration
+
+
+    def _timeDispatch(self, doReadOrWrite):
+        now = self._now
+        reactor = self._reactor
+        def timedDoReadOrWrite(selectable, *args):
+            before = now()
+            try:
+                doReadOrWrite(selectable, *args)
+            finally:
+                elapsed = now() - before
+                self._dispatched += elapsed
+                if elapsed > self.threshold:
+                    self._slowDispatch(reactor, selectable, args, elapsed)
+        return timedDoReadOrWrite
+
+
+    def _slowDispatch(self, reactor, selectable, args, elapsed):
+        """
+        Report a slow C{doRead} or C{doWrite}.
+
+        @param args: The arguments after the selectable passed to the
+            reactor's C{_doReadOrWrite}: either the name of the method, or a
+            file descriptor and event mask.
+        """
+        pollIn = getattr(reactor, "_POLL_IN", None)
+        if len(args) == 1:
+            kind = args[0]
+        elif pollIn is None:
+            # The event can't be interpreted; name the class instead.
+            self._slow("dispatch", selectable.__class__, elapsed)
+            return
+        elif args[1] & pollIn:
+            kind = "doRead"
+        else:
+            kind = "doWrite"
+        self._slow(kind, getattr(selectable, kind, selectable), elapsed)
+
+
+    def timeCall(self, kind, f, args, kw):
+        """
+        Call a function, reporting it if it takes longer than C{threshold}.
+
+        @param kind: See L{SlowCall.kind}.
+
+        @param f: The function to call with C{*args} and C{**kw}.
+
+        @return: The result of calling C{f}.
+        """
+        before = self._now()
+        try:
+            return f(*args, **kw)
+        finally:
+            elapsed = self._now() - before
+            if elapsed > self.threshold:
+                self._slow(kind, f, elapsed)
+
+
+    def _slow(self, kind, f, elapsed):
+        """
+        Log and remember a slow callback.
+        """
+        call = SlowCall(kind, _callableName(f), elapsed)
+        self.slowCalls.append(call)
+        log.msg(
+            format="Slow %(kind)s: %(name)s took %(duration).3f seconds",
+            kind=call.kind, name=call.name, duration=call.duration,
+            system="-")
+
+
+    def summary(self):
+        """
+        Summarize the measurements.
+
+        @return: A C{dict} mapping C{"iteration"}, C{"poll"}, C{"dispatch"}
+            and C{"timedCalls"} to L{LatencyHistogram.summary} results, and
+            C{"iterations"} and C{"slowCalls"} to the counts of each.
+        """
+        result = {
+            "iterations": self.iterations,
+            "slowCalls": len(self.slowCalls),
+            }
+        for name in ("iteration", "poll", "dispatch", "timedCalls"):
+            result[name] = getattr(self, name).summary()
+        return result
+
+
+    def report(self):
+        """
+        Format the measurements as text, for example to be printed from a
+        manhole.
+
+        @rtype: C{str}
+        """
+        lines = ["%d iterations" % (self.iterations,),
+                 "%-11s %10s %10s %10s %10s" % (
+                     "", "mean", "p50", "p99", "max")]
+        for name in ("iteration", "poll", "dispatch", "timedCalls"):
+            summary = getattr(self, name).summary()
+            lines.append("%-11s %9.6fs %9.6fs %9.6fs %9.6fs" % (
+                name, summary["mean"], summary["p50"], summary["p99"],
+                summary["max"]))
+        for call in self.slowCalls:
+            lines.append("slow %s: %s %.6fs" % (
+                call.kind, call.name, call.duration))
+        return "\n".join(lines)
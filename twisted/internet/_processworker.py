@@ -0,0 +1,66 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+The main program of the worker processes started by
+L{twisted.internet.processpool.ProcessPool}.
+"""
+
+import errno
+import os
+import sys
+
+
+def _setupPath(environ):
+    """
+    Override C{sys.path} with what the pool passed in
+    B{TWISTED_PROCESSPOOL_PYTHONPATH}.
+
+    @see: twisted.internet.processpool.ProcessPool._spawn
+    """
+    if 'TWISTED_PROCESSPOOL_PYTHONPATH' in environ:
+        sys.path[:] = environ['TWISTED_PROCESSPOOL_PYTHONPATH'].split(
+            os.pathsep)
+
+
+_setupPath(os.environ)
+
+
+from twisted.internet.protocol import FileWrapper
+
+
+
+def main(_fdopen=os.fdopen, _read=os.read):
+    """
+    Run the functions the pool sends until it closes the command pipe.
+
+    @param _fdopen: If specified, the function to use in place of
+        C{os.fdopen}.
+    @param _read: If specified, the function to use in place of C{os.read}.
+    """
+    from twisted.internet.processpool import (
+        _WorkerProtocol, _WORKER_AMP_STDIN, _WORKER_AMP_STDOUT)
+
+    workerProtocol = _WorkerProtocol()
+    protocolOut = _fdopen(_WORKER_AMP_STDOUT, 'wb')
+    workerProtocol.makeConnection(FileWrapper(protocolOut))
+
+    while True:
+        try:
+            data = _read(_WORKER_AMP_STDIN, 65536)
+        except (IOError, OSError) as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+        if not data:
+            break
+        workerProtocol.dataReceived(data)
+        protocolOut.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,7 @@ Support for generic select()able objects.
 
 from __future__ import division, absolute_import
 
+import os
 from socket import AF_INET6, inet_pton, error
 
 from zope.interface import implementer
@@ -15,7 +16,8 @@ from zope.interface import implementer
 # Twisted Imports
 from twisted.python.compat import _PY3, unicode, lazyByteSlice
 from twisted.python import reflect, failure
-from twisted.internet import interfaces, main
+from twisted.internet import interfaces, main, defer
+from twisted.internet.error import ConnectionLost
 
 if _PY3:
     def _concatenate(bObj, offset, bArray):
@@ -31,6 +33,45 @@ else:
         return buffer(bObj, offset) + b"".join(bArray)
 
 
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    # The smallest value POSIX allows.
+    _IOV_MAX = 16
+
+# The average size, in bytes, buffered chunks must have for them to be
+# written with scatter/gather I/O rather than joined first.  See
+# docs/core/benchmarks/writev.py.
+_VECTOR_MIN_CHUNK = 16 * 1024
+
+
+
+class _FileSegment(object):
+    """
+    A part of a file queued by L{FileDescriptor._writeFile}, waiting in
+    C{_tempDataBuffer} to be sent.
+
+    @ivar fileObj: The file to send bytes from.
+
+    @ivar offset: The position in C{fileObj} of the next byte to send.
+    @type offset: C{int}
+
+    @ivar count: The number of bytes still to be sent.
+    @type count: C{int}
+
+    @ivar deferred: The L{Deferred} to fire once all of the bytes are sent.
+    """
+
+    def __init__(self, fileObj, offset, count, deferred):
+        self.fileObj = fileObj
+        self.offset = offset
+        self.count = count
+        self.deferred = deferred
+
+
+
 class _ConsumerMixin(object):
     """
     L{IConsumer} implementations can mix this in to get C{registerProducer} and
@@ -164,6 +205,40 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     This is an abstract superclass of all objects which may be notified when
     they are readable or writable; e.g. they have a file-descriptor that is
     valid to be passed to select(2).
+
+    @ivar _vectorWrites: A flag indicating whether L{doWrite} should hand
+        buffered chunks to L{_writeSomeDataVector} as they are, rather than
+        joining them together and passing the result to L{writeSomeData},
+        when the buffered chunks are large enough that copying them costs
+        more than the extra work of passing them separately.  Subclasses set
+        this when they can send several buffers with a single system call.
+    @type _vectorWrites: C{bool}
+
+    @ivar _fileSegments: The number of L{_FileSegment}s queued in
+        C{_tempDataBuffer} by L{_writeFile}.  While there are any, L{doWrite}
+        writes the buffered bytes and files one at a time, in order, with
+        L{writeSomeData} and L{_writeSomeFile}.  C{_tempDataLen} includes the
+        unsent bytes of the files.
+    @type _fileSegments: C{int}
+
+    @ivar _reportsWouldBlock: A flag indicating whether L{doRead} and
+        L{doWrite} set C{_readBlocked} and C{_writeBlocked} when they find
+        there is nothing more to read or no room left to write.  An
+        edge-triggered reactor only delivers a readiness notification once,
+        so it can only drive descriptors which set this until they run dry.
+    @type _reportsWouldBlock: C{bool}
+
+    @ivar _readBlocked: Set by L{doRead}, if C{_reportsWouldBlock} is set,
+        when there is no more data to read until the reactor next reports the
+        descriptor readable: a read failed with C{EWOULDBLOCK}, or read less
+        than was asked for.
+    @type _readBlocked: C{bool}
+
+    @ivar _writeBlocked: Set by L{doWrite}, if C{_reportsWouldBlock} is set,
+        when no more data can be written until the reactor next reports the
+        descriptor writable: a write failed with C{EWOULDBLOCK}, or wrote
+        less than was asked for.
+    @type _writeBlocked: C{bool}
     """
     connected = 0
     disconnected = 0
@@ -172,6 +247,11 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     _writeDisconnected = False
     dataBuffer = b""
     offset = 0
+    _vectorWrites = False
+    _fileSegments = 0
+    _reportsWouldBlock = False
+    _readBlocked = False
+    _writeBlocked = False
 
     SEND_LIMIT = 128*1024
 
@@ -200,6 +280,14 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         """
         self.disconnected = 1
         self.connected = 0
+        if self._fileSegments:
+            segments = [chunk for chunk in self._tempDataBuffer
+                        if isinstance(chunk, _FileSegment)]
+            self._tempDataBuffer = []
+            self._tempDataLen = 0
+            self._fileSegments = 0
+            for segment in segments:
+                segment.deferred.errback(reason)
         if self.producer is not None:
             self.producer.stopProducing()
             self.producer = None
@@ -221,6 +309,41 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                                   reflect.qual(self.__class__))
 
 
+    def _writeSomeDataVector(self, vector):
+        """
+        Write as much as possible of the given sequence of buffers,
+        immediately.
+
+        This is used instead of L{writeSomeData} when C{_vectorWrites} is set,
+        so that buffers written separately do not need to be copied into one
+        string first.  This implementation joins them and calls
+        L{writeSomeData}; subclasses which set C{_vectorWrites} override it to
+        use scatter/gather I/O.
+
+        @param vector: A C{list} of bytes-like objects to write, in order.
+
+        @return: The same as L{writeSomeData}; if an integer, the number of
+            bytes written from the start of the concatenation of C{vector}.
+        """
+        return self.writeSomeData(b"".join(vector))
+
+
+    def _writeSomeFile(self, segment):
+        """
+        Write as much as possible of the given part of a file, immediately.
+
+        Subclasses which support L{_writeFile} must override this method.
+
+        @param segment: The part of the file to write.
+        @type segment: L{_FileSegment}
+
+        @return: The same as L{writeSomeData}; if an integer, the number of
+            bytes of C{segment} written.
+        """
+        raise NotImplementedError("%s does not implement _writeSomeFile" %
+                                  reflect.qual(self.__class__))
+
+
     def doRead(self):
         """
         Called when data is available for reading.
@@ -240,28 +363,43 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @see: L{twisted.internet.interfaces.IWriteDescriptor.doWrite}.
         """
-        if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
-            # If there is currently less than SEND_LIMIT bytes left to send
-            # in the string, extend it with the array data.
-            self.dataBuffer = _concatenate(
-                self.dataBuffer, self.offset, self._tempDataBuffer)
-            self.offset = 0
-            self._tempDataBuffer = []
-            self._tempDataLen = 0
-
-        # Send as much data as you can.
-        if self.offset:
-            l = self.writeSomeData(lazyByteSlice(self.dataBuffer, self.offset))
+        if self._fileSegments:
+            l = self._doWriteFiles()
+            if isinstance(l, Exception) or l < 0:
+                return l
+        elif (self._vectorWrites and self._tempDataBuffer and
+                self._tempDataLen >=
+                len(self._tempDataBuffer) * _VECTOR_MIN_CHUNK):
+            # Joining small chunks is cheaper than handing them to the kernel
+            # one by one; only large chunks are worth not copying.
+            l = self._doWriteVector()
+            if isinstance(l, Exception) or l < 0:
+                return l
         else:
-            l = self.writeSomeData(self.dataBuffer)
-
-        # There is no writeSomeData implementation in Twisted which returns
-        # < 0, but the documentation for writeSomeData used to claim negative
-        # integers meant connection lost.  Keep supporting this here,
-        # although it may be worth deprecating and removing at some point.
-        if isinstance(l, Exception) or l < 0:
-            return l
-        self.offset += l
+            if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
+                # If there is currently less than SEND_LIMIT bytes left to
+                # send in the string, extend it with the array data.
+                self.dataBuffer = _concatenate(
+                    self.dataBuffer, self.offset, self._tempDataBuffer)
+                self.offset = 0
+                self._tempDataBuffer = []
+                self._tempDataLen = 0
+
+            # Send as much data as you can.
+            if self.offset:
+                l = self.writeSomeData(
+                    lazyByteSlice(self.dataBuffer, self.offset))
+            else:
+                l = self.writeSomeData(self.dataBuffer)
+
+            # There is no writeSomeData implementation in Twisted which
+            # returns < 0, but the documentation for writeSomeData used to
+            # claim negative integers meant connection lost.  Keep supporting
+            # this here, although it may be worth deprecating and removing at
+            # some point.
+            if isinstance(l, Exception) or l < 0:
+                return l
+            self.offset += l
         # If there is nothing left to send,
         if self.offset == len(self.dataBuffer) and not self._tempDataLen:
             self.dataBuffer = b""
@@ -288,6 +426,103 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                 return result
         return None
 
+
+    def _doWriteVector(self):
+        """
+        Write the unsent part of C{dataBuffer} followed by the chunks in
+        C{_tempDataBuffer} using L{_writeSomeDataVector}, then drop whatever
+        was written from the buffers.
+
+        At most C{_IOV_MAX} buffers are passed at once and no more are added
+        once C{SEND_LIMIT} bytes have been collected.  If a chunk is only
+        partially written, it becomes the new C{dataBuffer}.
+
+        @return: The result of L{_writeSomeDataVector}.
+        """
+        vector = []
+        pending = len(self.dataBuffer) - self.offset
+        if pending:
+            vector.append(lazyByteSlice(self.dataBuffer, self.offset))
+        size = pending
+        chunks = self._tempDataBuffer
+        for chunk in chunks:
+            if size >= self.SEND_LIMIT or len(vector) >= _IOV_MAX:
+                break
+            vector.append(chunk)
+            size += len(chunk)
+
+        l = self._writeSomeDataVector(vector)
+        if isinstance(l, Exception) or l < 0:
+            return l
+
+        if l < pending:
+            self.offset += l
+            return l
+        written = l - pending
+        index = 0
+        while index < len(chunks) and len(chunks[index]) <= written:
+            written -= len(chunks[index])
+            self._tempDataLen -= len(chunks[index])
+            index += 1
+        if written:
+            # Part of this chunk was written; keep the rest at the front.
+            self.dataBuffer = chunks[index]
+            self.offset = written
+            self._tempDataLen -= len(chunks[index])
+            index += 1
+        else:
+            self.dataBuffer = b""
+            self.offset = 0
+        del chunks[:index]
+        return l
+
+
+    def _doWriteFiles(self):
+        """
+        Write some of the unsent part of C{dataBuffer} or, once it has all
+        been sent, of the first file segment in C{_tempDataBuffer}.
+
+        Any bytes buffered ahead of the first file segment are joined to make
+        the new C{dataBuffer} first.  Once a file segment has been sent, it is
+        removed and its L{Deferred} is fired.
+
+        @return: The result of L{writeSomeData} or L{_writeSomeFile}.
+        """
+        chunks = self._tempDataBuffer
+        if (self.offset == len(self.dataBuffer) and
+                not isinstance(chunks[0], _FileSegment)):
+            index = 1
+            while not isinstance(chunks[index], _FileSegment):
+                index += 1
+            self.dataBuffer = _concatenate(b"", 0, chunks[:index])
+            self.offset = 0
+            self._tempDataLen -= len(self.dataBuffer)
+            del chunks[:index]
+
+        if self.offset < len(self.dataBuffer):
+            l = self.writeSomeData(
+                lazyByteSlice(self.dataBuffer, self.offset))
+            if isinstance(l, Exception) or l < 0:
+                return l
+            self.offset += l
+            return l
+
+        self.dataBuffer = b""
+        self.offset = 0
+        segment = chunks[0]
+        l = self._writeSomeFile(segment)
+        if isinstance(l, Exception) or l < 0:
+            return l
+        segment.offset += l
+        segment.count -= l
+        self._tempDataLen -= l
+        if not segment.count:
+            del chunks[0]
+            self._fileSegments -= 1
+            segment.deferred.callback(None)
+        return l
+
+
     def _postLoseConnection(self):
         """Called after a loseConnection(), when all data has been written.
 
@@ -359,13 +594,13 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         """
         Reliably write a sequence of data.
 
-        Currently, this is a convenience method roughly equivalent to::
+        This is equivalent to::
 
             for chunk in iovec:
                 fd.write(chunk)
 
-        It may have a more efficient implementation at a later time or in a
-        different reactor.
+        Transports which support scatter/gather I/O (see C{_vectorWrites})
+        send the chunks without first copying them into a single string.
 
         As with the C{write()} method, if a buffer size limit is reached and a
         streaming producer is registered, it will be paused until the buffered
@@ -383,6 +618,33 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         self.startWriting()
 
 
+    def _writeFile(self, fileObj, offset, count):
+        """
+        Reliably write part of a file, using L{_writeSomeFile}.
+
+        The part of the file is queued behind any buffered data, just like a
+        chunk passed to C{write()}, and counts towards the buffer size limit.
+        This is the implementation of
+        L{twisted.internet.interfaces.ISendfileTransport.sendFile}.
+
+        @return: A L{Deferred} which fires with C{None} once C{count} bytes
+            have been written, or fails with the reason the connection was
+            lost first.
+        """
+        if not self.connected or self._writeDisconnected:
+            return defer.fail(ConnectionLost())
+        d = defer.Deferred()
+        if not count:
+            d.callback(None)
+            return d
+        self._tempDataBuffer.append(_FileSegment(fileObj, offset, count, d))
+        self._tempDataLen += count
+        self._fileSegments += 1
+        self._maybePauseProducer()
+        self.startWriting()
+        return d
+
+
     def loseConnection(self, _connDone=failure.Failure(main.CONNECTION_DONE)):
         """Close the connection at the next available opportunity.
 
@@ -13,7 +13,6 @@ from zope.interface import implementer, classImplements
 
 import sys
 import warnings
-from heapq import heappush, heappop, heapify
 
 import traceback
 
@@ -24,11 +23,15 @@ from twisted.internet import fdesc, main, error, abstract, defer, threads
 from twisted.python import log, failure, reflect
 from twisted.python.runtime import seconds as runtimeSeconds, platform
 from twisted.internet.defer import Deferred, DeferredList
+from twisted.internet._instrumentation import ReactorInstrumentation
 
 # This import is for side-effects!  Even if you don't see any code using it
 # in this module, don't delete it.
 from twisted.python import threadable
 
+# Not all platforms have, or support, this option.
+_SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", None)
+
 
 @implementer(IDelayedCall)
 class DelayedCall:
@@ -38,6 +41,10 @@ class DelayedCall:
     debug = False
     _str = None
 
+    # The position of this call in the owning reactor's pending timed call
+    # heap, or C{None} if it is not currently in that heap.
+    _heapIndex = None
+
     def __init__(self, time, func, args, kw, cancel, reset,
                  seconds=runtimeSeconds):
         """
@@ -209,6 +216,116 @@ class DelayedCall:
 
 
 
+def _siftUp(heap, pos):
+    """
+    Move the L{DelayedCall} at C{pos} towards the root of C{heap} until its
+    parent is scheduled no later than it is, keeping each call's
+    C{_heapIndex} up to date.
+
+    @param heap: A C{list} of L{DelayedCall} instances ordered as a binary
+        min-heap on their C{time} attribute.
+    @param pos: The index of the call to move.
+    """
+    call = heap[pos]
+    time = call.time
+    while pos > 0:
+        parentPos = (pos - 1) >> 1
+        parent = heap[parentPos]
+        if parent.time <= time:
+            break
+        heap[pos] = parent
+        parent._heapIndex = pos
+        pos = parentPos
+    heap[pos] = call
+    call._heapIndex = pos
+
+
+
+def _siftDown(heap, pos):
+    """
+    Move the L{DelayedCall} at C{pos} away from the root of C{heap} until
+    neither of its children is scheduled earlier than it is, keeping each
+    call's C{_heapIndex} up to date.
+
+    @param heap: A C{list} of L{DelayedCall} instances ordered as a binary
+        min-heap on their C{time} attribute.
+    @param pos: The index of the call to move.
+    """
+    call = heap[pos]
+    time = call.time
+    end = len(heap)
+    childPos = 2 * pos + 1
+    while childPos < end:
+        rightPos = childPos + 1
+        if rightPos < end and heap[rightPos].time < heap[childPos].time:
+            childPos = rightPos
+        child = heap[childPos]
+        if time <= child.time:
+            break
+        heap[pos] = child
+        child._heapIndex = pos
+        pos = childPos
+        childPos = 2 * pos + 1
+    heap[pos] = call
+    call._heapIndex = pos
+
+
+
+def _heapPush(heap, call):
+    """
+    Add C{call} to C{heap}.
+
+    @param heap: A C{list} of L{DelayedCall} instances ordered as a binary
+        min-heap on their C{time} attribute.
+    @param call: The L{DelayedCall} to add.  It must not already be in a heap.
+    """
+    heap.append(call)
+    _siftUp(heap, len(heap) - 1)
+
+
+
+def _heapPop(heap):
+    """
+    Remove and return the earliest L{DelayedCall} in C{heap}.
+
+    @param heap: A non-empty C{list} of L{DelayedCall} instances ordered as a
+        binary min-heap on their C{time} attribute.
+
+    @return: The removed L{DelayedCall}, with its C{_heapIndex} reset to
+        C{None}.
+    """
+    last = heap.pop()
+    if heap:
+        first = heap[0]
+        heap[0] = last
+        _siftDown(heap, 0)
+    else:
+        first = last
+    first._heapIndex = None
+    return first
+
+
+
+def _heapRemove(heap, call):
+    """
+    Remove C{call} from an arbitrary position in C{heap} in logarithmic time.
+
+    @param heap: A C{list} of L{DelayedCall} instances ordered as a binary
+        min-heap on their C{time} attribute.
+    @param call: A L{DelayedCall} currently in C{heap}.
+    """
+    pos = call._heapIndex
+    last = heap.pop()
+    if last is not call:
+        heap[pos] = last
+        if pos > 0 and last.time < heap[(pos - 1) >> 1].time:
+            _siftUp(heap, pos)
+        else:
+            _siftDown(heap, pos)
+    call._heapIndex = None
+
+
+
 @implementer(IResolverSimple)
 class ThreadedResolver(object):
     """
@@ -460,6 +577,23 @@ class ReactorBase(object):
     @ivar _registerAsIOThread: A flag controlling whether the reactor will
         register the thread it is running in as the I/O thread when it starts.
         If C{True}, registration will be done, otherwise it will not be.
+
+    @ivar _pendingTimedCalls: A binary min-heap of the L{DelayedCall}s which
+        are waiting to run, ordered by their C{time} attribute.  Each call
+        records its position in the heap as C{_heapIndex} so that it can be
+        moved or removed without searching for it.
+
+    @ivar _newTimedCalls: A C{list} of the L{DelayedCall}s created since the
+        last time new calls were moved into C{_pendingTimedCalls}.
+
+    @ivar instrumentation: The L{ReactorInstrumentation} measuring this
+        reactor, or C{None}.  See L{startInstrumentation}.
+
+    @ivar _wakeUpPending: A flag which is true from the time
+        L{callFromThread} wakes the reactor up until L{runUntilCurrent} next
+        looks at C{threadCallQueue}.  While it is set, further calls from
+        threads don't need to wake the reactor again, so a burst of them
+        costs one wake-up rather than one each.
     """
 
     _registerAsIOThread = True
@@ -467,6 +601,8 @@ class ReactorBase(object):
     _stopped = True
     installed = False
     usingThreads = False
+    instrumentation = None
+    _wakeUpPending = False
     resolver = BlockingResolver()
 
     __name__ = "twisted.internet.reactor"
@@ -476,7 +612,6 @@ class ReactorBase(object):
         self._eventTriggers = {}
         self._pendingTimedCalls = []
         self._newTimedCalls = []
-        self._cancellations = 0
         self.running = False
         self._started = False
         self._justStopped = False
@@ -713,27 +848,24 @@ class ReactorBase(object):
         return tple
 
     def _moveCallLaterSooner(self, tple):
-        # Linear time find: slow.
-        heap = self._pendingTimedCalls
-        try:
-            pos = heap.index(tple)
+        """
+        Restore the heap invariant after C{tple} has been rescheduled for an
+        earlier time.  Calls which have not yet been moved into the pending
+        heap are left alone; they will be positioned correctly when they are
+        inserted.
+        """
+        if tple._heapIndex is not None:
+            _siftUp(self._pendingTimedCalls, tple._heapIndex)
 
-            # Move elt up the heap until it rests at the right place.
-            elt = heap[pos]
-            while pos != 0:
-                parent = (pos-1) // 2
-                if heap[parent] <= elt:
-                    break
-                # move parent down
-                heap[pos] = heap[parent]
-                pos = parent
-            heap[pos] = elt
-        except ValueError:
-            # element was not found in heap - oh well...
-            pass
 
     def _cancelCallLater(self, tple):
-        self._cancellations+=1
+        """
+        Remove C{tple} from the pending heap immediately.  Calls which have not
+        yet been moved into the pending heap are discarded when they are
+        inserted.
+        """
+        if tple._heapIndex is not None:
+            _heapRemove(self._pendingTimedCalls, tple)
 
 
     def getDelayedCalls(self):
@@ -745,11 +877,9 @@ class ReactorBase(object):
 
     def _insertNewDelayedCalls(self):
         for call in self._newTimedCalls:
-            if call.cancelled:
-                self._cancellations-=1
-            else:
+            if not call.cancelled:
                 call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
+                _heapPush(self._pendingTimedCalls, call)
         self._newTimedCalls = []
 
 
@@ -765,10 +895,21 @@ class ReactorBase(object):
         # insert new delayed calls to make sure to include them in timeout value
         self._insertNewDelayedCalls()
 
-        if not self._pendingTimedCalls:
+        if self._pendingTimedCalls:
+            due = self._pendingTimedCalls[0].time
+        else:
+            due = None
+
+        # Wake up in time to measure the next sampled iteration, too.
+        if self.instrumentation is not None:
+            nextSample = self.instrumentation.nextSample
+            if nextSample is not None and (due is None or nextSample < due):
+                due = nextSample
+
+        if due is None:
             return None
 
-        delay = self._pendingTimedCalls[0].time - self.seconds()
+        delay = due - self.seconds()
 
         # Pick a somewhat arbitrary maximum possible value for the timeout.
         # This value is 2 ** 31 / 1000, which is the number of seconds which can
@@ -783,9 +924,54 @@ class ReactorBase(object):
         return max(0, min(longest, delay))
 
 
+    def startInstrumentation(self, threshold=0.1, sampleInterval=0.001):
+        """
+        Start measuring where this reactor spends its time.
+
+        An iteration of the loop every C{sampleInterval} seconds is timed,
+        split into waiting for events, calling C{doRead} and C{doWrite}, and
+        calling timed calls and calls from threads, and any single one of
+        those callbacks which takes longer than C{threshold} seconds is
+        logged.  The measurements can be looked at while the reactor runs,
+        for example from a manhole, through L{instrumentation}.
+
+        @param threshold: The number of seconds a callback may take before it
+            is logged.
+        @type threshold: C{float}
+
+        @param sampleInterval: The number of seconds between measured
+            iterations, or C{0} to measure every iteration.
+        @type sampleInterval: C{float}
+
+        @return: The new value of L{instrumentation}.
+        @rtype: L{ReactorInstrumentation}
+        """
+        self.stopInstrumentation()
+        self.instrumentation = ReactorInstrumentation(
+            threshold, sampleInterval=sampleInterval)
+        self.instrumentation.install(self)
+        return self.instrumentation
+
+
+    def stopInstrumentation(self):
+        """
+        Stop measuring where this reactor spends its time, if
+        L{startInstrumentation} was called.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.uninstall()
+            self.instrumentation = None
+
+
     def runUntilCurrent(self):
         """Run all pending timed calls.
         """
+        instrumentation = self.instrumentation
+        if instrumentation is not None and not instrumentation.measuring:
+            instrumentation = None
+        # Clear this before looking at the queue, so that a call added from
+        # now on wakes the reactor up again if it is not run below.
+        self._wakeUpPending = False
         if self.threadCallQueue:
             # Keep track of how many calls we actually make, as we're
             # making them, in case another call is added to the queue
@@ -794,34 +980,37 @@ class ReactorBase(object):
             total = len(self.threadCallQueue)
             for (f, a, kw) in self.threadCallQueue:
                 try:
-                    f(*a, **kw)
+                    if instrumentation is None:
+                        f(*a, **kw)
+                    else:
+                        instrumentation.timeCall("callFromThread", f, a, kw)
                 except:
                     log.err()
                 count += 1
                 if count == total:
                     break
+            # Any calls left in the queue were added after _wakeUpPending
+            # was cleared, so they have woken the reactor up already.
             del self.threadCallQueue[:count]
-            if self.threadCallQueue:
-                self.wakeUp()
 
         # insert new delayed calls now
         self._insertNewDelayedCalls()
 
         now = self.seconds()
         while self._pendingTimedCalls and (self._pendingTimedCalls[0].time <= now):
-            call = heappop(self._pendingTimedCalls)
-            if call.cancelled:
-                self._cancellations-=1
-                continue
-
+            call = _heapPop(self._pendingTimedCalls)
             if call.delayed_time > 0:
                 call.activate_delay()
-                heappush(self._pendingTimedCalls, call)
+                _heapPush(self._pendingTimedCalls, call)
                 continue
 
             try:
                 call.called = 1
-                call.func(*call.args, **call.kw)
+                if instrumentation is None:
+                    call.func(*call.args, **call.kw)
+                else:
+                    instrumentation.timeCall(
+                        "DelayedCall", call.func, call.args, call.kw)
             except:
                 log.deferr()
                 if hasattr(call, "creator"):
@@ -833,13 +1022,11 @@ class ReactorBase(object):
                     e += "\n"
                     log.msg(e)
 
-
-        if (self._cancellations > 50 and
-             self._cancellations > len(self._pendingTimedCalls) >> 1):
-            self._cancellations = 0
-            self._pendingTimedCalls = [x for x in self._pendingTimedCalls
-                                       if not x.cancelled]
-            heapify(self._pendingTimedCalls)
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            nextSample = instrumentation.nextSample
+            if nextSample is not None and nextSample <= now:
+                instrumentation.sample(now)
 
         if self._justStopped:
             self._justStopped = False
@@ -945,7 +1132,9 @@ class ReactorBase(object):
             # this is probably a bug in Jython, but until fixed this code
             # won't work in Jython.
             self.threadCallQueue.append((f, args, kw))
-            self.wakeUp()
+            if not self._wakeUpPending:
+                self._wakeUpPending = True
+                self.wakeUp()
 
         def _initThreadPool(self):
             """
@@ -1099,15 +1288,28 @@ class BasePort(abstract.FileDescriptor):
     """Basic implementation of a ListeningPort.
 
     Note: This does not actually implement IListeningPort.
+
+    @ivar reusePort: If C{True}, C{SO_REUSEPORT} is set on the sockets made
+        by L{createInternetSocket}, so that several sockets (usually in
+        different processes) can be bound to the same address, and the kernel
+        will share incoming connections or datagrams between them.
+    @type reusePort: C{bool}
     """
 
     addressFamily = None
     socketType = None
+    reusePort = False
 
     def createInternetSocket(self):
         s = socket.socket(self.addressFamily, self.socketType)
         s.setblocking(0)
         fdesc._setCloseOnExec(s.fileno())
+        if self.reusePort:
+            if _SO_REUSEPORT is None:
+                s.close()
+                raise socket.error(
+                    "SO_REUSEPORT is not supported on this platform")
+            s.setsockopt(socket.SOL_SOCKET, _SO_REUSEPORT, 1)
         return s
 
 
@@ -21,15 +21,19 @@ from __future__ import division, absolute_import
 import traceback
 import types
 import warnings
-from sys import exc_info
+from sys import exc_info, _getframe
 from functools import wraps
 
 # Twisted imports
+from zope.interface import implementer
+
 from twisted.python.compat import cmp, comparable
 from twisted.python import lockfile, failure
 from twisted.logger import Logger
 from twisted.python.deprecate import warnAboutFunction, deprecated
 from twisted.python.versions import Version
+from twisted.internet._instrumentation import _callableName, _now
+from twisted.internet.interfaces import IConsumer
 
 log = Logger()
 
@@ -85,7 +89,13 @@ def succeed(result):
     @rtype: L{Deferred}
     """
     d = Deferred()
-    d.callback(result)
+    if d.debug or _profiler is not None:
+        d.callback(result)
+    else:
+        # There are no callbacks to run yet, so the result can just be set.
+        assert not isinstance(result, Deferred)
+        d.called = True
+        d.result = result
     return d
 
 
@@ -188,13 +198,48 @@ def getDebugging():
     return Deferred.debug
 
 
+
+# The DeferredProfiler in use, if any.  See startProfiling.
+_profiler = None
+
+def startProfiling(creationSites=False):
+    """
+    Start recording how long L{Deferred} callbacks take and how long
+    L{Deferred}s wait for their results, replacing any profiler already
+    running.
+
+    @param creationSites: If C{True}, also record where each L{Deferred} was
+        created, and keep separate measurements for each place.  This is
+        slower, since it looks at the stack every time a L{Deferred} is
+        created.
+    @type creationSites: C{bool}
+
+    @return: The L{DeferredProfiler} recording the measurements.
+    """
+    global _profiler
+    _profiler = DeferredProfiler(creationSites)
+    return _profiler
+
+
+
+def stopProfiling():
+    """
+    Stop the profiling started by L{startProfiling}.
+
+    @return: The L{DeferredProfiler} which was in use, or C{None}.
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
 # See module docstring.
 _NO_RESULT = object()
 _CONTINUE = object()
 
 
 
-class Deferred:
+class Deferred(object):
     """
     This is a callback which will be put off until later.
 
@@ -222,6 +267,11 @@ class Deferred:
         on this instance.
     @type paused: C{int}
 
+    @ivar callbacks: The callbacks and errbacks waiting for a result, as a
+        C{list} of C{(callback, callbackArgs, callbackKeywords, errback,
+        errbackArgs, errbackKeywords)} tuples.  The arguments are tuples and
+        the keywords are C{dict}s or C{None}.
+
     @ivar _suppressAlreadyCalled: A flag used by the cancellation mechanism
         which is C{True} if the Deferred has no canceller and has been
         cancelled, C{False} otherwise.  If C{True}, it can be expected that
@@ -238,22 +288,20 @@ class Deferred:
         Deferred, this is a reference to the other Deferred.  Otherwise, C{None}.
     """
 
-    called = False
-    paused = 0
+    # The attributes used every time a Deferred is created and fired are kept
+    # in slots, so that doing so doesn't need a dictionary.  One is still made
+    # for any other attribute set on an instance, such as the rarely changed
+    # ones with class defaults below.
+    __slots__ = ("callbacks", "result", "called", "paused", "_canceller",
+                 "_runningCallbacks", "_chainedTo", "__dict__", "__weakref__")
+
     _debugInfo = None
     _suppressAlreadyCalled = False
 
-    # Are we currently running a user-installed callback?  Meant to prevent
-    # recursive running of callbacks when a reentrant call to add a callback is
-    # used.
-    _runningCallbacks = False
-
     # Keep this class attribute for now, for compatibility with code that
     # sets it directly.
     debug = False
 
-    _chainedTo = None
-
     def __init__(self, canceller=None):
         """
         Initialize a L{Deferred}.
@@ -279,10 +327,19 @@ class Deferred:
             return result is ignored.
         """
         self.callbacks = []
+        self.called = False
+        self.paused = 0
         self._canceller = canceller
+        # Are we currently running a user-installed callback?  Meant to
+        # prevent recursive running of callbacks when a reentrant call to add
+        # a callback is used.
+        self._runningCallbacks = False
+        self._chainedTo = None
         if self.debug:
             self._debugInfo = DebugInfo()
             self._debugInfo.creator = traceback.format_stack()[:-1]
+        if _profiler is not None:
+            _profiler._created(self)
 
 
     def addCallbacks(self, callback, errback=None,
@@ -298,9 +355,9 @@ class Deferred:
         """
         assert callable(callback)
         assert errback is None or callable(errback)
-        cbs = ((callback, callbackArgs, callbackKeywords),
-               (errback or (passthru), errbackArgs, errbackKeywords))
-        self.callbacks.append(cbs)
+        self.callbacks.append(
+            (callback, callbackArgs or (), callbackKeywords or None,
+             errback or passthru, errbackArgs or (), errbackKeywords or None))
 
         if self.called:
             self._runCallbacks()
@@ -496,18 +553,24 @@ class Deferred:
             if self._debugInfo is None:
                 self._debugInfo = DebugInfo()
             self._debugInfo.invoker = traceback.format_stack()[:-2]
+        if _profiler is not None and self._debugInfo is not None:
+            _profiler._fired(self)
         self.called = True
         self.result = result
-        self._runCallbacks()
+        # With nothing to run, no chain to clear and a result which doesn't
+        # need to be reported if it goes unhandled, there is nothing more to
+        # do.
+        if (self.callbacks or self._chainedTo is not None or
+                isinstance(result, failure.Failure)):
+            self._runCallbacks()
 
 
     def _continuation(self):
         """
-        Build a tuple of callback and errback with L{_continue} to be used by
-        L{_addContinue} and L{_removeContinue} on another Deferred.
+        Build a callback and errback pair with L{_CONTINUE} to be used by
+        L{_runCallbacks} on another Deferred.
         """
-        return ((_CONTINUE, (self,), None),
-                (_CONTINUE, (self,), None))
+        return (_CONTINUE, (self,), None, _CONTINUE, (self,), None)
 
 
     def _runCallbacks(self):
@@ -540,6 +603,9 @@ class Deferred:
             # Don't recursively run callbacks
             return
 
+        Failure = failure.Failure
+        profiler = _profiler
+
         # Keep track of all the Deferreds encountered while propagating results
         # up a chain.  The way a Deferred gets onto this stack is by having
         # added its _continuation() to the callbacks list of a second Deferred
@@ -558,12 +624,20 @@ class Deferred:
 
             finished = True
             current._chainedTo = None
-            while current.callbacks:
-                item = current.callbacks.pop(0)
-                callback, args, kw = item[
-                    isinstance(current.result, failure.Failure)]
-                args = args or ()
-                kw = kw or {}
+            callbacks = current.callbacks
+            # Rather than popping each callback off the front of the list,
+            # which takes time proportional to the length of the list, step
+            # through it and remove the ones which have been run once this
+            # loop is left.  Callbacks added while it runs are appended, so
+            # they are reached too.
+            index = 0
+            while index < len(callbacks):
+                item = callbacks[index]
+                index += 1
+                if isinstance(current.result, Failure):
+                    callback, args, kw = item[3], item[4], item[5]
+                else:
+                    callback, args, kw = item[0], item[1], item[2]
 
                 # Avoid recursion if we can.
                 if callback is _CONTINUE:
@@ -585,7 +659,14 @@ class Deferred:
                 try:
                     current._runningCallbacks = True
                     try:
-                        current.result = callback(current.result, *args, **kw)
+                        if profiler is not None:
+                            current.result = profiler._call(
+                                current, callback, args, kw)
+                        elif kw is None:
+                            current.result = callback(current.result, *args)
+                        else:
+                            current.result = callback(
+                                current.result, *args, **kw)
                         if current.result is current:
                             warnAboutFunction(
                                 callback,
@@ -598,7 +679,7 @@ class Deferred:
                 except:
                     # Including full frame information in the Failure is quite
                     # expensive, so we avoid it unless self.debug is set.
-                    current.result = failure.Failure(captureVars=self.debug)
+                    current.result = Failure(captureVars=self.debug)
                 else:
                     if isinstance(current.result, Deferred):
                         # The result is another Deferred.  If it has a result,
@@ -621,13 +702,14 @@ class Deferred:
                             if current.result._debugInfo is not None:
                                 current.result._debugInfo.failResult = None
                             current.result = resultResult
+            del callbacks[:index]
 
             if finished:
                 # As much of the callback chain - perhaps all of it - as can be
                 # processed right now has been.  The current Deferred is waiting on
                 # another Deferred or for more callbacks.  Before finishing with it,
                 # make sure its _debugInfo is in the proper state.
-                if isinstance(current.result, failure.Failure):
+                if isinstance(current.result, Failure):
                     # Stash the Failure in the _debugInfo for unhandled error
                     # reporting.
                     current.result.cleanFailure()
@@ -708,6 +790,211 @@ class DebugInfo:
 
 
 
+class DeferredProfiler(object):
+    """
+    Measurements of L{Deferred} callbacks and of how long L{Deferred}s wait
+    for their results, made while profiling is on.  See L{startProfiling}.
+
+    Callbacks are identified by their fully qualified names, except that the
+    callback L{inlineCallbacks} uses to resume a generator is identified by
+    the generator's name.  L{Deferred}s are identified by where they were
+    created if C{creationSites} is set, or by their class otherwise.
+
+    @ivar creationSites: Whether measurements are kept separately for each
+        place L{Deferred}s are created.
+    @type creationSites: C{bool}
+
+    @ivar calls: A C{dict} mapping C{(site, callback)} to a two-item C{list}
+        of the number of times the callback was called for a L{Deferred}
+        created at C{site} (C{None} unless C{creationSites} is set) and the
+        total time those calls took in seconds, including the time taken by
+        other callbacks they ran.
+
+    @ivar waits: A C{dict} mapping the identity of L{Deferred}s to a
+        three-item C{list} of the number of them which were fired, the total
+        time in seconds they waited between being created and fired, and the
+        longest any of them waited.
+
+    @ivar stacks: A C{dict} mapping C{tuple}s of names, for a callback and the
+        callbacks running when it was called, outermost first, to the time in
+        seconds spent in that callback but not in other callbacks it ran.  If
+        C{creationSites} is set, each callback's name is preceded by the
+        place its L{Deferred} was created.
+
+    @ivar _now: A no-argument callable returning the current time in
+        seconds.
+
+    @ivar _stack: The callbacks currently running, outermost first, as
+        two-item C{list}s of the C{tuple} of names they add to L{stacks} and
+        the time spent so far in the callbacks they ran.
+    """
+
+    def __init__(self, creationSites=False, now=_now):
+        self.creationSites = creationSites
+        self.calls = {}
+        self.waits = {}
+        self.stacks = {}
+        self._now = now
+        self._stack = []
+
+
+    def _created(self, deferred):
+        """
+        Note the creation of a L{Deferred}, keeping the time and perhaps the
+        place in its L{DebugInfo}.
+        """
+        if deferred._debugInfo is None:
+            deferred._debugInfo = DebugInfo()
+        deferred._debugInfo.created = self._now()
+        if self.creationSites:
+            # Skip the frames of this module, such as succeed() and
+            # Deferred.__init__ itself.
+            frame = _getframe(2)
+            while frame is not None and frame.f_globals is globals():
+                frame = frame.f_back
+            if frame is not None:
+                deferred._debugInfo.creationSite = "%s.%s:%d" % (
+                    frame.f_globals.get("__name__"), frame.f_code.co_name,
+                    frame.f_lineno)
+
+
+    def _site(self, deferred):
+        """
+        Identify a L{Deferred} for L{waits}.
+        """
+        if self.creationSites:
+            return getattr(deferred._debugInfo, "creationSite", None)
+        return _callableName(deferred.__class__)
+
+
+    def _fired(self, deferred):
+        """
+        Note the firing of a L{Deferred}.
+        """
+        created = getattr(deferred._debugInfo, "created", None)
+        if created is None:
+            # Created before profiling started.
+            return
+        waited = self._now() - created
+        site = self._site(deferred)
+        wait = self.waits.get(site)
+        if wait is None:
+            self.waits[site] = [1, waited, waited]
+        else:
+            wait[0] += 1
+            wait[1] += waited
+            if waited > wait[2]:
+                wait[2] = waited
+
+
+    def _name(self, callback, args):
+        """
+        Name a callback.
+        """
+        if callback is _inlineCallbacksResume:
+            generator = args[0].generator
+            frame = generator.gi_frame
+            if frame is not None:
+                return "%s.%s" % (
+                    frame.f_globals.get("__name__"),
+                    getattr(generator, "__qualname__", generator.__name__))
+        return _callableName(callback)
+
+
+    def _call(self, deferred, callback, args, kw):
+        """
+        Call a callback of a L{Deferred} with its result, measuring how long
+        it takes.
+
+        @return: The callback's result.
+        """
+        name = self._name(callback, args)
+        site = None
+        if self.creationSites and deferred._debugInfo is not None:
+            site = getattr(deferred._debugInfo, "creationSite", None)
+        stack = self._stack
+        if site is None:
+            entry = [(name,), 0.0]
+        else:
+            entry = [(site, name), 0.0]
+        stack.append(entry)
+        before = self._now()
+        try:
+            if kw is None:
+                return callback(deferred.result, *args)
+            return callback(deferred.result, *args, **kw)
+        finally:
+            elapsed = self._now() - before
+            frames = ()
+            for e in stack:
+                frames += e[0]
+            del stack[-1]
+            if stack:
+                stack[-1][1] += elapsed
+            self.stacks[frames] = (
+                self.stacks.get(frames, 0.0) + elapsed - entry[1])
+            key = (site, name)
+            call = self.calls.get(key)
+            if call is None:
+                self.calls[key] = [1, elapsed]
+            else:
+                call[0] += 1
+                call[1] += elapsed
+
+
+    def table(self, sortBy="cumulative", limit=None):
+        """
+        Format the measurements as two tables, of callbacks and of waits.
+
+        @param sortBy: C{"cumulative"} to list the callbacks which took the
+            most time first, or C{"calls"} to list the ones called most often
+            first.  Waits are listed longest total first.
+
+        @param limit: The greatest number of rows in each table, or C{None}
+            for all of them.
+
+        @rtype: C{str}
+        """
+        column = {"calls": 0, "cumulative": 1}[sortBy]
+        calls = sorted(self.calls.items(),
+                       key=lambda item: item[1][column], reverse=True)
+        lines = ["%8s %12s %12s  %s" % (
+            "calls", "cumulative", "per call", "callback")]
+        for (site, name), (count, total) in calls[:limit]:
+            if site is not None:
+                name = "%s (created at %s)" % (name, site)
+            lines.append("%8d %12.6f %12.6f  %s" % (
+                count, total, total / count, name))
+        waits = sorted(self.waits.items(),
+                       key=lambda item: item[1][1], reverse=True)
+        lines.append("")
+        lines.append("%8s %12s %12s %12s  %s" % (
+            "fired", "total wait", "mean wait", "max wait", "deferred"))
+        for site, (count, total, longest) in waits[:limit]:
+            lines.append("%8d %12.6f %12.6f %12.6f  %s" % (
+                count, total, total / count, longest, site))
+        return "\n".join(lines)
+
+
+    def collapsedStacks(self):
+        """
+        Format the time spent in callbacks as collapsed stacks, one line for
+        each distinct stack of callbacks giving the names in it separated by
+        semicolons and the time spent in the innermost callback in
+        microseconds, which can be rendered as a flame graph.
+
+        @rtype: C{str}
+        """
+        lines = []
+        for frames, elapsed in sorted(self.stacks.items()):
+            lines.append("%s %d" % (
+                ";".join(frame.replace(";", ":").replace(" ", "_")
+                         for frame in frames),
+                round(elapsed * 1e6)))
+        return "\n".join(lines)
+
+
+
 @comparable
 class FirstError(Exception):
     """
@@ -927,6 +1214,221 @@ def gatherResults(deferredList, consumeErrors=False):
 
 
 
+class _ParallelMap(object):
+    """
+    The state of one call to L{parallelMap}.
+
+    @ivar deferred: The L{Deferred} returned by L{parallelMap}.
+
+    @ivar _iterator: An iterator over the items not yet passed to C{_f}, or
+        C{None} once it is exhausted.
+
+    @ivar _started: The number of items passed to C{_f} so far.
+
+    @ivar _outstanding: A C{dict} mapping the index of each item whose result
+        is not yet known to the L{Deferred} for it.
+
+    @ivar _pending: A C{dict} mapping the index of each result which is known
+        but can't be delivered yet, because it was not the next one in order,
+        to the result.
+
+    @ivar _delivered: The number of results delivered so far, in order.  Only
+        maintained when results are delivered in order to a receiver.
+
+    @ivar _results: A C{dict} mapping indexes to results, if they are being
+        collected rather than delivered to a receiver.
+
+    @ivar _filling: A flag which is C{True} while L{_fill} is running, so
+        that results which arrive at once don't make it recurse.
+
+    @ivar _finished: A flag which is C{True} once L{deferred} has been given
+        a result or cancelled.
+    """
+
+    def __init__(self, iterable, f, concurrency, ordered, failFast,
+                 receiver):
+        self.deferred = Deferred(self._cancel)
+        self._iterator = iter(iterable)
+        self._f = f
+        self._concurrency = concurrency
+        self._ordered = ordered
+        self._failFast = failFast
+        self._receiver = receiver
+        self._started = 0
+        self._outstanding = {}
+        self._pending = {}
+        self._delivered = 0
+        self._results = {}
+        self._filling = False
+        self._finished = False
+
+
+    def _fill(self):
+        """
+        Start calls until C{_concurrency} are outstanding or there are no more
+        items, then see whether everything is done.
+        """
+        if self._filling:
+            return
+        self._filling = True
+        try:
+            while (not self._finished and self._iterator is not None and
+                   len(self._outstanding) < self._concurrency):
+                if (self._ordered and self._receiver is not None and
+                        self._started - self._delivered >= self._concurrency):
+                    # Results are waiting for an earlier one; don't let them
+                    # pile up without bound.
+                    break
+                try:
+                    item = next(self._iterator)
+                except StopIteration:
+                    self._iterator = None
+                    break
+                except:
+                    self._fail(failure.Failure())
+                    return
+                index = self._started
+                self._started += 1
+                d = maybeDeferred(self._f, item)
+                self._outstanding[index] = d
+                d.addBoth(self._completed, index)
+        finally:
+            self._filling = False
+        if (not self._finished and self._iterator is None and
+                not self._outstanding):
+            self._finished = True
+            if self._receiver is None:
+                results = self._results
+                self.deferred.callback(
+                    [results[i] for i in range(self._started)])
+            else:
+                self.deferred.callback(None)
+
+
+    def _completed(self, result, index):
+        """
+        Deliver the result of the call for the item at C{index}, and start
+        another call.
+        """
+        del self._outstanding[index]
+        if self._finished:
+            return None
+        if self._failFast and isinstance(result, failure.Failure):
+            self._fail(failure.Failure(FirstError(result, index)))
+            return None
+        try:
+            self._deliver(index, result)
+        except:
+            self._fail(failure.Failure())
+            return None
+        self._fill()
+
+
+    def _deliver(self, index, result):
+        """
+        Collect a result, or pass it to the receiver if it is next or
+        results are not being delivered in order.
+        """
+        if self._receiver is None:
+            self._results[index] = result
+        elif not self._ordered:
+            self._receiver(index, result)
+        else:
+            pending = self._pending
+            pending[index] = result
+            while self._delivered in pending:
+                index = self._delivered
+                self._delivered += 1
+                self._receiver(index, pending.pop(index))
+
+
+    def _stop(self):
+        """
+        Stop calling C{_f} and cancel the outstanding calls.
+        """
+        self._finished = True
+        self._iterator = None
+        self._pending.clear()
+        for d in list(self._outstanding.values()):
+            d.cancel()
+
+
+    def _fail(self, reason):
+        """
+        Stop, and fail L{deferred} with C{reason}.
+        """
+        self._stop()
+        self.deferred.errback(reason)
+
+
+    def _cancel(self, deferred):
+        """
+        Stop when L{deferred} is cancelled.
+        """
+        self._stop()
+
+
+
+def parallelMap(iterable, f, concurrency, ordered=True, failFast=True,
+                receiver=None):
+    """
+    Call a function which may return a L{Deferred} with each item of an
+    iterable, with no more than a given number of calls outstanding at once.
+
+    Items are only taken from C{iterable} when there is room to start another
+    call, so it may be a generator producing more items than would fit in
+    memory at once.
+
+    By default the results are collected into a list, in the same order as
+    the items.  If C{receiver} is given they are instead passed to it as they
+    become available, and not kept.
+
+    This can be cancelled by calling the C{cancel} method of the returned
+    L{Deferred}, which stops taking items and cancels the outstanding calls.
+
+    @param iterable: The items.
+
+    @param f: A one-argument callable, which may return a L{Deferred}.
+
+    @param concurrency: The greatest number of calls to C{f} whose results are
+        not yet known.
+    @type concurrency: C{int}
+
+    @param ordered: If C{True}, results are passed to C{receiver} in the
+        order of the items, and no more than C{concurrency} results are held
+        back waiting for an earlier one, which may leave fewer than
+        C{concurrency} calls outstanding.  If C{False}, results are passed
+        to C{receiver} as soon as they are available.
+    @type ordered: C{bool}
+
+    @param failFast: If C{True}, the first call which fails stops
+        everything: no more items are taken, the outstanding calls are
+        cancelled and the returned L{Deferred} fails with a L{FirstError}
+        wrapping that failure.  If C{False}, failures are collected or passed
+        to C{receiver} like any other result, as L{failure.Failure}s.
+    @type failFast: C{bool}
+
+    @param receiver: C{None}, or a two-argument callable which is called
+        with the index of each item and the result of calling C{f} with it.
+        If it raises an exception, everything stops and the returned
+        L{Deferred} fails with it.
+
+    @return: A L{Deferred} which fires when every call has finished, with a
+        C{list} of the results if C{receiver} is C{None}, or C{None}
+        otherwise.  If taking an item from C{iterable} raises an exception,
+        it fails with it.
+    @rtype: L{Deferred}
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1, not %r" % (
+            concurrency,))
+    state = _ParallelMap(iterable, f, concurrency, ordered, failFast,
+                         receiver)
+    state._fill()
+    return state.deferred
+
+
+
 # Constants for use with DeferredList
 
 SUCCESS = True
@@ -1106,102 +1608,206 @@ def returnValue(val):
 
 
 
-def _inlineCallbacks(result, g, deferred):
+class _InlineCallbacksStats(object):
     """
-    See L{inlineCallbacks}.
+    Counts of how a function decorated with L{inlineCallbacks} has run, for
+    profiling.  Each such function has one of these as its
+    C{inlineCallbacksStats} attribute.
+
+    @ivar calls: The number of times the function has been called.
+    @type calls: C{int}
+
+    @ivar steps: The number of times its generators have been resumed,
+        including when they were started.
+    @type steps: C{int}
+
+    @ivar synchronous: The number of L{Deferred}s its generators yielded
+        which already had results, so that they could be resumed without
+        waiting.
+    @type synchronous: C{int}
+
+    @ivar waits: The number of L{Deferred}s its generators yielded which they
+        had to wait for.
+    @type waits: C{int}
     """
-    # This function is complicated by the need to prevent unbounded recursion
-    # arising from repeatedly yielding immediately ready deferreds.  This while
-    # loop and the waiting variable solve that by manually unfolding the
-    # recursion.
 
-    waiting = [True, # waiting for result?
-               None] # result
+    def __init__(self):
+        self.calls = 0
+        self.steps = 0
+        self.synchronous = 0
+        self.waits = 0
 
-    while 1:
-        try:
-            # Send the last result back as the result of the yield expression.
-            isFailure = isinstance(result, failure.Failure)
-            if isFailure:
-                result = result.throwExceptionIntoGenerator(g)
-            else:
-                result = g.send(result)
-        except StopIteration as e:
-            # fell off the end, or "return" statement
-            deferred.callback(getattr(e, "value", None))
-            return deferred
-        except _DefGen_Return as e:
-            # returnValue() was called; time to give a result to the original
-            # Deferred.  First though, let's try to identify the potentially
-            # confusing situation which results when returnValue() is
-            # accidentally invoked from a different function, one that wasn't
-            # decorated with @inlineCallbacks.
-
-            # The traceback starts in this frame (the one for
-            # _inlineCallbacks); the next one down should be the application
-            # code.
-            appCodeTrace = exc_info()[2].tb_next
-            if isFailure:
-                # If we invoked this generator frame by throwing an exception
-                # into it, then throwExceptionIntoGenerator will consume an
-                # additional stack frame itself, so we need to skip that too.
-                appCodeTrace = appCodeTrace.tb_next
-            # Now that we've identified the frame being exited by the
-            # exception, let's figure out if returnValue was called from it
-            # directly.  returnValue itself consumes a stack frame, so the
-            # application code will have a tb_next, but it will *not* have a
-            # second tb_next.
-            if appCodeTrace.tb_next.tb_next:
-                # If returnValue was invoked non-local to the frame which it is
-                # exiting, identify the frame that ultimately invoked
-                # returnValue so that we can warn the user, as this behavior is
-                # confusing.
-                ultimateTrace = appCodeTrace
-                while ultimateTrace.tb_next.tb_next:
-                    ultimateTrace = ultimateTrace.tb_next
-                filename = ultimateTrace.tb_frame.f_code.co_filename
-                lineno = ultimateTrace.tb_lineno
-                warnings.warn_explicit(
-                    "returnValue() in %r causing %r to exit: "
-                    "returnValue should only be invoked by functions decorated "
-                    "with inlineCallbacks" % (
-                        ultimateTrace.tb_frame.f_code.co_name,
-                        appCodeTrace.tb_frame.f_code.co_name),
-                    DeprecationWarning, filename, lineno)
-            deferred.callback(e.value)
-            return deferred
-        except:
-            deferred.errback()
-            return deferred
 
-        if isinstance(result, Deferred):
-            # a deferred was yielded, get the result.
-            def gotResult(r):
-                if waiting[0]:
-                    waiting[0] = False
-                    waiting[1] = r
-                else:
-                    _inlineCallbacks(r, g, deferred)
+    def __repr__(self):
+        return ("<_InlineCallbacksStats calls=%d steps=%d synchronous=%d "
+                "waits=%d>" % (
+                    self.calls, self.steps, self.synchronous, self.waits))
 
-            result.addBoth(gotResult)
-            if waiting[0]:
-                # Haven't called back yet, set flag so that we get reinvoked
-                # and return from the loop
-                waiting[0] = False
-                return deferred
 
-            result = waiting[1]
-            # Reset waiting to initial values for next loop.  gotResult uses
-            # waiting, but this isn't a problem because gotResult is only
-            # executed once, and if it hasn't been executed yet, the return
-            # branch above would have been taken.
 
+class _InlineCallbacksState(object):
+    """
+    The state of one generator being run by L{inlineCallbacks}.
 
-            waiting[0] = True
-            waiting[1] = None
+    @ivar generator: The generator.
+
+    @ivar deferred: The L{Deferred} which will be given the generator's
+        result.
+
+    @ivar stats: The L{_InlineCallbacksStats} of the decorated function.
+
+    @ivar waiting: C{True} while a L{Deferred} the generator yielded is
+        having L{_inlineCallbacksResume} added to it, so that a result given
+        to it straight away can be told apart from one given later.
+
+    @ivar result: The result given to L{_inlineCallbacksResume} while
+        C{waiting} is set.
+
+    @ivar args: The arguments L{_inlineCallbacksResume} is added to yielded
+        L{Deferred}s with, so that they are only built once.
+    """
+    __slots__ = ("generator", "deferred", "stats", "waiting", "result", "args")
+
+    def __init__(self, generator, deferred, stats):
+        self.generator = generator
+        self.deferred = deferred
+        self.stats = stats
+        self.waiting = False
+        self.result = None
+        self.args = (self,)
+
+
+
+def _inlineCallbacksResume(result, state):
+    """
+    Resume a generator run by L{inlineCallbacks} with the result of the
+    L{Deferred} it yielded.
+
+    @param state: The L{_InlineCallbacksState} of the generator.
+    """
+    if state.waiting:
+        # The result arrived while it was being asked for; let the loop in
+        # _inlineCallbacks pick it up.
+        state.waiting = False
+        state.result = result
+    else:
+        _inlineCallbacks(result, state.generator, state.deferred, state)
 
 
-    return deferred
+
+def _inlineCallbacks(result, g, deferred, state):
+    """
+    See L{inlineCallbacks}.
+
+    Results which are available straight away, either because the generator
+    yielded something other than a L{Deferred} or a L{Deferred} which already
+    had a result, are sent back into the generator by looping here rather
+    than by recursion, without adding callbacks to anything.  Only when a
+    L{Deferred} without a result is yielded does this return, leaving
+    L{_inlineCallbacksResume} to call it again once there is one.
+
+    @param state: The L{_InlineCallbacksState} of C{g}.
+    """
+    steps = 0
+    synchronous = 0
+    try:
+        while 1:
+            steps += 1
+            try:
+                # Send the last result back as the result of the yield
+                # expression.
+                isFailure = isinstance(result, failure.Failure)
+                if isFailure:
+                    result = result.throwExceptionIntoGenerator(g)
+                else:
+                    result = g.send(result)
+            except StopIteration as e:
+                # fell off the end, or "return" statement
+                deferred.callback(getattr(e, "value", None))
+                return deferred
+            except _DefGen_Return as e:
+                # returnValue() was called; time to give a result to the
+                # original Deferred.  First though, let's try to identify the
+                # potentially confusing situation which results when
+                # returnValue() is accidentally invoked from a different
+                # function, one that wasn't decorated with @inlineCallbacks.
+
+                # The traceback starts in this frame (the one for
+                # _inlineCallbacks); the next one down should be the
+                # application code.
+                appCodeTrace = exc_info()[2].tb_next
+                if isFailure:
+                    # If we invoked this generator frame by throwing an
+                    # exception into it, then throwExceptionIntoGenerator will
+                    # consume an additional stack frame itself, so we need to
+                    # skip that too.
+                    appCodeTrace = appCodeTrace.tb_next
+                # Now that we've identified the frame being exited by the
+                # exception, let's figure out if returnValue was called from
+                # it directly.  returnValue itself consumes a stack frame, so
+                # the application code will have a tb_next, but it will *not*
+                # have a second tb_next.
+                if appCodeTrace.tb_next.tb_next:
+                    # If returnValue was invoked non-local to the frame which
+                    # it is exiting, identify the frame that ultimately
+                    # invoked returnValue so that we can warn the user, as
+                    # this behavior is confusing.
+                    ultimateTrace = appCodeTrace
+                    while ultimateTrace.tb_next.tb_next:
+                        ultimateTrace = ultimateTrace.tb_next
+                    filename = ultimateTrace.tb_frame.f_code.co_filename
+                    lineno = ultimateTrace.tb_lineno
+                    warnings.warn_explicit(
+                        "returnValue() in %r causing %r to exit: "
+                        "returnValue should only be invoked by functions "
+                        "decorated with inlineCallbacks" % (
+                            ultimateTrace.tb_frame.f_code.co_name,
+                            appCodeTrace.tb_frame.f_code.co_name),
+                        DeprecationWarning, filename, lineno)
+                deferred.callback(e.value)
+                return deferred
+            except:
+                deferred.errback()
+                return deferred
+
+            if not isinstance(result, Deferred):
+                continue
+
+            synchronous += 1
+            if (result.called and not result.paused and
+                    not result._runningCallbacks and not result.callbacks and
+                    not isinstance(result.result, Deferred)):
+                # The Deferred already has a result: take it, leaving None
+                # behind, which is what adding a callback returning None
+                # would have done.
+                taken = result.result
+                result.result = None
+                if result._debugInfo is not None:
+                    result._debugInfo.failResult = None
+                result = taken
+                continue
+
+            # Otherwise add a callback to get the result.  It may still be
+            # given straight away, for instance if the Deferred was paused
+            # by one of its own callbacks which has just unpaused it.
+            state.waiting = True
+            result.addCallbacks(
+                _inlineCallbacksResume, _inlineCallbacksResume,
+                state.args, None, state.args, None)
+            if state.waiting:
+                # Haven't called back yet, so _inlineCallbacksResume will
+                # call us again when it is.
+                state.waiting = False
+                synchronous -= 1
+                state.stats.waits += 1
+                return deferred
+
+            result = state.result
+            state.result = None
+    finally:
+        stats = state.stats
+        stats.steps += steps
+        stats.synchronous += synchronous
 
 
 
@@ -1258,7 +1864,17 @@ def inlineCallbacks(f):
         def loadData(url):
             response = yield makeRequest(url)
             return json.loads(response)
+
+    For profiling, the decorated function has an C{inlineCallbacksStats}
+    attribute counting how many times it has been called, how many times its
+    generators have been resumed, and how many of the L{Deferred}s they
+    yielded already had results or had to be waited for::
+
+        >>> loadData.inlineCallbacksStats
+        <_InlineCallbacksStats calls=10 steps=20 synchronous=0 waits=10>
     """
+    stats = _InlineCallbacksStats()
+
     @wraps(f)
     def unwindGenerator(*args, **kwargs):
         try:
@@ -1271,7 +1887,11 @@ def inlineCallbacks(f):
             raise TypeError(
                 "inlineCallbacks requires %r to produce a generator; "
                 "instead got %r" % (f, gen))
-        return _inlineCallbacks(None, gen, Deferred())
+        stats.calls += 1
+        deferred = Deferred()
+        return _inlineCallbacks(
+            None, gen, deferred, _InlineCallbacksState(gen, deferred, stats))
+    unwindGenerator.inlineCallbacksStats = stats
     return unwindGenerator
 
 
@@ -1465,6 +2085,7 @@ class QueueUnderflow(Exception):
 
 
 
+@implementer(IConsumer)
 class DeferredQueue(object):
     """
     An event driven queue.
@@ -1473,6 +2094,11 @@ class DeferredQueue(object):
     made to retrieve an object when the queue is empty, a L{Deferred} is
     returned which will fire when an object becomes available.
 
+    A queue with a C{size} can also apply backpressure rather than raising
+    L{QueueOverflow}: L{putWait} waits for room, and a streaming producer
+    registered with L{registerProducer} is paused while the queue is full.
+    Several objects can be retrieved at once with L{getBatch}.
+
     @ivar size: The maximum number of objects to allow into the queue
     at a time.  When an attempt to add a new object would exceed this
     limit, L{QueueOverflow} is raised synchronously.  C{None} for no limit.
@@ -1481,13 +2107,49 @@ class DeferredQueue(object):
     one time.  When an attempt is made to get an object which would
     exceed this limit, L{QueueUnderflow} is raised synchronously.  C{None}
     for no limit.
+
+    @ivar waiting: The L{Deferred}s returned by L{get} and L{getBatch} which
+        are waiting for objects, oldest first.
+
+    @ivar pending: The objects in the queue, oldest first.
+
+    @ivar putters: C{(object, Deferred)} pairs for the calls to L{putWait}
+        waiting for room in the queue, oldest first.
+
+    @ivar producer: The producer registered with L{registerProducer}, or
+        C{None}.
+
+    @ivar _batches: A C{dict} mapping the L{Deferred}s in C{waiting} which
+        were returned by L{getBatch} to C{[objects, maxItems, timeoutCall]}
+        lists: the objects gathered for it so far, the most it will take,
+        and the L{IDelayedCall} which will give it what has been gathered
+        if it is not full sooner, or C{None}.
+
+    @ivar _producerPaused: Whether C{producer} has been paused because the
+        queue is full.
+
+    @ivar _scheduler: The L{IReactorTime} provider used by L{getBatch}, or
+        C{None} to use the global reactor.
     """
 
-    def __init__(self, size=None, backlog=None):
+    producer = None
+    _producerPaused = False
+
+    def __init__(self, size=None, backlog=None, scheduler=None):
+        """
+        @param size: See C{size}.
+
+        @param backlog: See C{backlog}.
+
+        @param scheduler: See C{_scheduler}.
+        """
         self.waiting = []
         self.pending = []
+        self.putters = []
         self.size = size
         self.backlog = backlog
+        self._batches = {}
+        self._scheduler = scheduler
 
 
     def _cancelGet(self, d):
@@ -1500,9 +2162,89 @@ class DeferredQueue(object):
         d has fired. put() pops a deferred out of self.waiting and calls
         it, so the canceller will no longer be called.
 
+        If d was returned by L{getBatch}, the objects gathered for it are
+        given to the other waiting gets, and any left over are put back at
+        the front of the queue.
+
         @param d: The deferred that has been canceled.
         """
         self.waiting.remove(d)
+        batch = self._batches.pop(d, None)
+        if batch is not None:
+            objects, maxItems, timeoutCall = batch
+            if timeoutCall is not None:
+                timeoutCall.cancel()
+            while objects and self._deliver(objects[0]):
+                del objects[0]
+            self.pending[:0] = objects
+
+
+    def _cancelPut(self, d):
+        """
+        Remove the call to L{putWait} which returned d, as d has been
+        cancelled.
+
+        @param d: The deferred that has been canceled.
+        """
+        for i, (obj, putter) in enumerate(self.putters):
+            if putter is d:
+                del self.putters[i]
+                break
+
+
+    def _full(self):
+        """
+        Return whether the queue has no room for another object.
+        """
+        return self.size is not None and len(self.pending) >= self.size
+
+
+    def _deliver(self, obj):
+        """
+        Give an object to the oldest waiting L{get} or L{getBatch}, if there
+        is one.
+
+        @return: C{True} if the object was delivered, otherwise C{False}.
+        """
+        if not self.waiting:
+            return False
+        d = self.waiting[0]
+        batch = self._batches.get(d)
+        if batch is None:
+            del self.waiting[0]
+            d.callback(obj)
+            return True
+        batch[0].append(obj)
+        if batch[2] is None or len(batch[0]) >= batch[1]:
+            self._finishBatch(d)
+        return True
+
+
+    def _finishBatch(self, d):
+        """
+        Give a L{Deferred} returned by L{getBatch} the objects gathered for
+        it.
+        """
+        self.waiting.remove(d)
+        objects, maxItems, timeoutCall = self._batches.pop(d)
+        if timeoutCall is not None and timeoutCall.active():
+            timeoutCall.cancel()
+        d.callback(objects)
+
+
+    def _removed(self):
+        """
+        Let waiting L{putWait} calls and a paused producer know that objects
+        have been removed from the queue.
+        """
+        while self.putters and not self._full():
+            obj, d = self.putters.pop(0)
+            self.pending.append(obj)
+            d.callback(None)
+        if (self._producerPaused and self.producer is not None and
+                len(self.pending) <= self.size // 2):
+            self._producerPaused = False
+            self.producer.resumeProducing()
 
 
     def put(self, obj):
@@ -1511,14 +2253,35 @@ class DeferredQueue(object):
 
         @raise QueueOverflow: Too many objects are in this queue.
         """
-        if self.waiting:
-            self.waiting.pop(0).callback(obj)
-        elif self.size is None or len(self.pending) < self.size:
+        if self._deliver(obj):
+            return
+        elif not self._full():
             self.pending.append(obj)
         else:
             raise QueueOverflow()
 
 
+    def putWait(self, obj):
+        """
+        Add an object to this queue when there is room for it.
+
+        Objects added by L{putWait} join the queue in the order it was called
+        in, but L{put} and L{write} don't wait for them.
+
+        @return: A L{Deferred} which fires with C{None} once the object is in
+            the queue.  Cancelling it before then withdraws the object.
+        """
+        if not self.putters:
+            if self._deliver(obj):
+                return succeed(None)
+            elif not self._full():
+                self.pending.append(obj)
+                return succeed(None)
+        d = Deferred(canceller=self._cancelPut)
+        self.putters.append((obj, d))
+        return d
+
+
     def get(self):
         """
         Attempt to retrieve and remove an object from the queue.
@@ -1530,7 +2293,9 @@ class DeferredQueue(object):
         L{Deferred}s are already waiting for an object from this queue.
         """
         if self.pending:
-            return succeed(self.pending.pop(0))
+            d = succeed(self.pending.pop(0))
+            self._removed()
+            return d
         elif self.backlog is None or len(self.waiting) < self.backlog:
             d = Deferred(canceller=self._cancelGet)
             self.waiting.append(d)
@@ -1539,6 +2304,104 @@ class DeferredQueue(object):
             raise QueueUnderflow()
 
 
+    def getBatch(self, maxItems, maxWait=None):
+        """
+        Attempt to retrieve and remove up to C{maxItems} objects from the
+        queue at once.
+
+        @param maxItems: The most objects to retrieve.
+        @type maxItems: C{int}
+
+        @param maxWait: C{None} to retrieve whatever objects are in the queue
+            as soon as there is at least one, or the most seconds to wait for
+            C{maxItems} objects before retrieving what there is, which may
+            be nothing.
+        @type maxWait: C{float} or C{None}
+
+        @return: a L{Deferred} which fires with a C{list} of the objects.
+            Cancelling it gives any objects gathered for it to the other
+            waiting gets, or puts them back at the front of the queue.
+
+        @raise QueueUnderflow: Too many (more than C{backlog})
+        L{Deferred}s are already waiting for an object from this queue.
+        """
+        if maxItems < 1:
+            raise ValueError("maxItems must be at least 1, not %r" % (
+                maxItems,))
+        objects = []
+        while self.pending and len(objects) < maxItems:
+            objects.append(self.pending.pop(0))
+            self._removed()
+        if len(objects) == maxItems or objects and maxWait is None:
+            return succeed(objects)
+        if maxWait is not None and maxWait <= 0:
+            return succeed(objects)
+        if self.backlog is not None and len(self.waiting) >= self.backlog:
+            self.pending[:0] = objects
+            raise QueueUnderflow()
+        d = Deferred(canceller=self._cancelGet)
+        timeoutCall = None
+        if maxWait is not None:
+            scheduler = self._scheduler
+            if scheduler is None:
+                from twisted.internet import reactor as scheduler
+            timeoutCall = scheduler.callLater(maxWait, self._finishBatch, d)
+        self.waiting.append(d)
+        self._batches[d] = [objects, maxItems, timeoutCall]
+        return d
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        Register a streaming producer, which will be paused while the queue
+        is full and resumed once it is no more than half full.
+
+        @see: L{twisted.internet.interfaces.IConsumer.registerProducer}
+
+        @raise RuntimeError: If a producer is already registered.
+
+        @raise ValueError: If C{streaming} is false; only streaming
+            producers are supported.
+        """
+        if self.producer is not None:
+            raise RuntimeError(
+                "Cannot register producer %s, because producer %s was never "
+                "unregistered." % (producer, self.producer))
+        if not streaming:
+            raise ValueError("DeferredQueue only supports streaming "
+                             "producers")
+        self.producer = producer
+        self._producerPaused = False
+        if self._full():
+            self._producerPaused = True
+            producer.pauseProducing()
+
+
+    def unregisterProducer(self):
+        """
+        Forget the producer registered with L{registerProducer}.
+
+        @see: L{twisted.internet.interfaces.IConsumer.unregisterProducer}
+        """
+        self.producer = None
+        self._producerPaused = False
+
+
+    def write(self, data):
+        """
+        Add an object to this queue even if it is full, pausing the
+        registered producer if there is one and the queue is now full.
+
+        @see: L{twisted.internet.interfaces.IConsumer.write}
+        """
+        if not self._deliver(data):
+            self.pending.append(data)
+        if (self.producer is not None and not self._producerPaused and
+                self._full()):
+            self._producerPaused = True
+            self.producer.pauseProducing()
+
+
 
 class AlreadyTryingToLockError(Exception):
     """
@@ -1652,7 +2515,7 @@ class DeferredFilesystemLock(lockfile.FilesystemLock):
 
 __all__ = ["Deferred", "DeferredList", "succeed", "fail", "FAILURE", "SUCCESS",
            "AlreadyCalledError", "TimeoutError", "gatherResults",
-           "maybeDeferred",
+           "parallelMap", "maybeDeferred",
            "waitForDeferred", "deferredGenerator", "inlineCallbacks",
            "returnValue",
            "DeferredLock", "DeferredSemaphore", "DeferredQueue",
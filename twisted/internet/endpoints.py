@@ -438,7 +438,7 @@ class _TCPServerEndpoint(object):
     A TCP server endpoint interface
     """
 
-    def __init__(self, reactor, port, backlog, interface):
+    def __init__(self, reactor, port, backlog, interface, reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -450,11 +450,18 @@ class _TCPServerEndpoint(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket.  Only reactors whose C{listenTCP} accepts a C{reusePort}
+            argument, such as those based on
+            L{twisted.internet.posixbase.PosixReactorBase}, support this.
+        @type reusePort: bool
         """
         self._reactor = reactor
         self._port = port
         self._backlog = backlog
         self._interface = interface
+        self._reusePort = reusePort
 
 
     def listen(self, protocolFactory):
@@ -462,11 +469,17 @@ class _TCPServerEndpoint(object):
         Implement L{IStreamServerEndpoint.listen} to listen on a TCP
         socket
         """
+        kwargs = {}
+        if self._reusePort:
+            # Not every IReactorTCP provider accepts this argument, so only
+            # pass it when it's needed.
+            kwargs['reusePort'] = True
         return defer.execute(self._reactor.listenTCP,
                              self._port,
                              protocolFactory,
                              backlog=self._backlog,
-                             interface=self._interface)
+                             interface=self._interface,
+                             **kwargs)
 
 
 
@@ -474,7 +487,8 @@ class TCP4ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv4 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface=''):
+    def __init__(self, reactor, port, backlog=50, interface='',
+                 reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -486,8 +500,13 @@ class TCP4ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to '' (all)
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket, defaults to C{False}.
+        @type reusePort: bool
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -495,7 +514,8 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
     """
     Implements TCP server endpoint with an IPv6 configuration
     """
-    def __init__(self, reactor, port, backlog=50, interface='::'):
+    def __init__(self, reactor, port, backlog=50, interface='::',
+                 reusePort=False):
         """
         @param reactor: An L{IReactorTCP} provider.
 
@@ -507,8 +527,13 @@ class TCP6ServerEndpoint(_TCPServerEndpoint):
 
         @param interface: The hostname to bind to, defaults to '' (all)
         @type interface: str
+
+        @param reusePort: Whether to set C{SO_REUSEPORT} on the listening
+            socket, defaults to C{False}.
+        @type reusePort: bool
         """
-        _TCPServerEndpoint.__init__(self, reactor, port, backlog, interface)
+        _TCPServerEndpoint.__init__(
+            self, reactor, port, backlog, interface, reusePort)
 
 
 
@@ -1004,7 +1029,28 @@ class AdoptedStreamServerEndpoint(object):
 
 
 
-def _parseTCP(factory, port, interface="", backlog=50):
+def _parseBoolean(value):
+    """
+    Convert a string argument from an endpoint description to a boolean.
+
+    @param value: C{"yes"}, C{"true"} or C{"1"} for C{True}, or C{"no"},
+        C{"false"} or C{"0"} for C{False}, in any case.
+    @type value: C{str}
+
+    @raise ValueError: If C{value} is anything else.
+
+    @rtype: C{bool}
+    """
+    lowered = value.lower()
+    if lowered in ("yes", "true", "1"):
+        return True
+    if lowered in ("no", "false", "0"):
+        return False
+    raise ValueError("Expected a boolean, not %r" % (value,))
+
+
+
+def _parseTCP(factory, port, interface="", backlog=50, reusePort="no"):
     """
     Internal parser function for L{_parseServer} to convert the string
     arguments for a TCP(IPv4) stream endpoint into the structured arguments.
@@ -1022,12 +1068,18 @@ def _parseTCP(factory, port, interface="", backlog=50):
     @param backlog: the length of the listen queue
     @type backlog: C{str}
 
+    @param reusePort: C{"yes"} to set C{SO_REUSEPORT} on the listening socket;
+        see L{_parseBoolean} for the accepted values.
+    @type reusePort: C{str}
+
     @return: a 2-tuple of (args, kwargs), describing  the parameters to
         L{IReactorTCP.listenTCP} (or, modulo argument 2, the factory, arguments
         to L{TCP4ServerEndpoint}.
     """
-    return (int(port), factory), {'interface': interface,
-                                  'backlog': int(backlog)}
+    kwargs = {'interface': interface, 'backlog': int(backlog)}
+    if _parseBoolean(reusePort):
+        kwargs['reusePort'] = True
+    return (int(port), factory), kwargs
 
 
 
@@ -1234,7 +1286,8 @@ class _TCP6ServerParser(object):
     """
     prefix = "tcp6"     # Used in _parseServer to identify the plugin with the endpoint type
 
-    def _parseServer(self, reactor, port, backlog=50, interface='::'):
+    def _parseServer(self, reactor, port, backlog=50, interface='::',
+                     reusePort="no"):
         """
         Internal parser function for L{_parseServer} to convert the string
         arguments into structured arguments for the L{TCP6ServerEndpoint}
@@ -1249,10 +1302,15 @@ class _TCP6ServerParser(object):
 
         @param interface: The hostname to bind to
         @type interface: str
+
+        @param reusePort: C{"yes"} to set C{SO_REUSEPORT} on the listening
+            socket; see L{_parseBoolean} for the accepted values.
+        @type reusePort: str
         """
         port = int(port)
         backlog = int(backlog)
-        return TCP6ServerEndpoint(reactor, port, backlog, interface)
+        return TCP6ServerEndpoint(
+            reactor, port, backlog, interface, _parseBoolean(reusePort))
 
 
     def parseStreamServer(self, reactor, *args, **kwargs):
@@ -1436,6 +1494,12 @@ def serverFromString(reactor, description):
 
         serverFromString(reactor, b"tcp:80:interface=127.0.0.1")
 
+    On platforms which support C{SO_REUSEPORT}, several processes can each
+    listen on the same TCP port, and have the kernel share connections between
+    them, by passing C{reusePort=yes}::
+
+        serverFromString(reactor, b"tcp:80:reusePort=yes")
+
     SSL server endpoints may be specified with the 'ssl' prefix, and the
     private key and certificate files may be specified by the C{privateKey} and
     C{certKey} arguments::
@@ -13,8 +13,13 @@ listeners or connectors are added)::
 
 from __future__ import division, absolute_import
 
-from select import epoll, EPOLLHUP, EPOLLERR, EPOLLIN, EPOLLOUT
+from select import epoll, EPOLLHUP, EPOLLERR, EPOLLIN, EPOLLOUT, EPOLLET
 import errno
+import select
+
+# Not defined by the select module before Python 3.3, but supported by every
+# kernel since 2.6.17.
+EPOLLRDHUP = getattr(select, "EPOLLRDHUP", 0x2000)
 
 from zope.interface import implementer
 
@@ -212,6 +217,39 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
     @ivar _continuousPolling: A L{_ContinuousPolling} instance, used to handle
         file descriptors (e.g. filesytem files) that are not supported by
         C{epoll(7)}.
+
+    @ivar _edgeTriggered: Whether descriptors which report when they would
+        block (see L{abstract.FileDescriptor._reportsWouldBlock}) are
+        registered in edge-triggered mode.
+
+    @ivar _edges: A set containing the integer file descriptors which are
+        registered with C{_poller} in edge-triggered mode.  These are
+        registered once, for both read and write readiness, and only
+        unregistered when they are neither read from nor written to, so
+        starting and stopping reading or writing them needs no system call.
+
+    @ivar _readReady: A set containing the integer file descriptors in
+        C{_edges} which have been reported readable and have not yet reported
+        that there is nothing more to read.
+
+    @ivar _readClosed: A set containing the integer file descriptors in
+        C{_edges} whose peers have been reported to have stopped sending.
+        These stay in C{_readReady} until they are read from or removed: the
+        end of the input is not reported again, even if a read finds some
+        data before it.
+
+    @ivar _writeReady: A set containing the integer file descriptors in
+        C{_edges} which have been reported writable and have not yet reported
+        that they cannot be written to.
+
+    @ivar _hungUp: A dictionary mapping the integer file descriptors in
+        C{_edges} which have been reported disconnected to the disconnection
+        event bits.
+
+    @ivar _runnable: A set containing the integer file descriptors in
+        C{_edges} which need C{doRead} or C{doWrite} called without waiting
+        for another notification: they are ready for something they are
+        interested in.
     """
 
     # Attributes for _PollLikeMixin
@@ -219,10 +257,17 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
     _POLL_IN = EPOLLIN
     _POLL_OUT = EPOLLOUT
 
-    def __init__(self):
+    def __init__(self, edgeTriggered=False):
         """
         Initialize epoll object, file descriptor tracking dictionaries, and the
         base class.
+
+        @param edgeTriggered: If C{True}, register descriptors which support
+            it in edge-triggered mode, and call their C{doRead} and
+            C{doWrite} until they run dry rather than asking the kernel again
+            whether they are ready.  This saves an C{epoll_ctl} call every
+            time a connection starts or stops writing.
+        @type edgeTriggered: C{bool}
         """
         # Create the poller we're going to use.  The 1024 here is just a hint
         # to the kernel, it is not a hard maximum.  After Linux 2.6.8, the size
@@ -232,6 +277,13 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         self._writes = set()
         self._selectables = {}
         self._continuousPolling = _ContinuousPolling(self)
+        self._edgeTriggered = edgeTriggered
+        self._edges = set()
+        self._readReady = set()
+        self._writeReady = set()
+        self._readClosed = set()
+        self._hungUp = {}
+        self._runnable = set()
         posixbase.PosixReactorBase.__init__(self)
 
 
@@ -244,6 +296,11 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         """
         fd = xer.fileno()
         if fd not in primary:
+            if fd in self._edges or (
+                    self._edgeTriggered and fd not in other and
+                    getattr(xer, "_reportsWouldBlock", False)):
+                self._addEdgeTriggered(xer, fd, primary, selectables)
+                return
             flags = event
             # epoll_ctl can raise all kinds of IOErrors, and every one
             # indicates a bug either in the reactor or application-code.
@@ -262,6 +319,69 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             selectables[fd] = xer
 
 
+    def _addEdgeTriggered(self, xer, fd, primary, selectables):
+        """
+        Private method for adding a descriptor from the event loop in
+        edge-triggered mode.
+
+        The descriptor is registered for read and write readiness the first
+        time it is added; after that, only our own tracking state changes.
+        """
+        if fd not in self._edges:
+            self._poller.register(
+                fd, EPOLLIN | EPOLLOUT | EPOLLRDHUP | EPOLLET)
+            self._edges.add(fd)
+        primary.add(fd)
+        selectables[fd] = xer
+        self._checkRunnable(fd)
+
+
+    def _removeEdgeTriggered(self, fd, primary, other, selectables):
+        """
+        Private method for removing a descriptor from the event loop in
+        edge-triggered mode.
+
+        It does the inverse job of L{_addEdgeTriggered}.
+        """
+        primary.remove(fd)
+        if fd in other:
+            self._checkRunnable(fd)
+        else:
+            del selectables[fd]
+            self._edges.remove(fd)
+            self._readReady.discard(fd)
+            self._writeReady.discard(fd)
+            self._readClosed.discard(fd)
+            self._hungUp.pop(fd, None)
+            self._runnable.discard(fd)
+            self._poller.unregister(fd)
+
+
+    def _checkRunnable(self, fd):
+        """
+        Add an edge-triggered descriptor to C{_runnable} if it is ready for
+        something it is interested in, or remove it if not.
+        """
+        if self._edgeEvent(fd):
+            self._runnable.add(fd)
+        else:
+            self._runnable.discard(fd)
+
+
+    def _edgeEvent(self, fd):
+        """
+        Work out the event bits to dispatch for an edge-triggered descriptor,
+        from what it has been reported ready for and what it is interested
+        in.
+        """
+        event = self._hungUp.get(fd, 0)
+        if fd in self._readReady and fd in self._reads:
+            event |= EPOLLIN
+        if fd in self._writeReady and fd in self._writes:
+            event |= EPOLLOUT
+        return event
+
+
     def addReader(self, reader):
         """
         Add a FileDescriptor for notification of data available to read.
@@ -311,6 +431,9 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             else:
                 return
         if fd in primary:
+            if fd in self._edges:
+                self._removeEdgeTriggered(fd, primary, other, selectables)
+                return
             if fd in other:
                 flags = antievent
                 # See comment above modify call in _add.
@@ -368,7 +491,13 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         """
         Poll the poller for new events.
         """
-        if timeout is None:
+        if self._runnable:
+            # Some edge-triggered descriptors still have work to do, and
+            # won't be reported again until they've done it.  They drop out
+            # as soon as a read or write comes up short, so this only keeps
+            # the loop from blocking while there is data to move.
+            timeout = 0
+        elif timeout is None:
             timeout = -1  # Wait indefinitely.
 
         try:
@@ -387,22 +516,76 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             raise
 
         _drdw = self._doReadOrWrite
+        edges = self._edges
         for fd, event in l:
             try:
                 selectable = self._selectables[fd]
             except KeyError:
                 pass
             else:
-                log.callWithLogger(selectable, _drdw, selectable, fd, event)
+                if fd in edges:
+                    self._noteEdge(fd, event)
+                else:
+                    log.callWithLogger(selectable, _drdw, selectable, fd, event)
+        if self._runnable:
+            self._runEdgeTriggered()
 
     doIteration = doPoll
 
 
-def install():
+    def _noteEdge(self, fd, event):
+        """
+        Record that an edge-triggered descriptor has become ready.
+        """
+        if event & EPOLLIN:
+            self._readReady.add(fd)
+        if event & EPOLLRDHUP:
+            self._readReady.add(fd)
+            self._readClosed.add(fd)
+        if event & EPOLLOUT:
+            self._writeReady.add(fd)
+        if event & self._POLL_DISCONNECTED:
+            # Unlike readiness, disconnection is never undone, and it may not
+            # be handled right away if there is input to read first.
+            self._hungUp[fd] = (
+                self._hungUp.get(fd, 0) | (event & self._POLL_DISCONNECTED))
+        self._checkRunnable(fd)
+
+
+    def _runEdgeTriggered(self):
+        """
+        Call C{doRead} and C{doWrite} once on each edge-triggered descriptor
+        which is ready to read or write, and stop calling them for whatever
+        they report would block until the kernel reports them ready again.
+        """
+        _drdw = self._doReadOrWrite
+        for fd in list(self._runnable):
+            # An earlier descriptor may have removed this one.
+            event = self._edgeEvent(fd)
+            if not event:
+                self._runnable.discard(fd)
+                continue
+            selectable = self._selectables[fd]
+            selectable._readBlocked = selectable._writeBlocked = False
+            log.callWithLogger(selectable, _drdw, selectable, fd, event)
+            if self._selectables.get(fd) is not selectable:
+                continue
+            # Once the peer has stopped sending, reading goes on until it
+            # finds the end of the input, which won't be reported again.
+            if selectable._readBlocked and fd not in self._readClosed:
+                self._readReady.discard(fd)
+            if selectable._writeBlocked:
+                self._writeReady.discard(fd)
+            self._checkRunnable(fd)
+
+
+def install(edgeTriggered=False):
     """
     Install the epoll() reactor.
+
+    @param edgeTriggered: See L{EPollReactor.__init__}.
     """
-    p = EPollReactor()
+    p = EPollReactor(edgeTriggered)
     from twisted.internet.main import installReactor
     installReactor(p)
 
@@ -1947,6 +1947,63 @@ class IFileDescriptorReceiver(Interface):
 
 
 
+class IBufferReceiver(Interface):
+    """
+    Protocols may implement L{IBufferReceiver} to be given the bytes received
+    by a transport in the transport's own read buffer, rather than in a new
+    C{bytes} object for each read.
+
+    Transports which support this call L{bufferReceived} instead of
+    L{IProtocol.dataReceived}; others continue to call
+    L{IProtocol.dataReceived}, so providers must implement both.  TCP
+    connections support it.  UNIX connections using L{twisted.python.sendmsg}
+    to receive file descriptors do not.
+
+    @since: 15.2
+    """
+    def bufferReceived(data):
+        """
+        Called whenever data is received.
+
+        @param data: The bytes received.  The buffer underlying C{data} is
+            reused for subsequent reads, so C{data} (and any view or slice of
+            it) is only valid until this method returns; copy anything which
+            must be kept, for example with C{data.tobytes()}.
+        @type data: L{memoryview}
+
+        @return: C{None}
+        """
+
+
+
+class IDatagramBatchReceiver(Interface):
+    """
+    Datagram protocols may implement L{IDatagramBatchReceiver} to be given
+    all of the datagrams read by their transport at once, rather than one
+    call per datagram.
+
+    Transports which support this call L{datagramsReceived} instead of
+    C{datagramReceived}; others continue to call C{datagramReceived}, so
+    providers must implement both.
+
+    @since: 15.2
+    """
+    def datagramsReceived(datagrams):
+        """
+        Called with the datagrams received since the transport last called
+        this method.
+
+        @param datagrams: The datagrams received, in the order they were
+            received.
+        @type datagrams: L{list} of 2-L{tuple}s of the datagram (C{bytes})
+            and the address it came from, as the arguments to
+            C{datagramReceived}
+
+        @return: C{None}
+        """
+
+
+
 class IProtocolFactory(Interface):
     """
     Interface for protocol factories.
@@ -2133,6 +2190,46 @@ class IUNIXTransport(ITransport):
 
 
 
+class ISendfileTransport(ITransport):
+    """
+    A transport which can send the contents of a file without copying them
+    through user space, for example with C{sendfile(2)}.
+
+    @since: 15.2
+    """
+
+    def sendFile(fileObj, offset, count):
+        """
+        Send C{count} bytes of C{fileObj}, starting at C{offset}, to the other
+        end of this connection.
+
+        The bytes are sent in order with respect to calls to C{write} and
+        C{writeSequence}: they follow any data already written and precede
+        any data written afterwards.  Producers registered with the transport
+        are paused while the unsent bytes of the file exceed the transport's
+        buffer size, just as they would be for written data.
+
+        The file's current position is neither used nor changed, and the file
+        must not be closed or truncated until the returned L{Deferred} fires.
+
+        @param fileObj: A regular file opened for reading, with a C{fileno}
+            method.
+
+        @param offset: The position in C{fileObj} of the first byte to send.
+        @type offset: L{int}
+
+        @param count: The number of bytes to send.
+        @type count: L{int}
+
+        @return: A L{Deferred} which fires with C{None} once all of the bytes
+            have been handed to the operating system, or fails if the
+            connection is lost or the file ends before C{count} bytes have
+            been sent.
+        @rtype: L{Deferred}
+        """
+
+
+
 class IOpenSSLServerConnectionCreator(Interface):
     """
     A provider of L{IOpenSSLServerConnectionCreator} can create
@@ -2416,6 +2513,31 @@ class IUDPTransport(Interface):
         """
 
 
+
+class IUDPBatchTransport(IUDPTransport):
+    """
+    A UDP transport which can write many datagrams with less overhead than
+    calling C{write} for each of them.
+
+    @since: 15.2
+    """
+
+    def writeMany(datagrams):
+        """
+        Write each of C{datagrams}, in order.
+
+        This is equivalent to calling C{write} for each datagram, and fails in
+        the same ways; if writing one of them raises an exception, the
+        datagrams after it are not written.
+
+        @param datagrams: The datagrams to write.
+        @type datagrams: An iterable of 2-L{tuple}s of a datagram (C{bytes})
+            and the address to write it to, as the arguments to C{write}.
+
+        @return: C{None}
+        """
+
+
 class IUNIXDatagramTransport(Interface):
     """
     Transport for UDP PacketProtocols.
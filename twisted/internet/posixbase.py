@@ -187,8 +187,70 @@ class _UnixWaker(_FDWaker):
 
 
 
+class _EventFDWaker(log.Logger, object):
+    """
+    A waker using a Linux C{eventfd} rather than a pipe.
+
+    An C{eventfd} is a single file descriptor holding a counter, so waking the
+    reactor any number of times before it reads leaves exactly one thing to
+    read, and only one descriptor is used instead of two.
+
+    @ivar i: The C{eventfd} file descriptor, which is both monitored by the
+        reactor and written to wake it up.
+    """
+    disconnected = 0
+
+    i = None
+
+    def __init__(self, reactor):
+        """Initialize.
+        """
+        self.reactor = reactor
+        self.i = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+        self.fileno = lambda: self.i
+
+
+    def wakeUp(self):
+        """Add one to the counter.
+        """
+        if self.i is not None:
+            try:
+                util.untilConcludes(os.eventfd_write, self.i, 1)
+            except OSError as e:
+                # The counter is full, so the reactor is already awake.
+                if e.errno != errno.EAGAIN:
+                    raise
+
+
+    def doRead(self):
+        """
+        Read the counter, resetting it to zero.
+        """
+        try:
+            util.untilConcludes(os.eventfd_read, self.i)
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+
+    def connectionLost(self, reason):
+        """Close the C{eventfd}.
+        """
+        if self.i is None:
+            return
+        try:
+            os.close(self.i)
+        except OSError:
+            pass
+        self.i = None
+
+
+
 if platformType == 'posix':
-    _Waker = _UnixWaker
+    if getattr(os, "eventfd", None) is not None:
+        _Waker = _EventFDWaker
+    else:
+        _Waker = _UnixWaker
 else:
     # Primarily Windows and Jython.
     _Waker = _SocketWaker
@@ -365,12 +427,18 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
 
     # IReactorUDP
 
-    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192):
+    def listenUDP(self, port, protocol, interface='', maxPacketSize=8192,
+                  reusePort=False):
         """Connects a given L{DatagramProtocol} to the given numeric UDP port.
 
+        @param reusePort: If C{True}, set C{SO_REUSEPORT} on the socket, so
+            that other sockets (usually in other processes) can be bound to
+            the same port, and the kernel will share incoming datagrams
+            between them.  This is not part of L{IReactorUDP}.
+
         @returns: object conforming to L{IListeningPort}.
         """
-        p = udp.Port(port, protocol, interface, maxPacketSize, self)
+        p = udp.Port(port, protocol, interface, maxPacketSize, self, reusePort)
         p.startListening()
         return p
 
@@ -490,8 +558,17 @@ class PosixReactorBase(_SignalReactorMixin, _DisconnectSelectableMixin,
 
     # IReactorTCP
 
-    def listenTCP(self, port, factory, backlog=50, interface=''):
-        p = tcp.Port(port, factory, backlog, interface, self)
+    def listenTCP(self, port, factory, backlog=50, interface='',
+                  reusePort=False):
+        """
+        @param reusePort: If C{True}, set C{SO_REUSEPORT} on the socket, so
+            that other sockets (usually in other processes) can listen on the
+            same port, and the kernel will share incoming connections between
+            them.  This is not part of L{IReactorTCP}.
+
+        @see: L{IReactorTCP.listenTCP}
+        """
+        p = tcp.Port(port, factory, backlog, interface, self, reusePort)
         p.startListening()
         return p
 
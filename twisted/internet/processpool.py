@@ -0,0 +1,535 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Run CPU-bound functions in a pool of worker processes.
+
+L{twisted.internet.threads.deferToThread} can't make Python code which is
+busy using the CPU go any faster, because only one thread at a time can run
+Python code.  A L{ProcessPool} runs functions in separate Python processes
+instead, started with L{IReactorProcess.spawnProcess} and driven with
+L{twisted.protocols.amp} over a pair of pipes, in the same way that
+L{twisted.trial._dist} drives its workers.
+
+The function and its arguments are pickled to send them to a worker, and the
+result, or the L{Failure} of the exception it raised, is pickled to send it
+back, so the function must be importable by name in the worker, and
+everything passed to and returned from it must be picklable.
+"""
+
+import os
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from collections import deque
+
+from zope.interface import implementer
+
+from twisted.internet.defer import (
+    Deferred, DeferredList, TimeoutError, fail)
+from twisted.internet.error import ProcessExitedAlready
+from twisted.internet.interfaces import ITransport, IAddress
+from twisted.internet.protocol import ProcessProtocol
+from twisted.protocols.amp import (
+    AMP, Argument, Boolean, Command, MAX_VALUE_LENGTH)
+from twisted.python import log
+from twisted.python.failure import Failure
+from twisted.python.modules import theSystemPath
+
+# File descriptor numbers used to set up pipes with the workers.
+_WORKER_AMP_STDIN = 3
+
+_WORKER_AMP_STDOUT = 4
+
+
+
+class _Chunked(Argument):
+    """
+    A string which may be longer than L{MAX_VALUE_LENGTH}, split across as
+    many keys as it needs: the argument's own name and then the name followed
+    by C{".1"}, C{".2"} and so on.
+    """
+
+    def fromBox(self, name, strings, objects, proto):
+        chunks = [strings.pop(name)]
+        while True:
+            key = "%s.%d" % (name, len(chunks))
+            if key not in strings:
+                break
+            chunks.append(strings.pop(key))
+        objects[name] = b"".join(chunks)
+
+
+    def toBox(self, name, strings, objects, proto):
+        value = objects.pop(name)
+        strings[name] = value[:MAX_VALUE_LENGTH]
+        for i, start in enumerate(
+                range(MAX_VALUE_LENGTH, len(value), MAX_VALUE_LENGTH)):
+            strings["%s.%d" % (name, i + 1)] = (
+                value[start:start + MAX_VALUE_LENGTH])
+
+
+
+class _CallFunction(Command):
+    """
+    Call a function in a worker.
+
+    C{call} is a pickled C{(function, args, kwargs)} tuple.  C{result} is the
+    pickled result if C{success} is true, or else the pickled L{Failure}.
+    """
+    arguments = [('call', _Chunked())]
+    response = [('success', Boolean()), ('result', _Chunked())]
+
+
+
+def _pickleFailure(reason):
+    """
+    Pickle a L{Failure}, or if its exception can't be pickled, a
+    L{Failure} of a C{RuntimeError} describing it.
+    """
+    reason.cleanFailure()
+    try:
+        return pickle.dumps(reason, pickle.HIGHEST_PROTOCOL)
+    except:
+        return pickle.dumps(
+            Failure(RuntimeError(reason.getErrorMessage())),
+            pickle.HIGHEST_PROTOCOL)
+
+
+
+class _WorkerProtocol(AMP):
+    """
+    The worker side of the protocol, which runs the functions it is sent.
+    """
+
+    def callFunction(self, call):
+        """
+        Unpickle and call a function, and pickle its result.
+        """
+        try:
+            function, args, kwargs = pickle.loads(call)
+            result = pickle.dumps(
+                function(*args, **kwargs), pickle.HIGHEST_PROTOCOL)
+        except:
+            return {'success': False, 'result': _pickleFailure(Failure())}
+        return {'success': True, 'result': result}
+
+    _CallFunction.responder(callFunction)
+
+
+
+class _WorkerAddress(object):
+    """
+    A stub L{IAddress} for the ends of a L{_WorkerTransport}.
+    """
+
+
+
+@implementer(ITransport)
+class _WorkerTransport(object):
+    """
+    A transport which sends what is written to it to a worker's command
+    pipe, for L{AMP} to use.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+
+
+    def write(self, data):
+        self._transport.writeToChild(_WORKER_AMP_STDIN, data)
+
+
+    def writeSequence(self, sequence):
+        for data in sequence:
+            self._transport.writeToChild(_WORKER_AMP_STDIN, data)
+
+
+    def loseConnection(self):
+        self._transport.loseConnection()
+
+
+    def getHost(self):
+        return _WorkerAddress()
+
+
+    def getPeer(self):
+        return _WorkerAddress()
+
+
+
+class _Task(object):
+    """
+    A call to be made in a worker.
+
+    @ivar data: The pickled C{(function, args, kwargs)} tuple.
+    @ivar deferred: The L{Deferred} to give the result to.
+    @ivar worker: The L{_Worker} running the call, or C{None} if it is still
+        queued.
+    @ivar timeoutCall: The L{IDelayedCall} which will kill the worker if the
+        call runs for too long, or C{None}.
+    @ivar timedOut: Whether the worker was killed because of that.
+    """
+    worker = None
+    timeoutCall = None
+    timedOut = False
+
+    def __init__(self, data):
+        self.data = data
+        self.deferred = None
+
+
+
+class _Worker(ProcessProtocol):
+    """
+    The pool's end of a worker process.
+
+    @ivar amp: The L{AMP} protocol talking to the worker.
+    @ivar tasks: The number of calls the worker has been given.
+    @ivar exited: Whether the worker process has ended.
+    @ivar ended: A L{Deferred} which fires when the worker process has ended.
+    """
+    exited = False
+
+    def __init__(self, pool):
+        self._pool = pool
+        self.amp = AMP()
+        self.tasks = 0
+        self.ended = Deferred()
+
+
+    def connectionMade(self):
+        self.amp.makeConnection(_WorkerTransport(self.transport))
+
+
+    def childDataReceived(self, childFD, data):
+        if childFD == _WORKER_AMP_STDOUT:
+            self.amp.dataReceived(data)
+        else:
+            ProcessProtocol.childDataReceived(self, childFD, data)
+
+
+    def outReceived(self, data):
+        log.msg(format="Worker %(pid)s: %(data)r",
+                pid=self.transport.pid, data=data)
+
+
+    errReceived = outReceived
+
+
+    def stop(self):
+        """
+        Close the worker's command pipe, so that it exits once it has
+        finished what it is doing.
+        """
+        self.transport.closeChildFD(_WORKER_AMP_STDIN)
+
+
+    def kill(self):
+        """
+        Kill the worker, without waiting for it to finish what it is doing.
+        """
+        try:
+            self.transport.signalProcess("KILL")
+        except ProcessExitedAlready:
+            pass
+
+
+    def processEnded(self, reason):
+        self.exited = True
+        self.amp.connectionLost(reason)
+        self._pool._workerEnded(self)
+        self.ended.callback(None)
+
+
+
+class ProcessPool(object):
+    """
+    A pool of worker processes to call functions in.
+
+    Workers are started as calls need them, up to C{max} of them, and are
+    kept running until the pool is stopped.  A worker which has run
+    C{maxTasksPerWorker} calls is replaced by a new one, which bounds the
+    damage a function which leaks memory can do.
+
+    @ivar min: The number of workers started by L{start} and kept running.
+    @type min: C{int}
+    @ivar max: The largest number of workers to run at once.
+    @type max: C{int}
+    @ivar maxTasksPerWorker: The number of calls a worker runs before it is
+        replaced, or C{None} for no limit.
+    @type maxTasksPerWorker: C{int} or C{None}
+    @ivar timeout: The number of seconds a call may run for before its
+        worker is killed and the call fails with L{TimeoutError}, or C{None}
+        for no limit.
+    @type timeout: C{float} or C{None}
+    @ivar started: Whether the pool is running calls.
+    @type started: C{bool}
+
+    @ivar _reactor: The L{IReactorProcess} and L{IReactorTime} provider to
+        start workers and time calls with.
+    @ivar _pending: A L{deque} of the L{_Task}s waiting for a worker.
+    @ivar _workers: The L{_Worker}s which may be given calls.
+    @ivar _idle: The L{_Worker}s in C{_workers} which aren't running a call.
+    @ivar _retiring: The L{_Worker}s which have been told to exit but haven't
+        yet.
+    """
+    started = False
+
+    def __init__(self, minWorkers=0, maxWorkers=None, maxTasksPerWorker=None,
+                 timeout=None, reactor=None):
+        """
+        @param minWorkers: See C{min}.
+        @param maxWorkers: See C{max}; the number of CPUs if C{None}.
+        @param maxTasksPerWorker: See C{maxTasksPerWorker}.
+        @param timeout: See C{timeout}.
+        @param reactor: See C{_reactor}; the global reactor if C{None}.
+        """
+        if maxWorkers is None:
+            maxWorkers = _cpuCount()
+        if minWorkers < 0 or maxWorkers < max(minWorkers, 1):
+            raise ValueError(
+                "Need 0 <= minWorkers <= maxWorkers and maxWorkers >= 1")
+        if reactor is None:
+            from twisted.internet import reactor
+        self.min = minWorkers
+        self.max = maxWorkers
+        self.maxTasksPerWorker = maxTasksPerWorker
+        self.timeout = timeout
+        self._reactor = reactor
+        self._pending = deque()
+        self._workers = []
+        self._idle = []
+        self._retiring = []
+
+
+    def start(self):
+        """
+        Start C{min} workers, and run any calls made before now.
+        """
+        self.started = True
+        while len(self._workers) < self.min:
+            self._idle.append(self._spawn())
+        self._dispatch()
+
+
+    def stop(self):
+        """
+        Stop running calls: cancel the calls which haven't started, and tell
+        every worker to exit once it has finished the call it is running.
+
+        @return: A L{Deferred} which fires with C{None} when every worker has
+            exited.
+        """
+        self.started = False
+        while self._pending:
+            self._pending[0].deferred.cancel()
+        for worker in self._idle:
+            self._retire(worker)
+        self._idle = []
+        return DeferredList(
+            [worker.ended for worker in self._workers + self._retiring]
+            ).addCallback(lambda ignored: None)
+
+
+    def callInProcess(self, f, *args, **kwargs):
+        """
+        Call a function in a worker.
+
+        @param f: The function to call.  It must be importable by name.
+        @param *args: The positional arguments to pass to C{f}.
+        @param **kwargs: The keyword arguments to pass to C{f}.
+
+        @return: A L{Deferred} which fires with the result of the call, or
+            fails with the exception it raised, with L{TimeoutError} if it
+            took longer than C{timeout}, or with
+            L{twisted.internet.error.ProcessTerminated} if the worker died.
+            Cancelling it before the call starts takes the call out of the
+            queue; cancelling it afterwards kills the worker.
+        """
+        try:
+            data = pickle.dumps((f, args, kwargs), pickle.HIGHEST_PROTOCOL)
+        except:
+            return fail()
+        task = _Task(data)
+        task.deferred = Deferred(lambda d: self._cancel(task))
+        self._pending.append(task)
+        self._dispatch()
+        return task.deferred
+
+
+    def _spawn(self):
+        """
+        Start a worker process.
+
+        @return: The new L{_Worker}, added to C{_workers}.
+        """
+        worker = _Worker(self)
+        self._workers.append(worker)
+        environ = os.environ.copy()
+        # The worker uses this as its sys.path; see _processworker._setupPath.
+        environ['TWISTED_PROCESSPOOL_PYTHONPATH'] = os.pathsep.join(sys.path)
+        workerPath = theSystemPath[
+            'twisted.internet._processworker'].filePath.path
+        self._reactor.spawnProcess(
+            worker, sys.executable, args=[sys.executable, workerPath],
+            env=environ, childFDs={0: 'w', 1: 'r', 2: 'r',
+                                   _WORKER_AMP_STDIN: 'w',
+                                   _WORKER_AMP_STDOUT: 'r'})
+        return worker
+
+
+    def _retire(self, worker):
+        """
+        Tell a worker to exit, and stop giving it calls.
+        """
+        self._workers.remove(worker)
+        self._retiring.append(worker)
+        worker.stop()
+
+
+    def _dispatch(self):
+        """
+        Give queued calls to idle workers, starting more workers if there are
+        too few.
+        """
+        if not self.started:
+            return
+        pending = self._pending
+        while pending and self._idle:
+            self._run(self._idle.pop(), pending.popleft())
+        while pending and len(self._workers) < self.max:
+            self._run(self._spawn(), pending.popleft())
+
+
+    def _run(self, worker, task):
+        """
+        Run a call in a worker.
+        """
+        worker.tasks += 1
+        task.worker = worker
+        if self.timeout is not None:
+            task.timeoutCall = self._reactor.callLater(
+                self.timeout, self._timedOut, task)
+        worker.amp.callRemote(_CallFunction, call=task.data).addBoth(
+            self._finished, worker, task)
+
+
+    def _finished(self, response, worker, task):
+        """
+        Give the result of a call to its L{Deferred}, and the worker another
+        call.
+
+        @param response: The response to L{_CallFunction}, or the L{Failure}
+            it failed with if the worker died.
+        """
+        if task.timeoutCall is not None and task.timeoutCall.active():
+            task.timeoutCall.cancel()
+        if isinstance(response, Failure):
+            result = response
+            if task.timedOut:
+                result = Failure(TimeoutError(
+                    "Call took longer than %s seconds" % (self.timeout,)))
+        else:
+            try:
+                result = pickle.loads(response['result'])
+            except:
+                result = Failure()
+            else:
+                if not response['success'] and not isinstance(
+                        result, Failure):
+                    result = Failure(RuntimeError(repr(result)))
+        if not task.deferred.called:
+            if isinstance(result, Failure):
+                task.deferred.errback(result)
+            else:
+                task.deferred.callback(result)
+
+        if not worker.exited and worker in self._workers:
+            if not self.started or (
+                    self.maxTasksPerWorker is not None and
+                    worker.tasks >= self.maxTasksPerWorker):
+                self._retire(worker)
+            else:
+                self._idle.append(worker)
+        self._dispatch()
+
+
+    def _timedOut(self, task):
+        """
+        Kill the worker running a call which has taken too long.
+        """
+        task.timedOut = True
+        task.worker.kill()
+
+
+    def _cancel(self, task):
+        """
+        Cancel a call: take it out of the queue if it hasn't started, or kill
+        its worker if it has.
+        """
+        if task.worker is None:
+            self._pending.remove(task)
+        else:
+            task.worker.kill()
+
+
+    def _workerEnded(self, worker):
+        """
+        Forget a worker which has exited, and replace it if it is needed.
+        """
+        for workers in (self._workers, self._idle, self._retiring):
+            if worker in workers:
+                workers.remove(worker)
+        if self.started:
+            while len(self._workers) < self.min:
+                self._idle.append(self._spawn())
+            self._dispatch()
+
+
+
+def _cpuCount():
+    """
+    Return the number of CPUs, or 1 if it can't be found out.
+    """
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
+
+_defaultPool = None
+
+def deferToProcessPool(f, *args, **kwargs):
+    """
+    Call a function in a worker process of a L{ProcessPool} shared by the
+    whole program, which the global reactor starts on first use and stops
+    when it shuts down.
+
+    Use L{ProcessPool.callInProcess} to use a pool configured differently.
+
+    @param f: The function to call.  It must be importable by name.
+    @param *args: The positional arguments to pass to C{f}.
+    @param **kwargs: The keyword arguments to pass to C{f}.
+
+    @return: A L{Deferred} which fires with the result of the call; see
+        L{ProcessPool.callInProcess}.
+    """
+    global _defaultPool
+    if _defaultPool is None:
+        from twisted.internet import reactor
+        _defaultPool = ProcessPool(reactor=reactor)
+        reactor.callWhenRunning(_defaultPool.start)
+        reactor.addSystemEventTrigger('during', 'shutdown', _defaultPool.stop)
+    return _defaultPool.callInProcess(f, *args, **kwargs)
+
+
+
+__all__ = ["ProcessPool", "deferToProcessPool"]
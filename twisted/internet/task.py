@@ -10,6 +10,10 @@ from __future__ import division, absolute_import
 
 __metaclass__ = type
 
+import heapq
+import itertools
+import math
+import random
 import sys
 import time
 
@@ -20,8 +24,10 @@ from twisted.python import reflect
 from twisted.python.failure import Failure
 
 from twisted.internet import base, defer
-from twisted.internet.interfaces import IReactorTime
-from twisted.internet.error import ReactorNotRunning
+from twisted.internet._instrumentation import _now
+from twisted.internet.interfaces import IReactorTime, IDelayedCall
+from twisted.internet.error import (
+    ReactorNotRunning, AlreadyCalled, AlreadyCancelled)
 
 
 class LoopingCall:
@@ -259,6 +265,130 @@ class LoopingCall:
 
 
 
+class _GroupedLoopingCall(LoopingCall):
+    """
+    A L{LoopingCall} made by a L{LoopingCallGroup}, which runs on the group's
+    L{TimingWheel}.
+
+    @ivar group: The L{LoopingCallGroup} which made this call.
+
+    @ivar _offset: The number of seconds to delay the next call by, to
+        spread calls which are started together across their interval.
+    """
+    _offset = 0.0
+
+    def start(self, interval, now=True):
+        """
+        Start running function every interval seconds, at a random point in
+        the interval if the group has jitter.
+
+        @see: L{LoopingCall.start}
+        """
+        self._offset = self.group._jitterFor(interval)
+        return LoopingCall.start(self, interval, now)
+
+
+    def _reschedule(self):
+        """
+        Schedule the next iteration of this looping call, taking the jitter
+        offset into account the first time.
+        """
+        if self._offset:
+            self._expectNextCallAt += self._offset
+            self._offset = 0.0
+        LoopingCall._reschedule(self)
+
+
+
+class LoopingCallGroup(object):
+    """
+    A group of L{LoopingCall}s, such as per-connection heartbeats, which are
+    all driven by one reactor timer.
+
+    The calls are scheduled on a L{TimingWheel}, so each of them may run up
+    to C{resolution} seconds late, but since each call is scheduled relative
+    to when it was started rather than to when it last ran, the lateness
+    does not accumulate.  Calls which are started at the same time, for
+    example when many clients reconnect at once, can be spread across their
+    interval with C{jitter} rather than all coming due together.
+
+    @ivar wheel: The L{TimingWheel} the calls are scheduled on.
+
+    @ivar jitter: The fraction of its interval by which each call is delayed
+        at random when it is started, between C{0} and C{1}.
+    @type jitter: C{float}
+
+    @ivar _random: A no-argument callable returning a random C{float} from
+        C{0} up to C{1}.
+
+    @since: 15.2
+    """
+
+    def __init__(self, resolution=0.1, jitter=0.0, clock=None):
+        """
+        @param resolution: The number of seconds covered by one tick of the
+            wheel, and so the most any call may be late by.
+        @type resolution: C{float}
+
+        @param jitter: See C{jitter}.
+
+        @param clock: The L{IReactorTime} provider which drives the wheel.
+            The default is L{twisted.internet.reactor}.
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+        self.wheel = TimingWheel(resolution, clock=clock)
+        self.jitter = jitter
+        self._random = random.random
+
+
+    def loopingCall(self, f, *a, **kw):
+        """
+        Make a L{LoopingCall} in this group.
+
+        @param f: The function to call.
+
+        @param a: Positional arguments to pass to C{f}.
+
+        @param kw: Keyword arguments to pass to C{f}.
+
+        @return: A L{LoopingCall}, which is used like any other.
+        """
+        return self._adopt(_GroupedLoopingCall(f, *a, **kw))
+
+
+    def withCount(self, countCallable):
+        """
+        Make a L{LoopingCall} in this group which is passed the number of
+        calls which should have occurred since it was last invoked.
+
+        @see: L{LoopingCall.withCount}
+
+        @return: A L{LoopingCall}, which is used like any other.
+        """
+        return self._adopt(_GroupedLoopingCall.withCount(countCallable))
+
+
+    def _adopt(self, call):
+        """
+        Make a L{_GroupedLoopingCall} use this group.
+        """
+        call.group = self
+        call.clock = self.wheel
+        return call
+
+
+    def _jitterFor(self, interval):
+        """
+        Return how long to delay a call with C{interval} by when it is
+        started.
+        """
+        if not self.jitter:
+            return 0.0
+        return self._random() * self.jitter * interval
+
+
+
 class SchedulerError(Exception):
     """
     The operation could not be completed because the scheduler or one of its
@@ -317,8 +447,10 @@ class NotPaused(SchedulerError):
 
 class _Timer(object):
     MAX_SLICE = 0.01
-    def __init__(self):
-        self.end = time.time() + self.MAX_SLICE
+    def __init__(self, maxSlice=None):
+        if maxSlice is None:
+            maxSlice = self.MAX_SLICE
+        self.end = time.time() + maxSlice
 
 
     def __call__(self):
@@ -366,19 +498,52 @@ class CooperativeTask(object):
         C{StopIteration}.
 
     @type _completionState: L{TaskFinished}
+
+    @ivar priority: The priority this task was created with.  While it has
+        work to do, tasks with a lower priority get none.
+    @type priority: C{int}
+
+    @ivar weight: The weight this task was created with.  Tasks with the same
+        priority are given work units in proportion to their weights.
+    @type weight: C{int} or C{float}
+
+    @ivar iterations: The number of units of work this task has done.
+    @type iterations: C{int}
+
+    @ivar cpuTime: The number of seconds this task has spent doing units of
+        work, in which time the reactor could do nothing else.
+    @type cpuTime: C{float}
+
+    @ivar _virtualTime: The number of units of work this task has been given,
+        divided by its weight, plus any time it missed out on while it was
+        paused or waiting for a L{defer.Deferred}.  Of the tasks with the
+        same priority, the one with the smallest C{_virtualTime} is given the
+        next unit of work.
+    @type _virtualTime: C{float}
+
+    @ivar _entry: This task's entry in its L{Cooperator}'s queue, or C{None}
+        if it has none.
     """
 
-    def __init__(self, iterator, cooperator):
+    def __init__(self, iterator, cooperator, priority=0, weight=1):
         """
         A private constructor: to create a new L{CooperativeTask}, see
         L{Cooperator.cooperate}.
         """
+        if weight <= 0:
+            raise ValueError("weight must be positive, not %r" % (weight,))
         self._iterator = iterator
         self._cooperator = cooperator
         self._deferreds = []
         self._pauseCount = 0
         self._completionState = None
         self._completionResult = None
+        self.priority = priority
+        self.weight = weight
+        self.iterations = 0
+        self.cpuTime = 0.0
+        self._virtualTime = 0.0
+        self._entry = None
         cooperator._addTask(self)
 
 
@@ -527,12 +692,47 @@ class Cooperator(object):
 
     Multiple L{Cooperator}s do not cooperate with each other, so for most
     cases you should use the L{global cooperator<task.cooperate>}.
+
+    Each task has a priority and a weight.  A task is only given work while
+    no task with a higher priority has work to do, so background work can be
+    given a lower priority than work which must be done promptly.  Tasks with
+    the same priority take turns, a task with twice the weight of another
+    being given twice as many units of work.  A task which has been paused,
+    or was waiting for a L{Deferred<defer.Deferred>}, takes its turn with the
+    others again rather than being given the work it missed.
+
+    @ivar budget: The number of seconds each step may take, if it is ended by
+        the default termination predicate, or C{None} for
+        L{_Timer.MAX_SLICE}.  It can be changed while the L{Cooperator} is
+        running.
+    @type budget: C{float} or C{None}
+
+    @ivar _tasks: The L{CooperativeTask}s which have work to do.
+
+    @ivar _queue: A heap of C{[-priority, virtualTime, sequence, task]}
+        entries, one for each of C{_tasks}, ordered by which should be given
+        the next unit of work.  The entry of a task which has stopped having
+        work to do is left in the heap with C{None} for the task.
+
+    @ivar _virtualTimes: A C{dict} mapping each priority to the
+        C{_virtualTime} of the task of that priority most recently given a
+        unit of work.  Tasks which are added or resumed are given at least
+        this virtual time.
+
+    @ivar _sequence: An iterator of the numbers which order queue entries
+        with the same priority and virtual time by when they were made.
+
+    @ivar _now: A no-argument callable returning the current time in
+        seconds, used to measure L{CooperativeTask.cpuTime}.
     """
 
+    _now = staticmethod(_now)
+
     def __init__(self,
                  terminationPredicateFactory=_Timer,
                  scheduler=_defaultScheduler,
-                 started=True):
+                 started=True,
+                 budget=None):
         """
         Create a scheduler-like object to which iterators may be added.
 
@@ -549,9 +749,21 @@ class Cooperator(object):
         @param started: A boolean which indicates whether iterators should be
         stepped as soon as they are added, or if they will be queued up until
         L{Cooperator.start} is called.
+
+        @param budget: See C{budget}.  It can only be given with the default
+        C{terminationPredicateFactory}.
+
+        @raise ValueError: If both C{budget} and
+        C{terminationPredicateFactory} are given.
         """
+        if budget is not None and terminationPredicateFactory is not _Timer:
+            raise ValueError(
+                "budget cannot be used with a terminationPredicateFactory")
+        self.budget = budget
         self._tasks = []
-        self._metarator = iter(())
+        self._queue = []
+        self._virtualTimes = {}
+        self._sequence = itertools.count()
         self._terminationPredicateFactory = terminationPredicateFactory
         self._scheduler = scheduler
         self._delayedCall = None
@@ -559,7 +771,7 @@ class Cooperator(object):
         self._started = started
 
 
-    def coiterate(self, iterator, doneDeferred=None):
+    def coiterate(self, iterator, doneDeferred=None, priority=0, weight=1):
         """
         Add an iterator to the list of iterators this L{Cooperator} is
         currently running.
@@ -571,24 +783,35 @@ class Cooperator(object):
             the completion deferred.  It is suggested that you use the default,
             which creates a new Deferred for you.
 
+        @param priority: See L{CooperativeTask.priority}.
+
+        @param weight: See L{CooperativeTask.weight}.
+
         @return: a Deferred that will fire when the iterator finishes.
         """
         if doneDeferred is None:
             doneDeferred = defer.Deferred()
-        CooperativeTask(iterator, self).whenDone().chainDeferred(doneDeferred)
+        CooperativeTask(iterator, self, priority, weight
+                        ).whenDone().chainDeferred(doneDeferred)
         return doneDeferred
 
 
-    def cooperate(self, iterator):
+    def cooperate(self, iterator, priority=0, weight=1):
         """
         Start running the given iterator as a long-running cooperative task, by
         calling next() on it as a periodic timed event.
 
         @param iterator: the iterator to invoke.
 
+        @param priority: See L{CooperativeTask.priority}.
+
+        @param weight: See L{CooperativeTask.weight}.
+
         @return: a L{CooperativeTask} object representing this task.
+
+        @raise ValueError: If C{weight} is not positive.
         """
-        return CooperativeTask(iterator, self)
+        return CooperativeTask(iterator, self, priority, weight)
 
 
     def _addTask(self, task):
@@ -601,41 +824,86 @@ class Cooperator(object):
             task._completeWith(SchedulerStopped(), Failure(SchedulerStopped()))
         else:
             self._tasks.append(task)
+            task._virtualTime = max(
+                task._virtualTime, self._virtualTimes.get(task.priority, 0.0))
+            self._enqueue(task)
             self._reschedule()
 
 
+    def _enqueue(self, task):
+        """
+        Add an entry for a L{CooperativeTask} to C{_queue}.
+        """
+        task._entry = [-task.priority, task._virtualTime,
+                       next(self._sequence), task]
+        heapq.heappush(self._queue, task._entry)
+
+
     def _removeTask(self, task):
         """
         Remove a L{CooperativeTask} from this L{Cooperator}.
         """
         self._tasks.remove(task)
+        if task._entry is not None:
+            task._entry[3] = None
+            task._entry = None
         # If no work left to do, cancel the delayed call:
         if not self._tasks and self._delayedCall:
             self._delayedCall.cancel()
             self._delayedCall = None
 
 
-    def _tasksWhileNotStopped(self):
-        """
-        Yield all L{CooperativeTask} objects in a loop as long as this
-        L{Cooperator}'s termination condition has not been met.
-        """
-        terminator = self._terminationPredicateFactory()
-        while self._tasks:
-            for t in self._metarator:
-                yield t
-                if terminator():
-                    return
-            self._metarator = iter(self._tasks)
-
-
     def _tick(self):
         """
         Run one scheduler tick.
+
+        Each unit of work is timed from the end of the one before, so that
+        only one measurement is taken per unit.
         """
         self._delayedCall = None
-        for taskObj in self._tasksWhileNotStopped():
+        if self._terminationPredicateFactory is _Timer:
+            terminator = _Timer(self.budget)
+        else:
+            terminator = self._terminationPredicateFactory()
+        heappop = heapq.heappop
+        heappushpop = heapq.heappushpop
+        virtualTimes = self._virtualTimes
+        sequence = self._sequence
+        now = self._now
+        entry = None
+        started = now()
+        while True:
+            # Put back the entry for the task which did the last unit of work,
+            # if it has more to do, and take the entry for the next one.
+            queue = self._queue
+            if entry is not None:
+                entry = heappushpop(queue, entry)
+            elif queue:
+                entry = heappop(queue)
+            else:
+                break
+            taskObj = entry[3]
+            if taskObj is None:
+                entry = None
+                continue
+            virtualTimes[taskObj.priority] = entry[1]
+            taskObj._virtualTime = entry[1] + 1.0 / taskObj.weight
             taskObj._oneWorkUnit()
+            finished = now()
+            taskObj.iterations += 1
+            taskObj.cpuTime += finished - started
+            started = finished
+            if entry[3] is taskObj and not self._stopped:
+                # The task still has work to do, and wasn't removed and added
+                # again while doing that unit.
+                entry[1] = taskObj._virtualTime
+                entry[2] = next(sequence)
+            else:
+                entry = None
+            if terminator():
+                if entry is not None:
+                    heapq.heappush(self._queue, entry)
+                break
         self._reschedule()
 
 
@@ -669,6 +937,7 @@ class Cooperator(object):
             taskObj._completeWith(SchedulerStopped(),
                                   Failure(SchedulerStopped()))
         self._tasks = []
+        self._queue = []
         if self._delayedCall is not None:
             self._delayedCall.cancel()
             self._delayedCall = None
@@ -688,7 +957,7 @@ class Cooperator(object):
 
 _theCooperator = Cooperator()
 
-def coiterate(iterator):
+def coiterate(iterator, priority=0, weight=1):
     """
     Cooperatively iterate over the given iterator, dividing runtime between it
     and all other iterators which have been passed to this function and not yet
@@ -696,13 +965,17 @@ def coiterate(iterator):
 
     @param iterator: the iterator to invoke.
 
+    @param priority: See L{CooperativeTask.priority}.
+
+    @param weight: See L{CooperativeTask.weight}.
+
     @return: a Deferred that will fire when the iterator finishes.
     """
-    return _theCooperator.coiterate(iterator)
+    return _theCooperator.coiterate(iterator, priority=priority, weight=weight)
 
 
 
-def cooperate(iterator):
+def cooperate(iterator, priority=0, weight=1):
     """
     Start running the given iterator as a long-running cooperative task, by
     calling next() on it as a periodic timed event.
@@ -715,9 +988,13 @@ def cooperate(iterator):
 
     @param iterator: the iterator to invoke.
 
+    @param priority: See L{CooperativeTask.priority}.
+
+    @param weight: See L{CooperativeTask.weight}.
+
     @return: a L{CooperativeTask} object representing this task.
     """
-    return _theCooperator.cooperate(iterator)
+    return _theCooperator.cooperate(iterator, priority, weight)
 
 
 
@@ -804,6 +1081,327 @@ class Clock:
 
 
 
+@implementer(IDelayedCall)
+class _WheelCall(object):
+    """
+    A call scheduled with L{TimingWheel.callLater}.
+
+    @ivar time: The time at which the call was requested to run.
+    @ivar tick: The tick of the owning wheel at which the call is due.  When
+        the call is moved later this is updated without moving the call
+        within the wheel; it is re-filed when the slot it is in comes due.
+    @ivar _slot: The C{set} the call is currently filed in, or C{None}.
+    """
+    cancelled = called = False
+    _slot = None
+
+    def __init__(self, wheel, time, tick, func, args, kw):
+        self._wheel = wheel
+        self.time = time
+        self.tick = tick
+        self.func = func
+        self.args = args
+        self.kw = kw
+
+
+    def getTime(self):
+        """
+        See L{IDelayedCall.getTime}.
+        """
+        return self.time
+
+
+    def _checkActive(self):
+        if self.cancelled:
+            raise AlreadyCancelled()
+        elif self.called:
+            raise AlreadyCalled()
+
+
+    def cancel(self):
+        """
+        See L{IDelayedCall.cancel}.
+        """
+        self._checkActive()
+        self.cancelled = True
+        self._wheel._cancel(self)
+        del self.func, self.args, self.kw
+
+
+    def reset(self, secondsFromNow):
+        """
+        See L{IDelayedCall.reset}.
+        """
+        self._checkActive()
+        self._wheel._reschedule(self, self._wheel.seconds() + secondsFromNow)
+
+
+    def delay(self, secondsLater):
+        """
+        See L{IDelayedCall.delay}.
+        """
+        self._checkActive()
+        self._wheel._reschedule(self, self.time + secondsLater)
+
+
+    def active(self):
+        """
+        See L{IDelayedCall.active}.
+        """
+        return not (self.cancelled or self.called)
+
+
+    def __repr__(self):
+        return "<_WheelCall 0x%x [%ss] called=%s cancelled=%s>" % (
+            id(self), self.time - self._wheel.seconds(), self.called,
+            self.cancelled)
+
+
+
+@implementer(IReactorTime)
+class TimingWheel(object):
+    """
+    A hierarchical timing wheel which schedules many coarse-grained calls,
+    such as connection timeouts, using a single underlying timer.
+
+    Scheduling and cancelling a call and moving it to a later time only
+    update a few fields, no matter how many calls are pending.  In exchange,
+    calls run up to C{resolution} seconds after the time they were scheduled
+    for.
+
+    The wheel provides L{IReactorTime}, so it can be used in place of the
+    reactor by anything which accepts a clock, for example
+    L{twisted.protocols.policies.TimeoutMixin.timeoutClock},
+    L{twisted.protocols.policies.TimeoutFactory}, L{deferLater} or
+    L{twisted.internet.defer.DeferredFilesystemLock}.
+
+    The first level of the wheel has C{slots} slots each covering
+    C{resolution} seconds; each further level has C{slots} slots each
+    covering a whole revolution of the level below.  Levels are added as
+    calls further in the future are scheduled.
+
+    @ivar resolution: The number of seconds covered by one tick of the wheel.
+    @ivar clock: The L{IReactorTime} provider which drives the wheel.
+
+    @ivar _slots: The number of slots in each level of the wheel.
+    @ivar _levels: A C{list} of levels, each a C{list} of C{_slots} C{set}s of
+        L{_WheelCall}s.
+    @ivar _tick: The number of the last tick which has been processed.
+    @ivar _count: The number of calls which are pending.
+    @ivar _timer: The L{IDelayedCall} for the next tick, or C{None} if no
+        calls are pending.
+
+    @since: 15.2
+    """
+    _timer = None
+
+    def __init__(self, resolution=1.0, slots=256, clock=None):
+        """
+        @param resolution: The number of seconds covered by one tick of the
+            wheel.
+        @type resolution: C{float}
+
+        @param slots: The number of slots in each level of the wheel.
+        @type slots: C{int}
+
+        @param clock: The L{IReactorTime} provider used to drive the wheel.
+            The default is L{twisted.internet.reactor}.
+        """
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        if slots < 2:
+            raise ValueError("slots must be at least 2")
+        if clock is None:
+            from twisted.internet import reactor as clock
+        self.resolution = resolution
+        self.clock = clock
+        self._slots = slots
+        self._levels = []
+        self._tick = self._currentTick()
+        self._count = 0
+
+
+    def _currentTick(self):
+        """
+        Return the number of the last tick which has started.
+        """
+        return int(math.floor(self.clock.seconds() / self.resolution))
+
+
+    def _tickFor(self, when):
+        """
+        Return the number of the first tick which may process a call scheduled
+        to run at C{when}.
+        """
+        return max(int(math.ceil(when / self.resolution)), self._tick + 1)
+
+
+    def seconds(self):
+        """
+        See L{IReactorTime.seconds}.
+        """
+        return self.clock.seconds()
+
+
+    def callLater(self, delay, callable, *args, **kw):
+        """
+        See L{IReactorTime.callLater}.
+
+        The call runs during the first tick of the wheel which starts at or
+        after C{delay} seconds from now.
+        """
+        if not self._count:
+            # Nothing is pending, so it is safe to skip the idle ticks.
+            self._tick = max(self._tick, self._currentTick())
+        when = self.seconds() + delay
+        call = _WheelCall(self, when, self._tickFor(when), callable, args, kw)
+        self._file(call)
+        self._count += 1
+        self._schedule()
+        return call
+
+
+    def getDelayedCalls(self):
+        """
+        See L{IReactorTime.getDelayedCalls}.
+
+        This visits every slot of the wheel, so it is only meant for tests.
+        """
+        return [call
+                for level in self._levels
+                for slot in level
+                for call in slot]
+
+
+    def _file(self, call):
+        """
+        Put C{call} into the slot of the lowest level of the wheel which will
+        come due no later than the call.
+        """
+        slots = self._slots
+        delta = call.tick - self._tick
+        level = 0
+        span = 1
+        while delta >= span * slots:
+            level += 1
+            span *= slots
+        while len(self._levels) <= level:
+            self._levels.append([set() for i in range(slots)])
+        slot = self._levels[level][(call.tick // span) % slots]
+        slot.add(call)
+        call._slot = slot
+
+
+    def _cancel(self, call):
+        """
+        Forget about a cancelled call.
+        """
+        call._slot.discard(call)
+        call._slot = None
+        self._count -= 1
+        if not self._count and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+    def _reschedule(self, call, when):
+        """
+        Move C{call} so that it runs at C{when}.
+
+        Moving a call later only records its new tick; it will be re-filed
+        when the slot it is in comes due.  Moving a call sooner re-files it
+        immediately.
+        """
+        call.time = when
+        tick = self._tickFor(when)
+        if tick < call.tick:
+            call._slot.discard(call)
+            call.tick = tick
+            self._file(call)
+        else:
+            call.tick = tick
+
+
+    def _schedule(self):
+        """
+        Make sure the underlying timer is set for the next tick if there are
+        any pending calls.
+        """
+        if self._count and self._timer is None:
+            nextTick = self._tick + 1
+            delay = nextTick * self.resolution - self.clock.seconds()
+            self._timer = self.clock.callLater(
+                max(0, delay), self._timerFired, nextTick)
+
+
+    def _timerFired(self, tick):
+        """
+        Process every tick up to the current one, then wait for the next.
+
+        @param tick: The tick the timer was set for.  The clock may report a
+            time very slightly before the start of this tick due to floating
+            point rounding; it is processed regardless.
+        """
+        self._timer = None
+        self._advance(max(tick, self._currentTick()))
+        self._schedule()
+
+
+    def _advance(self, target):
+        """
+        Process ticks up to and including C{target}, running the calls which
+        come due.
+        """
+        slots = self._slots
+        levels = self._levels
+        while self._tick < target and self._count:
+            self._tick = current = self._tick + 1
+
+            # Cascade calls from higher levels whose slot has come round into
+            # lower levels, starting at the top.
+            for level in range(len(levels) - 1, 0, -1):
+                span = slots ** level
+                if not current % span:
+                    index = (current // span) % slots
+                    slot = levels[level][index]
+                    if slot:
+                        levels[level][index] = set()
+                        for call in slot:
+                            self._file(call)
+
+            index = current % slots
+            slot = levels[0][index]
+            if not slot:
+                continue
+            levels[0][index] = set()
+            due = []
+            for call in slot:
+                if call.tick > current:
+                    self._file(call)
+                else:
+                    due.append(call)
+            due.sort(key=lambda call: call.time)
+            for call in due:
+                # An earlier call in this tick may have cancelled or moved
+                # this one.
+                if call.cancelled:
+                    continue
+                if call.tick > current:
+                    self._file(call)
+                    continue
+                call.called = True
+                call._slot = None
+                self._count -= 1
+                try:
+                    call.func(*call.args, **call.kw)
+                except:
+                    log.err(None, "Unhandled error in %r" % (call,))
+
+        if not self._count:
+            self._tick = max(self._tick, target)
+
+
+
 def deferLater(clock, delay, callable, *args, **kw):
     """
     Call the given function after a certain period of time has passed.
@@ -905,9 +1503,9 @@ def react(main, argv=(), _reactor=None):
 
 
 __all__ = [
-    'LoopingCall',
+    'LoopingCall', 'LoopingCallGroup',
 
-    'Clock',
+    'Clock', 'TimingWheel',
 
     'SchedulerStopped', 'Cooperator', 'coiterate',
 
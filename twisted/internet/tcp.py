@@ -17,7 +17,7 @@ import sys
 import operator
 import struct
 
-from zope.interface import implementer
+from zope.interface import implementer, alsoProvides
 
 from twisted.python.compat import _PY3, lazyByteSlice
 from twisted.python.runtime import platformType
@@ -90,6 +90,18 @@ from twisted.internet.error import CannotListenError
 from twisted.internet import abstract, main, interfaces, error
 from twisted.internet.protocol import Protocol
 
+try:
+    from os import sendfile as _sendfile
+except ImportError:
+    # Python 2 and some platforms don't have it.
+    _sendfile = None
+
+# Views of the buffers which L{Connection._doReadInto} is not currently using,
+# to be reused by the next read.  Each is taken off the list while it is in
+# use, so re-entrant reads and connections in other threads never share a
+# buffer.
+_readBuffers = []
+
 # Not all platforms have, or support, this flag.
 _AI_NUMERICSERV = getattr(socket, "AI_NUMERICSERV", 0)
 
@@ -174,7 +186,18 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
 
     @ivar logstr: prefix used when logging events related to this connection.
     @type logstr: C{str}
+
+    @ivar _readProtocol: The protocol which C{_readInto} was last worked out
+        for.
+
+    @ivar _readInto: Whether C{_readProtocol} provides
+        L{interfaces.IBufferReceiver}, and so whether L{doRead} should use
+        L{_doReadInto}.
+    @type _readInto: C{bool}
     """
+    _readProtocol = None
+    _readInto = False
+    _reportsWouldBlock = True
 
 
     def __init__(self, skt, protocol, reactor=None):
@@ -183,6 +206,14 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         self.socket.setblocking(0)
         self.fileno = skt.fileno
         self.protocol = protocol
+        # Buffered writes can be sent with one sendmsg call, without joining
+        # them first, if the socket supports it.
+        self._vectorWrites = getattr(skt, "sendmsg", None) is not None
+        if _sendfile is not None:
+            # This is provided by the instance rather than the class so that
+            # startTLS, which replaces the interfaces the instance provides
+            # with ISSLTransport, takes it away again.
+            alsoProvides(self, interfaces.ISendfileTransport)
 
 
     def getHandle(self):
@@ -197,18 +228,67 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         calls self.dataReceived(data) to process it.  If the connection is not
         lost through an error in the physical recv(), this function will return
         the result of the dataReceived call.
+
+        If the protocol provides L{interfaces.IBufferReceiver}, the data is
+        read with L{_doReadInto} instead.
         """
+        if self.protocol is not self._readProtocol:
+            # Checking the protocol on every read would cost more than it
+            # saves, so only do it when the protocol changes.
+            self._readProtocol = self.protocol
+            self._readInto = interfaces.IBufferReceiver.providedBy(
+                self.protocol)
+        if self._readInto:
+            return self._doReadInto()
         try:
             data = self.socket.recv(self.bufferSize)
         except socket.error as se:
             if se.args[0] == EWOULDBLOCK:
+                self._readBlocked = True
                 return
             else:
                 return main.CONNECTION_LOST
+        if len(data) < self.bufferSize:
+            # The receive buffer has been emptied.
+            self._readBlocked = True
 
         return self._dataReceived(data)
 
 
+    def _doReadInto(self):
+        """
+        Read up to C{self.bufferSize} bytes of data from the socket into a
+        reusable buffer, then call C{self.protocol.bufferReceived} with a
+        L{memoryview} of the bytes read.
+
+        This avoids allocating a new C{bytes} object for every read.
+        """
+        try:
+            view = _readBuffers.pop()
+        except IndexError:
+            view = memoryview(bytearray(self.bufferSize))
+        else:
+            if len(view) < self.bufferSize:
+                view = memoryview(bytearray(self.bufferSize))
+        try:
+            try:
+                size = self.socket.recv_into(view, self.bufferSize)
+            except socket.error as se:
+                if se.args[0] == EWOULDBLOCK:
+                    self._readBlocked = True
+                    return
+                else:
+                    return main.CONNECTION_LOST
+            if not size:
+                return main.CONNECTION_DONE
+            if size < self.bufferSize:
+                # See doRead.
+                self._readBlocked = True
+            self.protocol.bufferReceived(view[:size])
+        finally:
+            _readBuffers.append(view)
+
+
     def _dataReceived(self, data):
         if not data:
             return main.CONNECTION_DONE
@@ -238,12 +318,73 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         limitedData = lazyByteSlice(data, 0, self.SEND_LIMIT)
 
         try:
-            return untilConcludes(self.socket.send, limitedData)
+            sent = untilConcludes(self.socket.send, limitedData)
         except socket.error as se:
             if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                self._writeBlocked = True
                 return 0
             else:
                 return main.CONNECTION_LOST
+        if sent < len(limitedData):
+            # The send buffer has been filled.
+            self._writeBlocked = True
+        return sent
+
+
+    def _writeSomeDataVector(self, vector):
+        """
+        Write as much as possible of the given buffers to this TCP connection
+        with a single C{sendmsg} call.
+
+        @see: L{abstract.FileDescriptor._writeSomeDataVector}
+        """
+        try:
+            return untilConcludes(self.socket.sendmsg, vector)
+        except socket.error as se:
+            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                self._writeBlocked = True
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
+    def sendFile(self, fileObj, offset, count):
+        """
+        Send part of a file with C{sendfile(2)}.
+
+        This is only available on platforms which have L{os.sendfile}, and
+        only until TLS is started on the connection.
+
+        @see: L{interfaces.ISendfileTransport.sendFile}
+        """
+        if _sendfile is None or self.TLS:
+            raise RuntimeError("Cannot use sendFile on this connection")
+        return self._writeFile(fileObj, offset, count)
+
+
+    def _writeSomeFile(self, segment):
+        """
+        Write as much as possible of the given part of a file to this TCP
+        connection with a single C{sendfile} call.
+
+        @see: L{abstract.FileDescriptor._writeSomeFile}
+        """
+        try:
+            sent = untilConcludes(
+                _sendfile, self.socket.fileno(), segment.fileObj.fileno(),
+                segment.offset, segment.count)
+        except (OSError, IOError) as e:
+            if e.args[0] in (EAGAIN, EWOULDBLOCK, ENOBUFS):
+                self._writeBlocked = True
+                return 0
+            else:
+                return main.CONNECTION_LOST
+        if not sent:
+            # The file is shorter than promised; the bytes it was meant to
+            # provide can't be made up.
+            return error.ConnectionLost(
+                "%r ended %d bytes early" % (segment.fileObj, segment.count))
+        return sent
 
 
     def _closeWriteConnection(self):
@@ -570,6 +711,8 @@ class BaseClient(_BaseBaseClient, _TLSClientMixin, Connection):
             # http://msdn.microsoft.com/library/default.asp?url=/library/en-us/winsock/winsock/connect_2.asp
             elif ((connectResult in (EWOULDBLOCK, EINPROGRESS, EALREADY)) or
                   (connectResult == EINVAL and platformType == "win32")):
+                # Still connecting; wait to be told again.
+                self._readBlocked = self._writeBlocked = True
                 self.startReading()
                 self.startWriting()
                 return
@@ -914,13 +1057,19 @@ class Port(base.BasePort, _SocketCloser):
     addressFamily = socket.AF_INET
     _addressType = address.IPv4Address
 
-    def __init__(self, port, factory, backlog=50, interface='', reactor=None):
+    def __init__(self, port, factory, backlog=50, interface='', reactor=None,
+                 reusePort=False):
         """Initialize with a numeric port to listen on.
+
+        @param reusePort: If C{True}, set C{SO_REUSEPORT} on the socket, so
+            that other sockets can listen on the same port.
+        @type reusePort: C{bool}
         """
         base.BasePort.__init__(self, reactor=reactor)
         self.port = port
         self.factory = factory
         self.backlog = backlog
+        self.reusePort = reusePort
         if abstract.isIPv6Address(interface):
             self.addressFamily = socket.AF_INET6
             self._addressType = address.IPv6Address
@@ -14,9 +14,12 @@ except ImportError:
 from zope.interface import implementer
 
 from twisted.python.threadpool import ThreadPool
+from twisted.python import log
 from twisted.internet.interfaces import IReactorTime, IReactorThreads
 from twisted.internet.error import DNSLookupError
-from twisted.internet.base import ThreadedResolver, DelayedCall
+from twisted.internet.base import ThreadedResolver, DelayedCall, ReactorBase
+from twisted.internet._instrumentation import (
+    LatencyHistogram, ReactorInstrumentation)
 from twisted.internet.task import Clock
 from twisted.trial.unittest import TestCase
 
@@ -270,3 +273,562 @@ class DelayedCallTests(TestCase):
         self.assertTrue(self.zero != self.one)
         self.assertFalse(self.zero != self.zero)
         self.assertFalse(self.one != self.one)
+
+
+
+class TimedCallReactor(ReactorBase):
+    """
+    A L{ReactorBase} subclass which uses a L{Clock} for its notion of time and
+    needs no waker, so that its timed call queue can be driven directly.
+    """
+
+    def __init__(self):
+        self._clock = Clock()
+        self.seconds = self._clock.seconds
+        ReactorBase.__init__(self)
+
+
+    def installWaker(self):
+        """
+        Do nothing; no waker is needed since the reactor is never run.
+        """
+
+
+    def advance(self, amount):
+        """
+        Move time forward by C{amount} seconds and run the timed calls which
+        are now due.
+        """
+        self._clock.advance(amount)
+        self.runUntilCurrent()
+
+
+
+class TimedCallQueueTests(TestCase):
+    """
+    Tests for the indexed heap L{ReactorBase} keeps its L{DelayedCall}s in.
+    """
+
+    def setUp(self):
+        self.reactor = TimedCallReactor()
+        self.calls = []
+
+
+    def _schedule(self, delay, name):
+        """
+        Schedule a call which records C{name} in C{self.calls} after C{delay}
+        seconds and make sure it has been moved into the pending heap.
+        """
+        call = self.reactor.callLater(delay, self.calls.append, name)
+        self.reactor.runUntilCurrent()
+        return call
+
+
+    def assertHeapConsistent(self):
+        """
+        Assert that each pending call knows its own position in the heap and
+        that the heap invariant holds.
+        """
+        heap = self.reactor._pendingTimedCalls
+        for pos, call in enumerate(heap):
+            self.assertEqual(call._heapIndex, pos)
+            if pos:
+                self.assertTrue(heap[(pos - 1) // 2].time <= call.time)
+
+
+    def test_cancelRemovesImmediately(self):
+        """
+        Cancelling a pending L{DelayedCall} removes it from the heap right
+        away instead of leaving it for a later compaction pass.
+        """
+        calls = [self._schedule(i, i) for i in range(1, 20)]
+        calls[5].cancel()
+        calls[0].cancel()
+        calls[-1].cancel()
+        heap = self.reactor._pendingTimedCalls
+        self.assertEqual(len(heap), 16)
+        for call in (calls[5], calls[0], calls[-1]):
+            self.assertNotIn(call, heap)
+            self.assertIdentical(call._heapIndex, None)
+        self.assertHeapConsistent()
+        self.reactor.advance(20)
+        self.assertEqual(
+            self.calls, [i for i in range(2, 19) if i != 6])
+
+
+    def test_cancelNewCall(self):
+        """
+        A L{DelayedCall} cancelled before it has been moved into the heap is
+        never inserted into it.
+        """
+        call = self.reactor.callLater(1, self.calls.append, "x")
+        call.cancel()
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.reactor._pendingTimedCalls, [])
+        self.reactor.advance(2)
+        self.assertEqual(self.calls, [])
+
+
+    def test_resetSooner(self):
+        """
+        Resetting a pending L{DelayedCall} to an earlier time moves it to the
+        right place in the heap.
+        """
+        calls = [self._schedule(i, i) for i in range(1, 20)]
+        calls[-1].reset(0.5)
+        self.assertIdentical(self.reactor._pendingTimedCalls[0], calls[-1])
+        self.assertHeapConsistent()
+        self.reactor.advance(3)
+        self.assertEqual(self.calls, [19, 1, 2, 3])
+
+
+    def test_resetLater(self):
+        """
+        Resetting a pending L{DelayedCall} to a later time runs it at the new
+        time, after calls it was originally scheduled before.
+        """
+        calls = [self._schedule(i, i) for i in range(1, 5)]
+        calls[0].reset(10)
+        self.reactor.advance(5)
+        self.assertEqual(self.calls, [2, 3, 4])
+        self.assertHeapConsistent()
+        self.reactor.advance(5)
+        self.assertEqual(self.calls, [2, 3, 4, 1])
+
+
+    def test_delayNegative(self):
+        """
+        Delaying a pending L{DelayedCall} by a negative amount moves it to the
+        right place in the heap.
+        """
+        calls = [self._schedule(i, i) for i in range(1, 10)]
+        calls[8].delay(-8.5)
+        self.assertIdentical(self.reactor._pendingTimedCalls[0], calls[8])
+        self.assertHeapConsistent()
+
+
+    def test_cancelFromCall(self):
+        """
+        A L{DelayedCall} which cancels another pending call while it is running
+        prevents that call from running.
+        """
+        later = self._schedule(2, "later")
+        self.reactor.callLater(1, later.cancel)
+        self.reactor.advance(3)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.reactor._pendingTimedCalls, [])
+
+
+    def test_manyOperations(self):
+        """
+        The heap stays consistent through an interleaved series of schedules,
+        resets and cancellations, and calls run in order of their final time.
+        """
+        calls = [self._schedule((i * 7) % 31 + 1, i) for i in range(31)]
+        for i in range(0, 31, 3):
+            calls[i].cancel()
+            self.assertHeapConsistent()
+        for i in range(1, 31, 4):
+            if not i % 3:
+                continue
+            calls[i].reset(0.5 + i / 100.0)
+            self.assertHeapConsistent()
+        expected = sorted(
+            [c for i, c in enumerate(calls) if i % 3],
+            key=lambda c: c.getTime())
+        expected = [c.args[0] for c in expected]
+        self.reactor.advance(40)
+        self.assertEqual(self.calls, expected)
+
+
+
+class CountingWaker(object):
+    """
+    A waker which counts how many times it is woken up.
+    """
+    wakeUps = 0
+
+    def wakeUp(self):
+        self.wakeUps += 1
+
+
+
+class CoalescedWakeUpTests(TestCase):
+    """
+    Tests for the way L{ReactorBase.callFromThread} avoids waking the reactor
+    up more than once per iteration.
+    """
+
+    def setUp(self):
+        self.reactor = TimedCallReactor()
+        self.reactor.waker = CountingWaker()
+        self.calls = []
+
+
+    def test_burst(self):
+        """
+        Any number of calls to L{ReactorBase.callFromThread} before
+        L{ReactorBase.runUntilCurrent} runs wake the reactor up once.
+        """
+        for i in range(10):
+            self.reactor.callFromThread(self.calls.append, i)
+        self.assertEqual(self.reactor.waker.wakeUps, 1)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, list(range(10)))
+
+
+    def test_afterRunUntilCurrent(self):
+        """
+        A call to L{ReactorBase.callFromThread} after
+        L{ReactorBase.runUntilCurrent} has run the queued calls wakes the
+        reactor up again.
+        """
+        self.reactor.callFromThread(self.calls.append, 1)
+        self.reactor.runUntilCurrent()
+        self.reactor.callFromThread(self.calls.append, 2)
+        self.assertEqual(self.reactor.waker.wakeUps, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [1, 2])
+
+
+    def test_duringRunUntilCurrent(self):
+        """
+        A call to L{ReactorBase.callFromThread} made while
+        L{ReactorBase.runUntilCurrent} is running the queued calls wakes the
+        reactor up, so that it is not left in the queue until something else
+        does.
+        """
+        def again():
+            self.reactor.callFromThread(self.calls.append, 2)
+        self.reactor.callFromThread(again)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.reactor.waker.wakeUps, 2)
+        self.reactor.runUntilCurrent()
+        self.assertEqual(self.calls, [2])
+
+
+
+class LatencyHistogramTests(TestCase):
+    """
+    Tests for L{LatencyHistogram}.
+    """
+
+    def test_empty(self):
+        """
+        A L{LatencyHistogram} with nothing recorded summarizes to zeroes.
+        """
+        self.assertEqual(
+            LatencyHistogram().summary(),
+            {"count": 0, "total": 0.0, "mean": 0, "p50": 0.0, "p99": 0.0,
+             "max": 0.0})
+
+
+    def test_record(self):
+        """
+        L{LatencyHistogram.record} counts each duration in the bucket whose
+        bounds it falls between, and keeps the count, total and maximum.
+        """
+        histogram = LatencyHistogram()
+        for duration in (0.000005, 0.000015, 0.000015, 100.0):
+            histogram.record(duration)
+        self.assertEqual(histogram.buckets[:3], [1, 2, 0])
+        self.assertEqual(histogram.buckets[-1], 1)
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.total, 100.000035)
+        self.assertEqual(histogram.maximum, 100.0)
+
+
+    def test_percentile(self):
+        """
+        L{LatencyHistogram.percentile} returns the upper bound of the bucket
+        the percentile falls in, or the maximum if that is smaller.
+        """
+        histogram = LatencyHistogram()
+        for i in range(99):
+            histogram.record(0.000015)
+        histogram.record(0.05)
+        self.assertEqual(histogram.percentile(50), 0.00002)
+        self.assertEqual(histogram.percentile(99), 0.00002)
+        self.assertEqual(histogram.percentile(100), 0.05)
+
+
+
+class FakeSelectable(object):
+    """
+    A selectable whose C{doRead} takes as long as it is told to.
+    """
+
+    def __init__(self, clock, duration):
+        self.clock = clock
+        self.duration = duration
+
+
+    def doRead(self):
+        self.clock.advance(self.duration)
+
+
+
+class InstrumentedReactor(TimedCallReactor):
+    """
+    A L{TimedCallReactor} with a C{doIteration} which waits for events and
+    dispatches them by advancing its clock.
+
+    @ivar events: The selectables C{doIteration} calls C{_doReadOrWrite} for.
+
+    @ivar wait: How long C{doIteration} waits before dispatching events.
+    """
+    wait = 0.0
+
+    def __init__(self):
+        TimedCallReactor.__init__(self)
+        self.events = []
+
+
+    def doIteration(self, delay):
+        self._clock.advance(self.wait)
+        for selectable in self.events:
+            self._doReadOrWrite(selectable, "doRead")
+
+
+    def _doReadOrWrite(self, selectable, method):
+        getattr(selectable, method)()
+
+
+
+class ReactorInstrumentationTests(TestCase):
+    """
+    Tests for L{ReactorBase.startInstrumentation} and
+    L{ReactorInstrumentation}.
+    """
+
+    def setUp(self):
+        self.reactor = InstrumentedReactor()
+        self.instrumentation = ReactorInstrumentation(
+            threshold=1, now=self.reactor.seconds, sampleInterval=0)
+        self.instrumentation.install(self.reactor)
+        self.reactor.instrumentation = self.instrumentation
+        self.messages = []
+        log.addObserver(self.messages.append)
+        self.addCleanup(log.removeObserver, self.messages.append)
+
+
+    def iterate(self):
+        """
+        Run one iteration of the reactor's loop, as measured: wait for and
+        dispatch events, then run timed calls.
+        """
+        self.reactor.doIteration(0)
+        self.reactor.runUntilCurrent()
+
+
+    def sampled(self, sampleInterval):
+        """
+        Replace the instrumentation with one which measures an iteration
+        every C{sampleInterval} seconds.
+        """
+        self.instrumentation.uninstall()
+        self.instrumentation = ReactorInstrumentation(
+            threshold=1, now=self.reactor.seconds,
+            sampleInterval=sampleInterval)
+        self.instrumentation.install(self.reactor)
+        self.reactor.instrumentation = self.instrumentation
+
+
+    def test_notInstrumented(self):
+        """
+        A reactor has no instrumentation unless it is started.
+        """
+        self.assertIs(TimedCallReactor().instrumentation, None)
+
+
+    def test_start(self):
+        """
+        L{ReactorBase.startInstrumentation} sets
+        L{ReactorBase.instrumentation} to a new, installed
+        L{ReactorInstrumentation} with the given threshold, replacing any
+        earlier one.
+        """
+        instrumentation = self.reactor.startInstrumentation(
+            threshold=2, sampleInterval=0)
+        self.assertIsInstance(instrumentation, ReactorInstrumentation)
+        self.assertIsNot(instrumentation, self.instrumentation)
+        self.assertIs(self.reactor.instrumentation, instrumentation)
+        self.assertEqual(instrumentation.threshold, 2)
+        self.assertEqual(instrumentation.sampleInterval, 0)
+        self.iterate()
+        self.assertEqual(instrumentation.iterations, 1)
+        self.assertEqual(self.instrumentation.iterations, 0)
+
+
+    def test_stop(self):
+        """
+        L{ReactorBase.stopInstrumentation} restores the reactor's own
+        methods.
+        """
+        self.reactor.stopInstrumentation()
+        self.assertIs(self.reactor.instrumentation, None)
+        for name in ("runUntilCurrent", "doIteration", "_doReadOrWrite"):
+            self.assertNotIn(name, self.reactor.__dict__)
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 0)
+
+
+    def test_sampled(self):
+        """
+        With a C{sampleInterval}, an iteration every C{sampleInterval}
+        seconds is measured, and the reactor's own methods are used for the
+        others.
+        """
+        self.sampled(2)
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 0)
+        self.assertTrue(self.instrumentation.measuring)
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 1)
+        self.assertFalse(self.instrumentation.measuring)
+        for name in ("runUntilCurrent", "doIteration", "_doReadOrWrite"):
+            self.assertNotIn(name, self.reactor.__dict__)
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 1)
+        self.reactor._clock.advance(2)
+        self.iterate()
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 2)
+
+
+    def test_slowUnmeasured(self):
+        """
+        A callback which takes longer than the threshold in an iteration
+        which isn't measured delays the next measurement, and is recorded as
+        a slow iteration of the reactor.
+        """
+        self.sampled(2)
+        self.iterate()
+        self.iterate()
+        self.reactor.events.append(FakeSelectable(self.reactor._clock, 5))
+        self.iterate()
+        [call] = self.instrumentation.slowCalls
+        self.assertEqual(call.kind, "iteration")
+        self.assertEqual(call.name, __name__ + ".InstrumentedReactor")
+        self.assertEqual(call.duration, 3)
+
+
+    def test_sampleTimeout(self):
+        """
+        Sampling doesn't add a timed call, but L{ReactorBase.timeout} doesn't
+        let the reactor sleep past the next sample.
+        """
+        self.sampled(2)
+        self.iterate()
+        self.iterate()
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+        self.assertEqual(self.reactor.timeout(), 2)
+        self.reactor.callLater(1, lambda: None)
+        self.assertEqual(self.reactor.timeout(), 1)
+        self.reactor._clock.advance(1.5)
+        self.iterate()
+        self.assertEqual(self.reactor.timeout(), 0.5)
+
+
+    def test_stopSampled(self):
+        """
+        L{ReactorBase.stopInstrumentation} stops sampling, so the reactor may
+        sleep for as long as its timed calls allow again.
+        """
+        self.sampled(2)
+        self.reactor.stopInstrumentation()
+        self.assertIs(self.instrumentation.nextSample, None)
+        self.assertIs(self.reactor.timeout(), None)
+
+
+    def test_iteration(self):
+        """
+        Each iteration is timed, split into waiting for events, dispatching
+        them, and running timed calls.
+        """
+        self.reactor.wait = 3
+        self.reactor.events.append(FakeSelectable(self.reactor._clock, 0.5))
+        self.reactor.callLater(0, self.reactor._clock.advance, 0.25)
+        self.iterate()
+        self.assertEqual(self.instrumentation.iterations, 1)
+        self.assertEqual(self.instrumentation.poll.total, 3)
+        self.assertEqual(self.instrumentation.dispatch.total, 0.5)
+        self.assertEqual(self.instrumentation.timedCalls.total, 0.25)
+        self.assertEqual(self.instrumentation.iteration.total, 3.75)
+        self.assertEqual(list(self.instrumentation.slowCalls), [])
+
+
+    def test_slowDelayedCall(self):
+        """
+        A L{DelayedCall} which takes longer than the threshold is logged and
+        recorded with its fully qualified name.
+        """
+        self.reactor.callLater(0, self.reactor._clock.advance, 2)
+        self.iterate()
+        [call] = self.instrumentation.slowCalls
+        self.assertEqual(call.kind, "DelayedCall")
+        self.assertEqual(call.name, "twisted.internet.task.Clock.advance")
+        self.assertEqual(call.duration, 2)
+        self.assertIn(
+            "Slow DelayedCall: twisted.internet.task.Clock.advance took "
+            "2.000 seconds",
+            [log.textFromEventDict(m) for m in self.messages])
+
+
+    def test_slowCallFromThread(self):
+        """
+        A call from a thread which takes longer than the threshold is
+        recorded.
+        """
+        self.reactor.threadCallQueue.append(
+            (self.reactor._clock.advance, (2,), {}))
+        self.iterate()
+        [call] = self.instrumentation.slowCalls
+        self.assertEqual(call.kind, "callFromThread")
+        self.assertEqual(call.name, "twisted.internet.task.Clock.advance")
+
+
+    def test_slowDispatch(self):
+        """
+        A C{doRead} which takes longer than the threshold is recorded.
+        """
+        self.reactor.events.append(FakeSelectable(self.reactor._clock, 2))
+        self.iterate()
+        [call] = self.instrumentation.slowCalls
+        self.assertEqual(call.kind, "doRead")
+        self.assertEqual(call.name, __name__ + ".FakeSelectable.doRead")
+
+
+    def test_failingCall(self):
+        """
+        A timed call which raises an exception is still timed, and the
+        exception is logged as usual.
+        """
+        def fail():
+            self.reactor._clock.advance(2)
+            1 // 0
+        self.reactor.callLater(0, fail)
+        self.iterate()
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+        [call] = self.instrumentation.slowCalls
+        self.assertEqual(call.duration, 2)
+
+
+    def test_report(self):
+        """
+        L{ReactorInstrumentation.summary} and L{ReactorInstrumentation.report}
+        describe the measurements.
+        """
+        self.reactor.events.append(FakeSelectable(self.reactor._clock, 2))
+        self.iterate()
+        summary = self.instrumentation.summary()
+        self.assertEqual(summary["iterations"], 1)
+        self.assertEqual(summary["slowCalls"], 1)
+        self.assertEqual(summary["dispatch"]["max"], 2)
+        report = self.instrumentation.report().splitlines()
+        self.assertEqual(report[0], "1 iterations")
+        self.assertIn("dispatch", report[4])
+        self.assertEqual(
+            report[-1],
+            "slow doRead: %s.FakeSelectable.doRead 2.000000s" % (__name__,))
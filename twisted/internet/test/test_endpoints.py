@@ -1345,6 +1345,47 @@ class TCP4EndpointsTestCase(EndpointTestCaseMixin, unittest.TestCase):
 
 
 
+class TCPServerEndpointReusePortTests(unittest.TestCase):
+    """
+    Tests for the C{reusePort} argument to L{endpoints.TCP4ServerEndpoint} and
+    L{endpoints.TCP6ServerEndpoint}.
+    """
+    def listenWith(self, endpointClass, **kwargs):
+        """
+        Listen with an instance of C{endpointClass} created with C{kwargs}.
+
+        @return: The keyword arguments passed to C{listenTCP}.
+        """
+        calls = []
+        class Reactor(object):
+            def listenTCP(self, port, factory, **kwargs):
+                calls.append(kwargs)
+        endpoint = endpointClass(Reactor(), 1234, **kwargs)
+        endpoint.listen(object())
+        return calls[0]
+
+
+    def test_reusePort(self):
+        """
+        If C{reusePort} is C{True}, the endpoints pass it on to C{listenTCP}.
+        """
+        for endpointClass in (endpoints.TCP4ServerEndpoint,
+                              endpoints.TCP6ServerEndpoint):
+            self.assertTrue(
+                self.listenWith(endpointClass, reusePort=True)['reusePort'])
+
+
+    def test_noReusePort(self):
+        """
+        By default, the endpoints don't pass C{reusePort} to C{listenTCP}, so
+        that reactors which don't support it can still be used.
+        """
+        for endpointClass in (endpoints.TCP4ServerEndpoint,
+                              endpoints.TCP6ServerEndpoint):
+            self.assertNotIn('reusePort', self.listenWith(endpointClass))
+
+
+
 class TCP6EndpointsTestCase(EndpointTestCaseMixin, unittest.TestCase):
     """
     Tests for TCP IPv6 Endpoints.
@@ -2365,6 +2406,29 @@ class ParserTestCase(unittest.TestCase):
             ('TCP', (80, self.f), {'interface': '', 'backlog': 6}))
 
 
+    def test_reusePortTCP(self):
+        """
+        TCP port descriptions parse their 'reusePort' argument as a boolean,
+        and only include it in the keyword arguments if it is true.
+        """
+        self.assertEqual(
+            self.parse('tcp:80:reusePort=yes', self.f),
+            ('TCP', (80, self.f),
+             {'interface': '', 'backlog': 50, 'reusePort': True}))
+        self.assertEqual(
+            self.parse('tcp:80:reusePort=no', self.f),
+            ('TCP', (80, self.f), {'interface': '', 'backlog': 50}))
+
+
+    def test_invalidReusePortTCP(self):
+        """
+        A 'reusePort' argument to a TCP port description which is not a
+        boolean results in a L{ValueError}.
+        """
+        self.assertRaises(
+            ValueError, self.parse, 'tcp:80:reusePort=maybe', self.f)
+
+
     def test_simpleUNIX(self):
         """
         L{endpoints._parseServer} returns a C{'UNIX'} port description with
@@ -2469,6 +2533,18 @@ class ServerStringTests(unittest.TestCase):
         self.assertEqual(server._port, 1234)
         self.assertEqual(server._backlog, 12)
         self.assertEqual(server._interface, b"10.0.0.1")
+        self.assertFalse(server._reusePort)
+
+
+    def test_tcpReusePort(self):
+        """
+        L{endpoints.serverFromString} passes the C{reusePort} argument of a
+        TCP strports description to the L{TCP4ServerEndpoint} it returns.
+        """
+        server = endpoints.serverFromString(
+            object(), b"tcp:1234:reusePort=yes")
+        self.assertIsInstance(server, endpoints.TCP4ServerEndpoint)
+        self.assertTrue(server._reusePort)
 
 
     def test_ssl(self):
@@ -3259,6 +3335,18 @@ class TCP6ServerEndpointPluginTests(unittest.TestCase):
         self.assertEqual(ep._port, 8080)
         self.assertEqual(ep._backlog, 12)
         self.assertEqual(ep._interface, b'::1')
+        self.assertFalse(ep._reusePort)
+
+
+    def test_reusePort(self):
+        """
+        The C{reusePort} argument of a 'tcp6' endpoint string description is
+        passed to the L{TCP6ServerEndpoint}.
+        """
+        ep = endpoints.serverFromString(
+            MemoryReactor(), b"tcp6:8080:reusePort=yes")
+        self.assertIsInstance(ep, endpoints.TCP6ServerEndpoint)
+        self.assertTrue(ep._reusePort)
 
 
 
@@ -7,13 +7,18 @@ Tests for L{twisted.internet.epollreactor}.
 
 from __future__ import division, absolute_import
 
+import socket
+
 from twisted.trial.unittest import TestCase
 try:
-    from twisted.internet.epollreactor import _ContinuousPolling
+    from twisted.internet.epollreactor import _ContinuousPolling, EPollReactor
 except ImportError:
     _ContinuousPolling = None
 from twisted.internet.task import Clock
 from twisted.internet.error import ConnectionDone
+from twisted.internet.protocol import Protocol
+from twisted.internet.abstract import FileDescriptor
+from twisted.internet.tcp import Connection
 
 
 
@@ -246,3 +251,253 @@ class ContinuousPollingTests(TestCase):
 
     if _ContinuousPolling is None:
         skip = "epoll not supported in this environment."
+
+
+
+class RecordingPoller(object):
+    """
+    Wrap an C{epoll} object, recording the calls made to change its
+    registrations.
+
+    @ivar calls: A C{list} of C{(name, fd)} tuples.
+    """
+    def __init__(self, poller):
+        self._poller = poller
+        self.calls = []
+
+
+    def __getattr__(self, name):
+        method = getattr(self._poller, name)
+        if name not in ("register", "modify", "unregister"):
+            return method
+        def recorded(fd, *args):
+            self.calls.append((name, fd))
+            return method(fd, *args)
+        return recorded
+
+
+
+class AccumulatingProtocol(Protocol):
+    """
+    Record the data received and the reason the connection was lost.
+    """
+    lostReason = None
+
+    def __init__(self):
+        self.data = []
+
+
+    def dataReceived(self, data):
+        self.data.append(data)
+
+
+    def connectionLost(self, reason):
+        self.lostReason = reason
+
+
+
+class SocketDescriptor(FileDescriptor):
+    """
+    A C{FileDescriptor} for a socket which does not report when it would
+    block, so can't be used in edge-triggered mode.
+    """
+    def __init__(self, skt, reactor):
+        FileDescriptor.__init__(self, reactor)
+        self.fileno = skt.fileno
+
+
+
+class EdgeTriggeredTests(TestCase):
+    """
+    Tests for the edge-triggered mode of L{EPollReactor}.
+    """
+
+    def setUp(self):
+        self.reactor = EPollReactor(edgeTriggered=True)
+        self.addCleanup(self.reactor._poller.close)
+        self.addCleanup(self.reactor.waker.connectionLost, None)
+        self.poller = self.reactor._poller = RecordingPoller(
+            self.reactor._poller)
+
+
+    def connection(self, bufferSize=None):
+        """
+        Make a L{Connection} for one end of a connected pair of sockets.
+
+        @return: The L{Connection}, whose protocol is an
+            L{AccumulatingProtocol}, and the socket at the other end.
+        """
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        conn = Connection(client, AccumulatingProtocol(), self.reactor)
+        conn.connected = True
+        conn.protocol.makeConnection(conn)
+        if bufferSize is not None:
+            conn.bufferSize = bufferSize
+        return conn, server
+
+
+    def iterate(self, times=5):
+        """
+        Run the reactor's event loop a few times without blocking.
+        """
+        for i in range(times):
+            self.reactor.doIteration(0)
+
+
+    def test_levelTriggeredByDefault(self):
+        """
+        L{EPollReactor} registers descriptors in level-triggered mode unless
+        it is asked not to.
+        """
+        reactor = EPollReactor()
+        self.addCleanup(reactor._poller.close)
+        self.addCleanup(reactor.waker.connectionLost, None)
+        poller = reactor._poller = RecordingPoller(reactor._poller)
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        conn = Connection(client, AccumulatingProtocol(), reactor)
+        reactor.addReader(conn)
+        reactor.addWriter(conn)
+        self.assertEqual(
+            poller.calls,
+            [("register", client.fileno()), ("modify", client.fileno())])
+        self.assertEqual(reactor._edges, set())
+
+
+    def test_registeredOnce(self):
+        """
+        In edge-triggered mode, a descriptor is registered for read and write
+        readiness once, and only unregistered when it is neither read from
+        nor written to.
+        """
+        conn, server = self.connection()
+        fd = conn.fileno()
+        self.reactor.addReader(conn)
+        self.reactor.addWriter(conn)
+        self.reactor.removeWriter(conn)
+        self.reactor.addWriter(conn)
+        self.reactor.removeReader(conn)
+        self.assertEqual(self.poller.calls, [("register", fd)])
+        self.assertNotIn(conn, self.reactor.getReaders())
+        self.assertIn(conn, self.reactor.getWriters())
+        self.reactor.removeWriter(conn)
+        self.assertEqual(
+            self.poller.calls, [("register", fd), ("unregister", fd)])
+        self.assertEqual(self.reactor._edges, set())
+
+
+    def test_unsupportedDescriptor(self):
+        """
+        In edge-triggered mode, descriptors which do not report when they
+        would block are still registered in level-triggered mode.
+        """
+        skt, other = socket.socketpair()
+        self.addCleanup(skt.close)
+        self.addCleanup(other.close)
+        descriptor = SocketDescriptor(skt, self.reactor)
+        self.reactor.addReader(descriptor)
+        self.reactor.addWriter(descriptor)
+        self.assertEqual(
+            self.poller.calls,
+            [("register", skt.fileno()), ("modify", skt.fileno())])
+        self.assertEqual(self.reactor._edges, set())
+
+
+    def test_readUntilDrained(self):
+        """
+        In edge-triggered mode, a descriptor reported readable is read from
+        until it has no more data, although the kernel only reports it once.
+        """
+        conn, server = self.connection(bufferSize=10)
+        self.reactor.addReader(conn)
+        server.sendall(b"x" * 35)
+        self.iterate()
+        self.assertEqual(b"".join(conn.protocol.data), b"x" * 35)
+        self.assertEqual(len(conn.protocol.data), 4)
+        self.assertNotIn(conn.fileno(), self.reactor._readReady)
+        self.assertEqual(self.reactor._runnable, set())
+
+
+    def test_readAfterResume(self):
+        """
+        In edge-triggered mode, a descriptor which stops reading before it
+        has read all its data reads the rest when it starts reading again,
+        although the kernel does not report it readable again.
+        """
+        conn, server = self.connection(bufferSize=10)
+        self.reactor.addReader(conn)
+        server.sendall(b"x" * 10)
+        self.iterate(1)
+        conn.stopReading()
+        server.sendall(b"y" * 5)
+        self.iterate()
+        self.assertEqual(b"".join(conn.protocol.data), b"x" * 10)
+        conn.startReading()
+        self.iterate()
+        self.assertEqual(b"".join(conn.protocol.data), b"x" * 10 + b"y" * 5)
+
+
+    def test_endOfInputAfterData(self):
+        """
+        In edge-triggered mode, the end of the input is noticed even if it
+        arrives along with the data before it.
+        """
+        conn, server = self.connection()
+        protocol = conn.protocol
+        self.reactor.addReader(conn)
+        server.sendall(b"x" * 5)
+        server.shutdown(socket.SHUT_WR)
+        self.iterate()
+        self.assertEqual(b"".join(protocol.data), b"x" * 5)
+        protocol.lostReason.trap(ConnectionDone)
+        self.assertEqual(self.reactor._edges, set())
+        self.assertEqual(self.reactor._runnable, set())
+
+
+    def test_writeUntilBlocked(self):
+        """
+        In edge-triggered mode, a descriptor is written to until it would
+        block, and then not again until the kernel reports it writable.
+        """
+        conn, server = self.connection()
+        self.reactor.addReader(conn)
+        conn.write(b"x" * (4 * 1024 * 1024))
+        self.iterate()
+        self.assertTrue(conn.dataBuffer or conn._tempDataBuffer)
+        self.assertNotIn(conn.fileno(), self.reactor._writeReady)
+        self.assertEqual(self.reactor._runnable, set())
+
+        server.setblocking(False)
+        received = 0
+        while True:
+            try:
+                data = server.recv(1024 * 1024)
+            except socket.error:
+                if conn.dataBuffer or conn._tempDataBuffer:
+                    self.iterate(1)
+                    continue
+                break
+            received += len(data)
+        self.assertEqual(received, 4 * 1024 * 1024)
+        self.assertNotIn(conn, self.reactor.getWriters())
+
+
+    def test_install(self):
+        """
+        L{twisted.internet.epollreactor.install} passes its C{edgeTriggered}
+        argument on to L{EPollReactor}.
+        """
+        from twisted.internet import epollreactor, main
+        installed = []
+        self.patch(main, "installReactor", installed.append)
+        self.patch(epollreactor, "EPollReactor", lambda edgeTriggered: (
+            "reactor", edgeTriggered))
+        epollreactor.install()
+        epollreactor.install(edgeTriggered=True)
+        self.assertEqual(installed, [("reactor", False), ("reactor", True)])
+
+    if _ContinuousPolling is None:
+        skip = "epoll not supported in this environment."
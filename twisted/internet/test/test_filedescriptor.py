@@ -7,8 +7,13 @@ Whitebox tests for L{twisted.internet.abstract.FileDescriptor}.
 
 from __future__ import division, absolute_import
 
+from io import BytesIO
+
 from zope.interface.verify import verifyClass
 
+from twisted.python.failure import Failure
+from twisted.internet import abstract
+from twisted.internet.error import ConnectionLost
 from twisted.internet.abstract import FileDescriptor
 from twisted.internet.interfaces import IPushProducer
 from twisted.trial.unittest import SynchronousTestCase
@@ -97,3 +102,266 @@ class WriteDescriptorTests(SynchronousTestCase):
         descriptor = MemoryFile()
         descriptor.write(b"hello, world")
         self.assertIs(None, descriptor.doWrite())
+
+
+
+class VectorMemoryFile(MemoryFile):
+    """
+    A L{MemoryFile} which accepts writes as a sequence of buffers.
+
+    @ivar _vectors: A C{list} of the C{list}s of buffers passed to
+        L{_writeSomeDataVector}.
+    """
+    _vectorWrites = True
+
+    def __init__(self):
+        MemoryFile.__init__(self)
+        self._vectors = []
+
+
+    def _writeSomeDataVector(self, vector):
+        """
+        Record C{vector} and accept at most C{self._freeSpace} bytes of it.
+        """
+        self._vectors.append([bytes(chunk) for chunk in vector])
+        return self.writeSomeData(b"".join(self._vectors[-1]))
+
+
+
+class VectorWriteTests(SynchronousTestCase):
+    """
+    Tests for L{FileDescriptor.doWrite} on descriptors which set
+    C{_vectorWrites}.
+    """
+    def setUp(self):
+        self.patch(abstract, "_VECTOR_MIN_CHUNK", 2)
+
+
+    def test_smallWritesJoined(self):
+        """
+        If the average size of the buffered chunks is less than
+        C{_VECTOR_MIN_CHUNK}, the chunks are joined and written with
+        C{writeSomeData}.
+        """
+        descriptor = VectorMemoryFile()
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"abc", b"d", b""])
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(descriptor._vectors, [])
+        self.assertEqual(descriptor._written, [b"abcd"])
+
+
+    def test_chunksNotJoined(self):
+        """
+        Large chunks are passed to C{_writeSomeDataVector} as separate buffers
+        until C{SEND_LIMIT} bytes have been collected.
+        """
+        descriptor = VectorMemoryFile()
+        descriptor.SEND_LIMIT = 5
+        descriptor._freeSpace = 100
+        descriptor.write(b"abc")
+        descriptor.writeSequence([b"de", b"fgh"])
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(descriptor._vectors, [[b"abc", b"de"]])
+        self.assertEqual(descriptor._tempDataBuffer, [b"fgh"])
+        self.assertEqual(descriptor._tempDataLen, 3)
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(b"".join(descriptor._written), b"abcdefgh")
+        self.assertEqual(descriptor._tempDataBuffer, [])
+        self.assertEqual(descriptor._tempDataLen, 0)
+
+
+    def test_partialWrite(self):
+        """
+        When only part of a chunk is written, the unwritten remainder becomes
+        the start of the data sent by the next call to
+        L{FileDescriptor.doWrite}.
+        """
+        descriptor = VectorMemoryFile()
+        descriptor.SEND_LIMIT = 5
+        descriptor._freeSpace = 4
+        descriptor.writeSequence([b"abc", b"def", b"ghi", b"jkl"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor.dataBuffer, b"def")
+        self.assertEqual(descriptor.offset, 1)
+        self.assertEqual(descriptor._tempDataBuffer, [b"ghi", b"jkl"])
+        self.assertEqual(descriptor._tempDataLen, 6)
+        descriptor._freeSpace = 100
+        descriptor.doWrite()
+        self.assertEqual(
+            descriptor._vectors,
+            [[b"abc", b"def"], [b"ef", b"ghi"]])
+        descriptor.doWrite()
+        self.assertEqual(b"".join(descriptor._written), b"abcdefghijkl")
+        self.assertEqual(descriptor.dataBuffer, b"")
+        self.assertEqual(descriptor.offset, 0)
+
+
+    def test_partialWriteOfPendingBuffer(self):
+        """
+        When less than the unwritten part of C{dataBuffer} is written, the
+        chunks in the temporary buffer are left in place.
+        """
+        descriptor = VectorMemoryFile()
+        descriptor.SEND_LIMIT = 3
+        descriptor._freeSpace = 2
+        descriptor.writeSequence([b"abcde", b"f"])
+        descriptor.doWrite()
+        descriptor.write(b"ghi")
+        descriptor._freeSpace = 1
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors[-1], [b"cde"])
+        self.assertEqual(descriptor.offset, 3)
+        self.assertEqual(descriptor._tempDataBuffer, [b"f", b"ghi"])
+        self.assertEqual(descriptor._tempDataLen, 4)
+        descriptor._freeSpace = 100
+        for i in range(3):
+            descriptor.doWrite()
+        self.assertEqual(b"".join(descriptor._written), b"abcdefghi")
+
+
+    def test_iovMax(self):
+        """
+        At most C{_IOV_MAX} buffers are passed to C{_writeSomeDataVector} at
+        once.
+        """
+        self.patch(abstract, "_IOV_MAX", 2)
+        descriptor = VectorMemoryFile()
+        descriptor.SEND_LIMIT = 2
+        descriptor._freeSpace = 100
+        descriptor.writeSequence([b"ab", b"cd", b"ef", b"gh"])
+        descriptor.SEND_LIMIT = 100
+        descriptor.doWrite()
+        self.assertEqual(descriptor._vectors, [[b"ab", b"cd"]])
+        self.assertEqual(descriptor._tempDataBuffer, [b"ef", b"gh"])
+
+
+    def test_error(self):
+        """
+        An exception returned by C{_writeSomeDataVector} is returned by
+        L{FileDescriptor.doWrite}.
+        """
+        descriptor = VectorMemoryFile()
+        descriptor.SEND_LIMIT = 1
+        lost = Exception()
+        descriptor._writeSomeDataVector = lambda vector: lost
+        descriptor.write(b"abc")
+        self.assertIs(lost, descriptor.doWrite())
+
+
+
+class FileSegmentMemoryFile(MemoryFile):
+    """
+    A L{MemoryFile} which can write parts of files.
+    """
+
+    def stopReading(self):
+        pass
+
+
+    def _writeSomeFile(self, segment):
+        """
+        Copy at most C{self._freeSpace} bytes of C{segment} into
+        C{self._written}.
+        """
+        segment.fileObj.seek(segment.offset)
+        return self.writeSomeData(segment.fileObj.read(segment.count))
+
+
+
+class WriteFileTests(SynchronousTestCase):
+    """
+    Tests for L{FileDescriptor._writeFile}.
+    """
+    def flush(self, descriptor):
+        """
+        Call C{descriptor.doWrite} until its buffer is empty.
+        """
+        while descriptor._tempDataLen or (
+                descriptor.offset < len(descriptor.dataBuffer)):
+            self.assertIs(None, descriptor.doWrite())
+
+
+    def test_ordering(self):
+        """
+        The bytes of a file passed to C{_writeFile} are written after the data
+        written before it and before the data written after it, and the
+        returned L{Deferred} fires with C{None} once they have been written.
+        """
+        descriptor = FileSegmentMemoryFile()
+        descriptor._freeSpace = 100
+        descriptor.write(b"ab")
+        descriptor.writeSequence([b"c", b"d"])
+        d = descriptor._writeFile(BytesIO(b"0123456789"), 2, 5)
+        descriptor.write(b"ef")
+        self.assertEqual(descriptor._tempDataLen, 11)
+        self.flush(descriptor)
+        self.assertEqual(descriptor._written, [b"abcd", b"23456", b"ef"])
+        self.assertIs(None, self.successResultOf(d))
+        self.assertEqual(descriptor._fileSegments, 0)
+        self.assertEqual(descriptor._tempDataBuffer, [])
+
+
+    def test_partialWrite(self):
+        """
+        A file is written over several calls to C{doWrite} if the descriptor
+        does not accept all of it at once, and the L{Deferred} returned by
+        C{_writeFile} only fires once all of it has been written.
+        """
+        descriptor = FileSegmentMemoryFile()
+        descriptor._freeSpace = 3
+        d = descriptor._writeFile(BytesIO(b"0123456789"), 0, 8)
+        self.assertIs(None, descriptor.doWrite())
+        self.assertEqual(descriptor._tempDataLen, 5)
+        self.assertNoResult(d)
+        descriptor._freeSpace = 100
+        self.flush(descriptor)
+        self.assertEqual(descriptor._written, [b"012", b"34567"])
+        self.assertIs(None, self.successResultOf(d))
+
+
+    def test_empty(self):
+        """
+        Writing no bytes of a file succeeds immediately.
+        """
+        descriptor = FileSegmentMemoryFile()
+        d = descriptor._writeFile(BytesIO(b"0123"), 1, 0)
+        self.assertIs(None, self.successResultOf(d))
+        self.assertEqual(descriptor._tempDataBuffer, [])
+
+
+    def test_notConnected(self):
+        """
+        C{_writeFile} fails with L{ConnectionLost} if the descriptor is not
+        connected.
+        """
+        descriptor = FileSegmentMemoryFile()
+        descriptor.connected = False
+        d = descriptor._writeFile(BytesIO(b"0123"), 0, 4)
+        self.failureResultOf(d, ConnectionLost)
+
+
+    def test_connectionLost(self):
+        """
+        The L{Deferred}s for files which have not been written when the
+        connection is lost fail with the reason it was lost.
+        """
+        descriptor = FileSegmentMemoryFile()
+        descriptor.write(b"ab")
+        d = descriptor._writeFile(BytesIO(b"0123"), 0, 4)
+        descriptor.connectionLost(Failure(ConnectionLost()))
+        self.failureResultOf(d, ConnectionLost)
+        self.assertEqual(descriptor._fileSegments, 0)
+        self.assertEqual(descriptor._tempDataLen, 0)
+
+
+    def test_error(self):
+        """
+        An exception returned by C{_writeSomeFile} is returned by
+        L{FileDescriptor.doWrite}.
+        """
+        descriptor = FileSegmentMemoryFile()
+        lost = Exception()
+        descriptor._writeSomeFile = lambda segment: lost
+        descriptor._writeFile(BytesIO(b"0123"), 0, 4)
+        self.assertIs(lost, descriptor.doWrite())
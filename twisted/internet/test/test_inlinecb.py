@@ -11,10 +11,12 @@ well.
 
 from __future__ import division, absolute_import
 
+import inspect
 import sys
 
 from twisted.trial.unittest import TestCase
-from twisted.internet.defer import Deferred, returnValue, inlineCallbacks
+from twisted.internet.defer import (
+    Deferred, returnValue, inlineCallbacks, succeed, fail)
 
 
 class StopIterationReturnTests(TestCase):
@@ -124,3 +126,125 @@ class NonLocalExitTests(TestCase):
         self.assertMistakenMethodWarning(results)
 
 
+
+class SynchronousResultTests(TestCase):
+    """
+    L{inlineCallbacks} resumes a generator which yields a L{Deferred} which
+    already has a result without waiting.
+    """
+
+    def test_success(self):
+        """
+        The result of a L{Deferred} which already has one is sent into the
+        generator, and the L{Deferred} is left with a result of C{None}.
+        """
+        yielded = succeed(1)
+        results = []
+        @inlineCallbacks
+        def f():
+            results.append((yield yielded))
+        self.successResultOf(f())
+        self.assertEqual(results, [1])
+        self.assertEqual(self.successResultOf(yielded), None)
+
+
+    def test_failure(self):
+        """
+        The L{Failure} of a L{Deferred} which already has one is raised in the
+        generator, and is no longer reported as unhandled by the L{Deferred}.
+        """
+        yielded = fail(ZeroDivisionError())
+        @inlineCallbacks
+        def f():
+            try:
+                yield yielded
+            except ZeroDivisionError:
+                returnValue("caught")
+        self.assertEqual(self.successResultOf(f()), "caught")
+        self.assertEqual(self.successResultOf(yielded), None)
+        self.assertIdentical(yielded._debugInfo.failResult, None)
+
+
+    def test_paused(self):
+        """
+        A L{Deferred} which has a result but is paused is waited for.
+        """
+        yielded = succeed(1)
+        yielded.pause()
+        results = []
+        @inlineCallbacks
+        def f():
+            results.append((yield yielded))
+        d = f()
+        self.assertNoResult(d)
+        yielded.unpause()
+        self.successResultOf(d)
+        self.assertEqual(results, [1])
+
+
+    def test_manySynchronousResults(self):
+        """
+        A generator can yield any number of L{Deferred}s which already have
+        results without the stack growing.
+        """
+        @inlineCallbacks
+        def f():
+            for i in range(5000):
+                yield succeed(i)
+            depth = len(inspect.stack())
+            returnValue(depth)
+        @inlineCallbacks
+        def g():
+            yield succeed(None)
+            returnValue(len(inspect.stack()))
+        self.assertEqual(self.successResultOf(f()), self.successResultOf(g()))
+
+
+
+class InlineCallbacksStatsTests(TestCase):
+    """
+    Tests for the C{inlineCallbacksStats} attribute of functions decorated
+    with L{inlineCallbacks}.
+    """
+
+    def test_counts(self):
+        """
+        C{inlineCallbacksStats} counts calls, the times generators are
+        resumed, and the L{Deferred}s they yield which already had results
+        or had to be waited for.
+        """
+        @inlineCallbacks
+        def f(d):
+            yield 1
+            yield succeed(2)
+            yield d
+        first, second = Deferred(), Deferred()
+        f(first)
+        f(second)
+        stats = f.inlineCallbacksStats
+        self.assertEqual(
+            (stats.calls, stats.steps, stats.synchronous, stats.waits),
+            (2, 6, 2, 2))
+        first.callback(None)
+        second.callback(None)
+        self.assertEqual(
+            (stats.calls, stats.steps, stats.synchronous, stats.waits),
+            (2, 8, 2, 2))
+        self.assertEqual(
+            repr(stats),
+            "<_InlineCallbacksStats calls=2 steps=8 synchronous=2 waits=2>")
+
+
+    def test_separate(self):
+        """
+        Each decorated function has its own C{inlineCallbacksStats}.
+        """
+        @inlineCallbacks
+        def f():
+            yield None
+        @inlineCallbacks
+        def g():
+            yield None
+        f()
+        self.assertEqual(f.inlineCallbacksStats.calls, 1)
+        self.assertEqual(g.inlineCallbacksStats.calls, 0)
@@ -7,10 +7,14 @@ Tests for L{twisted.internet.posixbase} and supporting code.
 
 from __future__ import division, absolute_import
 
+import os
+import select
+
 from twisted.python.compat import _PY3
 from twisted.trial.unittest import TestCase
 from twisted.internet.defer import Deferred
-from twisted.internet.posixbase import PosixReactorBase, _Waker
+from twisted.internet.posixbase import (
+    PosixReactorBase, _Waker, _EventFDWaker)
 from twisted.internet.protocol import ServerFactory
 
 skipSockets = None
@@ -106,6 +110,77 @@ class PosixReactorBaseTests(TestCase):
 
 
 
+class EventFDWakerTests(TestCase):
+    """
+    Tests for L{_EventFDWaker}.
+    """
+    if getattr(os, "eventfd", None) is None:
+        skip = "eventfd is not available"
+
+    def setUp(self):
+        self.waker = _EventFDWaker(None)
+        self.addCleanup(self.waker.connectionLost, None)
+
+
+    def _readable(self):
+        """
+        Return whether the waker's file descriptor is readable.
+        """
+        readable, _, _ = select.select([self.waker.fileno()], [], [], 0)
+        return bool(readable)
+
+
+    def test_default(self):
+        """
+        L{_EventFDWaker} is the waker used by L{PosixReactorBase} when
+        C{eventfd} is available.
+        """
+        self.assertIs(_Waker, _EventFDWaker)
+
+
+    def test_wakeUp(self):
+        """
+        L{_EventFDWaker.wakeUp} makes the waker readable, and
+        L{_EventFDWaker.doRead} makes it unreadable again.
+        """
+        self.assertFalse(self._readable())
+        self.waker.wakeUp()
+        self.assertTrue(self._readable())
+        self.waker.doRead()
+        self.assertFalse(self._readable())
+
+
+    def test_wakeUpMany(self):
+        """
+        However many times L{_EventFDWaker.wakeUp} is called, one call to
+        L{_EventFDWaker.doRead} makes the waker unreadable.
+        """
+        for i in range(1000):
+            self.waker.wakeUp()
+        self.waker.doRead()
+        self.assertFalse(self._readable())
+
+
+    def test_doReadSpurious(self):
+        """
+        L{_EventFDWaker.doRead} does nothing if the waker was not woken up.
+        """
+        self.waker.doRead()
+        self.assertFalse(self._readable())
+
+
+    def test_connectionLost(self):
+        """
+        L{_EventFDWaker.connectionLost} closes the C{eventfd}, after which
+        L{_EventFDWaker.wakeUp} does nothing.
+        """
+        fd = self.waker.fileno()
+        self.waker.connectionLost(None)
+        self.assertRaises(OSError, os.fstat, fd)
+        self.waker.wakeUp()
+
+
+
 class TCPPortTests(TestCase):
     """
     Tests for L{twisted.internet.tcp.Port}.
@@ -0,0 +1,351 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.processpool}.
+"""
+
+import os
+import pickle
+import time
+
+from twisted.trial.unittest import TestCase
+from twisted.internet import processpool, reactor
+from twisted.internet.defer import CancelledError, TimeoutError
+from twisted.internet.interfaces import IReactorProcess
+from twisted.internet.processpool import (
+    ProcessPool, _Chunked, _WorkerProtocol, deferToProcessPool)
+from twisted.protocols.amp import MAX_VALUE_LENGTH
+from twisted.python.failure import Failure
+
+skipProcesses = None
+if not IReactorProcess.providedBy(reactor):
+    skipProcesses = "Reactor does not support processes"
+
+
+
+def echo(value):
+    """
+    Return C{value}, to be called in a worker.
+    """
+    return value
+
+
+
+def explode(message):
+    """
+    Raise C{ValueError}, to be called in a worker.
+    """
+    raise ValueError(message)
+
+
+
+def unpicklable():
+    """
+    Return something which can't be pickled, to be called in a worker.
+    """
+    return lambda: None
+
+
+
+class ChunkedTests(TestCase):
+    """
+    Tests for L{_Chunked}.
+    """
+
+    def roundTrip(self, value):
+        """
+        Put C{value} in a box and take it out again.
+
+        @return: The box and the value taken out of it.
+        """
+        strings = {}
+        _Chunked().toBox("value", strings, {"value": value}, None)
+        box = strings.copy()
+        objects = {}
+        _Chunked().fromBox("value", strings, objects, None)
+        self.assertEqual(strings, {})
+        return box, objects["value"]
+
+
+    def test_short(self):
+        """
+        A short value is kept under the argument's name.
+        """
+        box, value = self.roundTrip(b"hello")
+        self.assertEqual(box, {"value": b"hello"})
+        self.assertEqual(value, b"hello")
+
+
+    def test_empty(self):
+        """
+        An empty value is kept under the argument's name.
+        """
+        box, value = self.roundTrip(b"")
+        self.assertEqual(box, {"value": b""})
+        self.assertEqual(value, b"")
+
+
+    def test_long(self):
+        """
+        A value longer than L{MAX_VALUE_LENGTH} is split into chunks no
+        longer than that.
+        """
+        data = os.urandom(MAX_VALUE_LENGTH * 2 + 10)
+        box, value = self.roundTrip(data)
+        self.assertEqual(sorted(box), ["value", "value.1", "value.2"])
+        self.assertEqual(len(box["value.2"]), 10)
+        self.assertEqual(value, data)
+
+
+
+class WorkerProtocolTests(TestCase):
+    """
+    Tests for L{_WorkerProtocol}, the worker side of the protocol.
+    """
+
+    def call(self, f, *args):
+        """
+        Call C{f} with C{args} as if it had been sent by a pool.
+        """
+        return _WorkerProtocol().callFunction(
+            pickle.dumps((f, args, {}), pickle.HIGHEST_PROTOCOL))
+
+
+    def test_result(self):
+        """
+        The pickled result of the function is returned.
+        """
+        response = self.call(echo, [1, 2])
+        self.assertTrue(response['success'])
+        self.assertEqual(pickle.loads(response['result']), [1, 2])
+
+
+    def test_exception(self):
+        """
+        The pickled L{Failure} of an exception raised by the function is
+        returned.
+        """
+        response = self.call(explode, "bang")
+        self.assertFalse(response['success'])
+        reason = pickle.loads(response['result'])
+        self.assertIsInstance(reason, Failure)
+        reason.trap(ValueError)
+        self.assertEqual(reason.getErrorMessage(), "bang")
+
+
+    def test_unpicklableResult(self):
+        """
+        A result which can't be pickled is reported as a failure.
+        """
+        response = self.call(unpicklable)
+        self.assertFalse(response['success'])
+        self.assertIsInstance(pickle.loads(response['result']), Failure)
+
+
+
+class ProcessPoolTests(TestCase):
+    """
+    Tests for L{ProcessPool}, which start real worker processes.
+    """
+    skip = skipProcesses
+
+    def makePool(self, **kwargs):
+        """
+        Make and start a L{ProcessPool} which is stopped after the test.
+        """
+        pool = ProcessPool(**kwargs)
+        pool.start()
+        self.addCleanup(pool.stop)
+        return pool
+
+
+    def test_call(self):
+        """
+        L{ProcessPool.callInProcess} calls the function in a worker process,
+        with the arguments given, and fires with its result.
+        """
+        d = self.makePool(maxWorkers=1).callInProcess(
+            echo, value={"key": (1, 2.5)})
+        d.addCallback(self.assertEqual, {"key": (1, 2.5)})
+        return d
+
+
+    def test_otherProcess(self):
+        """
+        The function is called in a process other than this one.
+        """
+        d = self.makePool(maxWorkers=1).callInProcess(os.getpid)
+        d.addCallback(self.assertNotEqual, os.getpid())
+        return d
+
+
+    def test_large(self):
+        """
+        Arguments and results longer than an AMP value can be are passed.
+        """
+        data = b"x" * (MAX_VALUE_LENGTH * 3)
+        d = self.makePool(maxWorkers=1).callInProcess(echo, data)
+        d.addCallback(self.assertEqual, data)
+        return d
+
+
+    def test_exception(self):
+        """
+        An exception raised by the function fails the L{Deferred}.
+        """
+        d = self.makePool(maxWorkers=1).callInProcess(explode, "bang")
+        d = self.assertFailure(d, ValueError)
+        d.addCallback(lambda e: self.assertEqual(str(e), "bang"))
+        return d
+
+
+    def test_unpicklableArguments(self):
+        """
+        If the function or its arguments can't be pickled, the L{Deferred}
+        fails immediately.
+        """
+        pool = ProcessPool()
+        d = pool.callInProcess(echo, lambda: None)
+        self.failureResultOf(d)
+        self.assertEqual(len(pool._pending), 0)
+
+
+    def test_reuseWorker(self):
+        """
+        A worker runs one call after another.
+        """
+        pool = self.makePool(maxWorkers=1)
+        d = pool.callInProcess(os.getpid)
+        d.addCallback(lambda first: pool.callInProcess(os.getpid).addCallback(
+            self.assertEqual, first))
+        return d
+
+
+    def test_maxTasksPerWorker(self):
+        """
+        A worker which has run C{maxTasksPerWorker} calls is replaced by a
+        new one.
+        """
+        pool = self.makePool(maxWorkers=1, maxTasksPerWorker=2)
+        d = pool.callInProcess(os.getpid)
+        d.addCallback(
+            lambda first: pool.callInProcess(os.getpid).addCallback(
+                self.assertEqual, first).addCallback(
+                lambda ignored: pool.callInProcess(os.getpid)).addCallback(
+                self.assertNotEqual, first))
+        return d
+
+
+    def test_maxWorkers(self):
+        """
+        Calls made together are run in different workers, up to C{max} of
+        them.
+        """
+        pool = self.makePool(maxWorkers=2)
+        calls = [pool.callInProcess(os.getpid) for i in range(4)]
+        self.assertEqual(len(pool._workers), 2)
+        self.assertEqual(len(pool._pending), 2)
+        for call in calls[2:]:
+            call.addErrback(lambda reason: reason.trap(CancelledError))
+        d = calls[0].addCallback(
+            lambda first: calls[1].addCallback(self.assertNotEqual, first))
+        return d
+
+
+    def test_minWorkers(self):
+        """
+        L{ProcessPool.start} starts C{min} workers.
+        """
+        pool = self.makePool(minWorkers=2, maxWorkers=3)
+        self.assertEqual(len(pool._workers), 2)
+        self.assertEqual(len(pool._idle), 2)
+
+
+    def test_queuedUntilStarted(self):
+        """
+        Calls made before the pool is started are run once it is.
+        """
+        pool = ProcessPool(maxWorkers=1)
+        d = pool.callInProcess(echo, 1)
+        self.assertNoResult(d)
+        self.assertEqual(pool._workers, [])
+        pool.start()
+        self.addCleanup(pool.stop)
+        d.addCallback(self.assertEqual, 1)
+        return d
+
+
+    def test_timeout(self):
+        """
+        A call which takes longer than C{timeout} fails with
+        L{TimeoutError}, and its worker is replaced.
+        """
+        pool = self.makePool(maxWorkers=1, timeout=0.5)
+        d = pool.callInProcess(time.sleep, 30)
+        d = self.assertFailure(d, TimeoutError)
+        d.addCallback(lambda ignored: pool.callInProcess(echo, 1))
+        d.addCallback(self.assertEqual, 1)
+        return d
+
+
+    def test_cancelQueued(self):
+        """
+        Cancelling a call which hasn't started takes it out of the queue.
+        """
+        pool = ProcessPool()
+        d = pool.callInProcess(echo, 1)
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertEqual(len(pool._pending), 0)
+
+
+    def test_cancelRunning(self):
+        """
+        Cancelling a call which is running kills its worker.
+        """
+        pool = self.makePool(maxWorkers=1)
+        d = pool.callInProcess(time.sleep, 30)
+        worker = pool._workers[0]
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        return worker.ended
+
+
+    def test_stop(self):
+        """
+        L{ProcessPool.stop} cancels the calls which haven't started and
+        returns a L{Deferred} which fires when every worker has exited,
+        after finishing the call it was running.
+        """
+        pool = ProcessPool(maxWorkers=1)
+        pool.start()
+        running = pool.callInProcess(echo, 1)
+        queued = pool.callInProcess(echo, 2)
+        d = pool.stop()
+        self.failureResultOf(queued, CancelledError)
+        d.addCallback(lambda ignored: self.assertEqual(
+            self.successResultOf(running), 1))
+        d.addCallback(lambda ignored: self.assertEqual(pool._workers, []))
+        return d
+
+
+
+class DeferToProcessPoolTests(TestCase):
+    """
+    Tests for L{deferToProcessPool}.
+    """
+    skip = skipProcesses
+
+    def test_deferToProcessPool(self):
+        """
+        L{deferToProcessPool} calls the function in the default pool.
+        """
+        pool = ProcessPool(maxWorkers=1)
+        pool.start()
+        self.addCleanup(pool.stop)
+        self.patch(processpool, "_defaultPool", pool)
+        d = deferToProcessPool(echo, 5)
+        self.assertEqual(len(pool._workers), 1)
+        d.addCallback(self.assertEqual, 5)
+        return d
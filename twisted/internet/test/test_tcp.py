@@ -25,7 +25,7 @@ from twisted.python import log
 from twisted.trial.unittest import SkipTest, TestCase
 from twisted.internet.error import (
     ConnectionLost, UserError, ConnectionRefusedError, ConnectionDone,
-    ConnectionAborted, DNSLookupError, NoProtocol)
+    ConnectionAborted, DNSLookupError, NoProtocol, CannotListenError)
 from twisted.internet.test.connectionmixins import (
     LogObserverMixin, ConnectionTestsMixin, StreamClientTestsMixin,
     findFreePort, ConnectableProtocol, EndpointCreator,
@@ -34,7 +34,7 @@ from twisted.internet.test.reactormixins import (
     ReactorBuilder, needsRunningReactor, stopOnError)
 from twisted.internet.interfaces import (
     ILoggingContext, IConnector, IReactorFDSet, IReactorSocket, IReactorTCP,
-    IResolverSimple, ITLSTransport)
+    IResolverSimple, ITLSTransport, ISendfileTransport, IBufferReceiver)
 from twisted.internet.address import IPv4Address, IPv6Address
 from twisted.internet.defer import (
     Deferred, DeferredList, maybeDeferred, gatherResults, succeed, fail)
@@ -42,6 +42,7 @@ from twisted.internet.endpoints import TCP4ServerEndpoint, TCP4ClientEndpoint
 from twisted.internet.protocol import ServerFactory, ClientFactory, Protocol
 from twisted.internet.interfaces import (
     IPushProducer, IPullProducer, IHalfCloseableProtocol)
+from twisted.internet import abstract, base, main, tcp
 from twisted.internet.tcp import Connection, Server, _resolveIPv6
 from twisted.internet.test.test_core import ObjectModelIntegrationMixin
 from twisted.test.test_tcp import MyClientFactory, MyServerFactory
@@ -133,6 +134,15 @@ class FakeSocket(object):
     def recv(self, size):
         return self.data
 
+    def recv_into(self, buffer, size):
+        """
+        Copy C{self.data} into the start of C{buffer}.
+
+        @return: The length of C{self.data}.
+        """
+        buffer[:len(self.data)] = self.data
+        return len(self.data)
+
     def send(self, bytes):
         """
         I{Send} all of C{bytes} by accumulating it into C{self.sendBuffer}.
@@ -178,6 +188,30 @@ class FakeSocket(object):
 
 
 
+class FakeSendmsgSocket(FakeSocket):
+    """
+    A L{FakeSocket} which also supports scatter/gather writes.
+
+    @ivar vectors: A C{list} of the C{list}s of buffers passed to
+        L{FakeSendmsgSocket.sendmsg}.
+    """
+    def __init__(self, data):
+        FakeSocket.__init__(self, data)
+        self.vectors = []
+
+
+    def sendmsg(self, buffers):
+        """
+        I{Send} all of C{buffers} by accumulating them into C{self.vectors}.
+
+        @return: The total length of C{buffers}.
+        """
+        buffers = [bytes(buf) for buf in buffers]
+        self.vectors.append(buffers)
+        return sum(len(buf) for buf in buffers)
+
+
+
 class TestFakeSocket(TestCase):
     """
     Test that the FakeSocket can be used by the doRead method of L{Connection}
@@ -206,6 +240,26 @@ class TestFakeSocket(TestCase):
 
 
 
+@implementer(IBufferReceiver)
+class BufferReceivingProtocol(Protocol):
+    """
+    An L{IBufferReceiver} which records what it is given.
+
+    @ivar received: A C{list} of the bytes passed to C{bufferReceived}.
+
+    @ivar views: A C{list} of the L{memoryview}s passed to C{bufferReceived}.
+    """
+    def __init__(self):
+        self.received = []
+        self.views = []
+
+
+    def bufferReceived(self, data):
+        self.views.append(data)
+        self.received.append(data.tobytes())
+
+
+
 class FakeProtocol(Protocol):
     """
     An L{IProtocol} that returns a value from its dataReceived method.
@@ -333,6 +387,216 @@ class TCPConnectionTests(TestCase):
     """
     Whitebox tests for L{twisted.internet.tcp.Connection}.
     """
+    def test_vectorWrites(self):
+        """
+        If the socket supports C{sendmsg}, L{Connection.doWrite} sends
+        large chunks with a single call to it, without joining them.
+        """
+        self.patch(abstract, "_VECTOR_MIN_CHUNK", 3)
+        skt = FakeSendmsgSocket(b"")
+        conn = Connection(skt, Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.write(b"foo")
+        conn.writeSequence([b"bar", b"baz"])
+        conn.doWrite()
+        self.assertEqual(skt.vectors, [[b"foo", b"bar", b"baz"]])
+        self.assertEqual(skt.sendBuffer, [])
+
+
+    def test_smallChunksJoined(self):
+        """
+        If the socket supports C{sendmsg} but the buffered chunks are small,
+        L{Connection.doWrite} joins them and sends them with C{send}.
+        """
+        skt = FakeSendmsgSocket(b"")
+        conn = Connection(skt, Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.writeSequence([b"foo", b"bar"])
+        conn.doWrite()
+        self.assertEqual(skt.vectors, [])
+        self.assertEqual(
+            b"".join([bytes(data) for data in skt.sendBuffer]), b"foobar")
+
+
+    def test_noVectorWrites(self):
+        """
+        If the socket does not support C{sendmsg}, L{Connection.doWrite} joins
+        the buffered chunks and sends them with C{send}.
+        """
+        skt = FakeSocket(b"")
+        conn = Connection(skt, Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.writeSequence([b"foo", b"bar"])
+        conn.doWrite()
+        self.assertEqual(
+            b"".join([bytes(data) for data in skt.sendBuffer]), b"foobar")
+
+
+    def fakeSendfile(self, results):
+        """
+        Replace L{os.sendfile} as used by L{tcp.Connection} with a fake.
+
+        @param results: A C{list} of the values the fake returns from
+            successive calls, or exceptions it raises.
+
+        @return: A C{list} to which the arguments of each call are appended.
+        """
+        calls = []
+        def sendfile(outFD, inFD, offset, count):
+            calls.append((outFD, inFD, offset, count))
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        self.patch(tcp, "_sendfile", sendfile)
+        return calls
+
+
+    def test_sendfileProvided(self):
+        """
+        L{Connection} provides L{ISendfileTransport} only if L{os.sendfile}
+        is available.
+        """
+        self.fakeSendfile([])
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        self.assertTrue(ISendfileTransport.providedBy(conn))
+        self.patch(tcp, "_sendfile", None)
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        self.assertFalse(ISendfileTransport.providedBy(conn))
+
+
+    def test_sendFile(self):
+        """
+        L{Connection.sendFile} sends the file with C{sendfile}, calling it
+        again for the rest of the file if only part of it is sent, and fires
+        the returned L{Deferred} once all of it has been sent.
+        """
+        calls = self.fakeSendfile([3, 2])
+        fileObj = FakeSocket(b"")
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        d = conn.sendFile(fileObj, 10, 5)
+        conn.doWrite()
+        self.assertNoResult(d)
+        conn.doWrite()
+        self.assertIs(None, self.successResultOf(d))
+        self.assertEqual(calls, [(1, 1, 10, 5), (1, 1, 13, 2)])
+
+
+    def test_sendFileWouldBlock(self):
+        """
+        If C{sendfile} fails with C{EAGAIN}, L{Connection.doWrite} tries again
+        later.
+        """
+        calls = self.fakeSendfile([OSError(errno.EAGAIN, "again"), 5])
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        d = conn.sendFile(FakeSocket(b""), 0, 5)
+        self.assertIs(None, conn.doWrite())
+        self.assertIs(None, conn.doWrite())
+        self.assertIs(None, self.successResultOf(d))
+        self.assertEqual(len(calls), 2)
+
+
+    def test_sendFileEndsEarly(self):
+        """
+        If the file ends before all of the bytes passed to
+        L{Connection.sendFile} have been sent, L{Connection.doWrite} returns
+        L{ConnectionLost}.
+        """
+        self.fakeSendfile([0])
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.sendFile(FakeSocket(b""), 0, 5)
+        self.assertIsInstance(conn.doWrite(), ConnectionLost)
+
+
+    def test_sendFileSocket(self):
+        """
+        L{Connection.sendFile} sends the requested part of the file over the
+        connection's socket.
+        """
+        if tcp._sendfile is None:
+            raise SkipTest("os.sendfile is not available")
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(b"0123456789")
+        fileObj = open(path, "rb")
+        self.addCleanup(fileObj.close)
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        conn = Connection(client, Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.write(b"ab")
+        d = conn.sendFile(fileObj, 3, 4)
+        conn.write(b"cd")
+        while conn._tempDataLen or conn.offset < len(conn.dataBuffer):
+            self.assertIs(None, conn.doWrite())
+        self.assertIs(None, self.successResultOf(d))
+        self.assertEqual(server.recv(100), b"ab3456cd")
+
+
+    def test_sendFileTLS(self):
+        """
+        L{Connection.sendFile} raises L{RuntimeError} once TLS has been
+        started.
+        """
+        self.fakeSendfile([])
+        conn = Connection(FakeSocket(b""), Protocol(), _FakeFDSetReactor())
+        conn.connected = True
+        conn.TLS = True
+        self.assertRaises(RuntimeError, conn.sendFile, FakeSocket(b""), 0, 5)
+
+
+    def test_bufferReceived(self):
+        """
+        If the protocol provides L{IBufferReceiver}, L{Connection.doRead}
+        reads into a buffer with C{recv_into} and passes a L{memoryview} of
+        the bytes read to its C{bufferReceived} method.
+        """
+        skt = FakeSocket(b"someData")
+        protocol = BufferReceivingProtocol()
+        conn = Connection(skt, protocol)
+        self.assertIs(None, conn.doRead())
+        self.assertEqual(protocol.received, [b"someData"])
+        self.assertIsInstance(protocol.views[0], memoryview)
+
+
+    def test_bufferReused(self):
+        """
+        L{Connection.doRead} reads into the same buffer each time if the
+        protocol provides L{IBufferReceiver}.
+        """
+        readBuffers = []
+        self.patch(tcp, "_readBuffers", readBuffers)
+        skt = FakeSocket(b"foo")
+        protocol = BufferReceivingProtocol()
+        conn = Connection(skt, protocol)
+        conn.doRead()
+        self.assertEqual(len(readBuffers), 1)
+        buf = readBuffers[0]
+        self.assertEqual(len(buf), conn.bufferSize)
+        skt.data = b"bar"
+        conn.doRead()
+        self.assertEqual(readBuffers, [buf])
+        self.assertEqual(protocol.received, [b"foo", b"bar"])
+        self.assertEqual(buf[:3].tobytes(), b"bar")
+
+
+    def test_bufferReceivedConnectionDone(self):
+        """
+        If the protocol provides L{IBufferReceiver} and the socket has been
+        closed by the peer, L{Connection.doRead} returns
+        L{main.CONNECTION_DONE} without calling C{bufferReceived}.
+        """
+        skt = FakeSocket(b"")
+        protocol = BufferReceivingProtocol()
+        conn = Connection(skt, protocol)
+        self.assertIs(main.CONNECTION_DONE, conn.doRead())
+        self.assertEqual(protocol.received, [])
+
+
     def test_doReadWarningIsRaised(self):
         """
         When an L{IProtocol} implementation that returns a value from its
@@ -379,6 +643,62 @@ class TCPConnectionTests(TestCase):
 
 
 
+class TCPPortReusePortTests(TestCase):
+    """
+    Tests for the C{reusePort} argument to L{tcp.Port}.
+    """
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        skip = "SO_REUSEPORT is not supported on this platform"
+
+    def listen(self, port=0, reusePort=True):
+        """
+        Make a L{tcp.Port} listening on C{127.0.0.1} and arrange for its
+        socket to be closed at the end of the test.
+        """
+        factory = ServerFactory()
+        factory.protocol = Protocol
+        p = tcp.Port(port, factory, interface='127.0.0.1',
+                     reactor=_FakeFDSetReactor(), reusePort=reusePort)
+        p.startListening()
+        self.addCleanup(p.socket.close)
+        return p
+
+
+    def test_reusePort(self):
+        """
+        If C{reusePort} is C{True}, L{tcp.Port} sets C{SO_REUSEPORT} on its
+        socket, so another such port can listen on the same port number.
+        """
+        first = self.listen()
+        portNumber = first.getHost().port
+        second = self.listen(portNumber)
+        self.assertEqual(second.getHost().port, portNumber)
+        self.assertTrue(second.socket.getsockopt(
+            socket.SOL_SOCKET, socket.SO_REUSEPORT))
+
+
+    def test_noReusePort(self):
+        """
+        By default, L{tcp.Port} does not set C{SO_REUSEPORT}, and so can't
+        listen on a port number already in use.
+        """
+        first = self.listen(reusePort=False)
+        self.assertFalse(first.socket.getsockopt(
+            socket.SOL_SOCKET, socket.SO_REUSEPORT))
+        self.assertRaises(
+            CannotListenError, self.listen, first.getHost().port, False)
+
+
+    def test_reusePortUnsupported(self):
+        """
+        If C{SO_REUSEPORT} is not supported, L{tcp.Port.startListening} raises
+        L{CannotListenError} when C{reusePort} is C{True}.
+        """
+        self.patch(base, "_SO_REUSEPORT", None)
+        self.assertRaises(CannotListenError, self.listen)
+
+
+
 class TCPCreator(EndpointCreator):
     """
     Create IPv4 TCP endpoints for L{runProtocolsWithReactor}-based tests.
@@ -1552,6 +1872,33 @@ class TCPConnectionTestsBuilder(ReactorBuilder):
         self.assertEqual(pauser.events, ["paused", "resumed", "lost"])
 
 
+    def test_bufferReceiver(self):
+        """
+        A protocol which provides L{IBufferReceiver} receives all of the bytes
+        written by the other end of the connection.  Reactors which don't
+        support L{IBufferReceiver} give them to C{dataReceived} instead.
+        """
+        @implementer(IBufferReceiver)
+        class Receiver(ConnectableProtocol):
+            def __init__(self):
+                self.received = []
+
+            def bufferReceived(self, data):
+                self.received.append(data.tobytes())
+
+            def dataReceived(self, data):
+                self.received.append(data)
+
+        class Client(ConnectableProtocol):
+            def connectionMade(self):
+                self.transport.write(b"x" * 100000)
+                self.transport.loseConnection()
+
+        receiver = Receiver()
+        runProtocolsWithReactor(self, receiver, Client(), TCPCreator())
+        self.assertEqual(b"".join(receiver.received), b"x" * 100000)
+
+
     def test_doubleHalfClose(self):
         """
         If one side half-closes its connection, and then the other side of the
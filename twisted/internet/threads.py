@@ -15,10 +15,84 @@ if not _PY3:
 else:
     import queue as Queue
 
+from collections import deque
+
 from twisted.python import failure
 from twisted.internet import defer
 
 
+
+class _ResultBatch(object):
+    """
+    Results of calls made in a threadpool, waiting to be given to their
+    L{defer.Deferred}s in the reactor thread.
+
+    Only a result which arrives when no delivery is pending asks the reactor
+    to deliver them, so results which finish while the reactor is busy are
+    all delivered by one call.
+
+    @ivar _reactor: The reactor to deliver the results in.
+    @ivar _results: A L{deque} of C{(deferred, success, result)} tuples
+        waiting to be delivered.  Appending to it and popping from it are
+        thread-safe.
+    @ivar _pending: Whether a call to L{_deliver} has been requested but has
+        not started delivering yet.  It is cleared before delivery starts, so
+        a result added while it is set is always delivered.
+    """
+    _pending = False
+
+    def __init__(self, reactor):
+        self._reactor = reactor
+        self._results = deque()
+
+
+    def add(self, d, success, result):
+        """
+        Add a result, from a thread in the threadpool.
+        """
+        self._results.append((d, success, result))
+        if not self._pending:
+            self._pending = True
+            self._reactor.callFromThread(self._deliver)
+
+
+    def _deliver(self):
+        """
+        Give each result waiting to be delivered to its L{defer.Deferred}.
+        """
+        self._pending = False
+        popleft = self._results.popleft
+        while True:
+            try:
+                d, success, result = popleft()
+            except IndexError:
+                return
+            if success:
+                d.callback(result)
+            else:
+                d.errback(result)
+
+
+
+def _resultBatch(reactor, threadpool):
+    """
+    Get the L{_ResultBatch} delivering results from C{threadpool} to
+    C{reactor}, making it if there isn't one.
+
+    This is only called in the reactor thread, so no lock is needed.
+    """
+    try:
+        batches = threadpool._resultBatches
+    except AttributeError:
+        batches = threadpool._resultBatches = {}
+    try:
+        return batches[reactor]
+    except KeyError:
+        batch = batches[reactor] = _ResultBatch(reactor)
+        return batch
+
+
+
 def deferToThreadPool(reactor, threadpool, f, *args, **kwargs):
     """
     Call the function C{f} using a thread from the given threadpool and return
@@ -32,7 +106,9 @@ def deferToThreadPool(reactor, threadpool, f, *args, **kwargs):
         invoked.
 
     @param threadpool: An object which supports the C{callInThreadWithCallback}
-        method of C{twisted.python.threadpool.ThreadPool}.
+        method of C{twisted.python.threadpool.ThreadPool}.  If its
+        C{batchResults} attribute is true, results which arrive together are
+        delivered to the reactor thread together.
 
     @param f: The function to call.
     @param *args: positional arguments to pass to f.
@@ -44,11 +120,16 @@ def deferToThreadPool(reactor, threadpool, f, *args, **kwargs):
     """
     d = defer.Deferred()
 
-    def onResult(success, result):
-        if success:
-            reactor.callFromThread(d.callback, result)
-        else:
-            reactor.callFromThread(d.errback, result)
+    if getattr(threadpool, "batchResults", False):
+        add = _resultBatch(reactor, threadpool).add
+        def onResult(success, result):
+            add(d, success, result)
+    else:
+        def onResult(success, result):
+            if success:
+                reactor.callFromThread(d.callback, result)
+            else:
+                reactor.callFromThread(d.errback, result)
 
     threadpool.callInThreadWithCallback(onResult, f, *args, **kwargs)
 
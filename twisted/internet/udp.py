@@ -57,7 +57,7 @@ from twisted.internet import abstract, error, interfaces
 
 
 @implementer(
-    interfaces.IListeningPort, interfaces.IUDPTransport,
+    interfaces.IListeningPort, interfaces.IUDPBatchTransport,
     interfaces.ISystemHandle)
 class Port(base.BasePort):
     """
@@ -66,6 +66,13 @@ class Port(base.BasePort):
     @ivar maxThroughput: Maximum number of bytes read in one event
         loop iteration.
 
+    @ivar _readBudget: Maximum number of datagrams read in one event loop
+        iteration.  L{doRead} doubles it, up to C{_maxReadBudget}, whenever it
+        reads that many without emptying the socket, and halves it, down to
+        C{_minReadBudget}, whenever the socket empties before half of it has
+        been read.
+    @type _readBudget: C{int}
+
     @ivar addressFamily: L{socket.AF_INET} or L{socket.AF_INET6}, depending on
         whether this port is listening on an IPv4 address or an IPv6 address.
 
@@ -82,10 +89,15 @@ class Port(base.BasePort):
     socketType = socket.SOCK_DGRAM
     maxThroughput = 256 * 1024
 
+    _minReadBudget = 16
+    _maxReadBudget = 1024
+    _readBudget = _minReadBudget
+
     _realPortNumber = None
     _preexistingSocket = None
 
-    def __init__(self, port, proto, interface='', maxPacketSize=8192, reactor=None):
+    def __init__(self, port, proto, interface='', maxPacketSize=8192,
+                 reactor=None, reusePort=False):
         """
         @param port: A port number on which to listen.
         @type port: C{int}
@@ -105,11 +117,16 @@ class Port(base.BasePort):
             its socket is ready for reading or writing. Defaults to
             C{None}, ie the default global reactor.
         @type reactor: L{interfaces.IReactorFDSet}
+
+        @param reusePort: If C{True}, set C{SO_REUSEPORT} on the socket, so
+            that other sockets can be bound to the same port.
+        @type reusePort: C{bool}
         """
         base.BasePort.__init__(self, reactor)
         self.port = port
         self.protocol = proto
         self.maxPacketSize = maxPacketSize
+        self.reusePort = reusePort
         self.interface = interface
         self.setLogStr()
         self._connectedAddr = None
@@ -220,34 +237,66 @@ class Port(base.BasePort):
     def doRead(self):
         """
         Called when my socket is ready for reading.
+
+        If the protocol provides L{interfaces.IDatagramBatchReceiver}, the
+        datagrams read are passed to its C{datagramsReceived} method together
+        once reading stops; otherwise each is passed to C{datagramReceived}
+        as soon as it is read.
         """
+        if interfaces.IDatagramBatchReceiver.providedBy(self.protocol):
+            datagrams = []
+        else:
+            datagrams = None
+        budget = self._readBudget
+        count = 0
         read = 0
-        while read < self.maxThroughput:
-            try:
-                data, addr = self.socket.recvfrom(self.maxPacketSize)
-            except socket.error as se:
-                no = se.args[0]
-                if no in _sockErrReadIgnore:
-                    return
-                if no in _sockErrReadRefuse:
-                    if self._connectedAddr:
-                        self.protocol.connectionRefused()
-                    return
-                raise
-            else:
-                read += len(data)
-                if self.addressFamily == socket.AF_INET6:
-                    # Remove the flow and scope ID from the address tuple,
-                    # reducing it to a tuple of just (host, port).
-                    #
-                    # TODO: This should be amended to return an object that can
-                    # unpack to (host, port) but also includes the flow info
-                    # and scope ID. See http://tm.tl/6826
-                    addr = addr[:2]
+        refused = False
+        try:
+            while count < budget and read < self.maxThroughput:
                 try:
-                    self.protocol.datagramReceived(data, addr)
+                    data, addr = self.socket.recvfrom(self.maxPacketSize)
+                except socket.error as se:
+                    no = se.args[0]
+                    if no in _sockErrReadIgnore:
+                        if count < budget // 2:
+                            self._readBudget = max(
+                                budget // 2, self._minReadBudget)
+                        return
+                    if no in _sockErrReadRefuse:
+                        if self._connectedAddr:
+                            refused = True
+                        return
+                    raise
+                else:
+                    count += 1
+                    read += len(data)
+                    if self.addressFamily == socket.AF_INET6:
+                        # Remove the flow and scope ID from the address tuple,
+                        # reducing it to a tuple of just (host, port).
+                        #
+                        # TODO: This should be amended to return an object that
+                        # can unpack to (host, port) but also includes the flow
+                        # info and scope ID. See http://tm.tl/6826
+                        addr = addr[:2]
+                    if datagrams is None:
+                        try:
+                            self.protocol.datagramReceived(data, addr)
+                        except:
+                            log.err()
+                    else:
+                        datagrams.append((data, addr))
+            if count == budget:
+                # There may well be more datagrams waiting; read more of them
+                # next time.
+                self._readBudget = min(budget * 2, self._maxReadBudget)
+        finally:
+            if datagrams:
+                try:
+                    self.protocol.datagramsReceived(datagrams)
                 except:
                     log.err()
+            if refused:
+                self.protocol.connectionRefused()
 
 
     def write(self, datagram, addr=None):
@@ -262,14 +311,68 @@ class Port(base.BasePort):
         @param addr: A tuple of (I{stringified IPv4 or IPv6 address},
             I{integer port number}); can be C{None} in connected mode.
         """
+        self._checkAddress(addr)
+        return self._write(datagram, addr)
+
+
+    def writeMany(self, datagrams):
+        """
+        Write several datagrams, checking each distinct address only once.
+
+        @see: L{interfaces.IUDPBatchTransport.writeMany}
+        """
+        checked = set()
+        for datagram, addr in datagrams:
+            if addr not in checked:
+                self._checkAddress(addr)
+                checked.add(addr)
+            self._write(datagram, addr)
+
+
+    def _checkAddress(self, addr):
+        """
+        Check that datagrams can be written to C{addr}.
+
+        @param addr: The address passed to L{write}.
+
+        @raise error.InvalidAddressError: If C{addr} is not an IP address of
+            the same family as this port.
+        """
         if self._connectedAddr:
             assert addr in (None, self._connectedAddr)
+            return
+        assert addr != None
+        if (not abstract.isIPAddress(addr[0])
+                and not abstract.isIPv6Address(addr[0])
+                and addr[0] != "<broadcast>"):
+            raise error.InvalidAddressError(
+                addr[0],
+                "write() only accepts IP addresses, not hostnames")
+        if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
+                and self.addressFamily == socket.AF_INET6):
+            raise error.InvalidAddressError(
+                addr[0],
+                "IPv6 port write() called with IPv4 or broadcast address")
+        if (abstract.isIPv6Address(addr[0])
+                and self.addressFamily == socket.AF_INET):
+            raise error.InvalidAddressError(
+                addr[0], "IPv4 port write() called with IPv6 address")
+
+
+    def _write(self, datagram, addr):
+        """
+        Write a datagram to an address which has already been checked by
+        L{_checkAddress}.
+
+        @see: L{write}
+        """
+        if self._connectedAddr:
             try:
                 return self.socket.send(datagram)
             except socket.error as se:
                 no = se.args[0]
                 if no == EINTR:
-                    return self.write(datagram)
+                    return self._write(datagram, addr)
                 elif no == EMSGSIZE:
                     raise error.MessageLengthError("message too long")
                 elif no == ECONNREFUSED:
@@ -277,28 +380,12 @@ class Port(base.BasePort):
                 else:
                     raise
         else:
-            assert addr != None
-            if (not abstract.isIPAddress(addr[0])
-                    and not abstract.isIPv6Address(addr[0])
-                    and addr[0] != "<broadcast>"):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "write() only accepts IP addresses, not hostnames")
-            if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
-                    and self.addressFamily == socket.AF_INET6):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "IPv6 port write() called with IPv4 or broadcast address")
-            if (abstract.isIPv6Address(addr[0])
-                    and self.addressFamily == socket.AF_INET):
-                raise error.InvalidAddressError(
-                    addr[0], "IPv4 port write() called with IPv6 address")
             try:
                 return self.socket.sendto(datagram, addr)
             except socket.error as se:
                 no = se.args[0]
                 if no == EINTR:
-                    return self.write(datagram, addr)
+                    return self._write(datagram, addr)
                 elif no == EMSGSIZE:
                     raise error.MessageLengthError("message too long")
                 elif no == ECONNREFUSED:
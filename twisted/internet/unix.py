@@ -128,6 +128,7 @@ class _SendmsgMixin(object):
                         _ancillaryDescriptor(fd))
                 except socket.error, se:
                     if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                        self._writeBlocked = True
                         return index
                     else:
                         return main.CONNECTION_LOST
@@ -161,6 +162,7 @@ class _SendmsgMixin(object):
                 sendmsg.recv1msg, self.socket.fileno(), 0, self.bufferSize)
         except socket.error, se:
             if se.args[0] == EWOULDBLOCK:
+                self._readBlocked = True
                 return
             else:
                 return main.CONNECTION_LOST
@@ -10,7 +10,9 @@ Basic protocols, such as line-oriented, netstring, and int prefixed strings.
 from __future__ import absolute_import, division
 
 # System imports
+import os
 import re
+import stat
 from struct import pack, unpack, calcsize
 from io import BytesIO
 import math
@@ -430,8 +432,17 @@ class LineOnlyReceiver(protocol.Protocol):
     @cvar MAX_LENGTH: The maximum length of a line to allow (If a
                       sent line is longer than this, the connection is dropped).
                       Default is 16384.
+
+    @ivar _buffer: The bytes received after the last delimiter.  A line
+        arriving in pieces is collected in a C{bytearray}, so that each
+        piece is only copied once.
+    @type _buffer: C{bytes} or C{bytearray}
+
+    @ivar _scanned: The offset in C{_buffer} before which no delimiter
+        starts, so that a line arriving in pieces is only searched once.
     """
     _buffer = b''
+    _scanned = 0
     delimiter = b'\r\n'
     MAX_LENGTH = 16384
 
@@ -439,8 +450,23 @@ class LineOnlyReceiver(protocol.Protocol):
         """
         Translates bytes into lines, and calls lineReceived.
         """
-        lines  = (self._buffer+data).split(self.delimiter)
-        self._buffer = lines.pop(-1)
+        buffer = self._buffer
+        delimiter = self.delimiter
+        if isinstance(buffer, bytearray):
+            buffer += data
+            if buffer.rfind(delimiter, self._scanned) == -1:
+                return self._partialLine()
+            data = bytes(buffer)
+        elif buffer:
+            data = buffer + data
+        # Split every complete line out at once, keeping only the partial
+        # line after them.
+        lines = data.split(delimiter)
+        self._buffer = lines.pop()
+        if not lines:
+            self._buffer = bytearray(self._buffer)
+            return self._partialLine()
+        self._scanned = 0
         for line in lines:
             if self.transport.disconnecting:
                 # this is necessary because the transport may be told to lose
@@ -456,6 +482,17 @@ class LineOnlyReceiver(protocol.Protocol):
             return self.lineLengthExceeded(self._buffer)
 
 
+    def _partialLine(self):
+        """
+        Keep the part of a line in C{_buffer}, in which no delimiter has
+        been found, to be added to as more of it is received.
+        """
+        if len(self._buffer) > self.MAX_LENGTH:
+            return self.lineLengthExceeded(bytes(self._buffer))
+        self._scanned = max(
+            0, len(self._buffer) - len(self.delimiter) + 1)
+
+
     def lineReceived(self, line):
         """
         Override this for when each line is received.
@@ -521,9 +558,27 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
     @cvar MAX_LENGTH: The maximum length of a line to allow (If a
                       sent line is longer than this, the connection is dropped).
                       Default is 16384.
+
+    @ivar _buffer: The bytes received which haven't been split into lines
+        yet.  A line arriving in pieces is collected in a C{bytearray}, so
+        that each piece is only copied once.
+    @type _buffer: C{bytes} or C{bytearray}
+
+    @ivar _scanned: The offset in C{_buffer} before which no delimiter
+        starts, so that a line arriving in pieces is only searched once.
+
+    @ivar _lines: The lines split out of C{_buffer} and not delivered yet,
+        last first.  Every complete line received at once is split out in
+        one go and C{_buffer} is only copied once, rather than the rest of
+        the buffer being copied after every line.
+
+    @ivar _linesDelimiter: The delimiter C{_lines} were split at.
     """
     line_mode = 1
     _buffer = b''
+    _scanned = 0
+    _lines = ()
+    _linesDelimiter = None
     _busyReceiving = False
     delimiter = b'\r\n'
     MAX_LENGTH = 16384
@@ -535,8 +590,15 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
         @return: All of the cleared buffered data.
         @rtype: C{bytes}
         """
-        b, self._buffer = self._buffer, b""
-        return b
+        lines, b = self._lines, self._buffer
+        self._lines = []
+        self._buffer = b""
+        self._scanned = 0
+        if lines:
+            lines.reverse()
+            lines.append(bytes(b))
+            return self._linesDelimiter.join(lines)
+        return bytes(b)
 
 
     def dataReceived(self, data):
@@ -545,43 +607,65 @@ class LineReceiver(protocol.Protocol, _PauseableMixin):
         Translates bytes into lines, and calls lineReceived (or
         rawDataReceived, depending on mode.)
         """
+        self._buffer += data
         if self._busyReceiving:
-            self._buffer += data
             return
 
         try:
             self._busyReceiving = True
-            self._buffer += data
-            while self._buffer and not self.paused:
+            # lineReceived and rawDataReceived may change any of this
+            # state, so it is looked up again after each call.
+            while not self.paused:
                 if self.line_mode:
-                    try:
-                        line, self._buffer = self._buffer.split(
-                            self.delimiter, 1)
-                    except ValueError:
-                        if len(self._buffer) > self.MAX_LENGTH:
-                            line, self._buffer = self._buffer, b''
-                            return self.lineLengthExceeded(line)
-                        return
-                    else:
-                        lineLength = len(line)
-                        if lineLength > self.MAX_LENGTH:
-                            exceeded = line + self.delimiter + self._buffer
-                            self._buffer = b''
-                            return self.lineLengthExceeded(exceeded)
-                        why = self.lineReceived(line)
-                        if (why or self.transport and
-                            self.transport.disconnecting):
-                            return why
-                else:
-                    data = self._buffer
-                    self._buffer = b''
-                    why = self.rawDataReceived(data)
+                    lines = self._lines
+                    if lines and self.delimiter != self._linesDelimiter:
+                        self._buffer = self.clearLineBuffer()
+                        continue
+                    if not lines:
+                        buffer = self._buffer
+                        delimiter = self.delimiter
+                        if isinstance(buffer, bytearray):
+                            if buffer.rfind(delimiter, self._scanned) == -1:
+                                return self._partialLine()
+                            buffer = bytes(buffer)
+                        lines = buffer.split(delimiter)
+                        self._buffer = lines.pop()
+                        if not lines:
+                            self._buffer = bytearray(self._buffer)
+                            return self._partialLine()
+                        self._scanned = 0
+                        lines.reverse()
+                        self._lines = lines
+                        self._linesDelimiter = delimiter
+                    line = lines.pop()
+                    if len(line) > self.MAX_LENGTH:
+                        lines.append(line)
+                        return self.lineLengthExceeded(self.clearLineBuffer())
+                    why = self.lineReceived(line)
+                    if (why or self.transport and
+                        self.transport.disconnecting):
+                        return why
+                elif self._lines or self._buffer:
+                    why = self.rawDataReceived(self.clearLineBuffer())
                     if why:
                         return why
+                else:
+                    break
         finally:
             self._busyReceiving = False
 
 
+    def _partialLine(self):
+        """
+        Keep the part of a line in C{_buffer}, in which no delimiter has
+        been found, to be added to as more of it is received.
+        """
+        if len(self._buffer) > self.MAX_LENGTH:
+            return self.lineLengthExceeded(self.clearLineBuffer())
+        self._scanned = max(
+            0, len(self._buffer) - len(self.delimiter) + 1)
+
+
     def setLineMode(self, extra=b''):
         """
         Sets the line-mode of this receiver.
@@ -919,10 +1003,54 @@ class FileSender:
         self.transform = transform
 
         self.deferred = deferred = defer.Deferred()
+        if (transform is None and
+                interfaces.ISendfileTransport.providedBy(consumer) and
+                self._sendFile()):
+            return deferred
         self.consumer.registerProducer(self, False)
         return deferred
 
 
+    def _sendFile(self):
+        """
+        Send the rest of the file with
+        L{interfaces.ISendfileTransport.sendFile}, without reading it.
+
+        @return: C{True} if the file is being sent, C{False} if it is not a
+            regular file and must be read instead.
+        """
+        try:
+            fileno = self.file.fileno()
+            offset = self.file.tell()
+        except (AttributeError, IOError, ValueError):
+            return False
+        info = os.fstat(fileno)
+        if not stat.S_ISREG(info.st_mode) or info.st_size <= offset:
+            return False
+        # Leave the file at the end, as if it had been read.
+        self.file.seek(info.st_size - 1)
+        lastSent = self.file.read(1)
+        d = self.consumer.sendFile(self.file, offset, info.st_size - offset)
+        d.addCallbacks(self._fileSent, self._sendFileFailed,
+                       callbackArgs=(lastSent,))
+        return True
+
+
+    def _fileSent(self, ignored, lastSent):
+        self.file = None
+        self.lastSent = lastSent
+        if self.deferred:
+            self.deferred.callback(lastSent)
+            self.deferred = None
+
+
+    def _sendFileFailed(self, reason):
+        self.file = None
+        if self.deferred:
+            self.deferred.errback(reason)
+            self.deferred = None
+
+
     def resumeProducing(self):
         chunk = ''
         if self.file:
@@ -546,12 +546,26 @@ class TimeoutProtocol(ProtocolWrapper):
 class TimeoutFactory(WrappingFactory):
     """
     Factory for TimeoutWrapper.
+
+    @ivar clock: The L{IReactorTime} provider used to schedule timeouts, or
+        C{None} to use the reactor.
     """
     protocol = TimeoutProtocol
 
 
-    def __init__(self, wrappedFactory, timeoutPeriod=30*60):
+    def __init__(self, wrappedFactory, timeoutPeriod=30*60, clock=None):
+        """
+        @param wrappedFactory: The factory for the protocols to wrap.
+
+        @param timeoutPeriod: Number of seconds to wait for activity before
+            timing out.
+
+        @param clock: An L{IReactorTime} provider used to schedule timeouts,
+            such as a L{twisted.internet.task.TimingWheel} shared by many
+            connections.  The default is the reactor.
+        """
         self.timeoutPeriod = timeoutPeriod
+        self.clock = clock
         WrappingFactory.__init__(self, wrappedFactory)
 
 
@@ -563,9 +577,13 @@ class TimeoutFactory(WrappingFactory):
     def callLater(self, period, func):
         """
         Wrapper around L{reactor.callLater} for test purpose.
+
+        If C{clock} is set, it is used instead of the reactor.
         """
-        from twisted.internet import reactor
-        return reactor.callLater(period, func)
+        clock = self.clock
+        if clock is None:
+            from twisted.internet import reactor as clock
+        return clock.callLater(period, func)
 
 
 
@@ -674,17 +692,27 @@ class TimeoutMixin:
     default, closes the connection.
 
     @cvar timeOut: The number of seconds after which to timeout the connection.
+
+    @cvar timeoutClock: The L{IReactorTime} provider used to schedule the
+        timeout, or C{None} to use the reactor.  Connections with long
+        timeouts which are reset frequently can share a
+        L{twisted.internet.task.TimingWheel} here to make each reset cheap.
     """
     timeOut = None
+    timeoutClock = None
 
     __timeoutCall = None
 
     def callLater(self, period, func):
         """
         Wrapper around L{reactor.callLater} for test purpose.
+
+        If C{timeoutClock} is set, it is used instead of the reactor.
         """
-        from twisted.internet import reactor
-        return reactor.callLater(period, func)
+        clock = self.timeoutClock
+        if clock is None:
+            from twisted.internet import reactor as clock
+        return clock.callLater(period, func)
 
 
     def resetTimeout(self):
@@ -11,13 +11,14 @@ import sys
 import struct
 from io import BytesIO
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
 from twisted.python.compat import _PY3, iterbytes
 from twisted.trial import unittest
 from twisted.protocols import basic
-from twisted.internet import protocol, error, task
-from twisted.internet.interfaces import IProducer
+from twisted.internet import protocol, error, task, defer
+from twisted.internet.interfaces import IProducer, ISendfileTransport
 from twisted.test import proto_helpers
 
 _PY3NEWSTYLESKIP = "All classes are new style on Python 3."
@@ -335,6 +336,102 @@ a'''
         self.assertRaises(NotImplementedError, proto.lineReceived, 'foo')
 
 
+    def test_linesAreBytes(self):
+        """
+        Lines and raw data are delivered as C{bytes}, and
+        L{LineReceiver.clearLineBuffer} returns C{bytes}, although they are
+        buffered in a C{bytearray}.
+        """
+        class RawLineReceiver(basic.LineReceiver):
+            def lineReceived(self, line):
+                self.line = line
+                self.setRawMode()
+            def rawDataReceived(self, data):
+                self.data = data
+
+        proto = RawLineReceiver()
+        proto.dataReceived(b'foo\r\nbar')
+        self.assertIs(type(proto.line), bytes)
+        self.assertEqual(proto.line, b'foo')
+        self.assertIs(type(proto.data), bytes)
+        self.assertEqual(proto.data, b'bar')
+        proto.setLineMode()
+        proto.dataReceived(b'baz')
+        rest = proto.clearLineBuffer()
+        self.assertIs(type(rest), bytes)
+        self.assertEqual(rest, b'baz')
+
+
+    def test_delimiterSplit(self):
+        """
+        A delimiter received in more than one piece ends the line.
+        """
+        proto = LineTester()
+        proto.delimiter = b'\r\n'
+        proto.makeConnection(proto_helpers.StringTransport())
+        for data in [b'foo\r', b'\nbar', b'\r', b'\n']:
+            proto.dataReceived(data)
+        self.assertEqual(proto.received, [b'foo', b'bar'])
+
+
+    def test_deliveredDataRemoved(self):
+        """
+        Once C{dataReceived} returns, only the part of a line which hasn't
+        been delivered is left in the buffer, and the part of it searched
+        for a delimiter isn't searched again.
+        """
+        proto = LineTester()
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.dataReceived(b'foo\nbar\nbaz')
+        self.assertEqual(proto.received, [b'foo', b'bar'])
+        self.assertEqual(proto._buffer, bytearray(b'baz'))
+        self.assertEqual(list(proto._lines), [])
+        self.assertEqual(proto._scanned, 3)
+        proto.dataReceived(b'quux\n')
+        self.assertEqual(proto.received, [b'foo', b'bar', b'bazquux'])
+        self.assertEqual(proto._buffer, bytearray())
+
+
+    def test_dataReceivedFromLineReceived(self):
+        """
+        Data passed to C{dataReceived} by C{lineReceived} is delivered after
+        the data already received.
+        """
+        class ReentrantReceiver(basic.LineReceiver):
+            delimiter = b'\n'
+            def connectionMade(self):
+                self.received = []
+            def lineReceived(self, line):
+                self.received.append(line)
+                if line == b'again':
+                    self.dataReceived(b'more\n')
+
+        proto = ReentrantReceiver()
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.dataReceived(b'again\nlast\n')
+        self.assertEqual(proto.received, [b'again', b'last', b'more'])
+
+
+    def test_delimiterChanged(self):
+        """
+        Lines received after C{lineReceived} changes the delimiter are split
+        at the new one, even if they were received along with the line.
+        """
+        class ChangingReceiver(basic.LineReceiver):
+            delimiter = b'\n'
+            def connectionMade(self):
+                self.received = []
+            def lineReceived(self, line):
+                self.received.append(line)
+                self.delimiter = b';'
+
+        proto = ChangingReceiver()
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.dataReceived(b'a\nb;c\nd;e')
+        self.assertEqual(proto.received, [b'a', b'b', b'c\nd'])
+        self.assertEqual(proto.clearLineBuffer(), b'e')
+
+
 
 class ExcessivelyLargeLineCatcher(basic.LineReceiver):
     """
@@ -480,6 +577,39 @@ class LineOnlyReceiverTests(unittest.SynchronousTestCase):
         self.assertIsInstance(res, error.ConnectionLost)
 
 
+    def test_longLineInPieces(self):
+        """
+        A line longer than C{MAX_LENGTH} closes the connection once enough of
+        it has been received in small pieces, and lines which arrive in
+        small pieces are delivered whole, as C{bytes}.
+        """
+        t = proto_helpers.StringTransport()
+        a = LineOnlyTester()
+        a.makeConnection(t)
+        for c in iterbytes(b'x' * 64 + b'\n'):
+            a.dataReceived(c)
+        self.assertEqual(a.received, [b'x' * 64])
+        self.assertIs(type(a.received[0]), bytes)
+        self.assertEqual(a._buffer, bytearray())
+        for c in iterbytes(b'x' * 64):
+            self.assertIs(a.dataReceived(c), None)
+        res = a.dataReceived(b'x')
+        self.assertIsInstance(res, error.ConnectionLost)
+
+
+    def test_delimiterSplit(self):
+        """
+        A delimiter received in more than one piece ends the line.
+        """
+        a = LineOnlyTester()
+        a.delimiter = b'\r\n'
+        a.makeConnection(proto_helpers.StringTransport())
+        for data in [b'foo\r', b'\nbar', b'\r', b'\nbaz']:
+            a.dataReceived(data)
+        self.assertEqual(a.received, [b'foo', b'bar'])
+        self.assertEqual(a._buffer, bytearray(b'baz'))
+
+
     def test_lineReceivedNotImplemented(self):
         """
         When L{LineOnlyReceiver.lineReceived} is not overridden in a subclass,
@@ -1312,3 +1442,85 @@ class FileSenderTests(unittest.TestCase):
         failure.trap(Exception)
         self.assertEqual("Consumer asked us to stop producing",
                          str(failure.value))
+
+
+    def openFile(self, content, offset=0):
+        """
+        Create a file containing C{content}, opened for reading at C{offset}.
+        """
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(content)
+        source = open(path, "rb")
+        self.addCleanup(source.close)
+        source.seek(offset)
+        return source
+
+
+    def test_sendFile(self):
+        """
+        If the consumer provides L{ISendfileTransport}, the rest of the file
+        is passed to its C{sendFile} method instead of being read, and the
+        L{Deferred} returned by L{basic.FileSender.beginFileTransfer} fires
+        with the last byte of the file once it has been sent.
+        """
+        source = self.openFile(b"Test content", 5)
+        consumer = SendfileStringTransport()
+        sender = basic.FileSender()
+        d = sender.beginFileTransfer(source, consumer)
+        self.assertIs(None, consumer.producer)
+        [(fileObj, offset, count, sent)] = consumer.sentFiles
+        self.assertEqual((fileObj, offset, count), (source, 5, 7))
+        self.assertEqual(source.tell(), 12)
+        self.assertNoResult(d)
+        sent.callback(None)
+        self.assertEqual(b"t", self.successResultOf(d))
+
+
+    def test_sendFileFailed(self):
+        """
+        If C{sendFile} fails, so does the L{Deferred} returned by
+        L{basic.FileSender.beginFileTransfer}.
+        """
+        consumer = SendfileStringTransport()
+        sender = basic.FileSender()
+        d = sender.beginFileTransfer(self.openFile(b"Test content"), consumer)
+        consumer.sentFiles[0][3].errback(error.ConnectionLost())
+        self.failureResultOf(d, error.ConnectionLost)
+
+
+    def test_sendFileNotUsed(self):
+        """
+        C{sendFile} is not used if there is a C{transform}, or if the file has
+        no file descriptor.
+        """
+        for source, transform in [
+                (self.openFile(b"Test content"), lambda chunk: chunk),
+                (BytesIO(b"Test content"), None)]:
+            consumer = SendfileStringTransport()
+            sender = basic.FileSender()
+            sender.beginFileTransfer(source, consumer, transform)
+            self.assertEqual(consumer.sentFiles, [])
+            self.assertIs(sender, consumer.producer)
+
+
+
+@implementer(ISendfileTransport)
+class SendfileStringTransport(proto_helpers.StringTransport):
+    """
+    A L{proto_helpers.StringTransport} which records the parts of files passed
+    to C{sendFile}.
+
+    @ivar sentFiles: A C{list} of C{(fileObj, offset, count, deferred)}
+        tuples, one for each call to C{sendFile}.
+    """
+
+    def __init__(self):
+        proto_helpers.StringTransport.__init__(self)
+        self.sentFiles = []
+
+
+    def sendFile(self, fileObj, offset, count):
+        d = defer.Deferred()
+        self.sentFiles.append((fileObj, offset, count, d))
+        return d
@@ -36,6 +36,7 @@ modules = [
     "twisted.copyright",
     "twisted.internet",
     "twisted.internet._glibbase",
+    "twisted.internet._instrumentation",
     "twisted.internet._newtls",
     "twisted.internet._signals",
     "twisted.internet.abstract",
@@ -127,6 +128,7 @@ modules = [
     "twisted.python.versions",
     "twisted.test",
     "twisted.test.iosim",
+    "twisted.test.loadsim",
     "twisted.test.proto_helpers",
     "twisted.test.ssl_helpers",
     "twisted.trial",
@@ -226,6 +228,7 @@ testModules = [
     "twisted.test.test_fdesc",
     "twisted.test.test_internet",
     "twisted.test.test_iosim",
+    "twisted.test.test_loadsim",
     "twisted.test.test_iutils",
     "twisted.test.test_lockfile",
     "twisted.test.test_log",
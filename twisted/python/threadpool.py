@@ -12,19 +12,63 @@ instead of creating a thread pool directly.
 from __future__ import division, absolute_import
 
 try:
-    from Queue import Queue
+    from queue import SimpleQueue as _Queue, Empty
 except ImportError:
-    from queue import Queue
-import contextlib
+    try:
+        from Queue import Queue as _Queue, Empty
+    except ImportError:
+        # Python 3.6.
+        from queue import Queue as _Queue, Empty
 import threading
+import time
 import copy
 
 from twisted.python import log, context, failure
 
+try:
+    _now = time.perf_counter
+except AttributeError:
+    # Python 2.
+    _now = time.time
+
 
 WorkerStop = object()
 
 
+
+class _WorkerStatistics(object):
+    """
+    Counters for the work done by one worker thread, which only that thread
+    updates, so that no lock is needed.
+
+    @ivar completed: The number of calls run.
+    @ivar waitTime: The total seconds calls spent queued before running.
+    @ivar maxWaitTime: The longest any call spent queued.
+    @ivar runTime: The total seconds calls took to run.
+    @ivar maxRunTime: The longest any call took to run.
+    """
+    __slots__ = ("completed", "waitTime", "maxWaitTime", "runTime",
+                 "maxRunTime")
+
+    def __init__(self):
+        self.completed = 0
+        self.waitTime = 0.0
+        self.maxWaitTime = 0.0
+        self.runTime = 0.0
+        self.maxRunTime = 0.0
+
+
+    def add(self, other):
+        """
+        Add the counters of another L{_WorkerStatistics} to these.
+        """
+        self.completed += other.completed
+        self.waitTime += other.waitTime
+        self.maxWaitTime = max(self.maxWaitTime, other.maxWaitTime)
+        self.runTime += other.runTime
+        self.maxRunTime = max(self.maxRunTime, other.maxRunTime)
+
+
 class ThreadPool:
     """
     This class (hopefully) generalizes the functionality of a pool of
@@ -38,6 +82,24 @@ class ThreadPool:
     @type started: L{bool}
     @ivar threads: List of workers currently running in this thread pool.
     @type threads: L{list}
+    @ivar keepalive: The number of seconds a worker beyond the minimum
+        number waits for work before it exits, or C{None} for workers to
+        wait indefinitely.
+    @type keepalive: L{float} or C{None}
+    @ivar batchResults: Whether
+        L{twisted.internet.threads.deferToThreadPool} should deliver the
+        results of calls to the reactor thread in batches, with one
+        C{callFromThread} for all the results which finish while the reactor
+        is busy, instead of one each.
+    @type batchResults: L{bool}
+
+    @ivar _lock: A lock held while starting and reaping workers.  A worker
+        which gives up waiting for work leaves C{waiters} before it checks
+        the queue, so that work queued meanwhile either keeps it or finds
+        too few waiters and starts another worker.
+    @ivar _statistics: The L{_WorkerStatistics} of each running worker.
+    @ivar _retired: The combined L{_WorkerStatistics} of workers which have
+        exited.
     """
     min = 5
     max = 20
@@ -45,26 +107,36 @@ class ThreadPool:
     started = False
     workers = 0
     name = None
+    keepalive = None
+    batchResults = False
 
     threadFactory = threading.Thread
     currentThread = staticmethod(threading.currentThread)
 
-    def __init__(self, minthreads=5, maxthreads=20, name=None):
+    def __init__(self, minthreads=5, maxthreads=20, name=None,
+                 keepalive=None):
         """
         Create a new threadpool.
 
         @param minthreads: minimum number of threads in the pool
         @param maxthreads: maximum number of threads in the pool
+        @param name: The name to give this threadpool; visible in log
+            messages.
+        @param keepalive: See C{keepalive}.
         """
         assert minthreads >= 0, 'minimum is negative'
         assert minthreads <= maxthreads, 'minimum is greater than maximum'
-        self.q = Queue(0)
+        self.q = _Queue()
         self.min = minthreads
         self.max = maxthreads
         self.name = name
+        self.keepalive = keepalive
         self.waiters = []
         self.threads = []
         self.working = []
+        self._lock = threading.Lock()
+        self._statistics = []
+        self._retired = _WorkerStatistics()
 
 
     def start(self):
@@ -103,10 +175,11 @@ class ThreadPool:
 
 
     def _startSomeWorkers(self):
-        neededSize = self.q.qsize() + len(self.working)
-        # Create enough, but not too many
-        while self.workers < min(self.max, neededSize):
-            self.startAWorker()
+        with self._lock:
+            neededSize = self.q.qsize() + len(self.working)
+            # Create enough, but not too many
+            while self.workers < min(self.max, neededSize):
+                self.startAWorker()
 
 
     def callInThread(self, func, *args, **kw):
@@ -155,55 +228,66 @@ class ThreadPool:
         if self.joined:
             return
         ctx = context.theContextTracker.currentContext().contexts[-1]
-        o = (ctx, func, args, kw, onResult)
+        o = (ctx, func, args, kw, onResult, _now())
         self.q.put(o)
-        if self.started:
+        if self.started and len(self.waiters) < self.q.qsize():
             self._startSomeWorkers()
 
 
-    @contextlib.contextmanager
-    def _workerState(self, stateList, workerThread):
-        """
-        Manages adding and removing this worker from a list of workers
-        in a particular state.
-
-        @param stateList: the list managing workers in this state
-
-        @param workerThread: the thread the worker is running in, used to
-            represent the worker in stateList
-        """
-        stateList.append(workerThread)
-        try:
-            yield
-        finally:
-            stateList.remove(workerThread)
-
-
     def _worker(self):
         """
         Method used as target of the created threads: retrieve a task to run
         from the threadpool, run it, and proceed to the next task until
-        threadpool is stopped.
+        threadpool is stopped, or until there has been no work for
+        C{keepalive} seconds and there are more than C{min} workers.
+
+        Calls made without a context are run directly rather than through
+        L{context.call}, which would have no effect.
         """
         ct = self.currentThread()
-        o = self.q.get()
+        stats = _WorkerStatistics()
+        self._statistics.append(stats)
+        waiters = self.waiters
+        working = self.working
+        defaultContext = context.defaultContextDict
+        now = _now
+
+        waiters.append(ct)
+        o = self._nextWork(ct)
         while o is not WorkerStop:
-            with self._workerState(self.working, ct):
-                ctx, function, args, kwargs, onResult = o
-                del o
-
-                try:
+            waiters.remove(ct)
+            working.append(ct)
+            ctx, function, args, kwargs, onResult, queued = o
+            del o
+
+            started = now()
+            try:
+                if ctx is defaultContext:
+                    result = function(*args, **kwargs)
+                else:
                     result = context.call(ctx, function, *args, **kwargs)
-                    success = True
-                except:
-                    success = False
-                    if onResult is None:
-                        context.call(ctx, log.err)
-                        result = None
-                    else:
-                        result = failure.Failure()
-
-                del function, args, kwargs
+                success = True
+            except:
+                success = False
+                if onResult is None:
+                    context.call(ctx, log.err)
+                    result = None
+                else:
+                    result = failure.Failure()
+            finished = now()
+
+            del function, args, kwargs
+            working.remove(ct)
+
+            waited = started - queued
+            ran = finished - started
+            stats.completed += 1
+            stats.waitTime += waited
+            stats.runTime += ran
+            if waited > stats.maxWaitTime:
+                stats.maxWaitTime = waited
+            if ran > stats.maxRunTime:
+                stats.maxRunTime = ran
 
             if onResult is not None:
                 try:
@@ -213,12 +297,88 @@ class ThreadPool:
 
             del ctx, onResult, result
 
-            with self._workerState(self.waiters, ct):
-                o = self.q.get()
+            waiters.append(ct)
+            o = self._nextWork(ct)
 
+        with self._lock:
+            self._statistics.remove(stats)
+            self._retired.add(stats)
         self.threads.remove(ct)
 
 
+    def _nextWork(self, workerThread):
+        """
+        Wait for the next work item for a worker which is in C{waiters}.
+
+        @param workerThread: The worker's thread.
+
+        @return: The work item, or L{WorkerStop} if the worker should exit,
+            either because it was told to or because it has waited
+            C{keepalive} seconds and there are more than C{min} workers.
+            The worker has been removed from C{waiters} if it should exit.
+        """
+        while True:
+            keepalive = self.keepalive
+            try:
+                if keepalive is None:
+                    o = self.q.get()
+                else:
+                    o = self.q.get(timeout=keepalive)
+            except Empty:
+                with self._lock:
+                    # Leave waiters before looking at the queue.  Either
+                    # work queued from now on finds one fewer waiter and
+                    # starts a worker to run it, or it was queued in time
+                    # for this worker to see it and stay.
+                    self.waiters.remove(workerThread)
+                    if self.workers > self.min and not self.q.qsize():
+                        self.workers -= 1
+                        return WorkerStop
+                    self.waiters.append(workerThread)
+            else:
+                if o is WorkerStop:
+                    self.waiters.remove(workerThread)
+                return o
+
+
+    def statistics(self):
+        """
+        Report on the work this threadpool has done and is doing.
+
+        The counts are gathered from each worker without stopping it, so
+        they may be very slightly out of date.
+
+        @return: A C{dict} with these keys:
+            - C{"queued"}: the number of calls waiting for a worker.
+            - C{"workers"}, C{"working"} and C{"idle"}: the number of
+              worker threads, and how many of them are running a call or
+              waiting for one.
+            - C{"completed"}: the number of calls which have run.
+            - C{"waitTime"}, C{"maxWaitTime"}: the mean and longest number
+              of seconds calls spent queued before running.
+            - C{"runTime"}, C{"maxRunTime"}: the mean and longest number of
+              seconds calls took to run.
+        @rtype: L{dict}
+        """
+        total = _WorkerStatistics()
+        with self._lock:
+            total.add(self._retired)
+            for stats in self._statistics:
+                total.add(stats)
+        completed = total.completed
+        return {
+            "queued": self.q.qsize(),
+            "workers": self.workers,
+            "working": len(self.working),
+            "idle": len(self.waiters),
+            "completed": completed,
+            "waitTime": completed and total.waitTime / completed,
+            "maxWaitTime": total.maxWaitTime,
+            "runTime": completed and total.runTime / completed,
+            "maxRunTime": total.maxRunTime,
+            }
+
+
     def stop(self):
         """
         Shutdown the threads in the threadpool.
@@ -226,9 +386,10 @@ class ThreadPool:
         self.joined = True
         self.started = False
         threads = copy.copy(self.threads)
-        while self.workers:
-            self.q.put(WorkerStop)
-            self.workers -= 1
+        with self._lock:
+            while self.workers:
+                self.q.put(WorkerStop)
+                self.workers -= 1
 
         # and let's just make sure
         # FIXME: threads that have died before calling stop() are not joined.
@@ -250,18 +411,20 @@ class ThreadPool:
         if not self.started:
             return
 
-        # Kill of some threads if we have too many.
-        while self.workers > self.max:
-            self.stopAWorker()
-        # Start some threads if we have too few.
-        while self.workers < self.min:
-            self.startAWorker()
+        with self._lock:
+            # Kill of some threads if we have too many.
+            while self.workers > self.max:
+                self.stopAWorker()
+            # Start some threads if we have too few.
+            while self.workers < self.min:
+                self.startAWorker()
         # Start some threads if there is a need.
         self._startSomeWorkers()
 
 
     def dumpStats(self):
-        log.msg('queue: %s'   % self.q.queue)
+        log.msg('queue: %s'   % self.q.qsize())
         log.msg('waiters: %s' % self.waiters)
         log.msg('workers: %s' % self.working)
         log.msg('total: %s'   % self.threads)
+        log.msg('statistics: %s' % self.statistics())
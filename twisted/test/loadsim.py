@@ -0,0 +1,634 @@
+# -*- test-case-name: twisted.test.test_loadsim -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A deterministic load simulation for server protocols.
+
+L{Simulation} connects any number of scripted clients to the protocols built
+by a server's L{IProtocolFactory} over in-memory connections.  Clients arrive
+at random, and the bytes sent each way are delayed by a random network
+latency, but every random choice is made by a generator with a fixed seed and
+time is kept by a L{task.Clock}, so a simulation runs the same way every time
+without any sockets or real delays.  The time the server's protocols spend
+handling each event is measured, to give the processor cost per request.
+
+For example, to measure the cost of a L{twisted.web.server.Site}::
+
+    site = Site(resource)
+    sim = Simulation(site, seed=1,
+                     latency=lambda random: random.expovariate(1 / 0.02))
+    site._reactor = sim.clock
+    request = b"GET / HTTP/1.1\\r\\nHost: example.com\\r\\n\\r\\n"
+    sim.arrive(1000, 200, lambda: ScriptedClient([request] * 5,
+                                                 httpResponseLength))
+    sim.run()
+    print(sim.report())
+"""
+
+from __future__ import division, absolute_import
+
+import random
+
+from zope.interface import implementer
+
+from twisted.internet import error, interfaces, task
+from twisted.internet._instrumentation import LatencyHistogram, _now
+from twisted.internet.address import IPv4Address
+from twisted.internet.protocol import Protocol
+from twisted.protocols.policies import TimeoutMixin
+from twisted.python import log, reflect
+from twisted.python.failure import Failure
+
+
+
+@implementer(interfaces.ITransport, interfaces.IConsumer)
+class _SimulatedTransport(object):
+    """
+    One end of an in-memory connection in a L{Simulation}.
+
+    Writes are never buffered or refused: a streaming producer registered
+    with the transport is never paused, and a pull producer is asked for more
+    data on every step of the clock until it is unregistered.
+
+    @ivar simulation: The L{Simulation} this transport is part of.
+
+    @ivar protocol: The protocol connected to this end.
+
+    @ivar peer: The L{_SimulatedTransport} at the other end.
+
+    @ivar isServer: Whether C{protocol} is a server protocol.
+
+    @ivar disconnecting: Whether C{loseConnection} has been called.
+
+    @ivar disconnected: Whether C{protocol} has been told the connection was
+        lost.
+
+    @ivar producer: The registered producer, or C{None}.
+
+    @ivar _lastDelivery: The time the last data written to this transport is
+        due to arrive at the other end; later writes arrive no sooner, so
+        that they arrive in order.
+    """
+    disconnecting = False
+    disconnected = False
+    producer = None
+    _lastDelivery = 0.0
+
+    def __init__(self, simulation, protocol, isServer, hostAddress,
+                 peerAddress):
+        self.simulation = simulation
+        self.protocol = protocol
+        self.isServer = isServer
+        self.hostAddress = hostAddress
+        self.peerAddress = peerAddress
+
+
+    def write(self, data):
+        """
+        Send C{data} to the other end, unless the connection is closing.
+        """
+        if data and not (self.disconnecting or self.disconnected):
+            self.simulation._send(self, data)
+
+
+    def writeSequence(self, data):
+        """
+        Send the concatenation of C{data} to the other end.
+        """
+        self.write(b"".join(data))
+
+
+    def loseConnection(self):
+        """
+        Close the connection once everything written has arrived.
+        """
+        if not (self.disconnecting or self.disconnected):
+            self.disconnecting = True
+            self.simulation._close(self)
+
+
+    abortConnection = loseConnection
+
+
+    def getPeer(self):
+        return self.peerAddress
+
+
+    def getHost(self):
+        return self.hostAddress
+
+
+    def logPrefix(self):
+        return "loadsim"
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        Register a producer.
+
+        @see: L{interfaces.IConsumer.registerProducer}
+        """
+        if self.producer is not None:
+            raise RuntimeError("Cannot register producer %s, because producer "
+                               "%s was never unregistered." % (
+                                   producer, self.producer))
+        self.producer = producer
+        if not streaming:
+            self.simulation.clock.callLater(0, self._pull, producer)
+
+
+    def unregisterProducer(self):
+        """
+        Forget the registered producer.
+
+        @see: L{interfaces.IConsumer.unregisterProducer}
+        """
+        self.producer = None
+
+
+    def _pull(self, producer):
+        """
+        Ask a pull producer for more data, and ask again later if it is still
+        registered.
+        """
+        if self.producer is producer and not self.disconnected:
+            self.simulation._dispatch(self, producer.resumeProducing)
+            if self.producer is producer:
+                self.simulation.clock.callLater(0, self._pull, producer)
+
+
+
+class Simulation(object):
+    """
+    A simulation of clients connecting to a server.
+
+    @ivar factory: The L{IProtocolFactory} which builds the server protocols.
+
+    @ivar clock: The L{task.Clock} which keeps the simulated time.  Server
+        protocols which use L{TimeoutMixin} have their timeouts scheduled on
+        it, and anything else which accepts a clock may be given it.
+
+    @ivar random: The C{random.Random} instance used for every random choice
+        the simulation makes.
+
+    @ivar connections: The number of connections made.
+
+    @ivar openConnections: The number of connections which are still open.
+
+    @ivar peakConnections: The most connections which were open at once.
+
+    @ivar requests: The number of responses clients have received.
+
+    @ivar failed: The number of requests whose connections were lost before
+        a response arrived.
+
+    @ivar responseTimes: A L{LatencyHistogram} of the simulated time between
+        clients sending a request and the response arriving.
+
+    @ivar cpu: A C{dict} mapping the fully qualified names of server protocol
+        classes to C{[calls, seconds]} lists: the number of events protocols
+        of that class handled, and the real time they took.
+
+    @ivar clientTime: The real time client protocols took handling events.
+
+    @ivar elapsed: The simulated time the last call to L{run} covered.
+
+    @ivar _latency: A one-argument callable which is passed C{random} and
+        returns the one-way network latency in seconds for some data.
+
+    @ivar _arrivals: The number of connections still to arrive.
+
+    @ivar _writes: C{(transport, data)} pairs for the writes made by the
+        protocol method being measured by L{_dispatch}, with C{None} for the
+        data if it closed the connection, which are scheduled once it returns
+        so that the cost of scheduling them is not counted; or C{None} if no
+        method is being measured.
+
+    @ivar _now: A no-argument callable returning the current real time in
+        seconds, used to measure C{cpu} and C{clientTime}.
+    """
+
+    _now = staticmethod(_now)
+
+    def __init__(self, factory, seed=0, latency=0.0, clock=None, port=80):
+        """
+        @param factory: See C{factory}.
+
+        @param seed: The seed for C{random}.
+
+        @param latency: The one-way network latency in seconds, or a
+            one-argument callable which is passed C{random} and returns the
+            latency for each write.
+
+        @param clock: See C{clock}.  A new L{task.Clock} is used if it is
+            C{None}.
+
+        @param port: The port number of the server's address.
+        """
+        if clock is None:
+            clock = task.Clock()
+        if not callable(latency):
+            constant = latency
+            latency = lambda random: constant
+        self.factory = factory
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.connections = 0
+        self.openConnections = 0
+        self.peakConnections = 0
+        self.requests = 0
+        self.failed = 0
+        self.responseTimes = LatencyHistogram()
+        self.cpu = {}
+        self.clientTime = 0.0
+        self.elapsed = 0.0
+        self._latency = latency
+        self._arrivals = 0
+        self._writes = None
+        self._serverAddress = IPv4Address("TCP", "10.0.0.1", port)
+
+
+    def connect(self, clientProtocol):
+        """
+        Connect a client protocol to a new server protocol.
+
+        @param clientProtocol: The client's L{IProtocol} provider.  It can
+            find this simulation through its transport's C{simulation}
+            attribute.
+
+        @return: The server protocol, or C{None} if the factory refused the
+            connection.
+        """
+        self.connections += 1
+        n = self.connections
+        clientAddress = IPv4Address(
+            "TCP", "10.%d.%d.%d" % ((n >> 16) & 255, (n >> 8) & 255, n & 255),
+            1024 + n % 60000)
+        before = self._now()
+        serverProtocol = self.factory.buildProtocol(clientAddress)
+        self._account(serverProtocol, self._now() - before)
+        if serverProtocol is None:
+            return None
+        if isinstance(serverProtocol, TimeoutMixin):
+            serverProtocol.timeoutClock = self.clock
+        serverTransport = _SimulatedTransport(
+            self, serverProtocol, True, self._serverAddress, clientAddress)
+        clientTransport = _SimulatedTransport(
+            self, clientProtocol, False, clientAddress, self._serverAddress)
+        serverTransport.peer = clientTransport
+        clientTransport.peer = serverTransport
+        self.openConnections += 1
+        self.peakConnections = max(self.peakConnections, self.openConnections)
+        self._dispatch(serverTransport, serverProtocol.makeConnection,
+                       serverTransport)
+        self._dispatch(clientTransport, clientProtocol.makeConnection,
+                       clientTransport)
+        return serverProtocol
+
+
+    def arrive(self, count, rate, clientFactory):
+        """
+        Connect C{count} clients, arriving at random at an average of C{rate}
+        a second, starting now.
+
+        @param clientFactory: A no-argument callable returning the protocol
+            for each client.
+        """
+        self._arrivals += count
+        self._scheduleArrival(count, rate, clientFactory)
+
+
+    def _scheduleArrival(self, count, rate, clientFactory):
+        """
+        Schedule the next of C{count} arrivals.
+        """
+        if count:
+            self.clock.callLater(self.random.expovariate(rate), self._arrive,
+                                 count, rate, clientFactory)
+
+
+    def _arrive(self, count, rate, clientFactory):
+        """
+        Connect a client, and schedule the next arrival.
+        """
+        self._arrivals -= 1
+        self.connect(clientFactory())
+        self._scheduleArrival(count - 1, rate, clientFactory)
+
+
+    def recordResponse(self, responseTime):
+        """
+        Record that a client received a response.
+
+        @param responseTime: The simulated time since it sent the request.
+        """
+        self.requests += 1
+        self.responseTimes.record(responseTime)
+
+
+    def recordFailure(self):
+        """
+        Record that a client's connection was lost before it received a
+        response.
+        """
+        self.failed += 1
+
+
+    def _send(self, transport, data):
+        """
+        Deliver data written to C{transport} to the other end, after the
+        network latency but not before data written earlier.
+        """
+        if self._writes is not None:
+            self._writes.append((transport, data))
+            return
+        now = self.clock.seconds()
+        when = max(now + self._latency(self.random), transport._lastDelivery)
+        transport._lastDelivery = when
+        self.clock.callLater(when - now, self._receive, transport.peer, data)
+
+
+    def _receive(self, transport, data):
+        """
+        Give data to the protocol connected to C{transport}.
+        """
+        if not transport.disconnected:
+            self._dispatch(transport, transport.protocol.dataReceived, data)
+
+
+    def _close(self, transport):
+        """
+        Close C{transport}'s connection once the data written to it has
+        arrived.
+        """
+        if self._writes is not None:
+            self._writes.append((transport, None))
+            return
+        now = self.clock.seconds()
+        when = max(now + self._latency(self.random), transport._lastDelivery)
+        self.clock.callLater(when - now, self._disconnect, transport,
+                             Failure(error.ConnectionDone()))
+
+
+    def _disconnect(self, transport, reason):
+        """
+        Tell the protocols at both ends of C{transport}'s connection that it
+        has been lost, if they have not been told already.
+        """
+        if transport.disconnected:
+            return
+        self.openConnections -= 1
+        for end in (transport, transport.peer):
+            end.disconnected = True
+            end.producer = None
+        for end in (transport, transport.peer):
+            self._dispatch(end, end.protocol.connectionLost, reason)
+
+
+    def _dispatch(self, transport, f, *args):
+        """
+        Call a method of the protocol connected to C{transport}, measuring
+        the time it takes.
+
+        If it raises an exception the exception is logged and the connection
+        is lost, as it would be by the reactor.
+        """
+        outer, self._writes = self._writes, []
+        before = self._now()
+        try:
+            f(*args)
+        except:
+            failed = Failure()
+        else:
+            failed = None
+        elapsed = self._now() - before
+        if transport.isServer:
+            self._account(transport.protocol, elapsed)
+        else:
+            self.clientTime += elapsed
+        writes, self._writes = self._writes, outer
+        for end, data in writes:
+            if data is None:
+                self._close(end)
+            else:
+                self._send(end, data)
+        if failed is not None:
+            log.err(failed, "Unhandled error in %r" % (transport.protocol,))
+            self._disconnect(transport, failed)
+
+
+    def _account(self, protocol, elapsed):
+        """
+        Add the time a server protocol took to C{cpu}.
+        """
+        name = reflect.qual(protocol.__class__)
+        try:
+            stats = self.cpu[name]
+        except KeyError:
+            stats = self.cpu[name] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+    def run(self, until=None):
+        """
+        Run the simulation until every client has arrived and every
+        connection has been closed, or nothing more will happen.
+
+        The server factory is started first and stopped afterwards.
+
+        @param until: The most simulated seconds to run for, or C{None}.
+        """
+        clock = self.clock
+        started = clock.seconds()
+        self.factory.doStart()
+        try:
+            while self._arrivals or self.openConnections:
+                calls = clock.getDelayedCalls()
+                if not calls:
+                    break
+                nextTime = calls[0].getTime()
+                if until is not None and nextTime > started + until:
+                    clock.advance(started + until - clock.seconds())
+                    break
+                clock.advance(max(0, nextTime - clock.seconds()))
+        finally:
+            self.factory.doStop()
+        self.elapsed = clock.seconds() - started
+
+
+    def summary(self):
+        """
+        Summarize the simulation.
+
+        @return: A C{dict} with the keys:
+            - C{"elapsed"}, C{"connections"}, C{"peakConnections"},
+              C{"requests"} and C{"failed"}: see the attributes of the same
+              names.
+            - C{"throughput"}: responses per simulated second.
+            - C{"responseTime"}: the L{LatencyHistogram.summary} of
+              C{responseTimes}.
+            - C{"cpu"}: a C{dict} mapping the names of server protocol
+              classes to C{dict}s of C{"calls"}, C{"time"} and
+              C{"perRequest"}.
+            - C{"cpuPerRequest"}: the real time all server protocols took per
+              response.
+        """
+        requests = self.requests
+        cpu = {}
+        total = 0.0
+        for name, (calls, seconds) in self.cpu.items():
+            total += seconds
+            cpu[name] = {
+                "calls": calls,
+                "time": seconds,
+                "perRequest": requests and seconds / requests,
+                }
+        return {
+            "elapsed": self.elapsed,
+            "connections": self.connections,
+            "peakConnections": self.peakConnections,
+            "requests": requests,
+            "failed": self.failed,
+            "throughput": self.elapsed and requests / self.elapsed,
+            "responseTime": self.responseTimes.summary(),
+            "cpu": cpu,
+            "cpuPerRequest": requests and total / requests,
+            }
+
+
+    def report(self):
+        """
+        Format the summary as text.
+
+        @rtype: C{str}
+        """
+        summary = self.summary()
+        response = summary["responseTime"]
+        lines = [
+            "%d connections (peak %d), %d requests, %d failed in %.3fs "
+            "simulated" % (
+                summary["connections"], summary["peakConnections"],
+                summary["requests"], summary["failed"], summary["elapsed"]),
+            "throughput: %.1f requests/s" % (summary["throughput"],),
+            "response time: mean %.6fs p50 %.6fs p99 %.6fs max %.6fs" % (
+                response["mean"], response["p50"], response["p99"],
+                response["max"]),
+            "server time per request: %.3f usec" % (
+                summary["cpuPerRequest"] * 1e6,),
+            ]
+        for name, stats in sorted(summary["cpu"].items()):
+            lines.append("  %s: %d calls, %.6fs, %.3f usec/request" % (
+                name, stats["calls"], stats["time"],
+                stats["perRequest"] * 1e6))
+        return "\n".join(lines)
+
+
+
+class ScriptedClient(Protocol):
+    """
+    A client which sends a series of requests over one connection, waiting
+    for the response to each before sending the next, and then closes the
+    connection.
+
+    @ivar requests: The requests still to send, as C{bytes}.
+
+    @ivar responseLength: A one-argument callable which is passed the bytes
+        received since the last response and returns the length of the
+        response at the start of them, or C{None} if it is incomplete.
+
+    @ivar thinkTime: A one-argument callable which is passed the
+        simulation's C{random} and returns the number of seconds to wait
+        after a response before sending the next request, or C{None} not to
+        wait.
+
+    @ivar _sentAt: The simulated time the request awaiting a response was
+        sent, or C{None}.
+    """
+    _sentAt = None
+
+    def __init__(self, requests, responseLength, thinkTime=None):
+        self.requests = list(requests)
+        self.responseLength = responseLength
+        self.thinkTime = thinkTime
+        self._buffer = b""
+
+
+    def connectionMade(self):
+        self._sendNext()
+
+
+    def _sendNext(self):
+        """
+        Send the next request, or close the connection if there are none
+        left.
+        """
+        if self.transport.disconnected:
+            return
+        if not self.requests:
+            self.transport.loseConnection()
+            return
+        self._sentAt = self.transport.simulation.clock.seconds()
+        self.transport.write(self.requests.pop(0))
+
+
+    def dataReceived(self, data):
+        simulation = self.transport.simulation
+        self._buffer += data
+        while self._sentAt is not None:
+            length = self.responseLength(self._buffer)
+            if length is None:
+                return
+            self._buffer = self._buffer[length:]
+            simulation.recordResponse(
+                simulation.clock.seconds() - self._sentAt)
+            self._sentAt = None
+            if self.thinkTime is None:
+                self._sendNext()
+            else:
+                simulation.clock.callLater(
+                    self.thinkTime(simulation.random), self._sendNext)
+
+
+    def connectionLost(self, reason):
+        if self._sentAt is not None:
+            self._sentAt = None
+            self.transport.simulation.recordFailure()
+
+
+
+def lineResponseLength(data, delimiter=b"\r\n"):
+    """
+    Find a response which is one line, for L{ScriptedClient}.
+
+    @return: The length of the first line of C{data}, including its
+        delimiter, or C{None} if there isn't a whole line.
+    """
+    index = data.find(delimiter)
+    if index == -1:
+        return None
+    return index + len(delimiter)
+
+
+
+def httpResponseLength(data):
+    """
+    Find an HTTP response with a C{Content-Length} header, for
+    L{ScriptedClient}.  Chunked responses are not supported.
+
+    @return: The length of the first response in C{data}, or C{None} if it
+        isn't all there.
+    """
+    end = data.find(b"\r\n\r\n")
+    if end == -1:
+        return None
+    length = 0
+    for line in data[:end].split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value.strip())
+    total = end + 4 + length
+    if len(data) < total:
+        return None
+    return total
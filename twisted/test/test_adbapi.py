@@ -11,8 +11,9 @@ import os, stat
 import types
 
 from twisted.enterprise.adbapi import ConnectionPool, ConnectionLost
-from twisted.enterprise.adbapi import Connection, Transaction
-from twisted.internet import reactor, defer, interfaces
+from twisted.enterprise.adbapi import Connection, Transaction, WriteBatcher
+from twisted.enterprise.adbapi import RoutingConnectionPool
+from twisted.internet import reactor, defer, interfaces, task
 from twisted.python.failure import Failure
 from twisted.python.reflect import requireModule
 
@@ -436,6 +437,35 @@ class SQLiteConnector(DBTestConnector):
         kw = {'database': self.database, 'cp_max': 1}
         return args, kw
 
+class SQLite3Connector(DBTestConnector):
+    """
+    Connector that uses the stdlib SQLite.
+    """
+    TEST_PREFIX = 'SQLite3'
+
+    escape_slashes = False
+
+    num_iterations = 1 # slow
+
+    def can_connect(self):
+        if requireModule('sqlite3') is None:
+            return False
+        else:
+            return True
+
+    def startDB(self):
+        self.database = os.path.join(self.DB_DIR, self.DB_NAME)
+        if os.path.exists(self.database):
+            os.unlink(self.database)
+
+    def getPoolArgs(self):
+        args = ('sqlite3',)
+        # Connections are closed by the reactor thread, not the pool thread
+        # which opened them.
+        kw = {'database': self.database, 'check_same_thread': False,
+              'cp_max': 1}
+        return args, kw
+
 class PyPgSQLConnector(DBTestConnector):
     TEST_PREFIX = "PyPgSQL"
 
@@ -553,20 +583,23 @@ def makeSQLTests(base, suffix, globals):
     @param suffix: A suffix used to create test case names. Prefixes
                    are defined in the DBConnector subclasses.
     """
-    connectors = [GadflyConnector, SQLiteConnector, PyPgSQLConnector,
-                  PsycopgConnector, MySQLConnector, FirebirdConnector]
+    connectors = [GadflyConnector, SQLiteConnector, SQLite3Connector,
+                  PyPgSQLConnector, PsycopgConnector, MySQLConnector,
+                  FirebirdConnector]
     for connclass in connectors:
         name = connclass.TEST_PREFIX + suffix
         klass = types.ClassType(name, (connclass, base, unittest.TestCase),
                                 base.__dict__)
         globals[name] = klass
 
-# GadflyADBAPITestCase SQLiteADBAPITestCase PyPgSQLADBAPITestCase
-# PsycopgADBAPITestCase MySQLADBAPITestCase FirebirdADBAPITestCase
+# GadflyADBAPITestCase SQLiteADBAPITestCase SQLite3ADBAPITestCase
+# PyPgSQLADBAPITestCase PsycopgADBAPITestCase MySQLADBAPITestCase
+# FirebirdADBAPITestCase
 makeSQLTests(ADBAPITestBase, 'ADBAPITestCase', globals())
 
-# GadflyReconnectTestCase SQLiteReconnectTestCase PyPgSQLReconnectTestCase
-# PsycopgReconnectTestCase MySQLReconnectTestCase FirebirdReconnectTestCase
+# GadflyReconnectTestCase SQLiteReconnectTestCase SQLite3ReconnectTestCase
+# PyPgSQLReconnectTestCase PsycopgReconnectTestCase MySQLReconnectTestCase
+# FirebirdReconnectTestCase
 makeSQLTests(ReconnectTestBase, 'ReconnectTestCase', globals())
 
 
@@ -819,3 +852,801 @@ class ConnectionPoolTestCase(unittest.TestCase):
         pool.close()
         # But not anymore.
         self.assertFalse(reactor.triggers)
+
+
+
+class RowConsumer(object):
+    """
+    An L{IConsumer} which records the batches of rows written to it.
+
+    @ivar batches: The batches written.
+    @ivar producer: The registered producer, or C{None}.
+    @ivar streaming: Whether the registered producer is streaming.
+    @ivar unregistered: Whether the producer has been unregistered.
+    @ivar onWrite: A callable to call with each batch after recording it, or
+        C{None}.
+    """
+    producer = None
+    streaming = None
+    unregistered = False
+    onWrite = None
+
+    def __init__(self):
+        self.batches = []
+
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+        self.streaming = streaming
+
+
+    def unregisterProducer(self):
+        self.unregistered = True
+
+
+    def write(self, batch):
+        self.batches.append(batch)
+        if self.onWrite is not None:
+            self.onWrite(batch)
+
+
+
+class RunQueryStreamTestCase(SQLite3Connector, unittest.TestCase):
+    """
+    Tests for L{ConnectionPool.runQueryStream}.
+    """
+    if interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    rows = 250
+
+    def extraSetUp(self):
+        """
+        Set up a database with a table of C{rows} rows, and a pool of one
+        connection to it.
+        """
+        self.startDB()
+        self.dbpool = self.makePool()
+        self.dbpool.start()
+        self.addCleanup(self.dbpool.close)
+        self.consumer = RowConsumer()
+        d = self.dbpool.runOperation(simple_table_schema)
+        d.addCallback(lambda ignored: self.dbpool.runInteraction(
+            lambda trans: trans.executemany(
+                "insert into simple(x) values(?)",
+                [(i,) for i in range(self.rows)])))
+        return d
+
+
+    def stream(self, **kwargs):
+        """
+        Stream the rows of the table to C{self.consumer}.
+        """
+        return self.dbpool.runQueryStream(
+            self.consumer, "select x from simple order by x", **kwargs)
+
+
+    def test_batches(self):
+        """
+        The rows are written to the consumer in batches of C{batchSize} by a
+        streaming producer, which is unregistered once they all have been,
+        and the L{Deferred} fires with the number of rows.
+        """
+        d = self.stream(batchSize=100)
+        self.assertTrue(self.consumer.streaming)
+        def cbStreamed(count):
+            self.assertEqual(count, self.rows)
+            self.assertTrue(self.consumer.unregistered)
+            self.assertEqual([len(batch) for batch in self.consumer.batches],
+                             [100, 100, 50])
+            self.assertEqual(
+                [row[0] for batch in self.consumer.batches for row in batch],
+                list(range(self.rows)))
+        return d.addCallback(cbStreamed)
+
+
+    def test_args(self):
+        """
+        C{args} is passed to the cursor's C{execute} method along with the
+        query.
+        """
+        d = self.dbpool.runQueryStream(
+            self.consumer, "select x from simple where x < ?", (10,))
+        d.addCallback(self.assertEqual, 10)
+        return d
+
+
+    def test_transform(self):
+        """
+        C{transform} is applied to each batch before it is written.
+        """
+        d = self.stream(batchSize=100, transform=len)
+        d.addCallback(lambda ignored: self.assertEqual(
+            self.consumer.batches, [100, 100, 50]))
+        return d
+
+
+    def test_pause(self):
+        """
+        No more rows are written while the consumer has paused the producer.
+        """
+        def pause(batch):
+            self.consumer.producer.pauseProducing()
+        self.consumer.onWrite = pause
+        d = self.stream(batchSize=100)
+        paused = task.deferLater(reactor, 0.1, lambda: None)
+        def cbPaused(ignored):
+            self.assertEqual(len(self.consumer.batches), 1)
+            self.consumer.onWrite = None
+            self.consumer.producer.resumeProducing()
+            return d
+        paused.addCallback(cbPaused)
+        paused.addCallback(self.assertEqual, self.rows)
+        return paused
+
+
+    def test_stop(self):
+        """
+        If the consumer stops the producer, no more rows are written, the
+        L{Deferred} fails, and the connection is freed for other queries.
+        """
+        def stop(batch):
+            self.consumer.producer.stopProducing()
+        self.consumer.onWrite = stop
+        d = self.stream(batchSize=100)
+        d = self.assertFailure(d, Exception)
+        d.addCallback(lambda ignored: self.dbpool.runQuery(
+            "select count(*) from simple"))
+        def cbQueried(result):
+            self.assertEqual(result[0][0], self.rows)
+            self.assertEqual(len(self.consumer.batches), 1)
+        return d.addCallback(cbQueried)
+
+
+    def test_queryFails(self):
+        """
+        If the query fails, the producer is unregistered and the
+        L{Deferred} fails.
+        """
+        d = self.dbpool.runQueryStream(self.consumer, "select * from NOTABLE")
+        d = self.assertFailure(d, self.dbpool.dbapi.OperationalError)
+        d.addCallback(lambda ignored: self.assertTrue(
+            self.consumer.unregistered))
+        return d
+
+
+
+class PoolStatisticsTestCase(SQLite3Connector, unittest.TestCase):
+    """
+    Tests for L{ConnectionPool.statistics} and the maintenance of idle
+    connections.
+    """
+    if interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    def extraSetUp(self):
+        self.startDB()
+        self.opened = []
+
+
+    def startPool(self, **kw):
+        """
+        Make and start a pool of at most one connection, which is closed
+        after the test.
+        """
+        pool = self.makePool(cp_min=1, cp_openfun=self.opened.append, **kw)
+        pool.start()
+        self.addCleanup(pool.close)
+        return pool
+
+
+    def waitFor(self, condition):
+        """
+        Return a L{defer.Deferred} which fires once C{condition()} is true,
+        checking every hundredth of a second, for up to five seconds.
+        """
+        def check(remaining):
+            if condition():
+                return None
+            if not remaining:
+                self.fail("Condition never became true")
+            return task.deferLater(reactor, 0.01, check, remaining - 1)
+        return check(500)
+
+
+    def test_statistics(self):
+        """
+        L{ConnectionPool.statistics} reports how long calls waited for and
+        held connections, and how long each statement took.
+        """
+        pool = self.startPool()
+        sql = "select count(*) from simple"
+        d = pool.runOperation(simple_table_schema)
+        d.addCallback(lambda ignored: pool.runQuery(sql))
+        d.addCallback(lambda ignored: pool.runQuery(sql))
+        def cbQueried(ignored):
+            stats = pool.statistics()
+            self.assertEqual(stats["connections"], 1)
+            self.assertEqual(stats["waitTime"]["count"], 3)
+            self.assertEqual(stats["inUse"]["count"], 3)
+            self.assertEqual(stats["queries"][sql]["count"], 2)
+            self.assertEqual(
+                stats["queries"][simple_table_schema]["count"], 1)
+            self.assertEqual(stats["threads"]["completed"], 3)
+            self.assertEqual(stats["pings"], 0)
+        return d.addCallback(cbQueried)
+
+
+    def test_maxQueries(self):
+        """
+        Only the first C{maxQueries} different statements are timed.
+        """
+        pool = self.startPool()
+        pool._statistics.maxQueries = 1
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: pool.runQuery("select 2"))
+        d.addCallback(lambda ignored: self.assertEqual(
+            list(pool.statistics()["queries"]), ["select 1"]))
+        return d
+
+
+    def test_maxLifetime(self):
+        """
+        A connection older than C{cp_max_lifetime} is replaced before it is
+        used.
+        """
+        pool = self.makePool(cp_min=1, cp_max_lifetime=0,
+                             cp_openfun=self.opened.append)
+        pool.start()
+        # Check that the connection is replaced when it is used, not by the
+        # maintenance timer.
+        pool._maintenance.stop()
+        pool._maintenance = None
+        self.addCleanup(pool.close)
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: pool.runQuery("select 1"))
+        def cbQueried(ignored):
+            self.assertEqual(len(self.opened), 2)
+            self.assertEqual(pool.statistics()["recycled"], 1)
+        return d.addCallback(cbQueried)
+
+
+    def test_maxLifetimeIdle(self):
+        """
+        An idle connection older than C{cp_max_lifetime} is replaced by the
+        maintenance timer.
+        """
+        pool = self.startPool(cp_max_lifetime=0.05)
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: self.waitFor(
+            lambda: len(self.opened) >= 2))
+        d.addCallback(lambda ignored: self.assertTrue(
+            pool.statistics()["recycled"] >= 1))
+        return d
+
+
+    def test_ping(self):
+        """
+        A connection which has been idle for C{cp_ping_interval} is checked
+        with C{cp_good_sql} by the maintenance timer.
+        """
+        pool = self.startPool(cp_ping_interval=0.05)
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: self.waitFor(
+            lambda: pool.statistics()["pings"] >= 1))
+        def cbPinged(ignored):
+            stats = pool.statistics()
+            self.assertEqual(stats["pingFailures"], 0)
+            self.assertEqual(len(self.opened), 1)
+        return d.addCallback(cbPinged)
+
+
+    def test_pingFailed(self):
+        """
+        A connection which fails its check is replaced, so the next query
+        succeeds.
+        """
+        pool = self.startPool(cp_ping_interval=0.05)
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: self.opened[0].close())
+        d.addCallback(lambda ignored: self.waitFor(
+            lambda: len(self.opened) >= 2))
+        def cbReplaced(ignored):
+            self.assertTrue(pool.statistics()["pingFailures"] >= 1)
+            self.assertTrue(self.flushLoggedErrors(pool.dbapi.Error))
+            return pool.runQuery("select 1")
+        d.addCallback(cbReplaced)
+        d.addCallback(self.assertEqual, [(1,)])
+        return d
+
+
+    def test_checkBeforeUse(self):
+        """
+        A connection found due for a check by the maintenance timer, whose
+        check was taken by another thread, is checked before it is next
+        used.
+        """
+        pool = self.startPool(cp_ping_interval=0)
+        pool._maintenance.stop()
+        pool._maintenance = None
+        d = pool.runWithConnection(lambda conn: pool.threadID())
+        def cbThread(tid):
+            pool._checksDue.add(tid)
+            return pool.runQuery("select 1")
+        d.addCallback(cbThread)
+        def cbQueried(result):
+            self.assertEqual(result, [(1,)])
+            self.assertEqual(pool.statistics()["pings"], 1)
+            self.assertEqual(pool._checksDue, set())
+        return d.addCallback(cbQueried)
+
+
+    def test_oneCheckPerConnection(self):
+        """
+        The maintenance timer sends one check for each idle connection which
+        is due, however many times it finds the connection due before the
+        check is run.
+        """
+        pool = self.startPool(cp_ping_interval=0)
+        pool._maintenance.stop()
+        pool._maintenance = None
+        sent = []
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: self.waitFor(
+            lambda: pool.threadpool.waiters))
+        def cbIdle(ignored):
+            pool.threadpool.callInThread = sent.append
+            pool._maintain()
+            pool._maintain()
+            self.assertEqual(sent, [pool._checkConnection])
+            self.assertEqual(
+                pool._checksDue,
+                set([pool.threadpool.waiters[0].ident]))
+        return d.addCallback(cbIdle)
+
+
+    def test_idleTimeout(self):
+        """
+        Threads beyond C{cp_min} exit after being idle for
+        C{cp_idle_timeout}, and their connections are closed.
+        """
+        pool = self.makePool(cp_min=0, cp_max=2, cp_idle_timeout=0.05)
+        pool.start()
+        self.addCleanup(pool.close)
+        d = pool.runQuery("select 1")
+        d.addCallback(lambda ignored: self.assertEqual(
+            pool.statistics()["connections"], 1))
+        d.addCallback(lambda ignored: self.waitFor(
+            lambda: not pool.connections))
+        d.addCallback(lambda ignored: self.assertEqual(
+            pool.threadpool.workers, 0))
+        return d
+
+
+
+class WriteBatcherTestCase(SQLite3Connector, unittest.TestCase):
+    """
+    Tests for L{WriteBatcher}.
+    """
+    if interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    insert = "insert into simple(x) values(?)"
+
+    def extraSetUp(self):
+        self.startDB()
+        self.dbpool = self.makePool(cp_min=1)
+        self.dbpool.start()
+        self.addCleanup(self.dbpool.close)
+        self.clock = task.Clock()
+        self.batcher = WriteBatcher(
+            self.dbpool, maxRows=3, delay=0.5, clock=self.clock)
+        return self.dbpool.runOperation(simple_table_schema)
+
+
+    def calls(self):
+        """
+        Return the number of calls the pool has run.
+        """
+        return self.dbpool.statistics()["inUse"]["count"]
+
+
+    def rows(self, ignored=None):
+        """
+        Return the values in the table.
+        """
+        d = self.dbpool.runQuery("select x from simple order by x")
+        return d.addCallback(lambda rows: [row[0] for row in rows])
+
+
+    def test_delay(self):
+        """
+        Operations using the same statement are run together, in one
+        interaction, once the first has waited C{delay} seconds.
+        """
+        calls = self.calls()
+        ds = [self.batcher.runOperation(self.insert, (i,)) for i in (1, 2)]
+        self.clock.advance(0.4)
+        self.assertEqual(self.calls(), calls)
+        self.assertEqual(self.clock.getDelayedCalls()[0].getTime(), 0.5)
+        self.clock.advance(0.1)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        d = defer.gatherResults(ds)
+        d.addCallback(self.assertEqual, [None, None])
+        d.addCallback(
+            lambda ignored: self.assertEqual(self.calls(), calls + 1))
+        d.addCallback(self.rows)
+        d.addCallback(self.assertEqual, [1, 2])
+        return d
+
+
+    def test_maxRows(self):
+        """
+        A group is run as soon as it has C{maxRows} operations, without
+        waiting.
+        """
+        ds = [self.batcher.runOperation(self.insert, (i,)) for i in range(4)]
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        d = defer.gatherResults(ds[:3])
+        d.addCallback(self.rows)
+        d.addCallback(self.assertEqual, [0, 1, 2])
+        d.addCallback(lambda ignored: self.clock.advance(0.5))
+        d.addCallback(lambda ignored: ds[3])
+        d.addCallback(self.rows)
+        d.addCallback(self.assertEqual, [0, 1, 2, 3])
+        return d
+
+
+    def test_statements(self):
+        """
+        Operations using different statements are grouped separately.
+        """
+        calls = self.calls()
+        ds = [self.batcher.runOperation(self.insert, (1,)),
+              self.batcher.runOperation(
+                  "insert into simple(x) values(? + 10)", (1,))]
+        self.clock.advance(0.5)
+        d = defer.gatherResults(ds)
+        d.addCallback(
+            lambda ignored: self.assertEqual(self.calls(), calls + 2))
+        d.addCallback(self.rows)
+        d.addCallback(self.assertEqual, [1, 11])
+        return d
+
+
+    def test_order(self):
+        """
+        A group isn't started until the group before it using the same
+        statement has finished, even if that failed, so operations using the
+        same statement are run in the order they were made whatever the
+        size of the pool.  Groups using other statements don't wait.
+        """
+        started = []
+        class Pool(object):
+            def runInteraction(self, interaction, sql, params):
+                d = defer.Deferred()
+                started.append((sql, params, d))
+                return d
+        batcher = WriteBatcher(Pool(), maxRows=1, clock=self.clock)
+        ds = [batcher.runOperation(self.insert, (i,)) for i in range(3)]
+        self.assertEqual([params for (sql, params, d) in started], [[(0,)]])
+        other = batcher.runOperation("delete from simple")
+        self.assertEqual(started[1][:2], ("delete from simple", [()]))
+
+        started[0][2].errback(RuntimeError())
+        self.failureResultOf(ds[0], RuntimeError)
+        self.assertEqual(started[2][:2], (self.insert, [(1,)]))
+        started[2][2].callback(None)
+        self.assertEqual(self.successResultOf(ds[1]), None)
+        self.assertEqual(started[3][:2], (self.insert, [(2,)]))
+        started[3][2].callback(None)
+        started[1][2].callback(None)
+        self.assertEqual(self.successResultOf(ds[2]), None)
+        self.assertEqual(self.successResultOf(other), None)
+        self.assertEqual(len(started), 4)
+        self.assertEqual(batcher._running, [])
+        self.assertEqual(batcher._last, {})
+
+
+    def test_failure(self):
+        """
+        If a group fails, every operation in it fails, and none of them are
+        committed.
+        """
+        ds = [self.batcher.runOperation(self.insert, (1,)),
+              self.batcher.runOperation(self.insert, (1, 2))]
+        self.clock.advance(0.5)
+        d = defer.DeferredList(ds, consumeErrors=True)
+        def cbFinished(results):
+            for success, result in results:
+                self.assertFalse(success)
+                result.trap(self.dbpool.dbapi.Error)
+            return self.rows()
+        d.addCallback(cbFinished)
+        d.addCallback(self.assertEqual, [])
+        return d
+
+
+    def test_flush(self):
+        """
+        L{WriteBatcher.flush} runs waiting groups without waiting, and fires
+        once they have finished.
+        """
+        ds = [self.batcher.runOperation(self.insert, (i,)) for i in (1, 2)]
+        d = self.batcher.flush()
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        def cbFlushed(ignored):
+            for operation in ds:
+                self.assertEqual(self.successResultOf(operation), None)
+            return self.rows()
+        d.addCallback(cbFlushed)
+        d.addCallback(self.assertEqual, [1, 2])
+        return d
+
+
+
+class CursorCacheTestCase(SQLite3Connector, unittest.TestCase):
+    """
+    Tests for the C{cp_cursor_cache} option of L{ConnectionPool}.
+    """
+    if interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    select = "select x from simple"
+
+    def extraSetUp(self):
+        self.startDB()
+
+
+    def startPool(self, **kw):
+        """
+        Make and start a pool of one connection, which is closed after the
+        test, and create the table.
+        """
+        pool = self.makePool(cp_min=1, **kw)
+        pool.start()
+        self.addCleanup(pool.close)
+        return pool.runOperation(simple_table_schema).addCallback(
+            lambda ignored: pool)
+
+
+    def cursors(self, pool):
+        """
+        Return the cursors kept by the pool's only connection.
+        """
+        [(conn, cursors)] = pool._cursorCaches.values()
+        return cursors
+
+
+    def test_disabledByDefault(self):
+        """
+        No cursors are kept unless C{cp_cursor_cache} is given.
+        """
+        d = self.startPool()
+        def cbStarted(pool):
+            return pool.runQuery(self.select).addCallback(
+                lambda ignored: self.assertEqual(pool._cursorCaches, {}))
+        return d.addCallback(cbStarted)
+
+
+    def test_reuse(self):
+        """
+        A statement run again is run with the same cursor, and the same
+        statement object as the first time.
+        """
+        first = self.select
+        second = "".join(["select x ", "from simple"])
+        self.assertIsNot(first, second)
+        d = self.startPool(cp_cursor_cache=2)
+        def cbStarted(pool):
+            d = pool.runOperation("insert into simple(x) values(1)")
+            d.addCallback(lambda ignored: pool.runQuery(first))
+            def cbFirst(rows):
+                self.assertEqual(rows, [(1,)])
+                self.cursor = self.cursors(pool)[first][1]
+                return pool.runQuery(second)
+            d.addCallback(cbFirst)
+            def cbSecond(rows):
+                self.assertEqual(rows, [(1,)])
+                sql, cursor = self.cursors(pool)[second]
+                self.assertIs(sql, first)
+                self.assertIs(cursor, self.cursor)
+            return d.addCallback(cbSecond)
+        return d.addCallback(cbStarted)
+
+
+    def test_eviction(self):
+        """
+        Once C{cp_cursor_cache} cursors are kept, the cursor of the
+        statement run least recently is closed to make room for another.
+        """
+        d = self.startPool(cp_cursor_cache=1)
+        def cbStarted(pool):
+            d = pool.runQuery(self.select)
+            def cbFirst(ignored):
+                self.cursor = self.cursors(pool)[self.select][1]
+                return pool.runQuery("select 1")
+            d.addCallback(cbFirst)
+            def cbSecond(ignored):
+                self.assertEqual(list(self.cursors(pool)), ["select 1"])
+                self.assertRaises(pool.dbapi.ProgrammingError,
+                                  self.cursor.execute, self.select)
+            return d.addCallback(cbSecond)
+        return d.addCallback(cbStarted)
+
+
+    def test_disconnect(self):
+        """
+        The cursors of a connection are forgotten when it is disconnected.
+        """
+        d = self.startPool(cp_cursor_cache=1)
+        def cbStarted(pool):
+            d = pool.runQuery(self.select)
+            d.addCallback(lambda ignored: pool.runWithConnection(
+                lambda conn: conn.reconnect()))
+            d.addCallback(
+                lambda ignored: self.assertEqual(pool._cursorCaches, {}))
+            d.addCallback(lambda ignored: pool.runQuery(self.select))
+            d.addCallback(self.assertEqual, [])
+            return d
+        return d.addCallback(cbStarted)
+
+
+
+class RoutingConnectionPoolTestCase(SQLite3Connector, unittest.TestCase):
+    """
+    Tests for L{RoutingConnectionPool} with a database for the primary and
+    one for each of two replicas, each of which knows its own name.
+    """
+    if interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    def extraSetUp(self):
+        import sqlite3
+        pools = []
+        for name in ("primary", "replica1", "replica2"):
+            database = os.path.join(self.DB_DIR, name)
+            conn = sqlite3.connect(database)
+            conn.execute("create table marker (name text)")
+            conn.execute("insert into marker(name) values(?)", (name,))
+            conn.commit()
+            conn.close()
+            pools.append(ConnectionPool(
+                "sqlite3", database, check_same_thread=False, cp_min=1,
+                cp_max=1))
+        self.router = RoutingConnectionPool(pools[0], pools[1:])
+        self.router.start()
+        self.addCleanup(self.router.close)
+
+
+    def name(self, rows):
+        """
+        Return the name in the rows of the marker table.
+        """
+        return rows[0][0]
+
+
+    def test_roundRobin(self):
+        """
+        Queries are run by each replica in turn.
+        """
+        names = []
+        query = "select name from marker"
+        d = defer.succeed(None)
+        for i in range(4):
+            d.addCallback(lambda ignored: self.router.runQuery(query))
+            d.addCallback(lambda rows: names.append(self.name(rows)))
+        d.addCallback(lambda ignored: self.assertEqual(
+            names, ["replica1", "replica2", "replica1", "replica2"]))
+        return d
+
+
+    def test_writes(self):
+        """
+        L{RoutingConnectionPool.runOperation},
+        L{RoutingConnectionPool.runInteraction} and
+        L{RoutingConnectionPool.runWithConnection} are run by the primary.
+        """
+        def name(cursor):
+            cursor.execute("select name from marker order by name")
+            return [row[0] for row in cursor.fetchall()]
+        def connectionName(conn):
+            return name(conn.cursor())
+        d = self.router.runOperation(
+            "insert into marker(name) values('written')")
+        d.addCallback(lambda ignored: self.router.runInteraction(name))
+        d.addCallback(self.assertEqual, ["primary", "written"])
+        d.addCallback(
+            lambda ignored: self.router.runWithConnection(connectionName))
+        d.addCallback(self.assertEqual, ["primary", "written"])
+        return d
+
+
+    def test_statistics(self):
+        """
+        L{RoutingConnectionPool.statistics} reports the statistics of the
+        primary and of each replica.
+        """
+        d = self.router.runQuery("select name from marker")
+        def cbQueried(ignored):
+            statistics = self.router.statistics()
+            self.assertEqual(statistics["outstanding"], [0, 0])
+            self.assertEqual(
+                [replica["inUse"]["count"]
+                 for replica in statistics["replicas"]], [1, 0])
+            self.assertEqual(statistics["primary"]["inUse"]["count"], 0)
+        return d.addCallback(cbQueried)
+
+
+
+class QueryRecordingPool(object):
+    """
+    A fake L{ConnectionPool} which records the queries it is asked to run,
+    and leaves them running until the test fires them.
+
+    @ivar queries: The L{defer.Deferred}s returned by L{runQuery}.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+
+    def runQuery(self, *args, **kw):
+        d = defer.Deferred()
+        self.queries.append(d)
+        return d
+
+
+
+class RoutingPolicyTestCase(unittest.TestCase):
+    """
+    Tests for the choice of replica made by L{RoutingConnectionPool}.
+    """
+
+    def setUp(self):
+        self.primary = QueryRecordingPool()
+        self.replicas = [QueryRecordingPool() for i in range(3)]
+
+
+    def running(self):
+        """
+        Return the number of queries each replica was asked to run.
+        """
+        return [len(replica.queries) for replica in self.replicas]
+
+
+    def test_leastLoaded(self):
+        """
+        With the C{"least-loaded"} policy, a query is run by the replica with
+        the fewest queries running, the next one along among those with as
+        few.
+        """
+        router = RoutingConnectionPool(
+            self.primary, self.replicas, "least-loaded")
+        for i in range(3):
+            router.runQuery("select 1")
+        self.assertEqual(self.running(), [1, 1, 1])
+        self.replicas[1].queries[0].callback([])
+        self.assertEqual(router._outstanding, [1, 0, 1])
+        router.runQuery("select 1")
+        self.assertEqual(self.running(), [1, 2, 1])
+        router.runQuery("select 1")
+        self.assertEqual(self.running(), [1, 2, 2])
+
+
+    def test_noReplicas(self):
+        """
+        Without replicas, queries are run by the primary.
+        """
+        router = RoutingConnectionPool(self.primary, [])
+        router.runQuery("select 1")
+        self.assertEqual(len(self.primary.queries), 1)
+
+
+    def test_unknownPolicy(self):
+        """
+        L{RoutingConnectionPool} raises L{ValueError} for a policy it doesn't
+        know.
+        """
+        self.assertRaises(ValueError, RoutingConnectionPool,
+                          self.primary, self.replicas, "random")
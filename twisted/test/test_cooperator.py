@@ -709,3 +709,174 @@ class RunStateTests(unittest.TestCase):
 
 
 
+
+
+
+class SchedulingTests(unittest.SynchronousTestCase):
+    """
+    Tests for the priorities, weights, budget and statistics of
+    L{task.Cooperator} and L{task.CooperativeTask}.
+    """
+
+    def setUp(self):
+        """
+        Create a cooperator with a fake scheduler which does C{self.units}
+        units of work per tick.
+        """
+        self.units = 1
+        self.scheduler = FakeScheduler()
+        self.cooperator = task.Cooperator(
+            scheduler=self.scheduler,
+            terminationPredicateFactory=self.terminationPredicate)
+        self.work = []
+
+
+    def terminationPredicate(self):
+        """
+        Return a termination predicate which ends the step after
+        C{self.units} units of work.
+        """
+        done = []
+        def terminate():
+            done.append(None)
+            return len(done) >= self.units
+        return terminate
+
+
+    def worker(self, name, count=100):
+        """
+        Record C{name} in C{self.work} for each of C{count} units of work.
+        """
+        for i in range(count):
+            self.work.append(name)
+            yield None
+
+
+    def test_equalWeights(self):
+        """
+        Tasks with the same priority and weight take turns.
+        """
+        self.units = 6
+        self.cooperator.cooperate(self.worker("a"))
+        self.cooperator.cooperate(self.worker("b"))
+        self.cooperator.cooperate(self.worker("c"))
+        self.scheduler.pump()
+        self.assertEqual(self.work, list("abcabc"))
+
+
+    def test_weights(self):
+        """
+        Tasks with the same priority are given units of work in proportion to
+        their weights.
+        """
+        self.units = 8
+        self.cooperator.cooperate(self.worker("a"), weight=3)
+        self.cooperator.cooperate(self.worker("b"))
+        self.scheduler.pump()
+        self.assertEqual(self.work.count("a"), 6)
+        self.assertEqual(self.work.count("b"), 2)
+        self.assertEqual(self.work, list("abaabaaa"))
+
+
+    def test_priority(self):
+        """
+        Tasks with a lower priority are only given work once no task with a
+        higher priority has any to do.
+        """
+        self.units = 8
+        self.cooperator.cooperate(self.worker("bulk"), priority=-1)
+        self.cooperator.cooperate(self.worker("urgent", 2), priority=1)
+        self.cooperator.cooperate(self.worker("normal", 2))
+        self.scheduler.pump()
+        self.assertEqual(
+            self.work,
+            ["urgent", "urgent", "normal", "normal", "bulk", "bulk"])
+
+
+    def test_resumedTaskDoesNotCatchUp(self):
+        """
+        A task which has been paused takes turns with the other tasks when it
+        is resumed, rather than being given the work it missed.
+        """
+        self.units = 4
+        a = self.cooperator.cooperate(self.worker("a"))
+        self.cooperator.cooperate(self.worker("b"))
+        a.pause()
+        self.scheduler.pump()
+        self.assertEqual(self.work, list("bbbb"))
+        del self.work[:]
+        a.resume()
+        self.scheduler.pump()
+        self.assertEqual(sorted(self.work), list("aabb"))
+
+
+    def test_waitingTaskDoesNotCatchUp(self):
+        """
+        A task which was waiting for a L{defer.Deferred} takes turns with the
+        other tasks once it fires, rather than being given the work it
+        missed.
+        """
+        waiting = defer.Deferred()
+        def waiter():
+            self.work.append("a")
+            yield waiting
+            for i in range(10):
+                self.work.append("a")
+                yield None
+        self.units = 4
+        self.cooperator.cooperate(waiter())
+        self.cooperator.cooperate(self.worker("b"))
+        self.scheduler.pump()
+        self.assertEqual(self.work, list("abbb"))
+        del self.work[:]
+        waiting.callback(None)
+        self.scheduler.pump()
+        self.assertEqual(sorted(self.work), list("aabb"))
+
+
+    def test_invalidWeight(self):
+        """
+        L{task.Cooperator.cooperate} raises L{ValueError} if the weight is
+        not positive.
+        """
+        self.assertRaises(
+            ValueError, self.cooperator.cooperate, iter(()), weight=0)
+
+
+    def test_statistics(self):
+        """
+        L{task.CooperativeTask.iterations} counts the units of work the task
+        has done and L{task.CooperativeTask.cpuTime} the time they took.
+        """
+        times = [1.0, 1.5, 2.0, 4.0]
+        self.cooperator._now = lambda: times.pop(0)
+        self.units = 5
+        t = self.cooperator.cooperate(self.worker("a", 2))
+        self.scheduler.pump()
+        # Two units yield values and the third finds the iterator exhausted.
+        self.assertEqual(t.iterations, 3)
+        self.assertEqual(t.cpuTime, 3.0)
+
+
+    def test_budget(self):
+        """
+        The default termination predicate of a L{task.Cooperator} ends each
+        step after L{task.Cooperator.budget} seconds.
+        """
+        scheduler = FakeScheduler()
+        cooperator = task.Cooperator(scheduler=scheduler, budget=0)
+        cooperator.cooperate(self.worker("a"))
+        scheduler.pump()
+        self.assertEqual(self.work, ["a"])
+        cooperator.budget = 60
+        scheduler.pump()
+        self.assertEqual(len(self.work), 100)
+
+
+    def test_budgetWithPredicate(self):
+        """
+        L{task.Cooperator} raises L{ValueError} if given both a budget and a
+        termination predicate factory.
+        """
+        self.assertRaises(ValueError, task.Cooperator,
+                          terminationPredicateFactory=lambda: None, budget=1)
@@ -11,9 +11,12 @@ import warnings
 import gc, traceback
 import re
 
-from twisted.python import failure, log
+from zope.interface.verify import verifyObject
+
+from twisted.python import failure, log, reflect
 from twisted.python.compat import _PY3
 from twisted.internet import defer, reactor
+from twisted.internet.interfaces import IConsumer
 from twisted.internet.task import Clock
 from twisted.trial import unittest
 
@@ -1306,6 +1309,67 @@ class DeferredTestCase(unittest.SynchronousTestCase, ImmediateFailureMixin):
         self.assertEqual(L, [None])
 
 
+    def test_noInstanceDictionary(self):
+        """
+        Creating a L{Deferred}, adding callbacks to it and firing it only sets
+        attributes kept in its slots, so no instance dictionary is needed.
+        """
+        d = defer.Deferred()
+        d.addCallback(lambda result: defer.succeed(result))
+        d.addErrback(lambda reason: None)
+        d.callback(None)
+        self.assertEqual(vars(d), {})
+
+
+    def test_instanceAttributes(self):
+        """
+        Attributes which are not in the slots of L{Deferred} can still be set
+        on an instance.
+        """
+        d = defer.Deferred()
+        d.debug = True
+        d.extra = 1
+        self.assertTrue(d.debug)
+        self.assertFalse(defer.Deferred.debug)
+        self.assertEqual(d.extra, 1)
+
+
+    def test_succeedDebugging(self):
+        """
+        L{defer.succeed} records where its result was given when debugging is
+        enabled.
+        """
+        defer.setDebugging(True)
+        self.addCleanup(defer.setDebugging, False)
+        d = defer.succeed(None)
+        self.assertNotEqual(d._debugInfo.invoker, None)
+
+
+    def test_callbacksRemovedOnceRun(self):
+        """
+        The callbacks in L{Deferred.callbacks} are removed once they have
+        been run, including ones added while the chain is running, and ones
+        after a callback which returns an unfired L{Deferred} are left to run
+        when it fires.
+        """
+        L = []
+        inner = defer.Deferred()
+        d = defer.Deferred()
+        for i in range(100):
+            d.addCallback(lambda result, i=i: L.append(i))
+        def add(result):
+            d.addCallback(lambda result: L.append("added"))
+        d.addCallback(add)
+        d.addCallback(lambda result: inner)
+        d.addCallback(L.append)
+        d.callback(None)
+        self.assertEqual(L, list(range(100)))
+        self.assertEqual(len(d.callbacks), 2)
+        inner.callback("inner")
+        self.assertEqual(L, list(range(100)) + ["inner", "added"])
+        self.assertEqual(d.callbacks, [])
+
+
     def test_errbackWithNoArgsNoDebug(self):
         """
         C{Deferred.errback()} creates a failure from the current Python
@@ -1422,6 +1486,214 @@ class DeferredTestCase(unittest.SynchronousTestCase, ImmediateFailureMixin):
 
 
 
+class ParallelMapTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.parallelMap}.
+    """
+
+    def setUp(self):
+        self.taken = []
+        self.calls = {}
+        self.cancelled = []
+
+
+    def items(self, n):
+        """
+        Generate C{n} items, recording in C{self.taken} which have been
+        taken.
+        """
+        for i in range(n):
+            self.taken.append(i)
+            yield i
+
+
+    def call(self, item):
+        """
+        Return a new L{defer.Deferred} for an item, recording it in
+        C{self.calls}, and recording the item in C{self.cancelled} if it is
+        cancelled.
+        """
+        d = self.calls[item] = defer.Deferred(
+            lambda d: self.cancelled.append(item))
+        return d
+
+
+    def test_concurrency(self):
+        """
+        No more than C{concurrency} calls are outstanding at once, and items
+        are only taken from the iterable when a call can be started.
+        """
+        d = defer.parallelMap(self.items(10), self.call, 3)
+        self.assertEqual(sorted(self.calls), [0, 1, 2])
+        self.assertEqual(self.taken, [0, 1, 2])
+        self.calls.pop(1).callback("one")
+        self.assertEqual(sorted(self.calls), [0, 2, 3])
+        self.assertEqual(self.taken, [0, 1, 2, 3])
+        self.assertNoResult(d)
+
+
+    def test_collect(self):
+        """
+        Without a receiver, the L{defer.Deferred} returned by
+        L{defer.parallelMap} fires with a list of the results in the order
+        of the items, whatever order they arrive in.
+        """
+        d = defer.parallelMap(self.items(4), self.call, 4)
+        for i in (2, 0, 3, 1):
+            self.calls.pop(i).callback(i * 10)
+        self.assertEqual(self.successResultOf(d), [0, 10, 20, 30])
+
+
+    def test_empty(self):
+        """
+        With no items, L{defer.parallelMap} fires at once with an empty list.
+        """
+        self.assertEqual(
+            self.successResultOf(defer.parallelMap([], self.call, 1)), [])
+
+
+    def test_synchronous(self):
+        """
+        Results which are available at once, including results which are not
+        L{defer.Deferred}s at all, are handled without recursion.
+        """
+        d = defer.parallelMap(
+            range(10000), lambda i: defer.succeed(i) if i % 2 else i, 1)
+        self.assertEqual(self.successResultOf(d), list(range(10000)))
+
+
+    def test_ordered(self):
+        """
+        With a receiver, results are passed to it with their indexes in the
+        order of the items, and the L{defer.Deferred} returned by
+        L{defer.parallelMap} fires with C{None} when all are done.
+        """
+        received = []
+        d = defer.parallelMap(self.items(3), self.call, 3,
+                              receiver=lambda *r: received.append(r))
+        self.calls.pop(2).callback("c")
+        self.calls.pop(1).callback("b")
+        self.assertEqual(received, [])
+        self.calls.pop(0).callback("a")
+        self.assertEqual(received, [(0, "a"), (1, "b"), (2, "c")])
+        self.assertIdentical(self.successResultOf(d), None)
+
+
+    def test_orderedWindow(self):
+        """
+        When results are passed to a receiver in order, no more than
+        C{concurrency} results wait for an earlier one.
+        """
+        received = []
+        defer.parallelMap(self.items(10), self.call, 2,
+                          receiver=lambda *r: received.append(r))
+        self.calls.pop(1).callback("b")
+        self.assertEqual(self.taken, [0, 1])
+        self.calls.pop(0).callback("a")
+        self.assertEqual(received, [(0, "a"), (1, "b")])
+        self.assertEqual(self.taken, [0, 1, 2, 3])
+
+
+    def test_unordered(self):
+        """
+        With C{ordered=False}, results are passed to the receiver as soon as
+        they are available.
+        """
+        received = []
+        defer.parallelMap(self.items(3), self.call, 2, ordered=False,
+                          receiver=lambda *r: received.append(r))
+        self.calls.pop(1).callback("b")
+        self.assertEqual(received, [(1, "b")])
+        self.calls.pop(2).callback("c")
+        self.calls.pop(0).callback("a")
+        self.assertEqual(received, [(1, "b"), (2, "c"), (0, "a")])
+
+
+    def test_failFast(self):
+        """
+        By default, the first failure stops everything: the outstanding calls
+        are cancelled, no more items are taken, and the L{defer.Deferred}
+        returned by L{defer.parallelMap} fails with a L{defer.FirstError}.
+        """
+        d = defer.parallelMap(self.items(10), self.call, 3)
+        self.calls.pop(1).errback(GenericError())
+        self.assertEqual(self.taken, [0, 1, 2])
+        self.assertEqual(sorted(self.cancelled), [0, 2])
+        error = self.failureResultOf(d, defer.FirstError).value
+        self.assertEqual(error.index, 1)
+        error.subFailure.trap(GenericError)
+
+
+    def test_collectErrors(self):
+        """
+        With C{failFast=False}, failures are collected like other results.
+        """
+        d = defer.parallelMap(self.items(2), self.call, 2, failFast=False)
+        self.calls.pop(0).errback(GenericError())
+        self.calls.pop(1).callback("b")
+        [error, result] = self.successResultOf(d)
+        error.trap(GenericError)
+        self.assertEqual(result, "b")
+
+
+    def test_exception(self):
+        """
+        An exception raised by the function is treated as a failure.
+        """
+        d = defer.parallelMap([0], lambda item: 1 // item, 1)
+        self.failureResultOf(d, defer.FirstError).value.subFailure.trap(
+            ZeroDivisionError)
+
+
+    def test_iterableFails(self):
+        """
+        If taking an item from the iterable raises an exception, the
+        outstanding calls are cancelled and the L{defer.Deferred} returned by
+        L{defer.parallelMap} fails with it.
+        """
+        def items():
+            yield 0
+            raise GenericError()
+        d = defer.parallelMap(items(), self.call, 2)
+        self.assertEqual(self.cancelled, [0])
+        self.failureResultOf(d, GenericError)
+
+
+    def test_receiverFails(self):
+        """
+        If the receiver raises an exception, the outstanding calls are
+        cancelled and the L{defer.Deferred} returned by L{defer.parallelMap}
+        fails with it.
+        """
+        def receiver(index, result):
+            raise GenericError()
+        d = defer.parallelMap(self.items(2), self.call, 2, receiver=receiver)
+        self.calls.pop(0).callback(None)
+        self.assertEqual(self.cancelled, [1])
+        self.failureResultOf(d, GenericError)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the L{defer.Deferred} returned by L{defer.parallelMap}
+        cancels the outstanding calls and stops taking items.
+        """
+        d = defer.parallelMap(self.items(10), self.call, 2)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        self.assertEqual(sorted(self.cancelled), [0, 1])
+        self.assertEqual(self.taken, [0, 1])
+
+
+    def test_concurrencyTooSmall(self):
+        """
+        L{defer.parallelMap} raises L{ValueError} if C{concurrency} is less
+        than one.
+        """
+        self.assertRaises(ValueError, defer.parallelMap, [], self.call, 0)
+
+
+
 class FirstErrorTests(unittest.SynchronousTestCase):
     """
     Tests for L{FirstError}.
@@ -1896,6 +2168,178 @@ class DeferredCancellerTest(unittest.SynchronousTestCase):
 
 
 
+class DeferredProfilerTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.startProfiling}, L{defer.stopProfiling} and
+    L{defer.DeferredProfiler}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.addCleanup(defer.stopProfiling)
+
+
+    def startProfiling(self, creationSites=False):
+        """
+        Start profiling, with time measured by C{self.clock}.
+        """
+        profiler = defer.startProfiling(creationSites)
+        profiler._now = self.clock.seconds
+        return profiler
+
+
+    def slow(self, result, seconds=1):
+        """
+        A callback which takes C{seconds} seconds.
+        """
+        self.clock.advance(seconds)
+        return result
+
+
+    def test_startStop(self):
+        """
+        L{defer.startProfiling} returns a new L{defer.DeferredProfiler}, and
+        L{defer.stopProfiling} returns the same one, after which nothing more
+        is recorded.
+        """
+        profiler = defer.startProfiling()
+        self.assertIsInstance(profiler, defer.DeferredProfiler)
+        self.assertIdentical(defer.stopProfiling(), profiler)
+        self.assertIdentical(defer.stopProfiling(), None)
+        defer.succeed(None).addCallback(self.slow)
+        self.assertEqual(profiler.calls, {})
+        self.assertEqual(profiler.waits, {})
+
+
+    def test_calls(self):
+        """
+        The number of times each callback is called and the time the calls
+        take are recorded.
+        """
+        profiler = self.startProfiling()
+        d = defer.Deferred()
+        d.addCallback(self.slow, 2)
+        d.addCallback(self.slow, 3)
+        d.addErrback(self.slow)
+        d.callback(None)
+        self.assertEqual(
+            profiler.calls,
+            {(None, "%s.%s.slow" % (__name__, type(self).__name__)): [2, 5],
+             (None, "twisted.internet.defer.passthru"): [1, 0]})
+
+
+    def test_waits(self):
+        """
+        The time between the creation and firing of L{Deferred}s is recorded,
+        except for L{Deferred}s created before profiling started.
+        """
+        before = defer.Deferred()
+        profiler = self.startProfiling()
+        first = defer.Deferred()
+        second = defer.Deferred()
+        self.clock.advance(2)
+        first.callback(None)
+        self.clock.advance(3)
+        second.errback(ZeroDivisionError())
+        self.failureResultOf(second)
+        before.callback(None)
+        defer.succeed(None)
+        self.assertEqual(
+            profiler.waits, {"twisted.internet.defer.Deferred": [3, 7, 5]})
+
+
+    def test_creationSites(self):
+        """
+        If creation sites are being recorded, calls and waits are recorded
+        separately for each place L{Deferred}s are created, skipping frames
+        in L{twisted.internet.defer}.
+        """
+        profiler = self.startProfiling(creationSites=True)
+        def create():
+            return defer.succeed(None)
+        create().addCallback(self.slow)
+        create().addCallback(self.slow)
+        [site] = profiler.waits.keys()
+        self.assertTrue(site.startswith(__name__ + ".create:"), site)
+        self.assertEqual(
+            profiler.calls,
+            {(site, "%s.%s.slow" % (__name__, type(self).__name__)): [2, 2]})
+
+
+    def test_stacks(self):
+        """
+        The time spent in each callback but not in callbacks it runs is
+        recorded for each stack of running callbacks, and
+        L{defer.DeferredProfiler.collapsedStacks} formats it.
+        """
+        profiler = self.startProfiling()
+        inner = defer.Deferred()
+        inner.addCallback(self.slow, 2)
+        def outer(result):
+            self.clock.advance(1)
+            inner.callback(None)
+            return result
+        defer.succeed(None).addCallback(outer)
+        outerName = reflect.fullyQualifiedName(outer)
+        slowName = reflect.fullyQualifiedName(self.slow)
+        self.assertEqual(
+            profiler.stacks,
+            {(outerName,): 1, (outerName, slowName): 2})
+        self.assertEqual(
+            profiler.collapsedStacks(),
+            "%s 1000000\n%s;%s 2000000" % (outerName, outerName, slowName))
+
+
+    def test_inlineCallbacks(self):
+        """
+        Resuming an L{defer.inlineCallbacks} generator is recorded under the
+        generator's name.
+        """
+        profiler = self.startProfiling()
+        waiting = defer.Deferred()
+        @defer.inlineCallbacks
+        def generator():
+            yield waiting
+            self.clock.advance(4)
+        generator()
+        waiting.callback(None)
+        self.assertEqual(
+            profiler.calls[None, reflect.fullyQualifiedName(generator)],
+            [1, 4])
+
+
+    def test_table(self):
+        """
+        L{defer.DeferredProfiler.table} formats the calls, sorted by time or
+        by the number of calls, and the waits.
+        """
+        profiler = self.startProfiling()
+        d = defer.Deferred()
+        self.clock.advance(1)
+        d.addCallback(self.slow, 3)
+        d.callback(None)
+        d.addCallback(lambda result: result)
+        d.addCallback(lambda result: result)
+        lines = profiler.table().splitlines()
+        self.assertEqual(
+            lines[0].split(), ["calls", "cumulative", "per", "call",
+                               "callback"])
+        self.assertEqual(
+            lines[1].split(),
+            ["1", "3.000000", "3.000000",
+             "%s.%s.slow" % (__name__, type(self).__name__)])
+        self.assertEqual(lines[2].split()[0], "2")
+        self.assertEqual(lines[3], "")
+        self.assertEqual(
+            lines[5].split(),
+            ["1", "1.000000", "1.000000", "1.000000",
+             "twisted.internet.defer.Deferred"])
+        lines = profiler.table(sortBy="calls", limit=1).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[1].split()[0], "2")
+
+
+
 class LogTestCase(unittest.SynchronousTestCase):
     """
     Test logging of unhandled errors.
@@ -2316,6 +2760,352 @@ class OtherPrimitives(unittest.SynchronousTestCase, ImmediateFailureMixin):
 
 
 
+class Producer(object):
+    """
+    A streaming producer which records whether it has been paused.
+
+    @ivar events: The names of the methods called on it, in order.
+    """
+    def __init__(self):
+        self.events = []
+
+
+    def pauseProducing(self):
+        self.events.append("pause")
+
+
+    def resumeProducing(self):
+        self.events.append("resume")
+
+
+    def stopProducing(self):
+        self.events.append("stop")
+
+
+
+class DeferredQueueBackpressureTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.DeferredQueue.putWait}, L{defer.DeferredQueue.getBatch}
+    and the L{IConsumer} implementation of L{defer.DeferredQueue}.
+    """
+
+    def test_interface(self):
+        """
+        L{defer.DeferredQueue} provides L{IConsumer}.
+        """
+        self.assertTrue(verifyObject(IConsumer, defer.DeferredQueue()))
+
+
+    def test_putWaitRoom(self):
+        """
+        L{defer.DeferredQueue.putWait} adds the object at once and returns a
+        L{Deferred} which has already fired if there is room for it.
+        """
+        queue = defer.DeferredQueue(size=1)
+        d = queue.putWait(1)
+        self.assertIsNone(self.successResultOf(d))
+        self.assertEqual(queue.pending, [1])
+
+
+    def test_putWaitGetter(self):
+        """
+        L{defer.DeferredQueue.putWait} gives the object to a waiting
+        L{defer.DeferredQueue.get}.
+        """
+        queue = defer.DeferredQueue(size=0)
+        got = queue.get()
+        self.assertIsNone(self.successResultOf(queue.putWait(1)))
+        self.assertEqual(self.successResultOf(got), 1)
+        self.assertEqual(queue.pending, [])
+
+
+    def test_putWaitFull(self):
+        """
+        The L{Deferred} returned by L{defer.DeferredQueue.putWait} on a full
+        queue fires once a get has made room for the object, and the objects
+        waited for join the queue in order.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.put(1)
+        first = queue.putWait(2)
+        second = queue.putWait(3)
+        self.assertNoResult(first)
+        self.assertNoResult(second)
+        self.assertEqual(self.successResultOf(queue.get()), 1)
+        self.assertIsNone(self.successResultOf(first))
+        self.assertNoResult(second)
+        self.assertEqual(queue.pending, [2])
+        self.assertEqual(self.successResultOf(queue.get()), 2)
+        self.assertIsNone(self.successResultOf(second))
+        self.assertEqual(queue.pending, [3])
+
+
+    def test_putWaitOrder(self):
+        """
+        L{defer.DeferredQueue.putWait} does not let an object jump ahead of
+        objects which are already waiting for room.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.put(1)
+        queue.putWait(2)
+        queue.get()
+        queue.get()
+        later = queue.putWait(3)
+        self.assertIsNone(self.successResultOf(later))
+        self.assertEqual(queue.pending, [3])
+
+
+    def test_putWaitCancel(self):
+        """
+        Cancelling the L{Deferred} returned by L{defer.DeferredQueue.putWait}
+        withdraws the object.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.put(1)
+        d = queue.putWait(2)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        queue.get()
+        self.assertEqual(queue.pending, [])
+        self.assertEqual(queue.putters, [])
+
+
+    def test_putStillRaises(self):
+        """
+        L{defer.DeferredQueue.put} still raises L{defer.QueueOverflow} when
+        the queue is full.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.put(1)
+        self.assertRaises(defer.QueueOverflow, queue.put, 2)
+
+
+    def test_getBatchReady(self):
+        """
+        L{defer.DeferredQueue.getBatch} returns up to C{maxItems} of the
+        objects in the queue at once.
+        """
+        queue = defer.DeferredQueue()
+        for i in range(5):
+            queue.put(i)
+        self.assertEqual(self.successResultOf(queue.getBatch(3)), [0, 1, 2])
+        self.assertEqual(self.successResultOf(queue.getBatch(3)), [3, 4])
+        self.assertEqual(queue.pending, [])
+
+
+    def test_getBatchWaitsForOne(self):
+        """
+        Without C{maxWait}, L{defer.DeferredQueue.getBatch} on an empty queue
+        fires with the first object put.
+        """
+        queue = defer.DeferredQueue()
+        d = queue.getBatch(3)
+        self.assertNoResult(d)
+        queue.put(1)
+        self.assertEqual(self.successResultOf(d), [1])
+        queue.put(2)
+        self.assertEqual(queue.pending, [2])
+
+
+    def test_getBatchFull(self):
+        """
+        With C{maxWait}, L{defer.DeferredQueue.getBatch} fires as soon as it
+        has C{maxItems} objects.
+        """
+        clock = Clock()
+        queue = defer.DeferredQueue(scheduler=clock)
+        queue.put(1)
+        d = queue.getBatch(3, 10)
+        queue.put(2)
+        self.assertNoResult(d)
+        queue.put(3)
+        self.assertEqual(self.successResultOf(d), [1, 2, 3])
+        self.assertEqual(clock.getDelayedCalls(), [])
+
+
+    def test_getBatchTimeout(self):
+        """
+        With C{maxWait}, L{defer.DeferredQueue.getBatch} fires with whatever
+        objects it has, possibly none, once C{maxWait} seconds have passed.
+        """
+        clock = Clock()
+        queue = defer.DeferredQueue(scheduler=clock)
+        d = queue.getBatch(3, 10)
+        queue.put(1)
+        clock.advance(9)
+        self.assertNoResult(d)
+        clock.advance(1)
+        self.assertEqual(self.successResultOf(d), [1])
+        d = queue.getBatch(3, 10)
+        clock.advance(10)
+        self.assertEqual(self.successResultOf(d), [])
+
+
+    def test_getBatchNoWait(self):
+        """
+        L{defer.DeferredQueue.getBatch} with a C{maxWait} of C{0} fires at
+        once with whatever objects there are.
+        """
+        queue = defer.DeferredQueue()
+        self.assertEqual(self.successResultOf(queue.getBatch(3, 0)), [])
+
+
+    def test_getBatchCancel(self):
+        """
+        Cancelling the L{Deferred} returned by L{defer.DeferredQueue.getBatch}
+        puts the objects gathered for it back at the front of the queue.
+        """
+        clock = Clock()
+        queue = defer.DeferredQueue(scheduler=clock)
+        d = queue.getBatch(3, 10)
+        queue.put(1)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        self.assertEqual(clock.getDelayedCalls(), [])
+        queue.put(2)
+        self.assertEqual(queue.pending, [1, 2])
+
+
+    def test_getBatchCancelDelivers(self):
+        """
+        Cancelling the L{Deferred} returned by L{defer.DeferredQueue.getBatch}
+        gives the objects gathered for it to the gets still waiting, oldest
+        first, before putting any left over back in the queue.
+        """
+        clock = Clock()
+        queue = defer.DeferredQueue(scheduler=clock)
+        batch = queue.getBatch(10, 5)
+        get = queue.get()
+        otherBatch = queue.getBatch(2, 5)
+        for i in range(4):
+            queue.put(i)
+        batch.cancel()
+        self.failureResultOf(batch, defer.CancelledError)
+        self.assertEqual(self.successResultOf(get), 0)
+        self.assertEqual(self.successResultOf(otherBatch), [1, 2])
+        self.assertEqual(queue.waiting, [])
+        self.assertEqual(queue.pending, [3])
+        self.assertEqual(clock.getDelayedCalls(), [])
+
+
+    def test_getBatchAdmitsPutters(self):
+        """
+        L{defer.DeferredQueue.getBatch} lets objects waiting for room into
+        the queue as it takes objects out.
+        """
+        queue = defer.DeferredQueue(size=2)
+        queue.put(1)
+        queue.put(2)
+        waiting = [queue.putWait(3), queue.putWait(4)]
+        self.assertEqual(self.successResultOf(queue.getBatch(3)), [1, 2, 3])
+        for d in waiting:
+            self.assertIsNone(self.successResultOf(d))
+        self.assertEqual(queue.pending, [4])
+
+
+    def test_getBatchBacklog(self):
+        """
+        L{defer.DeferredQueue.getBatch} raises L{defer.QueueUnderflow} when
+        too many L{Deferred}s are already waiting.
+        """
+        queue = defer.DeferredQueue(backlog=1)
+        queue.get()
+        self.assertRaises(defer.QueueUnderflow, queue.getBatch, 2)
+
+
+    def test_getBatchInvalid(self):
+        """
+        L{defer.DeferredQueue.getBatch} raises L{ValueError} if C{maxItems}
+        is less than one.
+        """
+        queue = defer.DeferredQueue()
+        self.assertRaises(ValueError, queue.getBatch, 0)
+
+
+    def test_producerPausedWhenFull(self):
+        """
+        A producer registered with a L{defer.DeferredQueue} is paused once
+        L{defer.DeferredQueue.write} fills the queue, and resumed once the
+        queue is no more than half full.
+        """
+        queue = defer.DeferredQueue(size=4)
+        producer = Producer()
+        queue.registerProducer(producer, True)
+        for i in range(4):
+            queue.write(i)
+        self.assertEqual(producer.events, ["pause"])
+        queue.write(4)
+        self.assertEqual(queue.pending, [0, 1, 2, 3, 4])
+        self.assertEqual(producer.events, ["pause"])
+        queue.get()
+        queue.get()
+        self.assertEqual(producer.events, ["pause"])
+        queue.get()
+        self.assertEqual(producer.events, ["pause", "resume"])
+
+
+    def test_writeToGetter(self):
+        """
+        L{defer.DeferredQueue.write} gives the object to a waiting get.
+        """
+        queue = defer.DeferredQueue(size=1)
+        producer = Producer()
+        queue.registerProducer(producer, True)
+        d = queue.get()
+        queue.write(1)
+        self.assertEqual(self.successResultOf(d), 1)
+        self.assertEqual(producer.events, [])
+
+
+    def test_registerFull(self):
+        """
+        A producer registered with a full L{defer.DeferredQueue} is paused at
+        once.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.put(1)
+        producer = Producer()
+        queue.registerProducer(producer, True)
+        self.assertEqual(producer.events, ["pause"])
+
+
+    def test_unregisterProducer(self):
+        """
+        A producer unregistered from a L{defer.DeferredQueue} is no longer
+        paused or resumed.
+        """
+        queue = defer.DeferredQueue(size=1)
+        producer = Producer()
+        queue.registerProducer(producer, True)
+        queue.unregisterProducer()
+        queue.write(1)
+        queue.get()
+        self.assertEqual(producer.events, [])
+        self.assertIsNone(queue.producer)
+
+
+    def test_registerTwice(self):
+        """
+        L{defer.DeferredQueue.registerProducer} raises L{RuntimeError} if a
+        producer is already registered.
+        """
+        queue = defer.DeferredQueue(size=1)
+        queue.registerProducer(Producer(), True)
+        self.assertRaises(RuntimeError, queue.registerProducer,
+                          Producer(), True)
+
+
+    def test_pullProducer(self):
+        """
+        L{defer.DeferredQueue.registerProducer} raises L{ValueError} for a
+        non-streaming producer.
+        """
+        queue = defer.DeferredQueue(size=1)
+        self.assertRaises(ValueError, queue.registerProducer,
+                          Producer(), False)
+
+
+
 class DeferredFilesystemLockTestCase(unittest.TestCase):
     """
     Test the behavior of L{DeferredFilesystemLock}
@@ -0,0 +1,294 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.test.loadsim}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.internet import error
+from twisted.internet.protocol import Protocol, ServerFactory
+from twisted.protocols import basic, policies
+from twisted.python import reflect
+from twisted.test import loadsim
+from twisted.trial.unittest import SynchronousTestCase
+
+
+
+class Echo(basic.LineReceiver):
+    """
+    Send back every line received.
+    """
+    def lineReceived(self, line):
+        self.sendLine(line)
+
+
+
+class TimingOut(Echo, policies.TimeoutMixin):
+    """
+    Echo lines, and close the connection after a second of idleness.
+    """
+    def connectionMade(self):
+        self.setTimeout(1)
+
+
+    def lineReceived(self, line):
+        self.resetTimeout()
+        Echo.lineReceived(self, line)
+
+
+    def timeoutConnection(self):
+        self.transport.loseConnection()
+
+
+
+class Recorder(Protocol):
+    """
+    Record what happens to a connection.
+    """
+    def __init__(self):
+        self.events = []
+
+
+    def connectionMade(self):
+        self.events.append("made")
+
+
+    def dataReceived(self, data):
+        self.events.append(data)
+
+
+    def connectionLost(self, reason):
+        self.events.append(reason.type)
+
+
+
+def factoryFor(protocol):
+    """
+    Make a L{ServerFactory} for C{protocol}.
+    """
+    factory = ServerFactory()
+    factory.protocol = protocol
+    return factory
+
+
+
+class SimulationTests(SynchronousTestCase):
+    """
+    Tests for L{loadsim.Simulation}.
+    """
+
+    def test_latency(self):
+        """
+        Data written to one end of a connection arrives at the other after
+        the latency, in order, and closing the connection waits for it to
+        arrive.
+        """
+        delays = [0.5, 0.1, 0.2]
+        sim = loadsim.Simulation(factoryFor(Recorder),
+                                 latency=lambda random: delays.pop(0))
+        client = Recorder()
+        server = sim.connect(client)
+        client.transport.write(b"a")
+        client.transport.write(b"b")
+        client.transport.loseConnection()
+        sim.clock.advance(0.4)
+        self.assertEqual(server.events, ["made"])
+        sim.clock.advance(0.1)
+        self.assertEqual(server.events, ["made", b"a", b"b",
+                                         error.ConnectionDone])
+        self.assertEqual(client.events, ["made", error.ConnectionDone])
+        self.assertEqual(sim.openConnections, 0)
+
+
+    def test_writeAndClose(self):
+        """
+        Data a protocol writes before closing the connection in the same
+        event arrives before the connection is closed.
+        """
+        class Goodbye(Protocol):
+            def connectionMade(self):
+                self.transport.write(b"bye")
+                self.transport.loseConnection()
+        sim = loadsim.Simulation(factoryFor(Goodbye), latency=1)
+        client = Recorder()
+        sim.connect(client)
+        sim.run()
+        self.assertEqual(client.events, ["made", b"bye",
+                                         error.ConnectionDone])
+
+
+    def test_addresses(self):
+        """
+        Each connection has its own client address, and the server's address
+        has the given port.
+        """
+        sim = loadsim.Simulation(factoryFor(Recorder), port=8080)
+        first = sim.connect(Recorder())
+        second = sim.connect(Recorder())
+        self.assertNotEqual(first.transport.getPeer(),
+                            second.transport.getPeer())
+        self.assertEqual(first.transport.getHost().port, 8080)
+        self.assertEqual(first.transport.getPeer(),
+                         first.transport.peer.getHost())
+
+
+    def test_scriptedClient(self):
+        """
+        L{loadsim.ScriptedClient} sends each request once the response to
+        the last has arrived, records the response times and closes the
+        connection.
+        """
+        sim = loadsim.Simulation(factoryFor(Echo), latency=0.25)
+        sim.connect(loadsim.ScriptedClient([b"a\r\n", b"b\r\n"],
+                                           loadsim.lineResponseLength))
+        sim.run()
+        self.assertEqual(sim.requests, 2)
+        self.assertEqual(sim.failed, 0)
+        self.assertEqual(sim.responseTimes.maximum, 0.5)
+        self.assertEqual(sim.elapsed, 1.25)
+
+
+    def test_thinkTime(self):
+        """
+        L{loadsim.ScriptedClient} waits for the think time between a
+        response and the next request.
+        """
+        sim = loadsim.Simulation(factoryFor(Echo))
+        sim.connect(loadsim.ScriptedClient(
+            [b"a\r\n", b"b\r\n", b"c\r\n"], loadsim.lineResponseLength,
+            lambda random: 2))
+        sim.run()
+        self.assertEqual(sim.requests, 3)
+        self.assertEqual(sim.elapsed, 6)
+
+
+    def test_arrivals(self):
+        """
+        L{loadsim.Simulation.arrive} connects clients at random, and the
+        same seed gives the same results.
+        """
+        def simulate(seed):
+            sim = loadsim.Simulation(
+                factoryFor(Echo), seed=seed,
+                latency=lambda random: random.uniform(0.01, 0.05))
+            sim.arrive(50, 10, lambda: loadsim.ScriptedClient(
+                [b"hello\r\n"] * 3, loadsim.lineResponseLength))
+            sim.run()
+            summary = sim.summary()
+            del summary["cpu"], summary["cpuPerRequest"]
+            return summary
+        first = simulate(1)
+        self.assertEqual(first["connections"], 50)
+        self.assertEqual(first["requests"], 150)
+        self.assertEqual(first["responseTime"]["count"], 150)
+        self.assertTrue(first["peakConnections"] > 1)
+        self.assertEqual(first["throughput"], 150 / first["elapsed"])
+        self.assertEqual(simulate(1), first)
+        self.assertNotEqual(simulate(2), first)
+
+
+    def test_cpuAccounting(self):
+        """
+        The real time server protocols take is accounted to their class.
+        """
+        sim = loadsim.Simulation(factoryFor(Echo))
+        times = iter(range(100))
+        sim._now = lambda: next(times)
+        sim.connect(loadsim.ScriptedClient([b"a\r\n"],
+                                           loadsim.lineResponseLength))
+        sim.run()
+        calls, seconds = sim.cpu[reflect.qual(Echo)]
+        # buildProtocol, makeConnection, dataReceived, connectionLost
+        self.assertEqual((calls, seconds), (4, 4))
+        summary = sim.summary()
+        self.assertEqual(summary["cpuPerRequest"], 4)
+        self.assertEqual(summary["cpu"][reflect.qual(Echo)],
+                         {"calls": 4, "time": 4, "perRequest": 4})
+        self.assertIn("server time per request: 4000000.000 usec",
+                      sim.report())
+
+
+    def test_timeoutClock(self):
+        """
+        Server protocols which use L{policies.TimeoutMixin} time out on the
+        simulation's clock.
+        """
+        sim = loadsim.Simulation(factoryFor(TimingOut))
+        client = Recorder()
+        sim.connect(client)
+        sim.run()
+        self.assertEqual(client.events, ["made", error.ConnectionDone])
+        self.assertEqual(sim.elapsed, 1)
+
+
+    def test_failedRequest(self):
+        """
+        A request whose connection is lost before the response arrives is
+        counted as failed.
+        """
+        sim = loadsim.Simulation(factoryFor(TimingOut))
+        sim.connect(loadsim.ScriptedClient([b"no end of line"],
+                                           loadsim.lineResponseLength))
+        sim.run()
+        self.assertEqual((sim.requests, sim.failed), (0, 1))
+
+
+    def test_until(self):
+        """
+        L{loadsim.Simulation.run} stops after C{until} simulated seconds.
+        """
+        sim = loadsim.Simulation(factoryFor(Echo))
+        sim.connect(loadsim.ScriptedClient(
+            [b"a\r\n"] * 10, loadsim.lineResponseLength, lambda random: 1))
+        sim.run(until=3.5)
+        self.assertEqual(sim.elapsed, 3.5)
+        self.assertEqual(sim.requests, 4)
+
+
+    def test_protocolError(self):
+        """
+        An exception raised by a server protocol is logged and its
+        connection is lost.
+        """
+        class Broken(Protocol):
+            def dataReceived(self, data):
+                raise ZeroDivisionError()
+        sim = loadsim.Simulation(factoryFor(Broken))
+        client = Recorder()
+        sim.connect(client)
+        client.transport.write(b"x")
+        sim.run()
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+        self.assertEqual(client.events, ["made", ZeroDivisionError])
+
+
+
+class ResponseLengthTests(SynchronousTestCase):
+    """
+    Tests for L{loadsim.lineResponseLength} and
+    L{loadsim.httpResponseLength}.
+    """
+
+    def test_line(self):
+        """
+        L{loadsim.lineResponseLength} finds the first line.
+        """
+        self.assertEqual(loadsim.lineResponseLength(b"ab\r\ncd\r\n"), 4)
+        self.assertIsNone(loadsim.lineResponseLength(b"ab"))
+
+
+    def test_http(self):
+        """
+        L{loadsim.httpResponseLength} finds a response with a body of the
+        length given by its C{Content-Length} header.
+        """
+        response = (b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\nhello")
+        self.assertEqual(loadsim.httpResponseLength(response + b"HTTP"),
+                         len(response))
+        self.assertIsNone(loadsim.httpResponseLength(response[:-1]))
+        self.assertIsNone(loadsim.httpResponseLength(b"HTTP/1.1 200 OK\r\n"))
+        self.assertEqual(
+            loadsim.httpResponseLength(b"HTTP/1.1 204 No Content\r\n\r\n"),
+            27)
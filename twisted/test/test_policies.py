@@ -584,6 +584,31 @@ class TimeoutTestCase(unittest.TestCase):
         self.failUnless(self.proto.wrappedProtocol.disconnected)
 
 
+    def test_clock(self):
+        """
+        L{policies.TimeoutFactory} schedules timeouts using the clock passed
+        to it, such as a L{task.TimingWheel}.
+        """
+        clock = task.Clock()
+        wheel = task.TimingWheel(clock=clock)
+        wrappedFactory = protocol.ServerFactory()
+        wrappedFactory.protocol = SimpleProtocol
+        factory = policies.TimeoutFactory(wrappedFactory, 3, clock=wheel)
+        proto = factory.buildProtocol(
+            address.IPv4Address('TCP', '127.0.0.1', 12345))
+        transport = StringTransportWithDisconnection()
+        transport.protocol = proto
+        proto.makeConnection(transport)
+
+        self.assertEqual(len(wheel.getDelayedCalls()), 1)
+        clock.pump([1.0, 1.0])
+        proto.dataReceived(b'bytes')
+        clock.pump([1.0, 1.0])
+        self.failIf(proto.wrappedProtocol.disconnected)
+        clock.pump([1.0])
+        self.failUnless(proto.wrappedProtocol.disconnected)
+
+
 
 class TimeoutTester(protocol.Protocol, policies.TimeoutMixin):
     """
@@ -736,6 +761,26 @@ class TestTimeout(unittest.TestCase):
         self.proto.setTimeout(None)
 
 
+    def test_timeoutClock(self):
+        """
+        If C{timeoutClock} is set, L{policies.TimeoutMixin.callLater} uses it
+        instead of the reactor.
+        """
+        mixin = policies.TimeoutMixin()
+        mixin.timeoutClock = wheel = task.TimingWheel(clock=self.clock)
+        mixin.timeoutConnection = lambda: timedOut.append(True)
+        timedOut = []
+
+        mixin.setTimeout(3)
+        self.assertEqual(len(wheel.getDelayedCalls()), 1)
+        self.clock.pump([1, 1])
+        mixin.resetTimeout()
+        self.clock.pump([1, 1])
+        self.assertEqual(timedOut, [])
+        self.clock.pump([1])
+        self.assertEqual(timedOut, [True])
+
+
 
 class LimitTotalConnectionsFactoryTestCase(unittest.TestCase):
     """Tests for policies.LimitTotalConnectionsFactory"""
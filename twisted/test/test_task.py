@@ -704,6 +704,338 @@ class ReactorLoopTestCase(unittest.TestCase):
 
 
 
+class TimingWheelTests(unittest.TestCase):
+    """
+    Tests for L{task.TimingWheel}.
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.wheel = task.TimingWheel(resolution=1.0, slots=4,
+                                      clock=self.clock)
+        self.calls = []
+
+
+    def test_interface(self):
+        """
+        L{task.TimingWheel} provides L{interfaces.IReactorTime} and hands back
+        L{interfaces.IDelayedCall} providers from C{callLater}.
+        """
+        self.assertTrue(interfaces.IReactorTime.providedBy(self.wheel))
+        call = self.wheel.callLater(1, self.calls.append, 1)
+        self.assertTrue(interfaces.IDelayedCall.providedBy(call))
+        self.assertEqual(call.getTime(), 1)
+        self.assertTrue(call.active())
+        self.assertEqual(self.wheel.getDelayedCalls(), [call])
+
+
+    def test_invalidArguments(self):
+        """
+        A non-positive resolution or fewer than two slots per level are
+        rejected with L{ValueError}.
+        """
+        self.assertRaises(ValueError, task.TimingWheel, 0, 4, self.clock)
+        self.assertRaises(ValueError, task.TimingWheel, 1, 1, self.clock)
+
+
+    def test_singleTimer(self):
+        """
+        While calls are pending the wheel keeps exactly one timer scheduled
+        with its clock, and none once they have all run.
+        """
+        for i in range(10):
+            self.wheel.callLater(i + 1, self.calls.append, i)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.pump([1] * 10)
+        self.assertEqual(self.calls, list(range(10)))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_runsAtResolution(self):
+        """
+        A call runs at the start of the first tick at or after the time it
+        was scheduled for, never before.
+        """
+        self.wheel.callLater(2.5, self.calls.append, "x")
+        self.clock.advance(2.9)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(0.1)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_farFuture(self):
+        """
+        Calls further in the future than one revolution of the first level
+        are cascaded down through the higher levels and run on time.
+        """
+        for delay in (3, 17, 64, 100, 255, 1000):
+            self.wheel.callLater(delay, self.calls.append, delay)
+        self.assertTrue(len(self.wheel._levels) > 1)
+        for second in range(1, 1001):
+            self.clock.advance(1)
+            self.assertEqual(
+                self.calls, [d for d in (3, 17, 64, 100, 255, 1000)
+                             if d <= second])
+
+
+    def test_ordering(self):
+        """
+        Calls which come due in the same tick run in the order of the times
+        they were scheduled for.
+        """
+        self.wheel.callLater(0.75, self.calls.append, "b")
+        self.wheel.callLater(0.25, self.calls.append, "a")
+        self.wheel.callLater(0.5, self.calls.append, "ab")
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["a", "ab", "b"])
+
+
+    def test_cancel(self):
+        """
+        A cancelled call does not run and is no longer pending, and the wheel
+        stops its timer once no calls are pending.
+        """
+        call = self.wheel.callLater(5, self.calls.append, "x")
+        call.cancel()
+        self.assertFalse(call.active())
+        self.assertEqual(self.wheel.getDelayedCalls(), [])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.assertRaises(error.AlreadyCancelled, call.cancel)
+        self.assertRaises(error.AlreadyCancelled, call.reset, 1)
+        self.clock.advance(10)
+        self.assertEqual(self.calls, [])
+
+
+    def test_cancelDuringTick(self):
+        """
+        A call which is cancelled by another call due in the same tick does
+        not run.
+        """
+        second = []
+        self.wheel.callLater(0.5, lambda: second[0].cancel())
+        second.append(self.wheel.callLater(0.75, self.calls.append, "x"))
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_resetLater(self):
+        """
+        Resetting a call to a later time makes it run at the new time.
+        """
+        call = self.wheel.callLater(3, self.calls.append, "x")
+        self.clock.advance(2)
+        call.reset(30)
+        self.assertEqual(call.getTime(), 32)
+        self.clock.pump([1] * 29)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["x"])
+        self.assertFalse(call.active())
+        self.assertRaises(error.AlreadyCalled, call.reset, 1)
+
+
+    def test_resetSooner(self):
+        """
+        Resetting a call to an earlier time makes it run at the new time.
+        """
+        call = self.wheel.callLater(500, self.calls.append, "x")
+        call.reset(2)
+        self.clock.pump([1, 1])
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_delay(self):
+        """
+        L{IDelayedCall.delay} moves a call relative to the time it was
+        scheduled for.
+        """
+        call = self.wheel.callLater(10, self.calls.append, "x")
+        call.delay(-8)
+        self.assertEqual(call.getTime(), 2)
+        call.delay(3)
+        self.assertEqual(call.getTime(), 5)
+        self.clock.pump([1] * 4)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_callLaterFromCall(self):
+        """
+        A call scheduled with no delay by a call being run runs on the next
+        tick rather than the current one.
+        """
+        def first():
+            self.calls.append("first")
+            self.wheel.callLater(0, self.calls.append, "second")
+        self.wheel.callLater(1, first)
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["first"])
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["first", "second"])
+
+
+    def test_idleSkip(self):
+        """
+        After being idle for a long time the wheel does not process the ticks
+        it missed and calls scheduled afterwards run on time.
+        """
+        self.clock.advance(10 ** 9)
+        self.wheel.callLater(2, self.calls.append, "x")
+        self.clock.advance(2)
+        self.assertEqual(self.calls, ["x"])
+
+
+    def test_error(self):
+        """
+        An exception raised by a call is logged and does not prevent other
+        calls in the same tick from running.
+        """
+        self.wheel.callLater(0.5, lambda: 1 // 0)
+        self.wheel.callLater(0.75, self.calls.append, "x")
+        self.clock.advance(1)
+        self.assertEqual(self.calls, ["x"])
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+
+
+    def test_deferLater(self):
+        """
+        A L{task.TimingWheel} can be used as the clock for L{task.deferLater}.
+        """
+        d = task.deferLater(self.wheel, 2, lambda: "result")
+        self.clock.advance(2)
+        self.assertEqual(self.successResultOf(d), "result")
+
+
+
+class LoopingCallGroupTests(unittest.TestCase):
+    """
+    Tests for L{task.LoopingCallGroup}.
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.group = task.LoopingCallGroup(resolution=1.0, clock=self.clock)
+        self.calls = []
+
+
+    def test_singleTimer(self):
+        """
+        Any number of looping calls in a group are driven by a single timer.
+        """
+        for i in range(100):
+            self.group.loopingCall(self.calls.append, i).start(5, now=False)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(5)
+        self.assertEqual(sorted(self.calls), list(range(100)))
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(5)
+        self.assertEqual(len(self.calls), 200)
+
+
+    def test_noDrift(self):
+        """
+        A looping call in a group runs at most C{resolution} seconds late,
+        and its lateness does not accumulate.
+        """
+        times = []
+        call = self.group.loopingCall(
+            lambda: times.append(self.clock.seconds()))
+        self.clock.advance(0.5)
+        call.start(2.25, now=False)
+        for i in range(40):
+            self.clock.advance(0.25)
+        self.assertEqual(times, [3, 5, 8, 10])
+
+
+    def test_stop(self):
+        """
+        Stopping a looping call in a group fires the L{defer.Deferred}
+        returned by C{start} and removes its timer once no other calls are
+        pending.
+        """
+        call = self.group.loopingCall(self.calls.append, None)
+        d = call.start(1)
+        self.assertEqual(self.calls, [None])
+        call.stop()
+        self.assertIs(self.successResultOf(d), call)
+        self.assertFalse(call.running)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_reset(self):
+        """
+        Resetting a looping call in a group skips its next iteration.
+        """
+        call = self.group.loopingCall(self.calls.append, None)
+        call.start(2, now=False)
+        self.clock.advance(1)
+        call.reset()
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [])
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [None])
+
+
+    def test_failure(self):
+        """
+        A looping call in a group which raises an exception stops, and the
+        L{defer.Deferred} returned by C{start} fails with it, without
+        affecting the other calls in the group.
+        """
+        def fail():
+            raise TestException()
+        failing = self.group.loopingCall(fail)
+        d = failing.start(1, now=False)
+        self.group.loopingCall(self.calls.append, None).start(1, now=False)
+        self.clock.advance(1)
+        self.failureResultOf(d, TestException)
+        self.clock.advance(1)
+        self.assertEqual(self.calls, [None, None])
+
+
+    def test_jitter(self):
+        """
+        With jitter, each looping call in a group is delayed by up to that
+        fraction of its interval when it is started, and keeps that phase.
+        """
+        group = task.LoopingCallGroup(resolution=1.0, jitter=0.5,
+                                      clock=self.clock)
+        offsets = [0.0, 0.5, 0.99]
+        group._random = lambda: offsets.pop(0)
+        times = {}
+        for i in range(3):
+            times[i] = []
+            group.loopingCall(
+                lambda i=i: times[i].append(self.clock.seconds())
+                ).start(10, now=False)
+        self.clock.pump([1] * 25)
+        self.assertEqual(times, {0: [10, 20], 1: [13, 23], 2: [15, 25]})
+
+
+    def test_invalidJitter(self):
+        """
+        L{task.LoopingCallGroup} raises L{ValueError} for a jitter which is
+        not between 0 and 1.
+        """
+        self.assertRaises(ValueError, task.LoopingCallGroup, jitter=2,
+                          clock=self.clock)
+
+
+    def test_withCount(self):
+        """
+        L{task.LoopingCallGroup.withCount} makes a looping call in the group
+        which is passed the number of intervals since it last ran.
+        """
+        call = self.group.withCount(self.calls.append)
+        call.start(1, now=False)
+        self.clock.advance(1)
+        self.clock.advance(3)
+        self.assertEqual(self.calls, [1, 3])
+
+
+
 class DeferLaterTests(unittest.TestCase):
     """
     Tests for L{task.deferLater}.
@@ -521,38 +521,124 @@ class ThreadPoolTestCase(unittest.SynchronousTestCase):
         self.assertEqual(len(pool.working), 0)
 
 
-    def test_workerState(self):
+    def _waitFor(self, condition):
         """
-        Upon entering a _workerState block, the threads unique identifier is
-        added to a stateList and is removed upon exiting the block.
+        Spin until C{condition()} is true, failing the test if it takes
+        longer than L{getTimeout}.
         """
-        pool = threadpool.ThreadPool()
-        workerThread = object()
-        stateList = []
-        with pool._workerState(stateList, workerThread):
-            self.assertIn(workerThread, stateList)
-        self.assertNotIn(workerThread, stateList)
+        deadline = time.time() + self.getTimeout()
+        while not condition():
+            if time.time() > deadline:
+                self.fail("A long time passed without succeeding")
+            time.sleep(0.0005)
 
 
-    def test_workerStateExceptionHandling(self):
+    def test_keepalive(self):
         """
-        The _workerState block does not consume L{Exception}s or change the
-        L{Exception} that gets raised.
+        A worker beyond the minimum number which has had no work for
+        C{keepalive} seconds exits.
         """
-        pool = threadpool.ThreadPool()
-        workerThread = object()
-        stateList = []
-        try:
-            with pool._workerState(stateList, workerThread):
-                self.assertIn(workerThread, stateList)
-                1 / 0
-        except ZeroDivisionError:
-            pass
-        except:
-            self.fail("_workerState shouldn't change raised exceptions")
-        else:
-            self.fail("_workerState shouldn't consume exceptions")
-        self.assertNotIn(workerThread, stateList)
+        pool = threadpool.ThreadPool(0, 1, keepalive=0.01)
+        pool.start()
+        self.addCleanup(pool.stop)
+        event = threading.Event()
+        pool.callInThread(event.set)
+        event.wait(self.getTimeout())
+        self._waitFor(lambda: not pool.threads)
+        self.assertEqual(pool.workers, 0)
+        self.assertEqual(pool.waiters, [])
+
+        # Work queued afterwards starts a new worker.
+        event.clear()
+        pool.callInThread(event.set)
+        self.assertTrue(event.wait(self.getTimeout()))
+
+
+    def test_keepaliveRace(self):
+        """
+        Work queued just as a worker which has had no work for C{keepalive}
+        seconds leaves C{waiters} is run, either by that worker or by a new
+        one.
+        """
+        pool = threadpool.ThreadPool(0, 1, keepalive=0.01)
+        ran = threading.Event()
+        queued = threading.Event()
+
+        class QueueOnRemove(list):
+            def remove(self, item):
+                if ran.is_set() and not queued.is_set():
+                    queued.set()
+                    # Queue from another thread, so that starting a worker
+                    # can wait for the pool's lock.
+                    queuer = threading.Thread(
+                        target=pool.callInThread, args=(ran.clear,))
+                    queuer.start()
+                    queuer.join(0.1)
+                list.remove(self, item)
+
+        pool.waiters = QueueOnRemove()
+        pool.start()
+        self.addCleanup(pool.stop)
+        pool.callInThread(ran.set)
+        self._waitFor(queued.is_set)
+        self._waitFor(lambda: not ran.is_set())
+
+
+    def test_keepaliveMinimum(self):
+        """
+        Workers up to the minimum number don't exit however long they go
+        without work.
+        """
+        pool = threadpool.ThreadPool(1, 2, keepalive=0.01)
+        pool.start()
+        self.addCleanup(pool.stop)
+        time.sleep(0.05)
+        self.assertEqual(pool.workers, 1)
+        self.assertEqual(len(pool.threads), 1)
+
+
+    def test_statistics(self):
+        """
+        L{ThreadPool.statistics} reports how many calls have been run, and
+        how long they were queued for and took to run.
+        """
+        pool = threadpool.ThreadPool(0, 1)
+        release = threading.Event()
+        done = threading.Event()
+        pool.callInThread(release.wait, self.getTimeout())
+        pool.callInThread(done.set)
+        stats = pool.statistics()
+        self.assertEqual(stats["queued"], 2)
+        self.assertEqual(stats["completed"], 0)
+        self.assertEqual(stats["runTime"], 0)
+
+        pool.start()
+        self.addCleanup(pool.stop)
+        time.sleep(0.01)
+        release.set()
+        done.wait(self.getTimeout())
+        self._waitFor(lambda: pool.statistics()["completed"] == 2)
+        stats = pool.statistics()
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["workers"], 1)
+        self.assertGreaterEqual(stats["maxRunTime"], 0.01)
+        self.assertGreaterEqual(stats["maxWaitTime"], 0.01)
+        self.assertGreaterEqual(stats["runTime"], 0.005)
+
+
+    def test_statisticsRetired(self):
+        """
+        The work of workers which have exited is still counted by
+        L{ThreadPool.statistics}.
+        """
+        pool = threadpool.ThreadPool(0, 1, keepalive=0.01)
+        pool.start()
+        self.addCleanup(pool.stop)
+        pool.callInThread(lambda: None)
+        self._waitFor(lambda: not pool.threads)
+        stats = pool.statistics()
+        self.assertEqual(stats["completed"], 1)
+        self.assertEqual(stats["workers"], 0)
 
 
 
@@ -8,7 +8,7 @@ Test methods in twisted.internet.threads and reactor thread APIs.
 
 from __future__ import division, absolute_import
 
-import sys, os, time
+import sys, os, time, threading
 
 from twisted.trial import unittest
 
@@ -328,6 +328,49 @@ class DeferToThreadPoolTestCase(unittest.TestCase):
 
 
 
+class BatchedDeferToThreadPoolTestCase(DeferToThreadPoolTestCase):
+    """
+    Test L{twisted.internet.threads.deferToThreadPool} with a threadpool
+    whose C{batchResults} is set.
+    """
+
+    def setUp(self):
+        DeferToThreadPoolTestCase.setUp(self)
+        self.tp.batchResults = True
+
+
+    def test_batched(self):
+        """
+        Results which arrive while the reactor is busy are delivered with
+        one C{callFromThread}.
+        """
+        class FakeReactor(object):
+            def __init__(self):
+                self.calls = []
+
+            def callFromThread(self, f, *args):
+                self.calls.append((f, args))
+
+        fakeReactor = FakeReactor()
+        release = threading.Event()
+        finished = []
+        def wait(n):
+            release.wait()
+            finished.append(n)
+            return n
+        deferreds = [threads.deferToThreadPool(fakeReactor, self.tp, wait, n)
+                     for n in range(3)]
+        release.set()
+        while len(finished) < 3 or self.tp.working:
+            time.sleep(0.001)
+        self.assertEqual(len(fakeReactor.calls), 1)
+        f, args = fakeReactor.calls[0]
+        f(*args)
+        self.assertEqual([self.successResultOf(d) for d in deferreds],
+                         [0, 1, 2])
+
+
+
 _callBeforeStartupProgram = """
 import time
 import %(reactor)s
@@ -8,6 +8,12 @@ Tests for implementations of L{IReactorUDP} and L{IReactorMulticast}.
 
 from __future__ import division, absolute_import
 
+import errno
+import socket
+
+from zope.interface import implementer
+from zope.interface.verify import verifyObject
+
 from twisted.trial import unittest
 
 from twisted.python.compat import intToBytes
@@ -451,6 +457,270 @@ class UDPTestCase(unittest.TestCase):
 
 
 
+class FakeDatagramSocket(object):
+    """
+    A fake for a non-blocking UDP L{socket.socket}.
+
+    @ivar incoming: A C{list} of the C{(data, addr)} tuples to be returned by
+        L{recvfrom}, after which it fails with C{EAGAIN}.
+
+    @ivar sent: A C{list} of the C{(data, addr)} tuples passed to L{sendto}.
+    """
+    def __init__(self, incoming=()):
+        self.incoming = list(incoming)
+        self.sent = []
+
+
+    def recvfrom(self, size):
+        if not self.incoming:
+            raise socket.error(errno.EAGAIN, "Resource temporarily unavailable")
+        return self.incoming.pop(0)
+
+
+    def sendto(self, data, addr):
+        self.sent.append((data, addr))
+        return len(data)
+
+
+
+@implementer(interfaces.IDatagramBatchReceiver)
+class BatchServer(Server):
+    """
+    A L{Server} which records the batches of datagrams it is given.
+
+    @ivar batches: A C{list} of the C{list}s passed to C{datagramsReceived}.
+    """
+    def __init__(self):
+        Server.__init__(self)
+        self.batches = []
+
+
+    def datagramsReceived(self, datagrams):
+        self.batches.append(datagrams)
+
+
+
+class BatchTests(unittest.TestCase):
+    """
+    Tests for batched reads and writes by L{udp.Port}.
+    """
+    def makePort(self, protocol, incoming=()):
+        """
+        Make a L{udp.Port} with a L{FakeDatagramSocket}.
+        """
+        port = udp.Port(0, protocol)
+        port.socket = FakeDatagramSocket(incoming)
+        return port
+
+
+    def test_interface(self):
+        """
+        L{udp.Port} provides L{interfaces.IUDPBatchTransport}.
+        """
+        self.assertTrue(verifyObject(
+            interfaces.IUDPBatchTransport, udp.Port(0, Server())))
+
+
+    def test_datagramsReceived(self):
+        """
+        L{udp.Port.doRead} passes all of the datagrams it reads to the
+        C{datagramsReceived} method of a protocol providing
+        L{interfaces.IDatagramBatchReceiver}, in one call.
+        """
+        incoming = [(b"a", ("127.0.0.1", 1)), (b"b", ("127.0.0.1", 2))]
+        server = BatchServer()
+        port = self.makePort(server, incoming)
+        port.doRead()
+        self.assertEqual(server.batches, [incoming])
+        self.assertEqual(server.packets, [])
+
+
+    def test_nothingReceived(self):
+        """
+        L{udp.Port.doRead} does not call C{datagramsReceived} if there were
+        no datagrams to read.
+        """
+        server = BatchServer()
+        port = self.makePort(server)
+        port.doRead()
+        self.assertEqual(server.batches, [])
+
+
+    def test_datagramReceived(self):
+        """
+        L{udp.Port.doRead} passes each datagram it reads to
+        C{datagramReceived} if the protocol does not provide
+        L{interfaces.IDatagramBatchReceiver}.
+        """
+        incoming = [(b"a", ("127.0.0.1", 1)), (b"b", ("127.0.0.1", 2))]
+        server = Server()
+        port = self.makePort(server, incoming)
+        port.doRead()
+        self.assertEqual(server.packets, incoming)
+
+
+    def test_readBudgetGrows(self):
+        """
+        If L{udp.Port.doRead} reads as many datagrams as its budget allows, it
+        stops, and doubles its budget for next time.
+        """
+        budget = udp.Port._minReadBudget
+        incoming = [(b"x", ("127.0.0.1", 1))] * (budget * 3 + 1)
+        server = BatchServer()
+        port = self.makePort(server, incoming)
+        port.doRead()
+        self.assertEqual(len(server.batches[0]), budget)
+        self.assertEqual(port._readBudget, budget * 2)
+        port.doRead()
+        self.assertEqual(len(server.batches[1]), budget * 2)
+        self.assertEqual(port._readBudget, budget * 4)
+        port.doRead()
+        self.assertEqual(len(server.batches[2]), 1)
+
+
+    def test_readBudgetLimit(self):
+        """
+        The read budget of L{udp.Port} does not grow beyond
+        C{_maxReadBudget}.
+        """
+        budget = udp.Port._maxReadBudget
+        server = BatchServer()
+        port = self.makePort(server, [(b"x", ("127.0.0.1", 1))] * budget * 2)
+        port._readBudget = budget
+        port.doRead()
+        self.assertEqual(len(server.batches[0]), budget)
+        self.assertEqual(port._readBudget, budget)
+
+
+    def test_readBudgetShrinks(self):
+        """
+        If the socket of a L{udp.Port} runs out of datagrams before half of
+        its read budget has been read, the budget is halved, down to
+        C{_minReadBudget}.
+        """
+        port = self.makePort(BatchServer(), [(b"x", ("127.0.0.1", 1))])
+        port._readBudget = port._minReadBudget * 4
+        port.doRead()
+        self.assertEqual(port._readBudget, port._minReadBudget * 2)
+        port.doRead()
+        self.assertEqual(port._readBudget, port._minReadBudget)
+        port.doRead()
+        self.assertEqual(port._readBudget, port._minReadBudget)
+
+
+    def test_datagramsReceivedError(self):
+        """
+        An exception raised by C{datagramsReceived} is logged.
+        """
+        class BrokenServer(BatchServer):
+            def datagramsReceived(self, datagrams):
+                1 / 0
+        port = self.makePort(BrokenServer(), [(b"x", ("127.0.0.1", 1))])
+        port.doRead()
+        self.assertEqual(len(self.flushLoggedErrors(ZeroDivisionError)), 1)
+
+
+    def test_connectionRefusedAfterBatch(self):
+        """
+        If reading fails because the connection was refused, the datagrams
+        read before the failure are delivered before C{connectionRefused} is
+        called.
+        """
+        events = []
+        class RefusedServer(BatchServer):
+            def datagramsReceived(self, datagrams):
+                events.append(datagrams)
+            def connectionRefused(self):
+                events.append("refused")
+
+        class RefusingSocket(FakeDatagramSocket):
+            def recvfrom(self, size):
+                if not self.incoming:
+                    raise socket.error(errno.ECONNREFUSED, "refused")
+                return FakeDatagramSocket.recvfrom(self, size)
+
+        port = udp.Port(0, RefusedServer())
+        port.socket = RefusingSocket([(b"x", ("127.0.0.1", 1))])
+        port._connectedAddr = ("127.0.0.1", 1)
+        port.doRead()
+        self.assertEqual(events, [[(b"x", ("127.0.0.1", 1))], "refused"])
+
+
+    def test_writeMany(self):
+        """
+        L{udp.Port.writeMany} writes each datagram to its address, in order,
+        checking each distinct address once.
+        """
+        port = self.makePort(Server())
+        checked = []
+        check = port._checkAddress
+        def checkAddress(addr):
+            checked.append(addr)
+            return check(addr)
+        port._checkAddress = checkAddress
+        datagrams = [(b"a", ("127.0.0.1", 1)), (b"b", ("127.0.0.1", 2)),
+                     (b"c", ("127.0.0.1", 1))]
+        port.writeMany(datagrams)
+        self.assertEqual(port.socket.sent, datagrams)
+        self.assertEqual(checked, [("127.0.0.1", 1), ("127.0.0.1", 2)])
+
+
+    def test_writeManyInvalidAddress(self):
+        """
+        L{udp.Port.writeMany} raises L{error.InvalidAddressError} for an
+        address which is not an IP address, after writing the datagrams
+        before it.
+        """
+        port = self.makePort(Server())
+        self.assertRaises(
+            error.InvalidAddressError, port.writeMany,
+            [(b"a", ("127.0.0.1", 1)), (b"b", ("example.invalid", 1)),
+             (b"c", ("127.0.0.1", 1))])
+        self.assertEqual(port.socket.sent, [(b"a", ("127.0.0.1", 1))])
+
+
+
+class ReusePortTests(unittest.TestCase):
+    """
+    Tests for the C{reusePort} argument to L{udp.Port}.
+    """
+    if getattr(socket, "SO_REUSEPORT", None) is None:
+        skip = "SO_REUSEPORT is not supported on this platform"
+
+    def bind(self, port=0, reusePort=True):
+        """
+        Make a L{udp.Port} bound to C{127.0.0.1} and arrange for its socket to
+        be closed at the end of the test.
+        """
+        p = udp.Port(port, Server(), interface="127.0.0.1",
+                     reusePort=reusePort)
+        p._bindSocket()
+        self.addCleanup(p.socket.close)
+        return p
+
+
+    def test_reusePort(self):
+        """
+        If C{reusePort} is C{True}, L{udp.Port} sets C{SO_REUSEPORT} on its
+        socket, so another such port can be bound to the same port number.
+        """
+        first = self.bind()
+        portNumber = first.getHost().port
+        second = self.bind(portNumber)
+        self.assertEqual(second.getHost().port, portNumber)
+
+
+    def test_noReusePort(self):
+        """
+        By default, L{udp.Port} does not set C{SO_REUSEPORT}, and so can't be
+        bound to a port number already in use.
+        """
+        first = self.bind(reusePort=False)
+        self.assertRaises(
+            error.CannotListenError, self.bind, first.getHost().port, False)
+
+
+
 class ReactorShutdownInteraction(unittest.TestCase):
     """Test reactor shutdown interaction"""
 
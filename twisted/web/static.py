@@ -24,7 +24,7 @@ from twisted.web.util import redirectTo
 from twisted.python.compat import networkString, intToBytes, nativeString, _PY3
 
 from twisted.python import components, filepath, log
-from twisted.internet import abstract, interfaces
+from twisted.internet import abstract, interfaces, error
 from twisted.python.util import InsensitiveDict
 from twisted.python.runtime import platformType
 
@@ -670,6 +670,63 @@ class StaticProducer(object):
         self.request = None
 
 
+    def _sendFile(self, offset, size=None):
+        """
+        Send part of the file with
+        L{interfaces.ISendfileTransport.sendFile}, if the request's transport
+        provides it, and finish the request once it has been sent.
+
+        The file can only be sent this way if its bytes are sent unchanged:
+        not if the response is compressed or uses chunked transfer encoding.
+
+        @param offset: The offset into the file of the first byte to send.
+        @param size: The number of bytes to send, or C{None} to send the rest
+            of the file.
+
+        @return: C{True} if the file is being sent, C{False} if it must be
+            written to the request instead.
+        """
+        request = self.request
+        transport = getattr(request, 'transport', None)
+        if (getattr(request, '_encoder', None) is not None or
+                not interfaces.ISendfileTransport.providedBy(transport)):
+            return False
+        try:
+            fileno = self.fileObject.fileno()
+        except (AttributeError, IOError, ValueError):
+            return False
+        if size is None:
+            size = os.fstat(fileno).st_size - offset
+
+        # Send the status line and headers.
+        request.write(b"")
+        if request.chunked or not request.startedWriting:
+            return False
+        request.sentLength += size
+        d = transport.sendFile(self.fileObject, offset, size)
+        d.addCallbacks(self._fileSent, self._sendFileFailed)
+        return True
+
+
+    def _fileSent(self, ignored):
+        """
+        Finish the request once the file has been sent by L{_sendFile}.
+        """
+        if self.request is not None:
+            self.request.finish()
+            self.stopProducing()
+
+
+    def _sendFileFailed(self, reason):
+        """
+        Clean up if the file could not be sent by L{_sendFile}; usually because
+        the connection was lost.
+        """
+        self.stopProducing()
+        if not reason.check(error.ConnectionLost, error.ConnectionDone):
+            log.err(reason, "Failed to send file")
+
+
 
 class NoRangeStaticProducer(StaticProducer):
     """
@@ -677,7 +734,8 @@ class NoRangeStaticProducer(StaticProducer):
     """
 
     def start(self):
-        self.request.registerProducer(self, False)
+        if not self._sendFile(self.fileObject.tell()):
+            self.request.registerProducer(self, False)
 
 
     def resumeProducing(self):
@@ -717,7 +775,8 @@ class SingleRangeStaticProducer(StaticProducer):
     def start(self):
         self.fileObject.seek(self.offset)
         self.bytesWritten = 0
-        self.request.registerProducer(self, 0)
+        if not self._sendFile(self.offset, self.size):
+            self.request.registerProducer(self, 0)
 
 
     def resumeProducing(self):
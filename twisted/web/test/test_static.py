@@ -13,17 +13,20 @@ import re
 
 from io import BytesIO as StringIO
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
-from twisted.internet import abstract, interfaces
+from twisted.internet import abstract, interfaces, error
+from twisted.internet.defer import Deferred
 from twisted.python.runtime import platform
 from twisted.python.filepath import FilePath
 from twisted.python import log
 from twisted.python.compat import iteritems, intToBytes, networkString
 from twisted.trial.unittest import TestCase
-from twisted.web import static, http, script, resource
+from twisted.web import static, http, script, resource, server
 from twisted.web.server import UnsupportedMethod
 from twisted.web.test.test_web import DummyRequest
+from twisted.web.test.requesthelper import DummyChannel
 from twisted.web.test._util import _render
 
 
@@ -855,6 +858,139 @@ class SingleRangeStaticProducerTests(TestCase):
 
 
 
+@implementer(interfaces.ISendfileTransport)
+class SendfileTransport(DummyChannel.TCP):
+    """
+    A transport which records the parts of files passed to L{sendFile}.
+
+    @ivar sentFiles: A C{list} of C{(fileObj, offset, count, deferred)}
+        tuples, one for each call to L{sendFile}.
+    """
+
+    def __init__(self):
+        DummyChannel.TCP.__init__(self)
+        self.sentFiles = []
+
+
+    def sendFile(self, fileObj, offset, count):
+        d = Deferred()
+        self.sentFiles.append((fileObj, offset, count, d))
+        return d
+
+
+
+class SendfileStaticProducerTests(TestCase):
+    """
+    Tests for the use of L{interfaces.ISendfileTransport} by
+    L{NoRangeStaticProducer} and L{SingleRangeStaticProducer}.
+    """
+
+    def setUp(self):
+        self.content = b"abcdef"
+        path = FilePath(self.mktemp())
+        path.setContent(self.content)
+        self.fileObject = path.open()
+        self.addCleanup(self.fileObject.close)
+        channel = DummyChannel()
+        channel.transport = self.transport = SendfileTransport()
+        self.request = server.Request(channel, False)
+        self.request.gotLength(0)
+        self.request.method = b"GET"
+        self.request.clientproto = b"HTTP/1.1"
+
+
+    def test_noRange(self):
+        """
+        L{NoRangeStaticProducer.start} writes the response headers and passes
+        the whole file to C{sendFile}, and finishes the request once it has
+        been sent.
+        """
+        self.request.setHeader(b"content-length", b"6")
+        producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+        producer.start()
+        [(fileObj, offset, count, d)] = self.transport.sentFiles
+        self.assertEqual(
+            (fileObj, offset, count), (self.fileObject, 0, 6))
+        self.assertEqual(self.transport.producers, [])
+        self.assertTrue(
+            self.transport.written.getvalue().startswith(b"HTTP/1.1 200 OK"))
+        self.assertEqual(self.request.sentLength, 6)
+        self.assertFalse(self.request.finished)
+        d.callback(None)
+        self.assertTrue(self.request.finished)
+        self.assertTrue(self.fileObject.closed)
+
+
+    def test_singleRange(self):
+        """
+        L{SingleRangeStaticProducer.start} passes the requested part of the
+        file to C{sendFile}.
+        """
+        self.request.setHeader(b"content-length", b"3")
+        producer = static.SingleRangeStaticProducer(
+            self.request, self.fileObject, 2, 3)
+        producer.start()
+        [(fileObj, offset, count, d)] = self.transport.sentFiles
+        self.assertEqual((offset, count), (2, 3))
+        d.callback(None)
+        self.assertTrue(self.request.finished)
+
+
+    def test_chunked(self):
+        """
+        If the response uses chunked transfer encoding, the file is written to
+        the request by the producer instead.
+        """
+        producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+        producer.start()
+        self.assertEqual(self.transport.sentFiles, [])
+        self.assertEqual(self.transport.producers, [(producer, False)])
+
+
+    def test_encoded(self):
+        """
+        If the response is encoded, the file is written to the request by the
+        producer instead.
+        """
+        self.request._encoder = object()
+        producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+        producer.start()
+        self.assertEqual(self.transport.sentFiles, [])
+        self.assertEqual(self.transport.producers, [(producer, False)])
+
+
+    def test_connectionLost(self):
+        """
+        If the connection is lost before the file has been sent, the file is
+        closed.
+        """
+        self.request.setHeader(b"content-length", b"6")
+        producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+        producer.start()
+        self.transport.sentFiles[0][3].errback(error.ConnectionLost())
+        self.assertTrue(self.fileObject.closed)
+        self.assertEqual(self.flushLoggedErrors(), [])
+
+
+    def test_failureLogged(self):
+        """
+        Failures to send the file other than the connection being lost are
+        logged.
+        """
+        self.request.setHeader(b"content-length", b"6")
+        producer = static.NoRangeStaticProducer(
+            self.request, self.fileObject)
+        producer.start()
+        self.transport.sentFiles[0][3].errback(RuntimeError())
+        self.assertTrue(self.fileObject.closed)
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+
+
+
 class MultipleRangeStaticProducerTests(TestCase):
     """
     Tests for L{MultipleRangeStaticProducer}.